@@ -4,12 +4,32 @@
 
 from aws_cdk import (
     aws_dynamodb as dynamodb,
+    aws_stepfunctions as sfn,
+    aws_stepfunctions_tasks as tasks,
 )
 
 from constructs import Construct
 
 from pace_constructs import PACETable
 
+# what the list page shows of a diagram, projected into the indexes we list diagrams from (previews rather than the
+# compressed descriptions, see genai_core.adapter.dynamo_db_data_model.CompressedUnicodeAttribute)
+DIAGRAM_SUMMARY_ATTRIBUTES = ["threat_model_id", "s3_prefix", "user_description_preview", "diagram_description_preview",
+                              "status"]
+
+
+def _update_status_task(scope: Construct, construct_id: str, table: dynamodb.ITable,
+                        key: dict[str, tasks.DynamoAttributeValue], status: str) -> tasks.DynamoUpdateItem:
+    return tasks.DynamoUpdateItem(
+        scope, construct_id,
+        key=key,
+        table=table,
+        expression_attribute_names={"#current_status": "status"},
+        expression_attribute_values={":current_status": tasks.DynamoAttributeValue.from_string(status)},
+        update_expression="SET #current_status = :current_status",
+        result_path=sfn.JsonPath.DISCARD
+    )
+
 
 class Database(Construct):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
@@ -31,12 +51,16 @@ class Database(Construct):
         self.threat_models_table = PACETable(
             self, "ThreatModels",
             partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            # see ThreatModelDocuments
+            stream=dynamodb.StreamViewType.KEYS_ONLY,
             # sort_key=dynamodb.Attribute(name="SK", type=dynamodb.AttributeType.STRING),
         )
 
         self.diagrams_table = PACETable(
             self, "Diagrams",
             partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            # see ThreatModelDocuments, old images tell us the parent of deleted items
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
         )
 
         self.diagrams_table.add_global_secondary_index(
@@ -46,9 +70,20 @@ class Database(Construct):
             projection_type=dynamodb.ProjectionType.ALL,
         )
 
+        # list page, see genai_core.adapter.dynamo_db_data_model.DiagramsByCreatedAtIndex
+        self.diagrams_table.add_global_secondary_index(
+            index_name="ByCreatedAt",
+            partition_key=dynamodb.Attribute(name="summary_pk", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="created_at", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=DIAGRAM_SUMMARY_ATTRIBUTES,
+        )
+
         self.components_table = PACETable(
             self, "Components",
             partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            # see ThreatModelDocuments, old images tell us the parent of deleted items
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
         )
 
         self.components_table.add_global_secondary_index(
@@ -61,6 +96,8 @@ class Database(Construct):
         self.threats_table = PACETable(
             self, "Threats",
             partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            # see ThreatModelDocuments, old images tell us the parent of deleted items
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
         )
 
         self.threats_table.add_global_secondary_index(
@@ -70,6 +107,27 @@ class Database(Construct):
             projection_type=dynamodb.ProjectionType.ALL,
         )
 
+        # materialized threat models, maintained from the streams of the tables above, see
+        # genai_core.adapter.threat_model_documents
+        self.threat_model_documents_table = PACETable(
+            self, "ThreatModelDocuments",
+            partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            time_to_live_attribute="expires_at",
+        )
+
+        # counters of the risk summary of every diagram and component, see genai_core.adapter.risk_summaries
+        self.risk_summaries_table = PACETable(
+            self, "RiskSummaries",
+            partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+        )
+
+        # content-addressed cache of deterministic converse responses, see genai_core.converse_cache
+        self.converse_cache_table = PACETable(
+            self, "ConverseCache",
+            partition_key=dynamodb.Attribute(name="key", type=dynamodb.AttributeType.STRING),
+            time_to_live_attribute="expires_at",
+        )
+
     def grant_read_data(self):
         raise NotImplementedError("You must implement this method")
 
@@ -77,9 +135,18 @@ class Database(Construct):
         raise NotImplementedError("You must implement this method")
 
     def grant_read_write_data(self, grantee):
-        for table in [self.threat_models_table, self.diagrams_table, self.components_table, self.threats_table]:
+        for table in [self.threat_models_table, self.diagrams_table, self.components_table, self.threats_table,
+                      self.threat_model_documents_table, self.risk_summaries_table, self.converse_cache_table]:
             table.grant_read_write_data(grantee)
 
+    def streamed_tables(self) -> list[dynamodb.ITable]:
+        return [self.threat_models_table, self.diagrams_table, self.components_table, self.threats_table]
+
+    def diagram_status_update(self, scope: Construct, construct_id: str, status: str) -> sfn.IChainable:
+        """ Step Functions state(s) setting the status of the diagram whose id is at `$.id` """
+        return _update_status_task(scope, construct_id, self.diagrams_table, {
+            "id": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at("$.id")),
+        }, status)
 
     def table_names(self) -> dict:
         return {
@@ -87,4 +154,98 @@ class Database(Construct):
             "DIAGRAMS_TABLE_NAME": self.diagrams_table.table_name,
             "COMPONENTS_TABLE_NAME": self.components_table.table_name,
             "THREATS_TABLE_NAME": self.threats_table.table_name,
-        }
\ No newline at end of file
+            "RISK_SUMMARIES_TABLE_NAME": self.risk_summaries_table.table_name,
+            "THREAT_MODEL_DOCUMENTS_TABLE_NAME": self.threat_model_documents_table.table_name,
+            "CONVERSE_CACHE_TABLE_NAME": self.converse_cache_table.table_name,
+        }
+
+
+class SingleTableDatabase(Construct):
+    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+        """
+        Single-table alternative to `Database`, see genai_core.adapter.single_table_threat_model_repository for the
+        key design. A whole threat model is a single Query on its partition instead of a Query per tree level.
+
+        Enable it with the `single_table_database` CDK context flag, and copy existing data over with
+        genai_core.adapter.single_table_migration.
+        """
+        super().__init__(scope, construct_id)
+
+        self.threat_model_items_table = PACETable(
+            self, "ThreatModelItems",
+            partition_key=dynamodb.Attribute(name="PK", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="SK", type=dynamodb.AttributeType.STRING),
+            # see ThreatModelDocuments, the partition key is all we need to know which threat model changed
+            stream=dynamodb.StreamViewType.KEYS_ONLY,
+        )
+
+        # sparse index, only diagram items have the `diagrams_index_pk` attribute
+        self.threat_model_items_table.add_global_secondary_index(
+            index_name="Diagrams",
+            partition_key=dynamodb.Attribute(name="diagrams_index_pk", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.ALL,
+        )
+
+        self.threat_model_items_table.add_global_secondary_index(
+            index_name="DiagramsByCreatedAt",
+            partition_key=dynamodb.Attribute(name="summary_pk", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="created_at", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["id", "entity_type", *DIAGRAM_SUMMARY_ATTRIBUTES],
+        )
+
+        # materialized threat models, maintained from the stream of the table above, see
+        # genai_core.adapter.threat_model_documents
+        self.threat_model_documents_table = PACETable(
+            self, "ThreatModelDocuments",
+            partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            time_to_live_attribute="expires_at",
+        )
+
+        # content-addressed cache of deterministic converse responses, see genai_core.converse_cache
+        self.converse_cache_table = PACETable(
+            self, "ConverseCache",
+            partition_key=dynamodb.Attribute(name="key", type=dynamodb.AttributeType.STRING),
+            time_to_live_attribute="expires_at",
+        )
+
+    def grant_read_write_data(self, grantee):
+        for table in [self.threat_model_items_table, self.threat_model_documents_table, self.converse_cache_table]:
+            table.grant_read_write_data(grantee)
+
+    def streamed_tables(self) -> list[dynamodb.ITable]:
+        return [self.threat_model_items_table]
+
+    def diagram_status_update(self, scope: Construct, construct_id: str, status: str) -> sfn.IChainable:
+        """
+        Step Functions state(s) setting the status of the diagram whose id is at `$.id`. The key of a diagram item
+        includes its threat model, so we first read it from the reference item of the diagram.
+        """
+        get_reference = tasks.DynamoGetItem(
+            scope, f"{construct_id} Reference",
+            table=self.threat_model_items_table,
+            key={
+                "PK": tasks.DynamoAttributeValue.from_string(
+                    sfn.JsonPath.format("REF#D#{}", sfn.JsonPath.string_at("$.id"))),
+                "SK": tasks.DynamoAttributeValue.from_string("REF"),
+            },
+            consistent_read=True,
+            result_selector={
+                "PK": sfn.JsonPath.string_at("$.Item.item_pk.S"),
+                "SK": sfn.JsonPath.string_at("$.Item.item_sk.S"),
+            },
+            result_path="$.diagramKey",
+        )
+        update_status = _update_status_task(scope, construct_id, self.threat_model_items_table, {
+            "PK": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at("$.diagramKey.PK")),
+            "SK": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at("$.diagramKey.SK")),
+        }, status)
+        return sfn.Chain.start(get_reference).next(update_status)
+
+    def table_names(self) -> dict:
+        return {
+            "THREAT_MODEL_ITEMS_TABLE_NAME": self.threat_model_items_table.table_name,
+            "THREAT_MODEL_DOCUMENTS_TABLE_NAME": self.threat_model_documents_table.table_name,
+            "CONVERSE_CACHE_TABLE_NAME": self.converse_cache_table.table_name,
+        }
@@ -3,6 +3,7 @@
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
 import os
+from typing import Union
 
 from aws_cdk import (
     CfnOutput,
@@ -25,12 +26,12 @@ from constructs import Construct
 
 from cdk_nag import NagSuppressions, NagPackSuppression
 
-from backend.api.database import Database
+from backend.api.database import Database, SingleTableDatabase
 
 
 class GenerateThreatsWorkflow(Construct):
     def __init__(self, scope: Construct, construct_id: str, graphql_api: appsync.GraphqlApi, data_bucket: s3.IBucket,
-                 db: Database, event_bus: events.IEventBus, layers, **kwargs) -> None:
+                 db: Union[Database, SingleTableDatabase], event_bus: events.IEventBus, layers, **kwargs) -> None:
         super().__init__(scope, construct_id)
 
         bedrock_xacct_role = self.node.try_get_context("BEDROCK_XACCT_ROLE")
@@ -46,11 +47,12 @@ class GenerateThreatsWorkflow(Construct):
                 "POWERTOOLS_LOG_LEVEL": "INFO",
                 "POWERTOOLS_METRICS_NAMESPACE": "ThreatModel",
                 "DATA_BUCKET_NAME": data_bucket.bucket_name,
+                "STREAM_PARTIAL_RESULTS": "true",
 
                 **db.table_names(),
             },
             memory_size=2048,
-            timeout=Duration.minutes(2),  # generation of threats takes 2min on p90
+            timeout=Duration.minutes(5),  # generation of threats for a single STRIDE type takes 2min on p90, we now ask for all types at once
             layers=layers
         )
 
@@ -65,7 +67,7 @@ class GenerateThreatsWorkflow(Construct):
             ))
 
         generate_threats_function.add_to_role_policy(iam.PolicyStatement(
-            actions=["bedrock:InvokeModel"],
+            actions=["bedrock:InvokeModel", "bedrock:InvokeModelWithResponseStream"],
             effect=iam.Effect.ALLOW,
             resources=[
                 f"arn:aws:bedrock:us-east-1::foundation-model/{model_id}"
@@ -78,28 +80,20 @@ class GenerateThreatsWorkflow(Construct):
         data_bucket.grant_read_write(generate_threats_function)
 
         graphql_api.grant(generate_threats_function,
-                          appsync.IamResource.custom("types/Mutation/fields/threats"),
+                          appsync.IamResource.custom("types/Mutation/fields/threats",
+                                                     "types/Mutation/fields/partialThreats"),
                           "appsync:GraphQL")
 
         def _update_status_to(status: str):
-            return tasks.DynamoUpdateItem(
-                self, f"Update Status to {status}",
-                key={
-                    "id": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at("$.id"))
-                },
-                table=db.diagrams_table,
-                expression_attribute_names={"#current_status": "status"},
-                expression_attribute_values={":current_status": tasks.DynamoAttributeValue.from_string(status)},
-                update_expression="SET #current_status = :current_status",
-                result_path=sfn.JsonPath.DISCARD
-            )
+            return db.diagram_status_update(self, f"Update Status to {status}", status)
 
         update_status_to_generating = _update_status_to("GENERATING_THREATS")
         update_status_to_generated = _update_status_to("THREATS_GENERATED")
 
         """
-        We will do a cross-product of components and threat types. This means that if we have as input 3 components,
-        and 6 threat types, it will result in 3x6=18 invocations to our generate threats task
+        We will create one task per component, each asking for all threat types in a single LLM call. This means that
+        if we have as input 3 components and 6 threat types, it will result in 3 invocations to our generate threats
+        task (instead of a 3x6=18 cross-product)
         """
 
         collect_all_tasks_function = lambda_.Function(
@@ -113,7 +107,7 @@ class GenerateThreatsWorkflow(Construct):
                 "const { id, s3Prefix, diagramDescription } = ev; "
                 "const components = ev.components || []; "
                 "const threatTypes = ev.threatTypes.length == 0 ? DEFAULT_THREAT_TYPES : ev.threatTypes; "
-                " const tasks = components.flatMap(component => threatTypes.map(threatType => ({ component, threatType }))); "
+                " const tasks = components.map(component => ({ component, threatTypes })); "
                 "cb(null, { id, s3Prefix, diagramDescription, tasks })"
                 "}")
         )
@@ -131,7 +125,7 @@ class GenerateThreatsWorkflow(Construct):
                 "id": sfn.JsonPath.string_at('$.id'),
                 "s3Prefix": sfn.JsonPath.string_at('$.s3Prefix'),
                 "diagramDescription": sfn.JsonPath.string_at('$.diagramDescription'),
-                "threatType": sfn.JsonPath.string_at('$$.Map.Item.Value.threatType'),
+                "threatTypes": sfn.JsonPath.list_at('$$.Map.Item.Value.threatTypes'),
                 "component": sfn.JsonPath.object_at('$$.Map.Item.Value.component'),
             },
             result_path=sfn.JsonPath.DISCARD,
@@ -182,6 +176,7 @@ class GenerateThreatsWorkflow(Construct):
                                            "Resource::<ThreatModelDatabaseComponentsB5563436.Arn>/index/*",
                                            "Resource::<ThreatModelDatabaseDiagrams2F00824D.Arn>/index/*",
                                            "Resource::<ThreatModelDatabaseThreats1E5E17C7.Arn>/index/*",
+                                           "Resource::<ThreatModelDatabaseThreatModelItems2A8155BA.Arn>/index/*",
                                        ]),
                     NagPackSuppression(id="AwsSolutions-IAM5",
                                        reason="CDK uses stars in actions for S3 for convenience.",
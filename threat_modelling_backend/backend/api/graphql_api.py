@@ -22,7 +22,8 @@ from aws_cdk import (
 from constructs import Construct
 
 from backend.api.generate_threats_workflow import GenerateThreatsWorkflow
-from backend.api.database import Database
+from backend.api.database import Database, SingleTableDatabase
+from backend.api.materialize_documents import MaterializeDocuments
 
 from cdk_aws_lambda_powertools_layer import LambdaPowertoolsLayer
 
@@ -62,7 +63,10 @@ class GraphQLAPI(Construct):
                                       server_access_logs_bucket=self.logs_bucket
                                       )
 
-        db = Database(self, "Database")
+        if self.node.try_get_context("single_table_database"):
+            db = SingleTableDatabase(self, "Database")
+        else:
+            db = Database(self, "Database")
 
         auth_config = appsync.AuthorizationConfig(
             default_authorization=appsync.AuthorizationMode(authorization_type=appsync.AuthorizationType.USER_POOL,
@@ -114,6 +118,9 @@ class GraphQLAPI(Construct):
                                                        db=db, event_bus=bus,
                                                        layers=[powertools_layer, shared_layer, genai_core_layer])
 
+        MaterializeDocuments(self, "MaterializeDocuments", db=db,
+                             layers=[powertools_layer, shared_layer, genai_core_layer])
+
         resolver_function = lambda_py.PythonFunction(
             self, "ResolverFn",
             runtime=lambda_.Runtime.PYTHON_3_12,
@@ -125,6 +132,11 @@ class GraphQLAPI(Construct):
                 "POWERTOOLS_LOG_LEVEL": "INFO",
                 "POWERTOOLS_METRICS_NAMESPACE": "ThreatModel",
                 "DATA_BUCKET_NAME": self.data_bucket.bucket_name,
+                "STREAM_PARTIAL_RESULTS": "true",
+                # getDiagram and generateReport could load whole threat models from a single materialized item, but
+                # documents lag behind the threats written by the generate threats workflow, see
+                # genai_core.adapter.threat_model_documents
+                "REPOSITORY_DOCUMENTS_ENABLED": "false",
 
                 **db.table_names(),
             },
@@ -142,8 +154,15 @@ class GraphQLAPI(Construct):
             ))
 
         resolver_function.add_to_role_policy(iam.PolicyStatement(
+            # we embed few shot example images to pick the ones most similar to the described diagram
             actions=["bedrock:InvokeModel"],
             effect=iam.Effect.ALLOW,
+            resources=["arn:aws:bedrock:us-east-1::foundation-model/amazon.titan-embed-image-v1"]
+        ))
+
+        resolver_function.add_to_role_policy(iam.PolicyStatement(
+            actions=["bedrock:InvokeModel", "bedrock:InvokeModelWithResponseStream"],
+            effect=iam.Effect.ALLOW,
             resources=[
                 f"arn:aws:bedrock:us-east-1::foundation-model/{model_id}"
                 for model_id in ["anthropic.claude-3-haiku-20240307-v1:0",
@@ -153,6 +172,12 @@ class GraphQLAPI(Construct):
         ))
 
         self.data_bucket.grant_read(resolver_function)
+        # the resolver stores the normalized variant of uploaded diagrams
+        self.data_bucket.grant_put(resolver_function, "normalized/*")
+        # and the embeddings of the few shot examples
+        self.data_bucket.grant_put(resolver_function, "genai_core_example_index/*")
+        # deleting a threat model deletes its images, threats and reports
+        self.data_bucket.grant_delete(resolver_function)
         db.grant_read_write_data(resolver_function)
 
         datasource = graphql_api.add_event_bridge_data_source("GraphQLDataSource", bus)
@@ -215,7 +240,8 @@ class GraphQLAPI(Construct):
         subscriptions_datasource = graphql_api.add_none_data_source("GraphQLSubscriptionsDataSource",
                                                                     description="Source for subscription creation updates")
 
-        for field_name in ["diagramDescription", "components", "threats", "allThreatsGenerated"]:
+        for field_name in ["diagramDescription", "components", "partialComponents", "threats", "partialThreats",
+                           "allThreatsGenerated"]:
             graphql_api.grant(resolver_function,
                               appsync.IamResource.custom(f"types/Mutation/fields/{field_name}"),
                               "appsync:GraphQL")
@@ -232,14 +258,19 @@ class GraphQLAPI(Construct):
 
         sync_datasource.create_resolver("ListDiagramResolver", type_name="Query", field_name="listDiagrams")
         sync_datasource.create_resolver("GetDiagramResolver", type_name="Query", field_name="getDiagram")
+        sync_datasource.create_resolver("GetRiskSummaryResolver", type_name="Query", field_name="getRiskSummary")
 
         sync_datasource.create_resolver("CreateComponentResolver", type_name="Mutation", field_name="createComponent")
 
         sync_datasource.create_resolver("UpdateComponentResolver", type_name="Mutation", field_name="updateComponent")
         sync_datasource.create_resolver("UpdateThreatResolver", type_name="Mutation", field_name="updateThreat")
+        sync_datasource.create_resolver("UpdateThreatsResolver", type_name="Mutation", field_name="updateThreats")
 
+        sync_datasource.create_resolver("DeleteThreatModelResolver", type_name="Mutation",
+                                        field_name="deleteThreatModel")
         sync_datasource.create_resolver("DeleteComponentResolver", type_name="Mutation", field_name="deleteComponent")
         sync_datasource.create_resolver("DeleteThreatResolver", type_name="Mutation", field_name="deleteThreat")
+        sync_datasource.create_resolver("DeleteThreatsResolver", type_name="Mutation", field_name="deleteThreats")
 
         sync_datasource.create_resolver("GenerateReportResolver", type_name="Mutation", field_name="generateReport")
 
@@ -310,6 +341,7 @@ class GraphQLAPI(Construct):
                                        "Resource::<ThreatModelDatabaseComponentsB5563436.Arn>/index/*",
                                        "Resource::<ThreatModelDatabaseDiagrams2F00824D.Arn>/index/*",
                                        "Resource::<ThreatModelDatabaseThreats1E5E17C7.Arn>/index/*",
+                                       "Resource::<ThreatModelDatabaseThreatModelItems2A8155BA.Arn>/index/*",
                                    ])
             ],
             apply_to_children=True,
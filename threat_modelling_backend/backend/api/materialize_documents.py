@@ -0,0 +1,83 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import os
+from typing import Union
+
+from aws_cdk import (
+    Duration,
+    aws_lambda as lambda_,
+    aws_lambda_event_sources as lambda_event_sources,
+    aws_lambda_python_alpha as lambda_py,
+)
+
+from constructs import Construct
+
+from cdk_nag import NagSuppressions, NagPackSuppression
+
+from backend.api.database import Database, SingleTableDatabase
+
+
+class MaterializeDocuments(Construct):
+    """ Keeps the threat model documents up to date from the streams of the threat model tables """
+
+    def __init__(self, scope: Construct, construct_id: str, db: Union[Database, SingleTableDatabase], layers,
+                 **kwargs) -> None:
+        super().__init__(scope, construct_id)
+
+        materialize_documents_function = lambda_py.PythonFunction(
+            self, "MaterializeDocumentsFn",
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            entry=os.path.join(os.path.dirname(__file__), "streams/materialize_documents"),
+            handler="lambda_handler",
+            environment={
+                "POWERTOOLS_SERVICE_NAME": "materialize_documents",
+                "POWERTOOLS_LOG_LEVEL": "INFO",
+                "POWERTOOLS_METRICS_NAMESPACE": "ThreatModel",
+
+                **db.table_names(),
+            },
+            memory_size=512,
+            timeout=Duration.minutes(1),
+            layers=layers
+        )
+
+        db.grant_read_write_data(materialize_documents_function)
+
+        for table in db.streamed_tables():
+            materialize_documents_function.add_event_source(lambda_event_sources.DynamoEventSource(
+                table,
+                starting_position=lambda_.StartingPosition.LATEST,
+                batch_size=1000,
+                # the writes of a request (or of a workflow step) land in the same batch and are rebuilt once
+                max_batching_window=Duration.seconds(2),
+                retry_attempts=3,
+                report_batch_item_failures=True,
+            ))
+
+        NagSuppressions.add_resource_suppressions(
+            materialize_documents_function,
+            suppressions=[
+                NagPackSuppression(
+                    id="AwsSolutions-IAM4",
+                    reason="For prototyping we use the AWS managed AWSLambdaBasicExecutionRole which uses AWS managed policies.",
+                    applies_to=[
+                        "Policy::arn:<AWS::Partition>:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+                    ]
+                ),
+                NagPackSuppression(id="AwsSolutions-IAM5",
+                                   reason="This Lambda should be able to query all table indices (GSIs).",
+                                   applies_to=[
+                                       "Resource::<ThreatModelThreatModelsTableF1D3D29B.Arn>/index/*",
+                                       "Resource::<ThreatModelDatabaseComponentsB5563436.Arn>/index/*",
+                                       "Resource::<ThreatModelDatabaseDiagrams2F00824D.Arn>/index/*",
+                                       "Resource::<ThreatModelDatabaseThreats1E5E17C7.Arn>/index/*",
+                                       "Resource::<ThreatModelDatabaseThreatModelItems2A8155BA.Arn>/index/*",
+                                   ]),
+                NagPackSuppression(id="AwsSolutions-IAM5",
+                                   reason="DynamoDB event sources need to list the streams of the tables.",
+                                   applies_to=["Resource::*"]),
+            ],
+            apply_to_children=True
+        )
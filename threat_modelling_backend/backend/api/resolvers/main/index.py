@@ -3,6 +3,7 @@
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
 import boto3
+from datetime import datetime, timezone
 import os
 
 from aws_lambda_powertools import Logger, Metrics
@@ -11,15 +12,16 @@ from aws_lambda_powertools.logging import correlation_paths
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
 from graphql.model import (
-    DiagramInput, ExtractComponentsInput, DiagramDescriptionMutation, ComponentsMutation
+    DiagramInput, ExtractComponentsInput, DiagramDescriptionMutation, ComponentsMutation, PartialComponentsMutation
 )
-from graphql.notifier import notify
+from graphql.notifier import notify, relay_partial_result
 
 from genai_core.repository import ThreatModelRepository
-from genai_core.adapter import DynamoDBThreatModelRepository
+from genai_core.adapter import repository_from_environment
 from genai_core.diagram_describer import get_diagram_description
-from genai_core.dfd_extractor import get_dfd_from_diagram_and_description
-from genai_core.model import ThreatModel, Diagram, Component
+from genai_core.dfd_extractor import get_dfd_from_diagram_and_description, stream_dfd_components
+from genai_core.image_pipeline import get_normalized_image
+from genai_core.model import ThreatModel, Diagram, Component, DFD
 
 from routers.sync_resolvers import router as sync_resolvers_router
 
@@ -29,27 +31,19 @@ app = AppSyncResolver()
 
 DATA_BUCKET_NAME = os.environ["DATA_BUCKET_NAME"]
 
-THREAT_MODELS_TABLE_NAME = os.getenv("THREAT_MODELS_TABLE_NAME")
-DIAGRAMS_TABLE_NAME = os.getenv("DIAGRAMS_TABLE_NAME", "Diagrams")
-COMPONENTS_TABLE_NAME = os.getenv("COMPONENTS_TABLE_NAME", "Components")
-THREATS_TABLE_NAME = os.getenv("THREATS_TABLE_NAME", "Threats")
+# when enabled, we relay each component to subscribers as soon as the LLM has generated it
+STREAM_PARTIAL_RESULTS = os.getenv("STREAM_PARTIAL_RESULTS", "false").lower() == "true"
 
-repository: ThreatModelRepository = DynamoDBThreatModelRepository.from_table_names(
-    threat_models_table_name=THREAT_MODELS_TABLE_NAME,
-    diagrams_table_name=DIAGRAMS_TABLE_NAME,
-    components_table_name=COMPONENTS_TABLE_NAME,
-    threats_table_name=THREATS_TABLE_NAME,
-) if (THREAT_MODELS_TABLE_NAME and DIAGRAMS_TABLE_NAME and COMPONENTS_TABLE_NAME and THREATS_TABLE_NAME) else None
+repository: ThreatModelRepository = repository_from_environment()
 
 s3_client = boto3.session.Session().client("s3")
 
 app.include_router(sync_resolvers_router)
 
 
-def read_s3_object(prefix: str, bucket_name=DATA_BUCKET_NAME) -> bytes:
-    logger.info(f"Reading object {bucket_name}/{prefix}")
-    s3_object = s3_client.get_object(Bucket=bucket_name, Key=prefix)
-    return s3_object["Body"].read()
+def read_diagram_image(prefix: str, bucket_name=DATA_BUCKET_NAME) -> bytes:
+    logger.info(f"Reading diagram image {bucket_name}/{prefix}")
+    return get_normalized_image(s3_client, bucket_name=bucket_name, key=prefix)
 
 
 @app.resolver(type_name="Mutation", field_name="extractComponents")
@@ -58,11 +52,26 @@ def extract_components(extractComponentsInput: dict) -> Diagram:
     extract_components_input = ExtractComponentsInput(**extractComponentsInput)
     diagram_id = extract_components_input.id
 
-    image = read_s3_object(prefix=extract_components_input.s3Prefix)
-
-    dfd = get_dfd_from_diagram_and_description(image=image,
-                                               diagram_description=extract_components_input.diagramDescription,
-                                               model_id=extract_components_input.modelId)
+    image = read_diagram_image(prefix=extract_components_input.s3Prefix)
+
+    if STREAM_PARTIAL_RESULTS:
+        dfd = DFD(components=[])
+        for dfd_component in stream_dfd_components(image=image,
+                                                   diagram_description=extract_components_input.diagramDescription,
+                                                   model_id=extract_components_input.modelId):
+            dfd.components.append(dfd_component)
+
+            # only the new component, the final result below relays them all (with the same ids)
+            relay_partial_result(PartialComponentsMutation, Diagram(
+                id=diagram_id,
+                threat_model_id=diagram_id,
+                s3_prefix=extract_components_input.s3Prefix,
+                diagram_description=extract_components_input.diagramDescription,
+                components=[Component(**dfd_component.model_dump(), diagram_id=diagram_id)]))
+    else:
+        dfd = get_dfd_from_diagram_and_description(image=image,
+                                                   diagram_description=extract_components_input.diagramDescription,
+                                                   model_id=extract_components_input.modelId)
 
     logger.info({"dfd": dfd})
 
@@ -86,7 +95,7 @@ def extract_components(extractComponentsInput: dict) -> Diagram:
 def create_diagram(diagramInput: dict) -> Diagram:
     diagram_input = DiagramInput(**diagramInput)
 
-    image = read_s3_object(prefix=diagram_input.s3Prefix)
+    image = read_diagram_image(prefix=diagram_input.s3Prefix)
 
     description = get_diagram_description(image=image,
                                           model_id=diagram_input.modelId,
@@ -99,7 +108,8 @@ def create_diagram(diagramInput: dict) -> Diagram:
                       threat_model_id=diagram_input.id,
                       s3_prefix=diagram_input.s3Prefix,
                       user_description=diagram_input.userDescription,
-                      diagram_description=description)
+                      diagram_description=description,
+                      created_at=datetime.now(timezone.utc).isoformat())
 
     if repository:
         logger.info(f"Persisting diagram {diagram} to threat_model {threat_model}")
@@ -2,30 +2,27 @@
 # SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
-import os
+from typing import Optional
 
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.event_handler.appsync import Router
 
-from genai_core.adapter import DynamoDBThreatModelRepository
-from genai_core.model import Component
-from genai_core.repository import ThreatModelRepository, DeleteItemException
+from genai_core.adapter import repository_from_environment
+from genai_core.model import Component, Threat, DREAD
+from genai_core.repository import ThreatModelRepository, DeleteItemException, NotFoundException, ThreatUpdate
 
 from graphql.model import CreateComponentInput, UpdateComponentInput, UpdateThreatInput, Report
 
 from services.create_xlsx_report_svc import generate_report as generate_report_svc
+from services.delete_threat_model_svc import delete_threat_model as delete_threat_model_svc
 
-THREAT_MODELS_TABLE_NAME = os.getenv("THREAT_MODELS_TABLE_NAME")
-DIAGRAMS_TABLE_NAME = os.getenv("DIAGRAMS_TABLE_NAME", "Diagrams")
-COMPONENTS_TABLE_NAME = os.getenv("COMPONENTS_TABLE_NAME", "Components")
-THREATS_TABLE_NAME = os.getenv("THREATS_TABLE_NAME", "Threats")
+repository: ThreatModelRepository = repository_from_environment()
 
-repository: ThreatModelRepository = DynamoDBThreatModelRepository.from_table_names(
-    threat_models_table_name=THREAT_MODELS_TABLE_NAME,
-    diagrams_table_name=DIAGRAMS_TABLE_NAME,
-    components_table_name=COMPONENTS_TABLE_NAME,
-    threats_table_name=THREATS_TABLE_NAME,
-) if (THREAT_MODELS_TABLE_NAME and DIAGRAMS_TABLE_NAME and COMPONENTS_TABLE_NAME and THREATS_TABLE_NAME) else None
+LIST_DIAGRAMS_DEFAULT_LIMIT = 20
+LIST_DIAGRAMS_MAX_LIMIT = 100
+
+# updateThreats and deleteThreats are sent as batched reads and writes, so a few hundred threats fit in one request
+BULK_THREATS_MAX_ITEMS = 500
 
 logger = Logger()
 router = Router()
@@ -41,6 +38,14 @@ def get_diagram(id: str) -> dict:
     return threat_model.diagrams[0].model_dump(by_alias=True)
 
 
+@router.resolver(type_name="Query", field_name="getRiskSummary")
+def get_risk_summary(diagramId: str, componentId: Optional[str] = None) -> dict:
+    if componentId is not None:
+        return repository.get_component_risk_summary(componentId).model_dump(by_alias=True)
+
+    return repository.get_diagram_risk_summary(diagramId).model_dump(by_alias=True)
+
+
 @router.resolver(type_name="Mutation", field_name="deleteThreat")
 def delete_threat(threatId: str) -> dict:
     try:
@@ -57,6 +62,30 @@ def delete_threat(threatId: str) -> dict:
     }
 
 
+@router.resolver(type_name="Mutation", field_name="deleteThreatModel")
+def delete_threat_model(threatModelId: str) -> dict:
+    try:
+        deletion = delete_threat_model_svc(repository, threatModelId)
+    except NotFoundException as e:
+        return {
+            "success": False,
+            "message": str(e)
+        }
+
+    if deletion.errors:
+        return {
+            "success": False,
+            "message": f"Threat model {threatModelId} deleted, but some of its files could not be deleted: "
+                       f"{' | '.join(deletion.errors)}"
+        }
+
+    return {
+        "success": True,
+        "message": f"Threat model {threatModelId} deleted successfully ({deletion.items_deleted} items and "
+                   f"{deletion.objects_deleted} files)"
+    }
+
+
 @router.resolver(type_name="Mutation", field_name="deleteComponent")
 def delete_component(componentId: str) -> dict:
     try:
@@ -74,54 +103,111 @@ def delete_component(componentId: str) -> dict:
 
 
 @router.resolver(type_name="Query", field_name="listDiagrams")
-def list_diagrams() -> list[dict]:
+def list_diagrams(limit: Optional[int] = None, nextToken: Optional[str] = None) -> dict:
     """
     TODO: this should be a list_threat_models, since this supports the list view frontend page
     will keep this as is for now, but it's slightly confusing
     """
-    diagrams = repository.list_diagrams()
+    limit = max(1, min(limit or LIST_DIAGRAMS_DEFAULT_LIMIT, LIST_DIAGRAMS_MAX_LIMIT))
+    page = repository.list_diagram_summaries(limit=limit, next_token=nextToken)
 
-    logger.info({"diagrams": diagrams})
+    logger.info({"diagrams": len(page.items), "nextToken": page.next_token})
 
-    return [d.model_dump(by_alias=True) for d in diagrams]
+    return page.model_dump(by_alias=True)
 
 
-@router.resolver(type_name="Mutation", field_name="updateThreat")
-def update_threat(updateThreatInput: dict) -> dict:
+def _changes_from(update_input: dict, model_class) -> dict:
+    """ Maps the (aliased) fields provided in an update input back to the field names of `model_class` """
+    field_mapping = {field.alias: name for name, field in model_class.model_fields.items() if field.alias}
+    return {field_mapping.get(k, k): v for k, v in update_input.items()}
+
+
+def _threat_update_from(updateThreatInput: dict) -> ThreatUpdate:
     update_threat_input = UpdateThreatInput.model_validate(updateThreatInput)
-    threat = repository.get_threat(update_threat_input.threatId)
 
-    # since we accept partial parameters, we might get some
-    params = update_threat_input.model_dump(exclude={"id", "diagramId", "componentId", "threatId"})
-    params_to_update = {k: params[k] for k in params if params[k] is not None}
+    # since we accept partial parameters, we only update the ones we got
+    params = update_threat_input.model_dump(exclude={"id", "diagramId", "componentId", "threatId", "expectedVersion"},
+                                            exclude_none=True)
+    if "dreadScores" in params:
+        params["dreadScores"] = DREAD.model_validate(params["dreadScores"]).model_dump()
+
+    return ThreatUpdate(threat_id=update_threat_input.threatId, changes=_changes_from(params, Threat),
+                        expected_version=update_threat_input.expectedVersion)
 
-    # pydantic doesn't support model_copy with aliases, so we need to map aliases from params_to_update back to field names
-    field_mapping = {field.alias: name for name, field in threat.model_fields.items() if field.alias}
-    mapped_params = {field_mapping.get(k, k): v for k, v in params_to_update.items()}
 
-    updated_threat = threat.model_copy(update=mapped_params)
+@router.resolver(type_name="Mutation", field_name="updateThreat")
+def update_threat(updateThreatInput: dict) -> dict:
+    update = _threat_update_from(updateThreatInput)
 
-    repository.save_threat(updated_threat)
+    updated_threat = repository.update_threat(update.threat_id, update.changes,
+                                              expected_version=update.expected_version)
 
     return updated_threat.model_dump(by_alias=True)
 
 
+def _check_bulk_size(items: list) -> None:
+    if len(items) > BULK_THREATS_MAX_ITEMS:
+        raise ValueError(f"At most {BULK_THREATS_MAX_ITEMS} threats can be sent per request, got {len(items)}")
+
+
+@router.resolver(type_name="Mutation", field_name="updateThreats")
+def update_threats(updateThreatInputs: list[dict]) -> list[dict]:
+    """ Applies every update it can, and reports which ones failed (and why) in the same order they were sent """
+    _check_bulk_size(updateThreatInputs)
+
+    results, updates = {}, []
+    for update_threat_input in updateThreatInputs:
+        try:
+            updates.append(_threat_update_from(update_threat_input))
+        except ValueError as e:
+            results[update_threat_input.get("threatId")] = e
+
+    results.update(repository.update_threats(updates))
+
+    logger.info({"updated": sum(1 for r in results.values() if isinstance(r, Threat)),
+                 "failed": sum(1 for r in results.values() if not isinstance(r, Threat))})
+
+    bulk_results = []
+    for threat_id in (update_threat_input.get("threatId") for update_threat_input in updateThreatInputs):
+        updated = isinstance(results[threat_id], Threat)
+        bulk_results.append({
+            "threatId": threat_id,
+            "success": updated,
+            "message": None if updated else str(results[threat_id]),
+            "threat": results[threat_id].model_dump(by_alias=True) if updated else None,
+        })
+
+    return bulk_results
+
+
+@router.resolver(type_name="Mutation", field_name="deleteThreats")
+def delete_threats(threatIds: list[str]) -> list[dict]:
+    _check_bulk_size(threatIds)
+
+    results = repository.delete_threats(threatIds)
+
+    logger.info({"deleted": sum(1 for error in results.values() if error is None),
+                 "failed": sum(1 for error in results.values() if error is not None)})
+
+    return [{
+        "threatId": threat_id,
+        "success": error is None,
+        "message": f"Threat {threat_id} deleted successfully" if error is None else str(error),
+    } for threat_id, error in results.items()]
+
+
 @router.resolver(type_name="Mutation", field_name="updateComponent")
 def update_component(updateComponentInput: dict) -> dict:
+    """ NOTE: the component is returned without its threats """
     update_component_input = UpdateComponentInput.model_validate(updateComponentInput)
-    component = repository.get_component(update_component_input.componentId)
-
-    # since we accept partial parameters, we might get some
-    params = update_component_input.model_dump(exclude={"id", "diagramId", "componentId"})
-    params_to_update = {k: params[k] for k in params if params[k] is not None}
-
-    # pydantic doesn't support model_copy with aliases, so we need to map aliases from params_to_update back to field names
-    field_mapping = {field.alias: name for name, field in component.model_fields.items() if field.alias}
-    mapped_params = {field_mapping.get(k, k): v for k, v in params_to_update.items()}
 
-    updated_component = component.model_copy(update=mapped_params)
+    # since we accept partial parameters, we only update the ones we got
+    params = update_component_input.model_dump(exclude={"id", "diagramId", "componentId", "expectedVersion"},
+                                               exclude_none=True)
 
-    repository.save_component(updated_component)
+    updated_component = repository.update_component(update_component_input.componentId,
+                                                    _changes_from(params, Component),
+                                                    expected_version=update_component_input.expectedVersion)
 
     return updated_component.model_dump(by_alias=True)
 
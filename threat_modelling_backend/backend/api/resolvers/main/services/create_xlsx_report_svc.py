@@ -22,6 +22,13 @@ else:
 
 DATA_BUCKET_NAME = os.getenv("DATA_BUCKET_NAME")
 
+REPORTS_FOLDER = "reports"
+
+
+def reports_prefix(threat_model_id: str) -> str:
+    """ :return: {str} the prefix of every report of a threat model, so that deleting it lists only its own reports """
+    return f"{REPORTS_FOLDER}/{threat_model_id}/"
+
 logger = Logger()
 
 s3_client: S3Client = boto3.session.Session(region_name=os.getenv("AWS_REGION", "us-east-1")).client("s3")
@@ -113,7 +120,8 @@ def generate_report(threat_model: ThreatModel) -> str:
 
     current_time = datetime.now().strftime("%Y-%m-%d_%H-%M")
 
-    file_name = f"reports/{current_time}-{threat_model.id}.xlsx"
+    # the id stays in the name of the file, which is what users download
+    file_name = f"{reports_prefix(threat_model.id)}{current_time}-{threat_model.id}.xlsx"
 
     s3_client.upload_fileobj(generated_report, Bucket=DATA_BUCKET_NAME, Key=file_name)
 
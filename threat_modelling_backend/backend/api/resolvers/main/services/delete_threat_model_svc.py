@@ -0,0 +1,106 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import boto3
+from botocore.exceptions import ClientError
+from dataclasses import dataclass, field
+import os
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger
+
+from genai_core.image_pipeline import normalized_image_key
+from genai_core.model import ThreatModel
+from genai_core.repository import ThreatModelRepository
+
+from services.create_xlsx_report_svc import reports_prefix
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3.client import S3Client
+else:
+    S3Client = object
+
+DATA_BUCKET_NAME = os.getenv("DATA_BUCKET_NAME")
+
+# see the generate threats workflow, one jsonl file per diagram, component and STRIDE type
+THREATS_FOLDER = "db/threats"
+
+# DeleteObjects accepts at most 1000 keys per request
+S3_DELETE_OBJECTS_MAX_KEYS = 1000
+
+logger = Logger()
+
+s3_client: S3Client = boto3.session.Session(region_name=os.getenv("AWS_REGION", "us-east-1")).client("s3")
+
+
+@dataclass
+class ThreatModelDeletion:
+    items_deleted: int
+    objects_deleted: int
+    # the S3 objects we could not delete, the threat model itself is gone by then
+    errors: list[str] = field(default_factory=list)
+
+
+def _list_keys(prefix: str) -> list[str]:
+    paginator = s3_client.get_paginator("list_objects_v2")
+    return [o["Key"] for page in paginator.paginate(Bucket=DATA_BUCKET_NAME, Prefix=prefix)
+            for o in page.get("Contents", [])]
+
+
+def object_keys_of(threat_model: ThreatModel) -> list[str]:
+    """ :return: {list[str]} the S3 objects that belong to `threat_model`: images, threats jsonl files and reports """
+    keys = []
+    for diagram in threat_model.diagrams:
+        keys.append(diagram.s3_prefix)
+
+        try:
+            etag = s3_client.head_object(Bucket=DATA_BUCKET_NAME, Key=diagram.s3_prefix)["ETag"]
+            # normalized variants are shared by identical uploads, another diagram would simply normalize it again
+            keys.append(normalized_image_key(etag))
+        except ClientError as e:
+            logger.warning(f"Unable to find the image of diagram {diagram.id}: {e}")
+
+        keys.extend(_list_keys(f"{THREATS_FOLDER}/{diagram.id}-"))
+
+    keys.extend(_list_keys(reports_prefix(threat_model.id)))
+
+    return list(dict.fromkeys(keys))
+
+
+def delete_objects(keys: list[str]) -> list[str]:
+    """
+    Deletes `keys` with as few DeleteObjects requests as possible.
+
+    :return: {list[str]} an error message for every object that could not be deleted
+    """
+    errors = []
+    for i in range(0, len(keys), S3_DELETE_OBJECTS_MAX_KEYS):
+        response = s3_client.delete_objects(Bucket=DATA_BUCKET_NAME, Delete={
+            "Objects": [{"Key": key} for key in keys[i:i + S3_DELETE_OBJECTS_MAX_KEYS]],
+            # only report the errors
+            "Quiet": True,
+        })
+        errors.extend(f"{e['Key']}: {e.get('Message', e.get('Code'))}" for e in response.get("Errors", []))
+
+    return errors
+
+
+def delete_threat_model(repository: ThreatModelRepository, threat_model_id: str) -> ThreatModelDeletion:
+    """
+    Deletes a threat model, its diagrams, components and threats, and then its S3 objects. Items are deleted first, so
+    that a failure leaves a threat model we can delete again rather than a threat model without its images.
+    """
+    # the keys of the S3 objects are derived from the threat model, so we gather them before it's gone
+    keys = object_keys_of(repository.get(threat_model_id))
+
+    def log_progress(deleted: int, total: int) -> None:
+        logger.info({"threat_model_id": threat_model_id, "deleted": deleted, "total": total})
+
+    items_deleted = repository.delete(threat_model_id, on_progress=log_progress)
+
+    errors = delete_objects(keys)
+    if errors:
+        logger.error({"threat_model_id": threat_model_id, "s3_errors": errors})
+
+    return ThreatModelDeletion(items_deleted=items_deleted, objects_deleted=len(keys) - len(errors), errors=errors)
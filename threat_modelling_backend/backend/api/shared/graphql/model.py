@@ -50,7 +50,10 @@ class GenerateThreatsInput(BaseModel):
     s3Prefix: str
     diagramDescription: str
     component: ComponentInput
-    threatType: str
+
+    # either a single STRIDE type, or a list of STRIDE types to be generated with a single LLM call
+    threatType: Optional[str] = None
+    threatTypes: list[str] = Field([])
 
     userDescription: str = Field("")
     modelId: Optional[str] = None
@@ -73,6 +76,8 @@ class UpdateComponentInput(BaseModel):
     description: Optional[str] = None
     componentType: Optional[str] = None
 
+    expectedVersion: Optional[int] = None
+
 
 class CreateComponentInput(BaseModel):
     id: str
@@ -96,6 +101,8 @@ class UpdateThreatInput(BaseModel):
     action: Optional[str] = None
     reason: Optional[str] = None
 
+    expectedVersion: Optional[int] = None
+
 
 class Report(BaseModel):
     presignedUrl: str
@@ -186,3 +193,76 @@ mutation threatsGenerated($id: ID!, $components: [ComponentInput]) {
             }
         }
     })
+
+# partial results, relayed while the LLM is still streaming. Each one only carries what was generated since the previous
+# one, on its own subscription, so that subscribers of the final results above still get them once and complete
+
+PartialComponentsMutation = Mutation(
+    query='''
+mutation PartialComponents($id: ID!, $components: [ComponentInput]) {
+    partialComponents(id: $id, components: $components) {
+        id
+        components {
+            id
+            name
+            description
+            componentType
+        }
+    }
+}
+''',
+    field_set={
+        "id": True,
+        "components": {
+            "__all__": {
+                # since components is a list, we need this special syntax (https://docs.pydantic.dev/latest/concepts/serialization/#advanced-include-and-exclude)
+                "id", "name", "description", "component_type"
+            }
+        }
+    })
+
+PartialThreatsMutation = Mutation(
+    query='''
+mutation partialThreatsGenerated($id: ID!, $components: [ComponentInput]) {
+    partialThreats(id: $id, components: $components) {
+        id
+        components {
+            id
+            name
+            description
+            componentType
+            threats {
+                id
+                name
+                description
+                threatType
+                action
+                reason
+                dreadScores {
+                    damage
+                    reproducibility
+                    exploitability
+                    affectedUsers
+                    discoverability
+                }
+            }
+        }
+    }
+}
+''',
+    field_set={
+        "id": True,
+        "components": {
+            "__all__": {
+                # since components is a list, we need this special syntax (https://docs.pydantic.dev/latest/concepts/serialization/#advanced-include-and-exclude)
+                "id": True, "name": True, "description": True, "component_type": True, "reason": True, "threats": {
+                    "__all__": {
+                        "id": True, "name": True, "description": True, "stride_type": True, "action": True,
+                        "dread_scores": {
+                            "damage", "reproducibility", "exploitability", "affected_users", "discoverability"
+                        }
+                    }
+                }
+            }
+        }
+    })
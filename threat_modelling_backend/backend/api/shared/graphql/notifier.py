@@ -80,6 +80,29 @@ def relay_status(id_, query, variables):
         metrics.add_metric("relayStatusGraphQLErrors", unit=MetricUnit.Count, value=1.0)
 
 
+def relay_result(mutation: Mutation, result: BaseModel) -> None:
+    """
+    Relays `result` to the subscribers of `mutation`. Besides the `notify` decorator, this can be used to relay partial
+    results while a resolver is still running, e.g. when streaming responses from the LLM
+    """
+    variables = result.model_dump(by_alias=True, include=mutation.field_set)
+    logger.debug({"field_set": mutation.field_set, "variables": variables})
+
+    relay_status(result.id, mutation.query, variables=variables)
+
+
+def relay_partial_result(mutation: Mutation, result: BaseModel) -> None:
+    """
+    Best-effort version of `relay_result`. Partial results are superseded by the final result, so we never want to fail
+    a resolver because we couldn't relay one of them
+    """
+    try:
+        relay_result(mutation, result)
+    except Exception as e:
+        metrics.add_metric("relayPartialResultErrors", unit=MetricUnit.Count, value=1.0)
+        logger.warning(f"Failed to relay partial result for id {result.id}: {e}")
+
+
 # TODO: add unit tests for notifier
 def notify(mutation: Mutation):
     def notify_decorator[T: BaseModel](resolver: Callable[..., T]) -> Callable[..., None]:
@@ -90,10 +113,7 @@ def notify(mutation: Mutation):
                 logger.debug({"resolver result": result})
 
                 if result is not None:
-                    variables = result.model_dump(by_alias=True, include=mutation.field_set)
-                    logger.debug({"field_set": mutation.field_set, "variables": variables})
-
-                    relay_status(result.id, mutation.query, variables=variables)
+                    relay_result(mutation, result)
             except ClientError as e:
                 if e.response["Error"]["Code"] in [
                     "ThrottlingException",
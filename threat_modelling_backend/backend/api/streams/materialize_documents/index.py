@@ -0,0 +1,56 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import os
+
+from aws_lambda_powertools import Logger, Metrics
+from aws_lambda_powertools.metrics import MetricUnit
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+from genai_core.adapter import repository_from_environment, ThreatModelDocumentStore
+from genai_core.adapter.threat_model_documents import ThreatModelLocator, rebuild_documents, record_version
+from genai_core.repository import ThreatModelRepository
+
+logger = Logger()
+metrics = Metrics()
+
+# always the tables, never REPOSITORY_DOCUMENTS_ENABLED, we are the ones building the documents
+repository: ThreatModelRepository = repository_from_environment()
+store = ThreatModelDocumentStore.from_table_name(os.environ["THREAT_MODEL_DOCUMENTS_TABLE_NAME"])
+locator = ThreatModelLocator()
+
+
+def materialize_documents(records: list[dict]) -> dict:
+    """
+    Rebuilds the document of every threat model changed by `records` once, however many of its items changed. The
+    event source batches records for a few seconds, so a burst of writes (e.g. the threats of a component) results in
+    a single rebuild.
+
+    :return: {dict} the records of the threat models we failed to rebuild, so that Lambda retries them
+    """
+    sequence_numbers_by_threat_model: dict[str, list[str]] = {}
+    # documents are versioned with their latest record, see genai_core.adapter.threat_model_documents
+    versions: dict[str, int] = {}
+    for record in records:
+        threat_model_id = locator.threat_model_id_of(record)
+        if threat_model_id is not None:
+            sequence_numbers_by_threat_model.setdefault(threat_model_id, []).append(
+                record["dynamodb"]["SequenceNumber"])
+            versions[threat_model_id] = max(versions.get(threat_model_id, 0), record_version(record))
+
+    errors = rebuild_documents(versions, repository, store)
+    failed = [threat_model_id for threat_model_id, error in errors.items() if error is not None]
+
+    logger.info({"records": len(records), "rebuilt": len(errors) - len(failed), "failed": failed})
+    metrics.add_metric(name="documentRecords", unit=MetricUnit.Count, value=len(records))
+    metrics.add_metric(name="documentRebuilds", unit=MetricUnit.Count, value=len(errors))
+
+    return {"batchItemFailures": [{"itemIdentifier": sequence_number} for threat_model_id in failed
+                                  for sequence_number in sequence_numbers_by_threat_model[threat_model_id]]}
+
+
+@metrics.log_metrics
+@logger.inject_lambda_context
+def lambda_handler(event: dict, context: LambdaContext):
+    return materialize_documents(event["Records"])
@@ -11,13 +11,18 @@ from botocore.exceptions import ClientError
 from aws_lambda_powertools import Logger, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 
-from graphql.model import GenerateThreatsInput, ThreatsMutation
-from graphql.notifier import notify
+from graphql.model import GenerateThreatsInput, ThreatsMutation, PartialThreatsMutation
+from graphql.notifier import notify, relay_partial_result
 
 from genai_core.repository import ThreatModelRepository
-from genai_core.adapter import DynamoDBThreatModelRepository
-from genai_core.model import DFDComponent, DFDComponentType, ThreatModel, Diagram, Component, Threat
-from genai_core.threats_generator import get_threats_for_component
+from genai_core.adapter import repository_from_environment
+from genai_core.clients import MaxTokensExceededException
+from genai_core.image_pipeline import get_normalized_image
+from genai_core.model import DFDComponent, DFDComponentType, DFDThreat, ThreatModel, Diagram, Component, Threat
+from genai_core.threats_generator import (
+    get_threats_for_component, stream_threats_for_component, get_threats_by_stride_type_for_component,
+    stream_threats_by_stride_type_for_component
+)
 
 logger = Logger()
 metrics = Metrics()
@@ -26,22 +31,14 @@ DATA_BUCKET_NAME = os.environ["DATA_BUCKET_NAME"]
 
 s3_client = boto3.session.Session().client("s3", config=Config(retries={"max_attempts": 3, "mode": "adaptive"}))
 
-THREAT_MODELS_TABLE_NAME = os.getenv("THREAT_MODELS_TABLE_NAME")
-DIAGRAMS_TABLE_NAME = os.getenv("DIAGRAMS_TABLE_NAME", "Diagrams")
-COMPONENTS_TABLE_NAME = os.getenv("COMPONENTS_TABLE_NAME", "Components")
-THREATS_TABLE_NAME = os.getenv("THREATS_TABLE_NAME", "Threats")
+# when enabled, we relay each threat to subscribers as soon as the LLM has generated it
+STREAM_PARTIAL_RESULTS = os.getenv("STREAM_PARTIAL_RESULTS", "false").lower() == "true"
 
-repository: ThreatModelRepository = DynamoDBThreatModelRepository.from_table_names(
-    threat_models_table_name=THREAT_MODELS_TABLE_NAME,
-    diagrams_table_name=DIAGRAMS_TABLE_NAME,
-    components_table_name=COMPONENTS_TABLE_NAME,
-    threats_table_name=THREATS_TABLE_NAME,
-) if (THREAT_MODELS_TABLE_NAME and DIAGRAMS_TABLE_NAME and COMPONENTS_TABLE_NAME and THREATS_TABLE_NAME) else None
+repository: ThreatModelRepository = repository_from_environment()
 
 
-def read_s3_object(bucket_name, prefix) -> bytes:
-    s3_object = s3_client.get_object(Bucket=bucket_name, Key=prefix)
-    return s3_object["Body"].read()
+def read_diagram_image(bucket_name, prefix) -> bytes:
+    return get_normalized_image(s3_client, bucket_name=bucket_name, key=prefix)
 
 
 def write_threatmodel_as_jsonline_to_s3(bucket_name, prefix, threat_model: ThreatModel):
@@ -66,6 +63,100 @@ def write_threatmodel_as_jsonline_to_s3(bucket_name, prefix, threat_model: Threa
         logger.error(f"Failed to upload jsonline with unknown error: {e}")
 
 
+def _partial_diagram(generate_threats_input: GenerateThreatsInput, component: DFDComponent,
+                     threats: list[Threat]) -> Diagram:
+    return Diagram(
+        id=generate_threats_input.id,
+        threat_model_id=generate_threats_input.id,  # TODO: update this to be the threat model's id
+        s3_prefix=generate_threats_input.s3Prefix,
+        user_description=generate_threats_input.userDescription,
+        diagram_description=generate_threats_input.diagramDescription,
+        components=[
+            Component(**component.model_dump(), diagram_id=generate_threats_input.id, threats=threats)
+        ]
+    )
+
+
+def _threats_of(component: DFDComponent, dfd_threats: list[DFDThreat]) -> list[Threat]:
+    return [Threat(component_id=component.id, **dfd_threat.model_dump()) for dfd_threat in dfd_threats]
+
+
+def _relay_new_threats(generate_threats_input: GenerateThreatsInput, component: DFDComponent,
+                       threats: list[Threat]) -> None:
+    """ Relays only the new threats, the final result relays them all again, with the same ids """
+    relay_partial_result(PartialThreatsMutation, _partial_diagram(generate_threats_input, component, threats))
+
+
+def _generate_threats(generate_threats_input: GenerateThreatsInput, image: bytes,
+                      component: DFDComponent) -> list[Threat]:
+    """ Generates threats of a single STRIDE type (`threatType`) """
+    if not STREAM_PARTIAL_RESULTS:
+        return _threats_of(component, get_threats_for_component(
+            image=image,
+            diagram_description=generate_threats_input.diagramDescription,
+            dataflow_component=component,
+            stride_type=generate_threats_input.threatType,
+            iterations=1,
+            model_id=generate_threats_input.modelId
+        ).threats)
+
+    threats = []
+    for dfd_threat in stream_threats_for_component(image=image,
+                                                   diagram_description=generate_threats_input.diagramDescription,
+                                                   dataflow_component=component,
+                                                   stride_type=generate_threats_input.threatType,
+                                                   model_id=generate_threats_input.modelId):
+        new_threats = _threats_of(component, [dfd_threat])
+        threats.extend(new_threats)
+
+        _relay_new_threats(generate_threats_input, component, new_threats)
+
+    return threats
+
+
+def _generate_threats_by_stride_type(generate_threats_input: GenerateThreatsInput, image: bytes,
+                                     component: DFDComponent) -> dict[str, list[Threat]]:
+    """ Generates threats of all STRIDE types in `threatTypes` with a single LLM call """
+    def generate_all() -> dict[str, list[Threat]]:
+        threats_by_stride_type = get_threats_by_stride_type_for_component(
+            image=image,
+            diagram_description=generate_threats_input.diagramDescription,
+            dataflow_component=component,
+            stride_types=generate_threats_input.threatTypes,
+            iterations=1,
+            model_id=generate_threats_input.modelId
+        )
+        return {stride_type: _threats_of(component, threats.threats)
+                for stride_type, threats in threats_by_stride_type.items()}
+
+    if not STREAM_PARTIAL_RESULTS:
+        return generate_all()
+
+    threats_by_stride_type = {stride_type: [] for stride_type in generate_threats_input.threatTypes}
+    try:
+        for stride_threats in stream_threats_by_stride_type_for_component(
+                image=image,
+                diagram_description=generate_threats_input.diagramDescription,
+                dataflow_component=component,
+                stride_types=generate_threats_input.threatTypes,
+                model_id=generate_threats_input.modelId):
+            if stride_threats.stride_type not in threats_by_stride_type:
+                continue
+
+            new_threats = _threats_of(component, stride_threats.threats)
+            threats_by_stride_type[stride_threats.stride_type].extend(new_threats)
+
+            if new_threats:
+                _relay_new_threats(generate_threats_input, component, new_threats)
+    except MaxTokensExceededException as e:
+        # what we streamed is incomplete, we start over with fewer STRIDE types per call. Subscribers drop the partial
+        # threats the final result doesn't include
+        logger.warning(f"Streamed threats were truncated, generating them again: {e}")
+        return generate_all()
+
+    return threats_by_stride_type
+
+
 @notify(ThreatsMutation)
 def generate_threats(generateThreatsInput: dict):
     generate_threats_input = GenerateThreatsInput.model_validate(generateThreatsInput)
@@ -80,7 +171,7 @@ def generate_threats(generateThreatsInput: dict):
         )
         return None
 
-    image = read_s3_object(bucket_name=DATA_BUCKET_NAME, prefix=generate_threats_input.s3Prefix)
+    image = read_diagram_image(bucket_name=DATA_BUCKET_NAME, prefix=generate_threats_input.s3Prefix)
 
     component = DFDComponent(id=generate_threats_input.component.id,
                              diagram_id=generate_threats_input.id,  # TODO: update this to be component.diagram_id
@@ -88,40 +179,28 @@ def generate_threats(generateThreatsInput: dict):
                              component_type=generate_threats_input.component.componentType,
                              description=generate_threats_input.component.description)
 
-    dfd_threats = get_threats_for_component(
-        image=image,
-        diagram_description=generate_threats_input.diagramDescription,
-        dataflow_component=component,
-        stride_type=generate_threats_input.threatType,
-        iterations=1,
-        model_id=generate_threats_input.modelId
-    ).threats
+    if generate_threats_input.threatTypes:
+        threats_by_stride_type = _generate_threats_by_stride_type(generate_threats_input, image, component)
+    else:
+        threats_by_stride_type = {
+            generate_threats_input.threatType: _generate_threats(generate_threats_input, image, component)
+        }
 
-    logger.info({f"{generate_threats_input.threatType} threats": dfd_threats})
+    logger.info({f"{stride_type} threats": threats for stride_type, threats in threats_by_stride_type.items()})
 
-    threats = [
-        Threat(component_id=component.id, **threat.model_dump())
-        for threat in dfd_threats
-    ]
+    threats = [threat for stride_type_threats in threats_by_stride_type.values() for threat in stride_type_threats]
 
-    partial_diagram = Diagram(
-        id=generate_threats_input.id,
-        threat_model_id=generate_threats_input.id,  # TODO: update this to be the threat model's id
-        s3_prefix=generate_threats_input.s3Prefix,
-        user_description=generate_threats_input.userDescription,
-        diagram_description=generate_threats_input.diagramDescription,
-        components=[
-            Component(**component.model_dump(), diagram_id=generate_threats_input.id, threats=threats)
-        ]
-    )
+    partial_diagram = _partial_diagram(generate_threats_input, component, threats)
 
     if repository:
         repository.save_threats(threats)
 
-    # persist to s3 to allow for Athena querying
-    response_s3_prefix = f"db/threats/{partial_diagram.id}-{component.id}-{generate_threats_input.threatType}-{component.component_type}.jsonl"
-    write_threatmodel_as_jsonline_to_s3(DATA_BUCKET_NAME, response_s3_prefix,
-                                        ThreatModel(id=partial_diagram.id, diagrams=[partial_diagram]))
+    # persist to s3 to allow for Athena querying, we keep one record per STRIDE type even when generating them together
+    for stride_type, stride_type_threats in threats_by_stride_type.items():
+        response_s3_prefix = f"db/threats/{partial_diagram.id}-{component.id}-{stride_type}-{component.component_type}.jsonl"
+        stride_type_diagram = _partial_diagram(generate_threats_input, component, stride_type_threats)
+        write_threatmodel_as_jsonline_to_s3(DATA_BUCKET_NAME, response_s3_prefix,
+                                            ThreatModel(id=stride_type_diagram.id, diagrams=[stride_type_diagram]))
 
     return partial_diagram
 
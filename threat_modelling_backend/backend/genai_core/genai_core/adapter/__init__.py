@@ -3,3 +3,9 @@
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
 from .dynamodb_threat_model_repository import DynamoDBThreatModelRepository
+from .single_table_threat_model_repository import SingleTableThreatModelRepository
+from .sqlite_threat_model_repository import SQLiteThreatModelRepository
+from .caching_threat_model_repository import CachingThreatModelRepository
+from .threat_model_documents import DocumentThreatModelRepository, ThreatModelDocumentStore
+from .async_threat_model_repository import AsyncDynamoDBThreatModelRepository, SyncThreatModelRepository
+from .environment import repository_from_environment, async_repository_from_environment
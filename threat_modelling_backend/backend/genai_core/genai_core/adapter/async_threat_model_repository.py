@@ -0,0 +1,219 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Bridges between the synchronous and the asynchronous threat model repositories.
+
+AsyncDynamoDBThreatModelRepository offloads the blocking boto3/pynamodb calls of a DynamoDB repository to a bounded
+thread pool, so that callers on an event loop can `asyncio.gather` them without blocking the loop, and without more
+than `max_in_flight` calls hitting DynamoDB at a time. DynamoDB calls are network bound, so threads are enough to
+overlap them, the same as in genai_core.converse_executor.
+
+SyncThreatModelRepository goes the other way, running an AsyncThreatModelRepository on an event loop of its own so that
+synchronous code (e.g. the resolvers) can use it as a regular ThreatModelRepository.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import threading
+from typing import Awaitable, Callable, Optional, TypeVar, Union
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DiagramSummaryPage, RiskSummary
+from genai_core.repository import ThreatModelRepository, AsyncThreatModelRepository, ThreatUpdate
+
+from .dynamodb_threat_model_repository import DynamoDBThreatModelRepository, DYNAMODB_MAX_CONCURRENCY
+
+T = TypeVar("T")
+
+
+class AsyncDynamoDBThreatModelRepository(AsyncThreatModelRepository):
+    """
+    Runs every call of a (multi-table or single-table) DynamoDB repository on a thread pool of `max_in_flight` threads.
+    Calls past that limit wait in the pool's queue, without holding a thread or the event loop.
+
+    NOTE: the tree loads of the DynamoDB repositories run their own concurrent queries (see DYNAMODB_MAX_CONCURRENCY),
+    so that many calls can have up to `max_in_flight` times as many requests in flight.
+    """
+
+    def __init__(self, repository: ThreatModelRepository, max_in_flight: int = DYNAMODB_MAX_CONCURRENCY):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.repository = repository
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="threat-model-repository")
+
+    @classmethod
+    def from_table_names(cls, *table_names: str, max_in_flight: int = DYNAMODB_MAX_CONCURRENCY,
+                         **kwargs) -> "AsyncDynamoDBThreatModelRepository":
+        """ Same arguments as DynamoDBThreatModelRepository.from_table_names """
+        repository = DynamoDBThreatModelRepository.from_table_names(*table_names, **kwargs)
+        return AsyncDynamoDBThreatModelRepository(repository, max_in_flight=max_in_flight)
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
+
+    def close(self) -> None:
+        """ Waits for the calls in flight, and rejects any further one """
+        self._executor.shutdown(wait=True)
+
+    async def get(self, threat_model_id: str) -> ThreatModel:
+        return await self._run(self.repository.get, threat_model_id)
+
+    async def get_diagram(self, diagram_id: str) -> Diagram:
+        return await self._run(self.repository.get_diagram, diagram_id)
+
+    async def get_component(self, component_id: str) -> Component:
+        return await self._run(self.repository.get_component, component_id)
+
+    async def get_threat(self, threat_id: str) -> Threat:
+        return await self._run(self.repository.get_threat, threat_id)
+
+    async def save(self, threat_model: ThreatModel) -> None:
+        await self._run(self.repository.save, threat_model)
+
+    async def save_diagram(self, diagram: Diagram) -> None:
+        await self._run(self.repository.save_diagram, diagram)
+
+    async def save_diagrams(self, diagrams: list[Diagram]) -> None:
+        await self._run(self.repository.save_diagrams, diagrams)
+
+    async def save_component(self, component: Component) -> None:
+        await self._run(self.repository.save_component, component)
+
+    async def save_components(self, components: list[Component]) -> None:
+        await self._run(self.repository.save_components, components)
+
+    async def save_threat(self, threat: Threat) -> None:
+        await self._run(self.repository.save_threat, threat)
+
+    async def save_threats(self, threats: list[Threat]) -> None:
+        await self._run(self.repository.save_threats, threats)
+
+    async def update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int] = None) -> Threat:
+        return await self._run(self.repository.update_threat, threat_id, changes, expected_version)
+
+    async def update_component(self, component_id: str, changes: dict,
+                               expected_version: Optional[int] = None) -> Component:
+        return await self._run(self.repository.update_component, component_id, changes, expected_version)
+
+    async def update_threats(self, updates: list[ThreatUpdate]) -> dict[str, Union[Threat, Exception]]:
+        return await self._run(self.repository.update_threats, updates)
+
+    async def delete(self, threat_model_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        return await self._run(self.repository.delete, threat_model_id, on_progress)
+
+    async def delete_component(self, component_id: str) -> None:
+        await self._run(self.repository.delete_component, component_id)
+
+    async def delete_threat(self, threat_id: str) -> None:
+        await self._run(self.repository.delete_threat, threat_id)
+
+    async def delete_threats(self, threat_ids: list[str]) -> dict[str, Optional[Exception]]:
+        return await self._run(self.repository.delete_threats, threat_ids)
+
+    async def list_diagrams(self) -> list[Diagram]:
+        return await self._run(self.repository.list_diagrams)
+
+    async def list_diagram_summaries(self, limit: int, next_token: Optional[str] = None) -> DiagramSummaryPage:
+        return await self._run(self.repository.list_diagram_summaries, limit, next_token)
+
+    async def get_diagram_risk_summary(self, diagram_id: str) -> RiskSummary:
+        return await self._run(self.repository.get_diagram_risk_summary, diagram_id)
+
+    async def get_component_risk_summary(self, component_id: str) -> RiskSummary:
+        return await self._run(self.repository.get_component_risk_summary, component_id)
+
+
+class SyncThreatModelRepository(ThreatModelRepository):
+    """
+    Runs an AsyncThreatModelRepository on a daemon thread with an event loop of its own, and blocks the calling thread
+    until each call completes. Calls from many threads run concurrently on that loop.
+    """
+
+    def __init__(self, repository: AsyncThreatModelRepository):
+        self.repository = repository
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="threat-model-repository-loop",
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self, coroutine: Awaitable[T]) -> T:
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("SyncThreatModelRepository can't be called from its own event loop")
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self) -> None:
+        """ Stops the event loop, calls in flight are cancelled """
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def get(self, threat_model_id: str) -> ThreatModel:
+        return self._run(self.repository.get(threat_model_id))
+
+    def get_diagram(self, diagram_id: str) -> Diagram:
+        return self._run(self.repository.get_diagram(diagram_id))
+
+    def get_component(self, component_id: str) -> Component:
+        return self._run(self.repository.get_component(component_id))
+
+    def get_threat(self, threat_id: str) -> Threat:
+        return self._run(self.repository.get_threat(threat_id))
+
+    def save(self, threat_model: ThreatModel) -> None:
+        self._run(self.repository.save(threat_model))
+
+    def save_diagram(self, diagram: Diagram) -> None:
+        self._run(self.repository.save_diagram(diagram))
+
+    def save_diagrams(self, diagrams: list[Diagram]) -> None:
+        self._run(self.repository.save_diagrams(diagrams))
+
+    def save_component(self, component: Component) -> None:
+        self._run(self.repository.save_component(component))
+
+    def save_components(self, components: list[Component]) -> None:
+        self._run(self.repository.save_components(components))
+
+    def save_threat(self, threat: Threat) -> None:
+        self._run(self.repository.save_threat(threat))
+
+    def save_threats(self, threats: list[Threat]) -> None:
+        self._run(self.repository.save_threats(threats))
+
+    def update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int] = None) -> Threat:
+        return self._run(self.repository.update_threat(threat_id, changes, expected_version))
+
+    def update_component(self, component_id: str, changes: dict, expected_version: Optional[int] = None) -> Component:
+        return self._run(self.repository.update_component(component_id, changes, expected_version))
+
+    def update_threats(self, updates: list[ThreatUpdate]) -> dict[str, Union[Threat, Exception]]:
+        return self._run(self.repository.update_threats(updates))
+
+    def delete(self, threat_model_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        return self._run(self.repository.delete(threat_model_id, on_progress))
+
+    def delete_component(self, component_id: str) -> None:
+        self._run(self.repository.delete_component(component_id))
+
+    def delete_threat(self, threat_id: str) -> None:
+        self._run(self.repository.delete_threat(threat_id))
+
+    def delete_threats(self, threat_ids: list[str]) -> dict[str, Optional[Exception]]:
+        return self._run(self.repository.delete_threats(threat_ids))
+
+    def list_diagrams(self) -> list[Diagram]:
+        return self._run(self.repository.list_diagrams())
+
+    def list_diagram_summaries(self, limit: int, next_token: Optional[str] = None) -> DiagramSummaryPage:
+        return self._run(self.repository.list_diagram_summaries(limit, next_token))
+
+    def get_diagram_risk_summary(self, diagram_id: str) -> RiskSummary:
+        return self._run(self.repository.get_diagram_risk_summary(diagram_id))
+
+    def get_component_risk_summary(self, component_id: str) -> RiskSummary:
+        return self._run(self.repository.get_component_risk_summary(component_id))
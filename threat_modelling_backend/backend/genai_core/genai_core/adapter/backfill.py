@@ -0,0 +1,65 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Backfills the attributes that items written by earlier versions don't have. Run it after deploying a version that
+introduced any of them, until then:
+
+- diagrams without a `created_at` are not listed (listDiagrams only reads the ByCreatedAt index)
+- descriptions are stored uncompressed, and the list page shows no user description for their diagrams
+- risk summaries count none of the threats written before
+
+Every backfill only rewrites what it has to, so it is safe to run again (e.g. once writes are idle, see
+`backfill_risk_summaries`). The tables are read from the same environment variables as the lambdas, for example:
+
+    THREAT_MODELS_TABLE_NAME=... DIAGRAMS_TABLE_NAME=... COMPONENTS_TABLE_NAME=... THREATS_TABLE_NAME=... \\
+        RISK_SUMMARIES_TABLE_NAME=... python -m genai_core.adapter.backfill
+
+or THREAT_MODEL_ITEMS_TABLE_NAME=... for the single-table design.
+"""
+
+import argparse
+from typing import Optional
+
+from aws_lambda_powertools import Logger
+
+from genai_core.repository import ThreatModelRepository
+
+logger = Logger()
+
+# in this order, the later ones read what the earlier ones write
+BACKFILLS = ["backfill_diagram_summaries", "backfill_compressed_attributes", "backfill_risk_summaries"]
+
+
+def backfill(repository: ThreatModelRepository) -> dict[str, int]:
+    """ :return: {dict[str, int]} the number of items updated by every backfill the repository supports """
+    results = {}
+    for name in BACKFILLS:
+        if hasattr(repository, name):
+            results[name] = getattr(repository, name)()
+            logger.info({"backfill": name, "updated": results[name]})
+
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from .environment import _table_repository_from_environment
+
+    argparse.ArgumentParser(description="Backfill the attributes missing from items written by earlier versions") \
+        .parse_args(argv)
+
+    # the tables themselves, without the cache or the documents some lambdas read through
+    repository = _table_repository_from_environment()
+    if repository is None:
+        print("No tables configured, see the docstring of genai_core.adapter.backfill")
+        return 1
+
+    for name, updated in backfill(repository).items():
+        print(f"{name}: {updated}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
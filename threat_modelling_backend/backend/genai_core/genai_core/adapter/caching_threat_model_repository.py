@@ -0,0 +1,255 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Read-through cache in front of any ThreatModelRepository.
+
+Entities are cached for the lifetime of the Lambda execution environment, bounded both in size (LRU) and in age (TTL).
+The TTL bounds how stale an entry can be when another execution environment writes the same entity; writes going
+through this repository invalidate the cached entity and every cached ancestor that embeds it (threat → component →
+diagram).
+
+Whole threat models are never served from the cache: they are what clients reload after the generate threats workflow
+(another Lambda function) has written their threats, and serving them from here would hide those threats for up to the
+TTL. Loading one still caches the diagrams, components and threats it embeds.
+"""
+
+from collections import OrderedDict
+import os
+import threading
+from time import time
+from typing import Callable, Optional, TypeVar, Union
+
+from genai_core.metrics import cache_metrics
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DiagramSummaryPage, RiskSummary
+from genai_core.repository import ThreatModelRepository, ThreatUpdate
+
+REPOSITORY_CACHE_MAX_SIZE = int(os.getenv("REPOSITORY_CACHE_MAX_SIZE", "256"))
+REPOSITORY_CACHE_TTL_SECONDS = int(os.getenv("REPOSITORY_CACHE_TTL_SECONDS", "30"))
+
+DIAGRAM, COMPONENT, THREAT = "diagram", "component", "threat"
+
+T = TypeVar("T")
+
+
+class EntityCache:
+    """ LRU cache whose entries also expire `ttl_seconds` after being set, counting its hits and misses """
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float]):
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._items: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key: str) -> Optional[object]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] <= time():
+                del self._items[key]
+                item = None
+
+            if item is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value: object) -> None:
+        expires_at = time() + self._ttl_seconds if self._ttl_seconds is not None else float("inf")
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def pop(self, key: str) -> Optional[object]:
+        with self._lock:
+            item = self._items.pop(key, None)
+            return item[1] if item is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class CachingThreatModelRepository(ThreatModelRepository):
+
+    def __init__(self, repository: ThreatModelRepository, max_size: int = REPOSITORY_CACHE_MAX_SIZE,
+                 ttl_seconds: float = REPOSITORY_CACHE_TTL_SECONDS):
+        self.repository = repository
+        self._caches = {entity_type: EntityCache(max_size, ttl_seconds) for entity_type in [DIAGRAM, COMPONENT, THREAT]}
+        # (entity type, id) -> id of the parent, entities never move between parents so these never expire
+        self._parents = EntityCache(max_size * 4, ttl_seconds=None)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """ :return: {dict[str, dict[str, int]]} the hits, misses and size of the cache of each entity type """
+        return {entity_type: {"hits": cache.hits, "misses": cache.misses, "size": len(cache)}
+                for entity_type, cache in self._caches.items()}
+
+    def clear(self) -> None:
+        for cache in [*self._caches.values(), self._parents]:
+            cache.clear()
+
+    # Reads
+
+    def _read_through(self, entity_type: str, entity_id: str, load: Callable[[], T]) -> T:
+        cached = self._caches[entity_type].get(entity_id)
+        cache_metrics(f"repository{entity_type[0].upper()}{entity_type[1:]}", hit=cached is not None)
+
+        if cached is None:
+            cached = load()
+            self._remember(entity_type, cached)
+
+        # callers are free to mutate what they get, so they never get the cached instance
+        return cached.model_copy(deep=True)
+
+    def _remember(self, entity_type: str, entity) -> None:
+        """ Caches `entity` along with every entity embedded in it, and learns their parents """
+        self._caches[entity_type].set(entity.id, entity.model_copy(deep=True))
+
+        if isinstance(entity, Diagram):
+            for component in entity.components:
+                self._remember(COMPONENT, component)
+        elif isinstance(entity, Component):
+            self._parents.set(f"{COMPONENT}#{entity.id}", entity.diagram_id)
+            for threat in entity.threats:
+                self._remember(THREAT, threat)
+        elif isinstance(entity, Threat):
+            self._parents.set(f"{THREAT}#{entity.id}", entity.component_id)
+
+    def get(self, threat_model_id: str) -> ThreatModel:
+        """ Not cached, see the module docstring """
+        threat_model = self.repository.get(threat_model_id)
+        for diagram in threat_model.diagrams:
+            self._remember(DIAGRAM, diagram)
+
+        return threat_model
+
+    def get_diagram(self, diagram_id: str) -> Diagram:
+        return self._read_through(DIAGRAM, diagram_id, lambda: self.repository.get_diagram(diagram_id))
+
+    def get_component(self, component_id: str) -> Component:
+        return self._read_through(COMPONENT, component_id, lambda: self.repository.get_component(component_id))
+
+    def get_threat(self, threat_id: str) -> Threat:
+        return self._read_through(THREAT, threat_id, lambda: self.repository.get_threat(threat_id))
+
+    def list_diagrams(self) -> list[Diagram]:
+        """ Not cached, new diagrams can be created by any execution environment """
+        return self.repository.list_diagrams()
+
+    def list_diagram_summaries(self, limit: int, next_token: Optional[str] = None) -> DiagramSummaryPage:
+        """ Not cached either, for the same reason """
+        return self.repository.list_diagram_summaries(limit, next_token)
+
+    def get_diagram_risk_summary(self, diagram_id: str) -> RiskSummary:
+        """ Not cached, summaries change with every threat write and are a single read anyway """
+        return self.repository.get_diagram_risk_summary(diagram_id)
+
+    def get_component_risk_summary(self, component_id: str) -> RiskSummary:
+        return self.repository.get_component_risk_summary(component_id)
+
+    # Invalidation
+
+    _PARENT_TYPES = {COMPONENT: DIAGRAM, THREAT: COMPONENT}
+
+    def _invalidate(self, entity_type: str, entity_id: str, parent_id: Optional[str] = None) -> None:
+        """ Drops an entity and all of its ancestors, when we don't know an ancestor we drop every entity of its type """
+        self._caches[entity_type].pop(entity_id)
+
+        parent_type = self._PARENT_TYPES.get(entity_type)
+        if parent_type is None:
+            return
+
+        if parent_id is not None:
+            self._parents.set(f"{entity_type}#{entity_id}", parent_id)
+        else:
+            parent_id = self._parents.get(f"{entity_type}#{entity_id}")
+
+        if parent_id is not None:
+            self._invalidate(parent_type, parent_id)
+            return
+
+        while parent_type is not None:
+            self._caches[parent_type].clear()
+            parent_type = self._PARENT_TYPES.get(parent_type)
+
+    # Writes
+
+    def save(self, threat_model: ThreatModel) -> None:
+        # threat models aren't cached, and their diagrams don't embed them
+        self.repository.save(threat_model)
+
+    def save_diagram(self, diagram: Diagram) -> None:
+        self.save_diagrams([diagram])
+
+    def save_diagrams(self, diagrams: list[Diagram]) -> None:
+        self.repository.save_diagrams(diagrams)
+        for diagram in diagrams:
+            self._invalidate(DIAGRAM, diagram.id)
+
+    def save_component(self, component: Component) -> None:
+        self.save_components([component])
+
+    def save_components(self, components: list[Component]) -> None:
+        self.repository.save_components(components)
+        for component in components:
+            self._invalidate(COMPONENT, component.id, component.diagram_id)
+
+    def save_threat(self, threat: Threat) -> None:
+        self.save_threats([threat])
+
+    def save_threats(self, threats: list[Threat]) -> None:
+        self.repository.save_threats(threats)
+        for threat in threats:
+            self._invalidate(THREAT, threat.id, threat.component_id)
+
+    def update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int] = None) -> Threat:
+        threat = self.repository.update_threat(threat_id, changes, expected_version)
+        self._invalidate(THREAT, threat.id, threat.component_id)
+        return threat
+
+    def update_threats(self, updates: list[ThreatUpdate]) -> dict[str, Union[Threat, Exception]]:
+        results = self.repository.update_threats(updates)
+        for result in results.values():
+            if isinstance(result, Threat):
+                self._invalidate(THREAT, result.id, result.component_id)
+        return results
+
+    def update_component(self, component_id: str, changes: dict, expected_version: Optional[int] = None) -> Component:
+        component = self.repository.update_component(component_id, changes, expected_version)
+        self._invalidate(COMPONENT, component.id, component.diagram_id)
+        return component
+
+    def delete(self, threat_model_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        deleted = self.repository.delete(threat_model_id, on_progress)
+        # we don't know which of the cached entities belonged to the threat model
+        self.clear()
+        return deleted
+
+    def delete_component(self, component_id: str) -> None:
+        self.repository.delete_component(component_id)
+        self._invalidate(COMPONENT, component_id)
+        self._parents.pop(f"{COMPONENT}#{component_id}")
+
+    def delete_threat(self, threat_id: str) -> None:
+        self.repository.delete_threat(threat_id)
+        self._invalidate(THREAT, threat_id)
+        self._parents.pop(f"{THREAT}#{threat_id}")
+
+    def delete_threats(self, threat_ids: list[str]) -> dict[str, Optional[Exception]]:
+        results = self.repository.delete_threats(threat_ids)
+        for threat_id, error in results.items():
+            if error is None:
+                self._invalidate(THREAT, threat_id)
+                self._parents.pop(f"{THREAT}#{threat_id}")
+        return results
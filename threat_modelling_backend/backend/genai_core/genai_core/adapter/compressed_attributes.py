@@ -0,0 +1,104 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Backfill of the text attributes written before we compressed them, see
+genai_core.adapter.dynamo_db_data_model.CompressedUnicodeAttribute.
+
+Both designs read those strings as they are, so the backfill only saves capacity and item size, and it can run at any
+time: every item is a conditional UpdateItem on the strings we read, so items written in the meantime are left alone.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from typing import Iterator, Optional, TYPE_CHECKING
+
+from boto3.dynamodb.conditions import Attr, ConditionBase
+from boto3.dynamodb.types import Binary
+from botocore.exceptions import ClientError
+
+from genai_core.model import DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
+
+from .dynamo_db_data_model import compress_text
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table as DynamoDBTable
+else:
+    DynamoDBTable = object
+
+# the previews of the compressed attributes we show in the list page, that indexes project instead
+PREVIEW_ATTRIBUTES = {"user_description": "user_description_preview",
+                      "diagram_description": "diagram_description_preview"}
+
+
+def scan_uncompressed(table: DynamoDBTable, key_names: list[str], names: list[str],
+                      filter_expression: Optional[ConditionBase] = None) -> Iterator[dict]:
+    """ :return: {Iterator[dict]} the keys and attributes `names` of the items where any of them is still a string """
+    condition = reduce(lambda a, b: a | b, [Attr(name).attribute_type("S") for name in names])
+    if filter_expression is not None:
+        condition = filter_expression & condition
+
+    scan_kwargs = {"FilterExpression": condition, "ConsistentRead": True,
+                   "ProjectionExpression": ", ".join(f"#p{i}" for i in range(len(key_names) + len(names))),
+                   "ExpressionAttributeNames": {f"#p{i}": name for i, name in enumerate([*key_names, *names])}}
+    while True:
+        try:
+            response = table.scan(**scan_kwargs)
+        except ClientError as e:
+            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+        yield from response["Items"]
+
+        if "LastEvaluatedKey" not in response:
+            return
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def compress_attributes(table: DynamoDBTable, key: dict, item: dict) -> bool:
+    """
+    Compresses the string attributes of `item` (and sets their previews) with a single UpdateItem, `item` holds only
+    attributes we compress.
+
+    :return: {bool} False if any of them changed since we read it, the item is then left as it is
+    """
+    strings = {name: value for name, value in item.items() if isinstance(value, str)}
+    if len(strings) == 0:
+        return False
+
+    assignments, conditions, names, values = [], [], {}, {}
+    for i, (name, value) in enumerate(strings.items()):
+        names[f"#a{i}"] = name
+        values[f":old{i}"], values[f":new{i}"] = value, Binary(compress_text(value))
+        assignments.append(f"#a{i} = :new{i}")
+        conditions.append(f"#a{i} = :old{i}")
+
+        if name in PREVIEW_ATTRIBUTES:
+            names[f"#p{i}"], values[f":p{i}"] = PREVIEW_ATTRIBUTES[name], value[:DIAGRAM_DESCRIPTION_PREVIEW_LENGTH]
+            assignments.append(f"#p{i} = :p{i}")
+
+    try:
+        table.update_item(Key=key, UpdateExpression="SET " + ", ".join(assignments),
+                          ConditionExpression=" AND ".join(conditions), ExpressionAttributeNames=names,
+                          ExpressionAttributeValues=values)
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+
+def backfill(table: DynamoDBTable, key_names: list[str], names: list[str],
+             filter_expression: Optional[ConditionBase] = None, max_workers: int = 16) -> int:
+    """
+    Compresses the attributes `names` of every item of `table` (matching `filter_expression`) that still holds them as
+    strings.
+
+    :return: {int} the number of items rewritten
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rewritten = executor.map(
+            lambda item: compress_attributes(table, {name: item[name] for name in key_names},
+                                             {name: item[name] for name in names if name in item}),
+            scan_uncompressed(table, key_names, names, filter_expression))
+
+        return sum(rewritten)
@@ -3,10 +3,13 @@
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
 import os
+import zlib
+from typing import Union
 
 from pynamodb.models import Model
-from pynamodb.attributes import UnicodeAttribute, MapAttribute, NumberAttribute
-from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
+from pynamodb.attributes import Attribute, UnicodeAttribute, MapAttribute, NumberAttribute
+from pynamodb.constants import BINARY, STRING
+from pynamodb.indexes import GlobalSecondaryIndex, AllProjection, IncludeProjection
 
 THREAT_MODELS_TABLE_NAME = os.getenv("THREAT_MODELS_TABLE_NAME", "ThreatModels")
 DIAGRAMS_TABLE_NAME = os.getenv("DIAGRAMS_TABLE_NAME", "Diagrams")
@@ -16,6 +19,56 @@ THREATS_TABLE_NAME = os.getenv("THREATS_TABLE_NAME", "Threats")
 AWS_REGION = os.getenv("AWS_REGION",
                        "us-east-1")  # we assume the runtime will have this defined, if not, please define yourself
 
+# text shorter than this (in UTF-8 bytes) is not worth compressing, zlib headers alone take 6 bytes
+COMPRESSION_THRESHOLD_BYTES = int(os.getenv("COMPRESSION_THRESHOLD_BYTES", "512"))
+
+# the first byte of a compressed text value tells how the rest of it is encoded
+UNCOMPRESSED, ZLIB = b"\x00", b"\x01"
+
+
+def compress_text(value: str) -> bytes:
+    """ :return: {bytes} `value` as stored by CompressedUnicodeAttribute """
+    encoded = value.encode("utf-8")
+    if len(encoded) < COMPRESSION_THRESHOLD_BYTES:
+        return UNCOMPRESSED + encoded
+
+    compressed = zlib.compress(encoded)
+    # text that doesn't compress (e.g. already random) is kept as is
+    return ZLIB + compressed if len(compressed) < len(encoded) else UNCOMPRESSED + encoded
+
+
+def decompress_text(value: Union[bytes, str]) -> str:
+    """ :return: {str} the text of a value written by `compress_text`, strings (written before we compressed) as is """
+    if isinstance(value, str):
+        return value
+
+    value = bytes(value)
+    if value[:1] == ZLIB:
+        return zlib.decompress(value[1:]).decode("utf-8")
+    if value[:1] == UNCOMPRESSED:
+        return value[1:].decode("utf-8")
+
+    raise ValueError(f"Unknown text encoding {value[:1]!r}")
+
+
+class CompressedUnicodeAttribute(Attribute[str]):
+    """
+    Text stored as a binary attribute, zlib compressed from COMPRESSION_THRESHOLD_BYTES on. Items written before we
+    compressed it still hold a string, which reads as is until `backfill_compressed_attributes` rewrites it.
+
+    Indexes should project a preview of the text instead, see DiagramsByCreatedAtIndex.
+    """
+    attr_type = BINARY
+
+    def serialize(self, value: str) -> bytes:
+        return compress_text(value)
+
+    def deserialize(self, value: Union[bytes, str]) -> str:
+        return decompress_text(value)
+
+    def get_value(self, value: dict) -> Union[bytes, str]:
+        return value[STRING] if STRING in value else super().get_value(value)
+
 
 class ThreatModelDataModel(Model):
     class Meta:
@@ -39,6 +92,29 @@ class DiagramByThreatModelIndex(GlobalSecondaryIndex):
     id = UnicodeAttribute(range_key=True)
 
 
+# every diagram with a creation time is in the same partition of the ByCreatedAt index, see DiagramsByCreatedAtIndex
+DIAGRAM_SUMMARY_PK = "Diagram"
+
+
+class DiagramsByCreatedAtIndex(GlobalSecondaryIndex):
+    """
+    Lists diagrams by creation time, projecting only what we show in the list page: previews of the descriptions rather
+    than the compressed descriptions themselves. Diagrams have no owner yet, so they all share the DIAGRAM_SUMMARY_PK
+    partition; once they do, the owner is the natural partition key.
+    """
+
+    class Meta:
+        index_name = "ByCreatedAt"
+        projection = IncludeProjection(["threat_model_id", "s3_prefix", "user_description_preview",
+                                        "diagram_description_preview", "status"])
+
+        read_capacity_units = 2
+        write_capacity_units = 1
+
+    summary_pk = UnicodeAttribute(hash_key=True)
+    created_at = UnicodeAttribute(range_key=True)
+
+
 class DiagramDataModel(Model):
     class Meta:
         table_name = DIAGRAMS_TABLE_NAME
@@ -48,11 +124,18 @@ class DiagramDataModel(Model):
     threat_model_id = UnicodeAttribute()
 
     s3_prefix = UnicodeAttribute()
-    user_description = UnicodeAttribute()
-    diagram_description = UnicodeAttribute()
+    user_description = CompressedUnicodeAttribute()
+    diagram_description = CompressedUnicodeAttribute()
     status = UnicodeAttribute()
+    created_at = UnicodeAttribute(null=True)
+
+    # list page projection, only set on diagrams with a `created_at`
+    summary_pk = UnicodeAttribute(null=True)
+    user_description_preview = UnicodeAttribute(null=True)
+    diagram_description_preview = UnicodeAttribute(null=True)
 
     by_threat_model = DiagramByThreatModelIndex()
+    by_created_at = DiagramsByCreatedAtIndex()
 
 
 class ComponentsByDiagramIndex(GlobalSecondaryIndex):
@@ -78,6 +161,7 @@ class ComponentDataModel(Model):
     component_type = UnicodeAttribute()
     name = UnicodeAttribute()
     description = UnicodeAttribute()
+    version = NumberAttribute(default=0)
 
     by_diagram = ComponentsByDiagramIndex()
 
@@ -112,10 +196,11 @@ class ThreatDataModel(Model):
 
     name = UnicodeAttribute()
     stride_type = UnicodeAttribute()
-    description = UnicodeAttribute()
+    description = CompressedUnicodeAttribute()
 
     dread_scores = DREADAttribute()
     action = UnicodeAttribute()
     reason = UnicodeAttribute()
+    version = NumberAttribute(default=0)
 
     by_component = ThreatsByComponentIndex()
@@ -0,0 +1,99 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+BatchWriteItem helpers for our pynamodb models.
+
+pynamodb's `Model.batch_write` sends 25 item chunks one after the other and retries unprocessed items without any delay,
+so we send chunks concurrently and back off (with jitter) before retrying the items DynamoDB did not process.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import random
+from time import perf_counter, sleep
+from typing import Type
+
+from aws_lambda_powertools import Logger
+from pynamodb.constants import DELETE_REQUEST, ITEM, KEY, PUT_REQUEST, UNPROCESSED_ITEMS
+from pynamodb.exceptions import PutError
+from pynamodb.models import Model
+
+from genai_core.metrics import write_metrics
+
+logger = Logger()
+
+# DynamoDB accepts at most 25 put or delete requests per BatchWriteItem
+BATCH_WRITE_MAX_ITEMS = 25
+BATCH_WRITE_MAX_CONCURRENCY = int(os.getenv("DYNAMODB_MAX_CONCURRENCY", "16"))
+BATCH_WRITE_MAX_RETRIES = int(os.getenv("BATCH_WRITE_MAX_RETRIES", "8"))
+BATCH_WRITE_BASE_DELAY_SECONDS = 0.05
+BATCH_WRITE_MAX_DELAY_SECONDS = 2.0
+
+# cascading deletes write (and report their progress) this many items at a time
+DELETE_PROGRESS_INTERVAL = 1000
+
+
+def _write_chunk(model_class: Type[Model], put_items: list[dict], delete_items: list[dict]) -> None:
+    table_name = model_class.Meta.table_name
+
+    for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+        response = model_class._get_connection().batch_write_item(put_items=put_items, delete_items=delete_items)
+
+        unprocessed_items = (response or {}).get(UNPROCESSED_ITEMS, {}).get(table_name)
+        if not unprocessed_items:
+            return
+
+        if attempt == BATCH_WRITE_MAX_RETRIES:
+            break
+
+        put_items = [item[PUT_REQUEST][ITEM] for item in unprocessed_items if PUT_REQUEST in item]
+        delete_items = [item[DELETE_REQUEST][KEY] for item in unprocessed_items if DELETE_REQUEST in item]
+
+        # full jitter exponential backoff, unprocessed items usually mean we are being throttled
+        delay = random.uniform(0, min(BATCH_WRITE_MAX_DELAY_SECONDS, BATCH_WRITE_BASE_DELAY_SECONDS * 2 ** attempt))
+        logger.info(f"Retrying {len(unprocessed_items)} unprocessed items of {table_name} in {delay:.3f}s")
+        sleep(delay)
+
+    raise PutError(f"Failed to batch write {len(unprocessed_items)} items to {table_name}: max retries exceeded")
+
+
+def batch_write(model_class: Type[Model], put: list[Model] = (), delete: list[Model] = (),
+                max_concurrency: int = BATCH_WRITE_MAX_CONCURRENCY) -> None:
+    """
+    Puts and deletes `model_class` items with as few BatchWriteItem requests as possible.
+
+    :param model_class: {Type[Model]} the pynamodb model of the table we write to
+    :param put: {list[Model]} the items to put
+    :param delete: {list[Model]} the items to delete, only their keys are used
+    :param max_concurrency: [OPTIONAL] {int} the maximum number of chunks sent at the same time
+    :raises PutError: when some items could not be written, even after retrying them
+    """
+    # a single BatchWriteItem can't touch the same key twice, the last request for a key wins as with sequential writes
+    requests_by_key = {}
+    for action, items in [("put", put), ("delete", delete)]:
+        for item in items:
+            key = json.dumps(item._get_keys(), sort_keys=True, default=str)
+            requests_by_key.pop(key, None)
+            requests_by_key[key] = (action, item.serialize() if action == "put" else item._get_keys())
+
+    requests = list(requests_by_key.values())
+    if len(requests) == 0:
+        return
+
+    chunks = [requests[i:i + BATCH_WRITE_MAX_ITEMS] for i in range(0, len(requests), BATCH_WRITE_MAX_ITEMS)]
+
+    start = perf_counter()
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as executor:
+        futures = [executor.submit(_write_chunk, model_class,
+                                   [item for action, item in chunk if action == "put"],
+                                   [item for action, item in chunk if action == "delete"])
+                   for chunk in chunks]
+
+        for future in futures:
+            future.result()
+
+    write_metrics("batchWrite", item_count=len(requests), latency_ms=(perf_counter() - start) * 1000)
@@ -4,25 +4,47 @@
 
 import boto3
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
 import os
-from typing import TYPE_CHECKING
+from typing import Callable, Optional, TYPE_CHECKING, Union
 
-from pynamodb.exceptions import DoesNotExist
+from pynamodb.constants import ALL_OLD, ATTRIBUTES
+from pynamodb.exceptions import DeleteError, DoesNotExist, PutError, UpdateError
 
-from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD, DiagramSummary, DiagramSummaryPage, \
+    RiskSummary, DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
 
 if TYPE_CHECKING:
     from mypy_boto3_dynamodb.service_resource import Table as DynamoDBTable
 else:
     DynamoDBTable = object
 
-from genai_core.repository import ThreatModelRepository, DeleteItemException, NotFoundException
+from genai_core.repository import ThreatModelRepository, DeleteItemException, NotFoundException, \
+    VersionConflictException, ThreatUpdate, COMPONENT_UPDATABLE_FIELDS, check_threat_changes
+from genai_core.adapter.dynamodb_batch import batch_write, DELETE_PROGRESS_INTERVAL
 from genai_core.adapter.dynamo_db_data_model import ThreatModelDataModel, DiagramDataModel, ComponentDataModel, \
-    ThreatDataModel
+    ThreatDataModel, DREADAttribute, DIAGRAM_SUMMARY_PK
+from genai_core.adapter import compressed_attributes
+from genai_core.adapter.pagination import encode_next_token, decode_next_token
+from genai_core.adapter.risk_summaries import risk_counter_deltas, roll_up, risk_counters_of, add_counters, \
+    risk_summary_from
 
 AWS_REGION = os.getenv("AWS_REGION",
                        "us-east-1")  # we assume the runtime will have this defined, if not, please define yourself
 
+# the maximum number of concurrent requests when loading a level of the threat model tree (e.g. all components)
+DYNAMODB_MAX_CONCURRENCY = int(os.getenv("DYNAMODB_MAX_CONCURRENCY", "16"))
+
+
+def diagram_risk_summary_key(diagram_id: str) -> dict:
+    return {"id": f"D#{diagram_id}"}
+
+
+def component_risk_summary_key(component_id: str) -> dict:
+    return {"id": f"C#{component_id}"}
+
 
 class DynamoDBThreatModelRepository(ThreatModelRepository):
     """ TODO: create proper exception types """
@@ -31,25 +53,39 @@ class DynamoDBThreatModelRepository(ThreatModelRepository):
                  threat_models: DynamoDBTable,
                  diagrams: DynamoDBTable,
                  components: DynamoDBTable,
-                 threats: DynamoDBTable):
+                 threats: DynamoDBTable,
+                 max_concurrency: int = DYNAMODB_MAX_CONCURRENCY,
+                 risk_summaries: Optional[DynamoDBTable] = None):
+        """
+        :param risk_summaries: [OPTIONAL] {DynamoDBTable} where we keep the counters of the risk summaries, without it
+            summaries are counted from the threats on every read
+        """
         self.threat_models = threat_models
         self.diagrams = diagrams
         self.components = components
         self.threats = threats
+        self.max_concurrency = max_concurrency
+        self.risk_summaries = risk_summaries
+        # components never move between diagrams, see `_diagrams_of`
+        self._diagram_of_component: dict[str, str] = {}
 
     @classmethod
     def from_table_names(cls,
                          threat_models_table_name: str,
                          diagrams_table_name: str,
                          components_table_name: str,
-                         threats_table_name: str) -> "DynamoDBThreatModelRepository":
+                         threats_table_name: str,
+                         risk_summaries_table_name: Optional[str] = None) -> "DynamoDBThreatModelRepository":
         session = boto3.session.Session(region_name=AWS_REGION)
 
         threat_models = session.resource("dynamodb").Table(threat_models_table_name)
         diagrams = session.resource("dynamodb").Table(diagrams_table_name)
         components = session.resource("dynamodb").Table(components_table_name)
         threats = session.resource("dynamodb").Table(threats_table_name)
-        return DynamoDBThreatModelRepository(threat_models, diagrams, components, threats)
+        risk_summaries = session.resource("dynamodb").Table(risk_summaries_table_name) \
+            if risk_summaries_table_name else None
+        return DynamoDBThreatModelRepository(threat_models, diagrams, components, threats,
+                                             risk_summaries=risk_summaries)
 
     def _build_threats_from(self, component_id, threats_data) -> list[Threat]:
         return [Threat(
@@ -67,47 +103,61 @@ class DynamoDBThreatModelRepository(ThreatModelRepository):
             ),
             action=t.action,
             reason=t.reason,
+            version=t.version,
         ) for t in threats_data]
 
-    def get(self, threat_model_id: str) -> ThreatModel:
-        try:
-            threat_model_data = ThreatModelDataModel.get(threat_model_id)
-        except:
-            raise NotFoundException(f"ThreatModel {threat_model_id} not found")
+    def _threats_from(self, threats_data) -> list[Threat]:
+        """ Same as `_build_threats_from` for threats of any component """
+        return [self._build_threats_from(t.component_id, [t])[0] for t in threats_data]
 
-        diagrams_data = DiagramDataModel.by_threat_model.query(threat_model_id)
+    def _query_concurrently(self, query, hash_keys: list[str]) -> dict[str, list]:
+        """
+        Runs `query` (e.g. `ComponentDataModel.by_diagram.query`) for every hash key concurrently, following every page.
 
-        diagrams = []
-        for diagram_data in diagrams_data:
-            components_data = ComponentDataModel.by_diagram.query(diagram_data.id)
+        :return: {dict[str, list]} the items of each hash key
+        """
+        if len(hash_keys) == 0:
+            return {}
 
-            components = []
-            for component_data in components_data:
-                threats_data = ThreatDataModel.by_component.query(component_data.id)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(hash_keys))) as executor:
+            # the result iterators paginate lazily, so we consume them inside the worker threads
+            results = executor.map(lambda hash_key: list(query(hash_key)), hash_keys)
 
-                threats = self._build_threats_from(component_data.id, threats_data)
+            return dict(zip(hash_keys, results))
 
-                component = Component(**component_data.attribute_values, threats=threats)
-                components.append(component)
+    def _load_diagrams(self, diagrams_data: list[DiagramDataModel]) -> list[Diagram]:
+        """ Loads the components and threats of `diagrams_data` with one round of concurrent queries per level """
+        components_by_diagram = self._query_concurrently(ComponentDataModel.by_diagram.query,
+                                                         [d.id for d in diagrams_data])
 
-            diagram = Diagram(**diagram_data.attribute_values, components=components)
-            diagrams.append(diagram)
+        threats_by_component = self._query_concurrently(ThreatDataModel.by_component.query,
+                                                        [c.id for cs in components_by_diagram.values() for c in cs])
 
-        threat_model = ThreatModel(**threat_model_data.attribute_values, diagrams=diagrams)
-        print(threat_model)
-        return threat_model
+        return [Diagram(**diagram_data.attribute_values, components=[
+            Component(**component_data.attribute_values,
+                      threats=self._build_threats_from(component_data.id, threats_by_component[component_data.id]))
+            for component_data in components_by_diagram[diagram_data.id]
+        ]) for diagram_data in diagrams_data]
 
-    def get_diagram(self, diagram_id: str) -> Diagram:
+    def get(self, threat_model_id: str) -> ThreatModel:
         try:
-            diagram_data = DiagramDataModel.get(diagram_id)
-            components_data = ComponentDataModel.by_diagram.query(diagram_data.id)
+            threat_model_data = ThreatModelDataModel.get(threat_model_id)
+        except:
+            raise NotFoundException(f"ThreatModel {threat_model_id} not found")
 
-            components = [self.get_component(c.id) for c in components_data]
+        diagrams = self._load_diagrams(list(DiagramDataModel.by_threat_model.query(threat_model_id)))
 
-            return Diagram(**diagram_data.attribute_values, components=components)
+        return ThreatModel(**threat_model_data.attribute_values, diagrams=diagrams)
+
+    def get_diagram(self, diagram_id: str) -> Diagram:
+        try:
+            diagram_data = DiagramDataModel.get(diagram_id)
         except DoesNotExist:
             raise NotFoundException(f"Diagram {diagram_id} does not exist")
 
+        # the ByDiagram index projects all attributes, so we don't need to get each component again
+        return self._load_diagrams([diagram_data])[0]
+
     def get_component(self, component_id: str) -> Component:
         try:
             component_data = ComponentDataModel.get(component_id)
@@ -142,24 +192,207 @@ class DynamoDBThreatModelRepository(ThreatModelRepository):
         diagrams_data = DiagramDataModel.scan()
         return [Diagram(**d.attribute_values) for d in diagrams_data]
 
+    def list_diagram_summaries(self, limit: int, next_token: Optional[str] = None) -> DiagramSummaryPage:
+        results = DiagramDataModel.by_created_at.query(DIAGRAM_SUMMARY_PK, scan_index_forward=False, limit=limit,
+                                                       last_evaluated_key=decode_next_token(next_token))
+
+        items = [DiagramSummary(**{**d.attribute_values, "user_description": d.user_description_preview or "",
+                                   "diagram_description": d.diagram_description_preview or ""})
+                 for d in results]
+
+        return DiagramSummaryPage(items=items, next_token=encode_next_token(results.last_evaluated_key))
+
+    @staticmethod
+    def _diagram_data(diagram: Diagram) -> DiagramDataModel:
+        return DiagramDataModel(**diagram.model_dump(exclude={"components"}),
+                                summary_pk=DIAGRAM_SUMMARY_PK if diagram.created_at else None,
+                                user_description_preview=diagram.user_description[:DIAGRAM_DESCRIPTION_PREVIEW_LENGTH],
+                                diagram_description_preview=diagram.diagram_description[
+                                                            :DIAGRAM_DESCRIPTION_PREVIEW_LENGTH])
+
+    def backfill_diagram_summaries(self) -> int:
+        """
+        Adds the diagrams created before we tracked `created_at` to the ByCreatedAt index, stamping them with the
+        current time.
+
+        :return: {int} the number of diagrams updated
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        diagrams = [Diagram(**{**d.attribute_values, "created_at": d.created_at or now})
+                    for d in DiagramDataModel.scan(filter_condition=DiagramDataModel.summary_pk.does_not_exist())]
+
+        self.save_diagrams(diagrams)
+
+        return len(diagrams)
+
+    def backfill_compressed_attributes(self) -> int:
+        """
+        Compresses the descriptions of the diagrams and threats written before we did (see CompressedUnicodeAttribute),
+        which also adds the `user_description_preview` of those diagrams to the ByCreatedAt index.
+
+        :return: {int} the number of items rewritten
+        """
+        return (compressed_attributes.backfill(self.diagrams, ["id"], ["user_description", "diagram_description"],
+                                               max_workers=self.max_concurrency) +
+                compressed_attributes.backfill(self.threats, ["id"], ["description"],
+                                               max_workers=self.max_concurrency))
+
     def save(self, threat_model: ThreatModel) -> None:
         try:
             ThreatModelDataModel(**threat_model.model_dump(exclude={"diagrams"})).save()
         except ClientError as e:
             raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
 
-    def save_threat(self, threat: Threat) -> None:
+    def _put_threat(self, threat: Threat) -> Optional[Threat]:
+        """ :return: {Optional[Threat]} the threat we replaced, if any, which tells us which counters to take back """
+        args, kwargs = ThreatDataModel(**threat.model_dump())._get_save_args()
         try:
-            ThreatDataModel(**threat.model_dump()).save()
-        except ClientError as e:
-            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+            response = ThreatDataModel._get_connection().put_item(*args, return_values=ALL_OLD, **kwargs)
+        except PutError as e:
+            raise Exception(f"DynamoDB PutItem error {e}")
+
+        if not response.get(ATTRIBUTES):
+            return None
+
+        return self._threats_from([ThreatDataModel.from_raw_data(response[ATTRIBUTES])])[0]
+
+    def save_threat(self, threat: Threat) -> None:
+        replaced = self._put_threat(threat)
+        self._add_risk_counters(before=[replaced] if replaced else [], after=[threat])
 
     def save_threats(self, threats: list[Threat]) -> None:
+        # the last of duplicate threats wins
+        threats = list({threat.id: threat for threat in threats}.values())
+
+        if self.risk_summaries is None:
+            try:
+                batch_write(ThreatDataModel, put=[ThreatDataModel(**threat.model_dump()) for threat in threats],
+                            max_concurrency=self.max_concurrency)
+            except PutError as e:
+                raise Exception(f"DynamoDB BatchWriteItem error {e}")
+            return
+
+        if len(threats) == 0:
+            return
+
+        def put_one(threat: Threat) -> Union[Optional[Threat], Exception]:
+            try:
+                return self._put_threat(threat)
+            except Exception as e:
+                return e
+
+        # batched writes can't return the items they replace, so each threat gets its own PutItem
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(threats))) as executor:
+            outcomes = list(executor.map(put_one, threats))
+
+        # the counters come from the items as they were right before each (atomic) put
+        saved = [(threat, outcome) for threat, outcome in zip(threats, outcomes) if not isinstance(outcome, Exception)]
+        self._add_risk_counters(before=[replaced for _, replaced in saved if replaced is not None],
+                                after=[threat for threat, _ in saved])
+
+        errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+        if errors:
+            raise errors[0]
+
+    def _update(self, model_class, entity_name: str, item_id: str, changes: dict,
+                expected_version: Optional[int]) -> tuple:
+        """
+        A single UpdateItem that also increments the version of the item. It returns the item as it was (ALL_OLD) and we
+        apply the changes to it, which is what ALL_NEW would return, since the update is atomic.
+
+        :return: {tuple} the item before and after the update
+        """
+        values = {name: DREADAttribute(**value) if name == "dread_scores" else value for name, value in changes.items()}
+        actions = [getattr(model_class, name).set(value) for name, value in values.items()]
+
+        condition = model_class.id.exists()
+        if expected_version is not None:
+            version_matches = model_class.version == expected_version
+            if expected_version == 0:
+                # items written before we versioned them
+                version_matches = version_matches | model_class.version.does_not_exist()
+            condition = condition & version_matches
+
         try:
-            for threat in threats:
-                self.save_threat(threat)
-        except ClientError as e:
-            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+            response = model_class._get_connection().update_item(
+                item_id, actions=[*actions, model_class.version.add(1)], condition=condition, return_values=ALL_OLD)
+        except UpdateError as e:
+            if e.cause_response_code != "ConditionalCheckFailedException":
+                raise Exception(f"DynamoDB UpdateItem error {e}")
+
+            # only failed updates pay for a second read, to tell a missing item from a version conflict
+            try:
+                current = model_class.get(item_id)
+            except DoesNotExist:
+                raise NotFoundException(f"{entity_name} {item_id} does not exist")
+
+            raise VersionConflictException(f"{entity_name} {item_id} is at version {current.version}, "
+                                           f"expected {expected_version}", current_version=current.version)
+
+        before, after = model_class.from_raw_data(response[ATTRIBUTES]), model_class.from_raw_data(response[ATTRIBUTES])
+        for name, value in values.items():
+            setattr(after, name, value)
+        after.version = (before.version or 0) + 1
+
+        return before, after
+
+    def _update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int]) -> tuple[Threat, Threat]:
+        """ :return: {tuple[Threat, Threat]} the threat before and after a conditional UpdateItem, see `_update` """
+        check_threat_changes(threat_id, changes)
+
+        before, after = self._threats_from(
+            self._update(ThreatDataModel, "Threat", threat_id, changes, expected_version))
+        return before, after
+
+    def update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int] = None) -> Threat:
+        before, after = self._update_threat(threat_id, changes, expected_version)
+        self._add_risk_counters(before=[before], after=[after])
+
+        return after
+
+    @staticmethod
+    def _get_threats_data(threat_ids: list[str], attributes_to_get: Optional[list[str]] = None) -> dict:
+        """ BatchGetItems (100 keys each, unprocessed keys are retried by pynamodb) keyed by threat id """
+        if len(threat_ids) == 0:
+            return {}
+
+        return {t.id: t for t in ThreatDataModel.batch_get(threat_ids, consistent_read=True,
+                                                           attributes_to_get=attributes_to_get)}
+
+    def update_threats(self, updates: list[ThreatUpdate]) -> dict[str, Union[Threat, Exception]]:
+        threat_ids = [update.threat_id for update in updates]
+        if len(set(threat_ids)) != len(threat_ids):
+            raise ValueError("A threat can only be updated once per request")
+        if len(updates) == 0:
+            return {}
+
+        def update_one(update: ThreatUpdate) -> Union[tuple[Threat, Threat], Exception]:
+            try:
+                return self._update_threat(update.threat_id, update.changes, update.expected_version)
+            except TypeError as e:
+                return ValueError(f"Invalid changes to Threat {update.threat_id}: {e}")
+            except Exception as e:
+                return e
+
+        # batched writes can't be conditional, so each threat gets its own UpdateItem
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(updates))) as executor:
+            outcomes = dict(zip(threat_ids, executor.map(update_one, updates)))
+
+        # the counters come from the items as they were right before each (atomic) update
+        updated = [outcome for outcome in outcomes.values() if isinstance(outcome, tuple)]
+        self._add_risk_counters(before=[before for before, _ in updated], after=[after for _, after in updated])
+
+        return {threat_id: outcome[1] if isinstance(outcome, tuple) else outcome
+                for threat_id, outcome in outcomes.items()}
+
+    def update_component(self, component_id: str, changes: dict, expected_version: Optional[int] = None) -> Component:
+        unknown_fields = set(changes) - COMPONENT_UPDATABLE_FIELDS
+        if unknown_fields:
+            raise ValueError(f"Component fields {sorted(unknown_fields)} can't be updated")
+
+        _, after = self._update(ComponentDataModel, "Component", component_id, changes, expected_version)
+
+        return Component(**after.attribute_values)
 
     def save_component(self, component: Component) -> None:
         """
@@ -172,40 +405,220 @@ class DynamoDBThreatModelRepository(ThreatModelRepository):
 
     def save_components(self, components: list[Component]) -> None:
         try:
-            for component in components:
-                self.save_component(component)
-        except ClientError as e:
-            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+            batch_write(ComponentDataModel,
+                        put=[ComponentDataModel(**component.model_dump(exclude={"threats"})) for component in components],
+                        max_concurrency=self.max_concurrency)
+        except PutError as e:
+            raise Exception(f"DynamoDB BatchWriteItem error {e}")
 
     def save_diagram(self, diagram: Diagram) -> None:
         try:
-            DiagramDataModel(**diagram.model_dump(exclude={"components"})).save()
+            self._diagram_data(diagram).save()
         except ClientError as e:
             raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
 
     def save_diagrams(self, diagrams: list[Diagram]) -> None:
         try:
-            for diagram in diagrams:
-                self.save_diagram(diagram)
-        except ClientError as e:
-            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+            batch_write(DiagramDataModel,
+                        put=[self._diagram_data(diagram) for diagram in diagrams],
+                        max_concurrency=self.max_concurrency)
+        except PutError as e:
+            raise Exception(f"DynamoDB BatchWriteItem error {e}")
 
 
-    def delete(self, threat_model_id: str) -> None:
-        """ Be wary of referential integrity when deleting items, you may leave zombi items without parents """
-        raise NotImplementedError
+    def delete(self, threat_model_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        try:
+            ThreatModelDataModel.get(threat_model_id, attributes_to_get=["id"])
+        except DoesNotExist:
+            raise NotFoundException(f"ThreatModel {threat_model_id} not found")
 
-    def delete_component(self, component_id: str) -> None:
-        component = self.get_component(component_id)
+        # we only need the keys, gathered with one round of concurrent queries per level
+        diagram_ids = [d.id for d in DiagramDataModel.by_threat_model.query(threat_model_id, attributes_to_get=["id"])]
+        component_ids = [c.id for cs in self._query_concurrently(
+            partial(ComponentDataModel.by_diagram.query, attributes_to_get=["id"]), diagram_ids).values() for c in cs]
+        threat_ids = [t.id for ts in self._query_concurrently(
+            partial(ThreatDataModel.by_component.query, attributes_to_get=["id"]), component_ids).values() for t in ts]
+
+        # derived from the threats, so they go first and are not counted
+        self._delete_risk_summaries([diagram_risk_summary_key(diagram_id) for diagram_id in diagram_ids] +
+                                    [component_risk_summary_key(component_id) for component_id in component_ids])
+
+        levels = [(ThreatDataModel, threat_ids), (ComponentDataModel, component_ids), (DiagramDataModel, diagram_ids),
+                  (ThreatModelDataModel, [threat_model_id])]
+        total = sum(len(ids) for _, ids in levels)
+
+        deleted = 0
+        for model_class, ids in levels:
+            for i in range(0, len(ids), DELETE_PROGRESS_INTERVAL):
+                chunk = ids[i:i + DELETE_PROGRESS_INTERVAL]
+                try:
+                    batch_write(model_class, delete=[model_class(id=item_id) for item_id in chunk],
+                                max_concurrency=self.max_concurrency)
+                except PutError as e:
+                    raise Exception(f"DynamoDB BatchWriteItem error {e}")
+
+                deleted += len(chunk)
+                if on_progress is not None:
+                    on_progress(deleted, total)
+
+        return deleted
+
+    def _threat_ids_of(self, component_id: str, limit: Optional[int] = None) -> list[str]:
+        """ Keys only query, used for referential checks where we don't need the threats themselves """
+        return [t.id for t in ThreatDataModel.by_component.query(component_id, limit=limit,
+                                                                 attributes_to_get=["id", "component_id"])]
 
+    def delete_component(self, component_id: str) -> None:
         # we need to make sure we keep referential integrity, so we will fail deletes when there are threats associated
-        # so, first let's check if there are threats
-        if len(component.threats) > 0:
+        # so, first let's check if there is at least one threat, and only list them all to report the error
+        if len(self._threat_ids_of(component_id, limit=1)) > 0:
             raise DeleteItemException("Component has threats associated",
-                                      errors=[f"Threat {t.id}" for t in component.threats])
+                                      errors=[f"Threat {threat_id}" for threat_id in self._threat_ids_of(component_id)])
 
         # if we are here it means the component has no threats and can be safely deleted
-        ComponentDataModel.get(component_id).delete()
+        try:
+            ComponentDataModel(id=component_id).delete(condition=ComponentDataModel.id.exists())
+        except DeleteError as e:
+            if e.cause_response_code == "ConditionalCheckFailedException":
+                raise NotFoundException(f"Component {component_id} does not exist")
+            raise
+
+        # all zeros, since the component has no threats
+        self._delete_risk_summaries([component_risk_summary_key(component_id)])
+
+    def _delete_threat(self, threat_id: str) -> Threat:
+        """ :return: {Threat} the deleted threat, which tells us which counters to take back """
+        try:
+            response = ThreatDataModel._get_connection().delete_item(threat_id, condition=ThreatDataModel.id.exists(),
+                                                                     return_values=ALL_OLD)
+        except DeleteError as e:
+            if e.cause_response_code == "ConditionalCheckFailedException":
+                raise NotFoundException(f"Threat {threat_id} does not exist")
+            raise
+
+        return self._threats_from([ThreatDataModel.from_raw_data(response[ATTRIBUTES])])[0]
 
     def delete_threat(self, threat_id: str) -> None:
-        ThreatDataModel.get(threat_id).delete()
+        self._add_risk_counters(before=[self._delete_threat(threat_id)], after=[])
+
+    def delete_threats(self, threat_ids: list[str]) -> dict[str, Optional[Exception]]:
+        threat_ids = list(dict.fromkeys(threat_ids))
+
+        if self.risk_summaries is not None:
+            return self._delete_threats_one_by_one(threat_ids)
+
+        # batched deletes can't be conditional, so a batched read tells us which threats don't exist
+        existing_ids = set(self._get_threats_data(threat_ids, attributes_to_get=["id"]))
+        results: dict[str, Optional[Exception]] = {
+            threat_id: None if threat_id in existing_ids else NotFoundException(f"Threat {threat_id} does not exist")
+            for threat_id in threat_ids}
+
+        try:
+            batch_write(ThreatDataModel, delete=[ThreatDataModel(id=threat_id) for threat_id in existing_ids],
+                        max_concurrency=self.max_concurrency)
+        except PutError as e:
+            error = Exception(f"DynamoDB BatchWriteItem error {e}")
+            results.update({threat_id: error for threat_id in existing_ids})
+
+        return results
+
+    def _delete_threats_one_by_one(self, threat_ids: list[str]) -> dict[str, Optional[Exception]]:
+        """ Conditional DeleteItems with ALL_OLD, so that the counters we take back are exactly those of the threats """
+        if len(threat_ids) == 0:
+            return {}
+
+        def delete_one(threat_id: str) -> Union[Threat, Exception]:
+            try:
+                return self._delete_threat(threat_id)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(threat_ids))) as executor:
+            outcomes = dict(zip(threat_ids, executor.map(delete_one, threat_ids)))
+
+        self._add_risk_counters(before=[outcome for outcome in outcomes.values() if isinstance(outcome, Threat)],
+                                after=[])
+
+        return {threat_id: outcome if isinstance(outcome, Exception) else None
+                for threat_id, outcome in outcomes.items()}
+
+    # Risk summaries
+
+    def _diagrams_of(self, component_ids: list[str]) -> dict[str, str]:
+        """ :return: {dict[str, str]} the diagram of each component, components that don't exist are left out """
+        missing = list({component_id for component_id in component_ids
+                         if component_id not in self._diagram_of_component})
+        if missing:
+            for c in ComponentDataModel.batch_get(missing, attributes_to_get=["id", "diagram_id"]):
+                self._diagram_of_component[c.id] = c.diagram_id
+
+        return {component_id: self._diagram_of_component[component_id] for component_id in component_ids
+                if component_id in self._diagram_of_component}
+
+    def _add_risk_counters(self, before: list[Threat], after: list[Threat]) -> None:
+        """ Adds the difference between the counters of `after` and `before` to their components and diagrams """
+        if self.risk_summaries is None:
+            return
+
+        deltas = risk_counter_deltas(before, after)
+        if len(deltas) == 0:
+            return
+
+        diagram_deltas = roll_up(deltas, self._diagrams_of(list(deltas)))
+        add_counters(self.risk_summaries,
+                     [(component_risk_summary_key(component_id), delta) for component_id, delta in deltas.items()] +
+                     [(diagram_risk_summary_key(diagram_id), delta) for diagram_id, delta in diagram_deltas.items()],
+                     max_workers=self.max_concurrency)
+
+    def _delete_risk_summaries(self, keys: list[dict]) -> None:
+        if self.risk_summaries is None or len(keys) == 0:
+            return
+
+        try:
+            with self.risk_summaries.batch_writer() as batch:
+                for key in keys:
+                    batch.delete_item(Key=key)
+        except ClientError as e:
+            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+    def _get_risk_summary(self, key: dict) -> RiskSummary:
+        try:
+            return risk_summary_from(self.risk_summaries.get_item(Key=key).get("Item"))
+        except ClientError as e:
+            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+    def get_diagram_risk_summary(self, diagram_id: str) -> RiskSummary:
+        if self.risk_summaries is None:
+            return RiskSummary.of([t for c in self.get_diagram(diagram_id).components for t in c.threats])
+
+        return self._get_risk_summary(diagram_risk_summary_key(diagram_id))
+
+    def get_component_risk_summary(self, component_id: str) -> RiskSummary:
+        if self.risk_summaries is None:
+            return RiskSummary.of(self.get_component(component_id).threats)
+
+        return self._get_risk_summary(component_risk_summary_key(component_id))
+
+    def backfill_risk_summaries(self) -> int:
+        """
+        Recounts the risk summaries of every diagram and component from their threats, e.g. for threat models written
+        before we kept them. Threats written while it runs may be counted twice or not at all, run it again when idle.
+
+        :return: {int} the number of diagrams recounted
+        """
+        if self.risk_summaries is None:
+            return 0
+
+        diagrams = self.list_diagrams()
+        for diagram in diagrams:
+            diagram_counters, component_counters = risk_counters_of(self.get_diagram(diagram.id))
+
+            try:
+                with self.risk_summaries.batch_writer() as batch:
+                    batch.put_item(Item={**diagram_risk_summary_key(diagram.id), **diagram_counters})
+                    for component_id, counters in component_counters.items():
+                        batch.put_item(Item={**component_risk_summary_key(component_id), **counters})
+            except ClientError as e:
+                raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+        return len(diagrams)
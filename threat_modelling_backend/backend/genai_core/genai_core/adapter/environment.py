@@ -0,0 +1,104 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import os
+import threading
+from typing import Optional
+
+from genai_core.repository import ThreatModelRepository, AsyncThreatModelRepository
+
+from .async_threat_model_repository import AsyncDynamoDBThreatModelRepository
+from .caching_threat_model_repository import CachingThreatModelRepository
+from .dynamodb_threat_model_repository import DynamoDBThreatModelRepository
+from .single_table_threat_model_repository import SingleTableThreatModelRepository
+from .sqlite_threat_model_repository import SQLiteThreatModelRepository
+from .threat_model_documents import DocumentThreatModelRepository, ThreatModelDocumentStore
+
+TABLE_NAME_VARIABLES = ["THREAT_MODEL_ITEMS_TABLE_NAME", "THREAT_MODELS_TABLE_NAME", "DIAGRAMS_TABLE_NAME",
+                        "COMPONENTS_TABLE_NAME", "THREATS_TABLE_NAME", "RISK_SUMMARIES_TABLE_NAME",
+                        "SQLITE_DATABASE_PATH"]
+
+_repositories: dict[tuple, Optional[ThreatModelRepository]] = {}
+_async_repositories: dict[tuple, Optional[AsyncThreatModelRepository]] = {}
+_lock = threading.Lock()
+
+
+def repository_from_environment() -> Optional[ThreatModelRepository]:
+    """
+    Builds the repository configured through the environment, i.e. the table names exported by the CDK `Database`
+    (or `SingleTableDatabase`) construct. Returns None when no tables are configured.
+
+    SQLITE_DATABASE_PATH takes precedence over any table, for load tests and offline runs without DynamoDB.
+
+    With REPOSITORY_DOCUMENTS_ENABLED threat models are read from their materialized documents (see
+    genai_core.adapter.threat_model_documents) when there is one that includes the writes made through it. Documents
+    don't know about writes made by other execution environments, so only enable it where staleness is acceptable.
+
+    With REPOSITORY_CACHE_ENABLED the repository is wrapped in a CachingThreatModelRepository. Modules of the same
+    Lambda function share one instance, so that writes made through any of them invalidate the cache of all of them.
+    It never serves whole threat models, so it only pays off for callers that read diagrams, components or threats
+    one by one, which our resolvers don't.
+    """
+    cache_enabled = os.getenv("REPOSITORY_CACHE_ENABLED", "false").lower() == "true"
+    documents_table_name = os.getenv("THREAT_MODEL_DOCUMENTS_TABLE_NAME") \
+        if os.getenv("REPOSITORY_DOCUMENTS_ENABLED", "false").lower() == "true" else None
+    key = _environment_key()
+
+    with _lock:
+        if key not in _repositories:
+            repository = _table_repository_from_environment()
+            if repository is not None and documents_table_name:
+                repository = DocumentThreatModelRepository(
+                    repository, ThreatModelDocumentStore.from_table_name(documents_table_name))
+            if repository is not None and cache_enabled:
+                repository = CachingThreatModelRepository(repository)
+            _repositories[key] = repository
+
+        return _repositories[key]
+
+
+def async_repository_from_environment() -> Optional[AsyncThreatModelRepository]:
+    """
+    The repository of `repository_from_environment` for callers on an event loop, see
+    AsyncDynamoDBThreatModelRepository. Both share the same instance underneath, and so the same cache.
+    """
+    repository = repository_from_environment()
+    key = _environment_key()
+
+    with _lock:
+        if key not in _async_repositories:
+            _async_repositories[key] = AsyncDynamoDBThreatModelRepository(repository) if repository is not None else None
+
+        return _async_repositories[key]
+
+
+def _environment_key() -> tuple:
+    return (os.getenv("REPOSITORY_CACHE_ENABLED", "false").lower(), os.getenv("REPOSITORY_DOCUMENTS_ENABLED"),
+            os.getenv("THREAT_MODEL_DOCUMENTS_TABLE_NAME"), *(os.getenv(name) for name in TABLE_NAME_VARIABLES))
+
+
+def _table_repository_from_environment() -> Optional[ThreatModelRepository]:
+    sqlite_database_path = os.getenv("SQLITE_DATABASE_PATH")
+    if sqlite_database_path:
+        return SQLiteThreatModelRepository.from_path(sqlite_database_path)
+
+    threat_model_items_table_name = os.getenv("THREAT_MODEL_ITEMS_TABLE_NAME")
+    if threat_model_items_table_name:
+        return SingleTableThreatModelRepository.from_table_name(threat_model_items_table_name)
+
+    threat_models_table_name = os.getenv("THREAT_MODELS_TABLE_NAME")
+    diagrams_table_name = os.getenv("DIAGRAMS_TABLE_NAME", "Diagrams")
+    components_table_name = os.getenv("COMPONENTS_TABLE_NAME", "Components")
+    threats_table_name = os.getenv("THREATS_TABLE_NAME", "Threats")
+
+    if not (threat_models_table_name and diagrams_table_name and components_table_name and threats_table_name):
+        return None
+
+    return DynamoDBThreatModelRepository.from_table_names(
+        threat_models_table_name=threat_models_table_name,
+        diagrams_table_name=diagrams_table_name,
+        components_table_name=components_table_name,
+        threats_table_name=threats_table_name,
+        risk_summaries_table_name=os.getenv("RISK_SUMMARIES_TABLE_NAME"),
+    )
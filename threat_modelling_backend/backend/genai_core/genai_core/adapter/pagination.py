@@ -0,0 +1,32 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+""" Opaque pagination cursors, wrapping the LastEvaluatedKey of a DynamoDB Query """
+
+import base64
+import binascii
+import json
+from typing import Optional
+
+
+def encode_next_token(last_evaluated_key: Optional[dict]) -> Optional[str]:
+    if not last_evaluated_key:
+        return None
+
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, separators=(",", ":")).encode()).decode()
+
+
+def decode_next_token(next_token: Optional[str]) -> Optional[dict]:
+    if not next_token:
+        return None
+
+    try:
+        last_evaluated_key = json.loads(base64.urlsafe_b64decode(next_token.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid nextToken")
+
+    if not isinstance(last_evaluated_key, dict):
+        raise ValueError("Invalid nextToken")
+
+    return last_evaluated_key
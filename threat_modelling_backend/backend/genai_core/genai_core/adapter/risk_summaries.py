@@ -0,0 +1,116 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Pre-aggregated risk summaries.
+
+Every component and diagram has an item of counters (see `genai_core.model.risk_counters`) that the repositories keep up
+to date with atomic `ADD` updates whenever threats are saved, updated or deleted, so that summaries are a single GetItem
+however many threats there are. Each write adds the difference between the counters of the threats before and after
+it, one UpdateItem per component and diagram it touched.
+
+Counters are updated right after the threats are written, so a write that fails in between leaves them off until
+`backfill_risk_summaries` recounts them from the threats.
+
+Every write of threats takes the threats before it from its own (atomic) write, with ALL_OLD, so the differences are
+exact however writes to the same threat interleave. Batches can't return what they replace, so threats are saved and
+deleted with concurrent per-item writes instead, as they are updated.
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, TYPE_CHECKING
+
+from botocore.exceptions import ClientError
+
+from genai_core.model import Diagram, Threat, RiskSummary, risk_counters
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table as DynamoDBTable
+else:
+    DynamoDBTable = object
+
+# attributes of the summary items that are not counters
+NON_COUNTER_ATTRIBUTES = {"id", "PK", "SK", "entity_type"}
+
+
+def risk_counter_deltas(before: Iterable[Threat], after: Iterable[Threat]) -> dict[str, Counter]:
+    """
+    :param before: {Iterable[Threat]} the threats a write replaced or deleted
+    :param after: {Iterable[Threat]} the threats it wrote
+    :return: {dict[str, Counter]} by component id, the counters to add (components with nothing to add are left out)
+    """
+    deltas: dict[str, Counter] = {}
+    for threats, sign in [(before, -1), (after, 1)]:
+        for threat in threats:
+            delta = deltas.setdefault(threat.component_id, Counter())
+            for name, count in risk_counters(threat).items():
+                delta[name] += sign * count
+
+    deltas = {component_id: Counter({name: count for name, count in delta.items() if count != 0})
+              for component_id, delta in deltas.items()}
+    return {component_id: delta for component_id, delta in deltas.items() if delta}
+
+
+def roll_up(deltas: dict[str, Counter], diagram_of: dict[str, str]) -> dict[str, Counter]:
+    """ :return: {dict[str, Counter]} the sum of the deltas of the components of each diagram in `diagram_of` """
+    rolled_up: dict[str, Counter] = {}
+    for component_id, delta in deltas.items():
+        if component_id in diagram_of:
+            rolled_up.setdefault(diagram_of[component_id], Counter()).update(delta)
+    return rolled_up
+
+
+def risk_counters_of(diagram: Diagram) -> tuple[Counter, dict[str, Counter]]:
+    """ :return: {tuple[Counter, dict[str, Counter]]} the counters of a diagram and, by id, of its components """
+    components = {component.id: Counter() for component in diagram.components}
+    for component in diagram.components:
+        for threat in component.threats:
+            components[component.id].update(risk_counters(threat))
+
+    return sum(components.values(), Counter()), components
+
+
+def add_counters(table: DynamoDBTable, updates: list[tuple[dict, Counter]], set_attributes: Optional[dict] = None,
+                 max_workers: int = 16) -> None:
+    """
+    Adds counters with one UpdateItem per item, items that don't exist yet are created.
+
+    :param updates: {list[tuple[dict, Counter]]} the key of each item and the counters to add to it
+    :param set_attributes: [OPTIONAL] {dict} attributes to set on every item as well
+    """
+
+    def add(key: dict, counters: Counter) -> None:
+        names, values = {}, {}
+        for i, (name, count) in enumerate(counters.items()):
+            names[f"#c{i}"], values[f":c{i}"] = name, count
+        expression = "ADD " + ", ".join(f"#c{i} :c{i}" for i in range(len(counters)))
+
+        if set_attributes:
+            for i, (name, value) in enumerate(set_attributes.items()):
+                names[f"#s{i}"], values[f":s{i}"] = name, value
+            expression = "SET " + ", ".join(f"#s{i} = :s{i}" for i in range(len(set_attributes))) + " " + expression
+
+        try:
+            table.update_item(Key=key, UpdateExpression=expression, ExpressionAttributeNames=names,
+                              ExpressionAttributeValues=values)
+        except ClientError as e:
+            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+    updates = [(key, counters) for key, counters in updates if counters]
+    if len(updates) == 0:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(updates))) as executor:
+        for future in [executor.submit(add, key, counters) for key, counters in updates]:
+            future.result()
+
+
+def risk_summary_from(item: Optional[dict]) -> RiskSummary:
+    """ :return: {RiskSummary} the summary of an item of counters, an empty one if there is no item (no threats yet) """
+    if item is None:
+        return RiskSummary.from_counters({})
+
+    return RiskSummary.from_counters({name: int(count) for name, count in item.items()
+                                      if name not in NON_COUNTER_ATTRIBUTES})
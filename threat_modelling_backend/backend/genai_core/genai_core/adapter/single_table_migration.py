@@ -0,0 +1,119 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Backfills the single-table design from the multi-table one.
+
+Threat models are copied whole (threat model, diagrams, components and threats). This is a one-shot copy: run it with
+writes frozen (e.g. the GraphQL API in maintenance), then switch the lambdas over. Threat models already in the target
+table are skipped, so a re-run only copies the ones that failed or were missing, and never clobbers edits made in the
+single table. Edits and deletes made in the multi-table design after a threat model was copied are NOT carried over.
+
+The source tables are read from the same environment variables as the lambdas, for example:
+
+    THREAT_MODELS_TABLE_NAME=... DIAGRAMS_TABLE_NAME=... COMPONENTS_TABLE_NAME=... THREATS_TABLE_NAME=... \\
+        python -m genai_core.adapter.single_table_migration --target-table <ThreatModelItems table>
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+from aws_lambda_powertools import Logger
+
+from genai_core.repository import ThreatModelRepository, NotFoundException
+
+from .dynamodb_threat_model_repository import DynamoDBThreatModelRepository, DYNAMODB_MAX_CONCURRENCY
+from .single_table_threat_model_repository import SingleTableThreatModelRepository
+
+logger = Logger()
+
+
+def scan_threat_model_ids(source: DynamoDBThreatModelRepository) -> Iterator[str]:
+    """ :return: {Iterator[str]} the id of every threat model in the multi-table design """
+    scan_kwargs = {"ProjectionExpression": "id"}
+    while True:
+        response = source.threat_models.scan(**scan_kwargs)
+        yield from (item["id"] for item in response["Items"])
+
+        if "LastEvaluatedKey" not in response:
+            return
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def migrate(source: ThreatModelRepository,
+            target: SingleTableThreatModelRepository,
+            threat_model_ids: Iterable[str],
+            max_workers: int = DYNAMODB_MAX_CONCURRENCY) -> dict[str, Optional[str]]:
+    """
+    Copies the given threat models from `source` to `target`, skipping those that are already in `target`. A threat
+    model only exists in `target` once all of it is copied, so a run that was interrupted is completed by the next one.
+
+    :return: {dict[str, Optional[str]]} for every threat model, None if it was migrated (or skipped) or the error that
+    prevented it
+    """
+
+    # like DynamoDBThreatModelRepository.backfill_diagram_summaries, diagrams without a creation time get this one
+    now = datetime.now(timezone.utc).isoformat()
+
+    skipped = []
+
+    def migrate_one(threat_model_id: str) -> Optional[str]:
+        try:
+            try:
+                target.get(threat_model_id)
+                skipped.append(threat_model_id)
+                return None
+            except NotFoundException:
+                pass
+
+            threat_model = source.get(threat_model_id)
+            for diagram in threat_model.diagrams:
+                diagram.created_at = diagram.created_at or now
+
+            target.save_tree(threat_model)
+            return None
+        except Exception as e:
+            logger.exception(f"Failed to migrate threat model {threat_model_id}")
+            return str(e)
+
+    threat_model_ids = list(threat_model_ids)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = dict(zip(threat_model_ids, executor.map(migrate_one, threat_model_ids)))
+
+    logger.info({"migrated": sum(1 for error in results.values() if error is None) - len(skipped),
+                 "skipped": len(skipped),
+                 "failed": sum(1 for error in results.values() if error is not None)})
+
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from .environment import repository_from_environment
+
+    parser = argparse.ArgumentParser(description="Copy threat models from the multi-table to the single-table design")
+    parser.add_argument("--target-table", required=True, help="name of the ThreatModelItems table")
+    parser.add_argument("--threat-model-id", action="append", dest="threat_model_ids",
+                        help="only migrate this threat model (can be repeated), defaults to all of them")
+    parser.add_argument("--max-workers", type=int, default=DYNAMODB_MAX_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    source = repository_from_environment()
+    if not isinstance(source, DynamoDBThreatModelRepository):
+        parser.error("THREAT_MODELS_TABLE_NAME must point to the multi-table design")
+
+    target = SingleTableThreatModelRepository.from_table_name(args.target_table)
+
+    results = migrate(source, target, args.threat_model_ids or scan_threat_model_ids(source), args.max_workers)
+
+    for threat_model_id, error in results.items():
+        if error is not None:
+            print(f"{threat_model_id}: {error}")
+
+    return 1 if any(error is not None for error in results.values()) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
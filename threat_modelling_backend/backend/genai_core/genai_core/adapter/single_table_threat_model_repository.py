@@ -0,0 +1,667 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Single-table DynamoDB design for the threat model tree.
+
+Every item of a threat model lives in the same partition, with hierarchical sort keys:
+
+    PK                  SK
+    TM#<threat model>   TM#
+    TM#<threat model>   D#<diagram>#
+    TM#<threat model>   D#<diagram>#C#<component>#
+    TM#<threat model>   D#<diagram>#C#<component>#T#<threat>#
+
+so the whole tree is a single (paginated) Query, and any subtree is a `begins_with` Query on the same partition. The
+trailing delimiter makes sure a prefix never matches a sibling whose id starts with the same characters.
+
+Descriptions of diagrams and threats are stored compressed, see genai_core.adapter.dynamo_db_data_model.compress_text.
+
+The partition also holds the counters of the risk summaries of its diagrams and components (`RS#D#<diagram>` and
+`RS#C#<component>`, see genai_core.adapter.risk_summaries), outside of the tree.
+
+Diagrams, components and threats are addressed by their own id in our API, so we also store a small reference item per
+entity (`REF#<type>#<id>`) holding the keys of the entity. References are read with strongly consistent GetItems, and
+since entities never move between parents we keep them in memory once read.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+from typing import Callable, Optional, TYPE_CHECKING, Union
+
+import boto3
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DiagramSummary, DiagramSummaryPage, \
+    RiskSummary, DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
+from genai_core.repository import ThreatModelRepository, DeleteItemException, NotFoundException, \
+    VersionConflictException, ThreatUpdate, COMPONENT_UPDATABLE_FIELDS, check_threat_changes
+
+from . import compressed_attributes
+from .dynamo_db_data_model import DIAGRAM_SUMMARY_PK, compress_text, decompress_text
+from .dynamodb_batch import BATCH_WRITE_MAX_CONCURRENCY, DELETE_PROGRESS_INTERVAL
+from .pagination import encode_next_token, decode_next_token
+from .risk_summaries import risk_counter_deltas, roll_up, risk_counters_of, add_counters, risk_summary_from
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table as DynamoDBTable
+else:
+    DynamoDBTable = object
+
+AWS_REGION = os.getenv("AWS_REGION",
+                       "us-east-1")  # we assume the runtime will have this defined, if not, please define yourself
+
+DIAGRAMS_INDEX_NAME = "Diagrams"
+# sparse as well, only diagrams with a `created_at` have a `summary_pk`
+DIAGRAMS_BY_CREATED_AT_INDEX_NAME = "DiagramsByCreatedAt"
+
+THREAT_MODEL, DIAGRAM, COMPONENT, THREAT = "ThreatModel", "Diagram", "Component", "Threat"
+RISK_SUMMARY = "RiskSummary"
+REFERENCE_PREFIXES = {DIAGRAM: "REF#D#", COMPONENT: "REF#C#", THREAT: "REF#T#"}
+# cascading deletes remove children before their parents
+DELETE_ORDER = {THREAT: 0, COMPONENT: 1, DIAGRAM: 2, THREAT_MODEL: 3}
+
+# DynamoDB accepts at most 100 keys per BatchGetItem
+BATCH_GET_MAX_KEYS = 100
+
+# attributes that only exist to key and index items, they are not part of our models
+KEY_ATTRIBUTES = {"PK", "SK", "entity_type", "diagrams_index_pk", "summary_pk", "user_description_preview",
+                  "diagram_description_preview"}
+
+# text attributes stored compressed, like their CompressedUnicodeAttribute in the multi-table design
+COMPRESSED_ATTRIBUTES = {DIAGRAM: ["user_description", "diagram_description"], THREAT: ["description"]}
+
+
+def threat_model_pk(threat_model_id: str) -> str:
+    return f"TM#{threat_model_id}"
+
+
+def diagram_sk(diagram_id: str) -> str:
+    return f"D#{diagram_id}#"
+
+
+def component_sk(diagram_id: str, component_id: str) -> str:
+    return f"{diagram_sk(diagram_id)}C#{component_id}#"
+
+
+def diagram_risk_summary_sk(diagram_id: str) -> str:
+    return f"RS#D#{diagram_id}"
+
+
+def component_risk_summary_sk(component_id: str) -> str:
+    return f"RS#C#{component_id}"
+
+
+class SingleTableThreatModelRepository(ThreatModelRepository):
+
+    def __init__(self, table: DynamoDBTable):
+        self.table = table
+        # (entity type, id) -> (PK, SK), see `_locate`
+        self._references: dict[tuple[str, str], tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_table_name(cls, table_name: str) -> "SingleTableThreatModelRepository":
+        session = boto3.session.Session(region_name=AWS_REGION)
+        return SingleTableThreatModelRepository(session.resource("dynamodb").Table(table_name))
+
+    # Keys and references
+
+    def _remember(self, entity_type: str, entity_id: str, pk: str, sk: str) -> None:
+        with self._lock:
+            self._references[(entity_type, entity_id)] = (pk, sk)
+
+    def _forget(self, entity_type: str, entity_id: str) -> None:
+        with self._lock:
+            self._references.pop((entity_type, entity_id), None)
+
+    def _locate(self, entity_type: str, entity_id: str) -> tuple[str, str]:
+        """ :return: {tuple[str, str]} the PK and SK of an entity, raises NotFoundException if it doesn't exist """
+        with self._lock:
+            keys = self._references.get((entity_type, entity_id))
+
+        if keys is None:
+            reference = self.table.get_item(Key={"PK": REFERENCE_PREFIXES[entity_type] + entity_id, "SK": "REF"},
+                                            ConsistentRead=True).get("Item")
+            if reference is None:
+                raise NotFoundException(f"{entity_type} {entity_id} does not exist")
+
+            keys = (reference["item_pk"], reference["item_sk"])
+            self._remember(entity_type, entity_id, *keys)
+
+        return keys
+
+    def _batch_get(self, keys: list[dict]) -> list[dict]:
+        """ Strongly consistent BatchGetItems, 100 keys each, until DynamoDB has processed every key """
+        items = []
+        for i in range(0, len(keys), BATCH_GET_MAX_KEYS):
+            request_items = {self.table.name: {"Keys": keys[i:i + BATCH_GET_MAX_KEYS], "ConsistentRead": True}}
+            while request_items:
+                try:
+                    response = self.table.meta.client.batch_get_item(RequestItems=request_items)
+                except ClientError as e:
+                    raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+                items.extend(response["Responses"].get(self.table.name, []))
+                request_items = response.get("UnprocessedKeys")
+
+        return items
+
+    def _locate_many(self, entity_type: str, entity_ids: list[str]) -> dict[str, tuple[str, str]]:
+        """ Same as `_locate` with batched reads, entities that don't exist are left out """
+        with self._lock:
+            located = {entity_id: self._references[(entity_type, entity_id)] for entity_id in entity_ids
+                       if (entity_type, entity_id) in self._references}
+
+        references = self._batch_get([{"PK": REFERENCE_PREFIXES[entity_type] + entity_id, "SK": "REF"}
+                                      for entity_id in entity_ids if entity_id not in located])
+        for reference in references:
+            entity_id = reference["PK"][len(REFERENCE_PREFIXES[entity_type]):]
+            located[entity_id] = (reference["item_pk"], reference["item_sk"])
+            self._remember(entity_type, entity_id, *located[entity_id])
+
+        return located
+
+    def _reference_item(self, entity_type: str, entity_id: str, pk: str, sk: str) -> dict:
+        self._remember(entity_type, entity_id, pk, sk)
+        return {"PK": REFERENCE_PREFIXES[entity_type] + entity_id, "SK": "REF", "item_pk": pk, "item_sk": sk}
+
+    # Serialization
+
+    @staticmethod
+    def _compressed(entity_type: str, attributes: dict) -> dict:
+        """ :return: {dict} `attributes` with the text we compress compressed """
+        compressed = COMPRESSED_ATTRIBUTES.get(entity_type, [])
+        return {name: compress_text(value) if name in compressed and isinstance(value, str) else value
+                for name, value in attributes.items()}
+
+    def _diagram_items(self, diagram: Diagram) -> list[dict]:
+        pk, sk = threat_model_pk(diagram.threat_model_id), diagram_sk(diagram.id)
+        # index keys can't be NULL, so we leave out unset attributes (i.e. `created_at`)
+        attributes = self._compressed(DIAGRAM, diagram.model_dump(exclude={"components"}, exclude_none=True))
+        return [
+            {**attributes, "PK": pk, "SK": sk, "entity_type": DIAGRAM,
+             # sparse index, only diagrams have this attribute
+             "diagrams_index_pk": DIAGRAM,
+             "user_description_preview": diagram.user_description[:DIAGRAM_DESCRIPTION_PREVIEW_LENGTH],
+             "diagram_description_preview": diagram.diagram_description[:DIAGRAM_DESCRIPTION_PREVIEW_LENGTH],
+             **({"summary_pk": DIAGRAM_SUMMARY_PK} if diagram.created_at else {})},
+            self._reference_item(DIAGRAM, diagram.id, pk, sk),
+        ]
+
+    def _component_items(self, component: Component) -> list[dict]:
+        pk, _ = self._locate(DIAGRAM, component.diagram_id)
+        sk = component_sk(component.diagram_id, component.id)
+        return [
+            {**component.model_dump(exclude={"threats"}), "PK": pk, "SK": sk, "entity_type": COMPONENT},
+            self._reference_item(COMPONENT, component.id, pk, sk),
+        ]
+
+    def _threat_items(self, threat: Threat) -> list[dict]:
+        pk, parent_sk = self._locate(COMPONENT, threat.component_id)
+        sk = f"{parent_sk}T#{threat.id}#"
+        return [
+            {**self._compressed(THREAT, threat.model_dump()), "PK": pk, "SK": sk, "entity_type": THREAT},
+            self._reference_item(THREAT, threat.id, pk, sk),
+        ]
+
+    @staticmethod
+    def _attributes_of(item: dict) -> dict:
+        compressed = COMPRESSED_ATTRIBUTES.get(item.get("entity_type"), [])
+        return {k: decompress_text(v) if k in compressed else v for k, v in item.items() if k not in KEY_ATTRIBUTES}
+
+    def _query(self, pk: str, sk_prefix: Optional[str] = None, **kwargs) -> list[dict]:
+        """ Queries a partition (optionally, a subtree of it) following every page """
+        condition = Key("PK").eq(pk)
+        if sk_prefix is not None:
+            condition = condition & Key("SK").begins_with(sk_prefix)
+
+        items, query_kwargs = [], {"KeyConditionExpression": condition, **kwargs}
+        while True:
+            response = self.table.query(**query_kwargs)
+            items.extend(response["Items"])
+
+            if "LastEvaluatedKey" not in response:
+                return items
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def _assemble(self, items: list[dict]) -> tuple[Optional[dict], list[Diagram], list[Component]]:
+        """
+        Builds the tree of (a subtree of) a partition in a single pass. Sort keys guarantee that parents always come
+        before their children, and that siblings are ordered by id.
+        """
+        threat_model, diagrams, components = None, {}, {}
+
+        for item in items:
+            entity_type = item["entity_type"]
+            attributes = self._attributes_of(item)
+
+            if entity_type == THREAT_MODEL:
+                threat_model = attributes
+            elif entity_type == DIAGRAM:
+                diagrams[item["id"]] = Diagram(**attributes)
+                self._remember(DIAGRAM, item["id"], item["PK"], item["SK"])
+            elif entity_type == COMPONENT:
+                component = Component(**attributes)
+                components[item["id"]] = component
+                self._remember(COMPONENT, item["id"], item["PK"], item["SK"])
+                if component.diagram_id in diagrams:
+                    diagrams[component.diagram_id].components.append(component)
+            elif entity_type == THREAT:
+                threat = Threat(**attributes)
+                if threat.component_id in components:
+                    components[threat.component_id].threats.append(threat)
+
+        return threat_model, list(diagrams.values()), list(components.values())
+
+    def _write(self, put: list[dict] = (), delete: list[dict] = ()) -> None:
+        try:
+            # the batch writer sends 25 item BatchWriteItems and resends unprocessed items
+            with self.table.batch_writer(overwrite_by_pkeys=["PK", "SK"]) as batch:
+                for item in put:
+                    batch.put_item(Item=item)
+                for key in delete:
+                    batch.delete_item(Key=key)
+        except ClientError as e:
+            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+    # ThreatModelRepository
+
+    def get(self, threat_model_id: str) -> ThreatModel:
+        threat_model, diagrams, _ = self._assemble(self._query(threat_model_pk(threat_model_id)))
+
+        if threat_model is None:
+            raise NotFoundException(f"ThreatModel {threat_model_id} not found")
+
+        return ThreatModel(**threat_model, diagrams=diagrams)
+
+    def get_diagram(self, diagram_id: str) -> Diagram:
+        try:
+            pk, sk = self._locate(DIAGRAM, diagram_id)
+        except NotFoundException:
+            raise NotFoundException(f"Diagram {diagram_id} does not exist")
+
+        _, diagrams, _ = self._assemble(self._query(pk, sk))
+        if len(diagrams) == 0:
+            raise NotFoundException(f"Diagram {diagram_id} does not exist")
+
+        return diagrams[0]
+
+    def get_component(self, component_id: str) -> Component:
+        pk, sk = self._locate(COMPONENT, component_id)
+
+        _, _, components = self._assemble(self._query(pk, sk))
+        if len(components) == 0:
+            raise NotFoundException(f"Component {component_id} does not exist")
+
+        return components[0]
+
+    def get_threat(self, threat_id: str) -> Threat:
+        pk, sk = self._locate(THREAT, threat_id)
+
+        item = self.table.get_item(Key={"PK": pk, "SK": sk}).get("Item")
+        if item is None:
+            raise NotFoundException(f"Threat {threat_id} does not exist")
+
+        return Threat(**self._attributes_of(item))
+
+    def _update(self, entity_type: str, entity_id: str, changes: dict,
+                expected_version: Optional[int]) -> tuple[dict, dict]:
+        """
+        A single UpdateItem that also increments the version of the item. It returns the item as it was (ALL_OLD) and we
+        apply the changes to it, which is what ALL_NEW would return, since the update is atomic.
+
+        :return: {tuple[dict, dict]} the item before and after the update
+        """
+        pk, sk = self._locate(entity_type, entity_id)
+
+        names = {"#version": "version"}
+        values = {":zero": 0, ":one": 1}
+        assignments = ["#version = if_not_exists(#version, :zero) + :one"]
+        for i, (name, value) in enumerate(self._compressed(entity_type, changes).items()):
+            names[f"#f{i}"], values[f":v{i}"] = name, value
+            assignments.append(f"#f{i} = :v{i}")
+
+        condition = "attribute_exists(PK)"
+        if expected_version is not None:
+            values[":expected"] = expected_version
+            condition += " AND (#version = :expected" + (
+                # items written before we versioned them
+                " OR attribute_not_exists(#version))" if expected_version == 0 else ")")
+
+        try:
+            before = self.table.update_item(Key={"PK": pk, "SK": sk}, UpdateExpression="SET " + ", ".join(assignments),
+                                            ConditionExpression=condition, ExpressionAttributeNames=names,
+                                            ExpressionAttributeValues=values, ReturnValues="ALL_OLD")["Attributes"]
+            return before, {**before, **changes, "version": int(before.get("version", 0)) + 1}
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+        # only failed updates pay for a second read, to tell a missing item from a version conflict
+        current = self.table.get_item(Key={"PK": pk, "SK": sk}, ConsistentRead=True).get("Item")
+        if current is None:
+            raise NotFoundException(f"{entity_type} {entity_id} does not exist")
+
+        raise VersionConflictException(f"{entity_type} {entity_id} is at version {current.get('version', 0)}, "
+                                       f"expected {expected_version}", current_version=int(current.get("version", 0)))
+
+    def _update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int]) -> tuple[Threat, Threat]:
+        """ :return: {tuple[Threat, Threat]} the threat before and after a conditional UpdateItem, see `_update` """
+        check_threat_changes(threat_id, changes)
+
+        before, after = (Threat(**self._attributes_of(item))
+                         for item in self._update(THREAT, threat_id, changes, expected_version))
+        return before, after
+
+    def update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int] = None) -> Threat:
+        before, after = self._update_threat(threat_id, changes, expected_version)
+        self._add_risk_counters(before=[before], after=[after])
+
+        return after
+
+    def update_threats(self, updates: list[ThreatUpdate]) -> dict[str, Union[Threat, Exception]]:
+        threat_ids = [update.threat_id for update in updates]
+        if len(set(threat_ids)) != len(threat_ids):
+            raise ValueError("A threat can only be updated once per request")
+        if len(updates) == 0:
+            return {}
+
+        # one BatchGetItem for the references, instead of a GetItem per threat in `_locate`
+        located = self._locate_many(THREAT, threat_ids)
+
+        def update_one(update: ThreatUpdate) -> Union[tuple[Threat, Threat], Exception]:
+            if update.threat_id not in located:
+                return NotFoundException(f"Threat {update.threat_id} does not exist")
+            try:
+                return self._update_threat(update.threat_id, update.changes, update.expected_version)
+            except Exception as e:
+                return e
+
+        # batched writes can't be conditional, so each threat gets its own UpdateItem
+        with ThreadPoolExecutor(max_workers=min(BATCH_WRITE_MAX_CONCURRENCY, len(updates))) as executor:
+            outcomes = dict(zip(threat_ids, executor.map(update_one, updates)))
+
+        # the counters come from the items as they were right before each (atomic) update
+        updated = [outcome for outcome in outcomes.values() if isinstance(outcome, tuple)]
+        self._add_risk_counters(before=[before for before, _ in updated], after=[after for _, after in updated])
+
+        return {threat_id: outcome[1] if isinstance(outcome, tuple) else outcome
+                for threat_id, outcome in outcomes.items()}
+
+    def update_component(self, component_id: str, changes: dict, expected_version: Optional[int] = None) -> Component:
+        unknown_fields = set(changes) - COMPONENT_UPDATABLE_FIELDS
+        if unknown_fields:
+            raise ValueError(f"Component fields {sorted(unknown_fields)} can't be updated")
+
+        _, after = self._update(COMPONENT, component_id, changes, expected_version)
+
+        return Component(**self._attributes_of(after))
+
+    def list_diagrams(self) -> list[Diagram]:
+        """
+        NOTE: this method does not populate components relationship
+        """
+        items, query_kwargs = [], {"IndexName": DIAGRAMS_INDEX_NAME,
+                                   "KeyConditionExpression": Key("diagrams_index_pk").eq(DIAGRAM)}
+        while True:
+            response = self.table.query(**query_kwargs)
+            items.extend(response["Items"])
+
+            if "LastEvaluatedKey" not in response:
+                return [Diagram(**self._attributes_of(item)) for item in items]
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def list_diagram_summaries(self, limit: int, next_token: Optional[str] = None) -> DiagramSummaryPage:
+        query_kwargs = {"IndexName": DIAGRAMS_BY_CREATED_AT_INDEX_NAME,
+                        "KeyConditionExpression": Key("summary_pk").eq(DIAGRAM_SUMMARY_PK),
+                        "ScanIndexForward": False, "Limit": limit}
+        exclusive_start_key = decode_next_token(next_token)
+        if exclusive_start_key:
+            query_kwargs["ExclusiveStartKey"] = exclusive_start_key
+
+        response = self.table.query(**query_kwargs)
+
+        items = [DiagramSummary(**{**self._attributes_of(item),
+                                   "user_description": item.get("user_description_preview", ""),
+                                   "diagram_description": item.get("diagram_description_preview", "")})
+                 for item in response["Items"]]
+
+        return DiagramSummaryPage(items=items, next_token=encode_next_token(response.get("LastEvaluatedKey")))
+
+    def backfill_compressed_attributes(self) -> int:
+        """
+        Compresses the descriptions of the diagrams and threats written before we did, which also adds the
+        `user_description_preview` of those diagrams to the DiagramsByCreatedAt index.
+
+        :return: {int} the number of items rewritten
+        """
+        return sum(compressed_attributes.backfill(self.table, ["PK", "SK"], names,
+                                                  filter_expression=Attr("entity_type").eq(entity_type))
+                   for entity_type, names in COMPRESSED_ATTRIBUTES.items())
+
+    def save(self, threat_model: ThreatModel) -> None:
+        self._write(put=[{**threat_model.model_dump(exclude={"diagrams"}), "PK": threat_model_pk(threat_model.id),
+                          "SK": "TM#", "entity_type": THREAT_MODEL}])
+
+    def save_tree(self, threat_model: ThreatModel) -> None:
+        """
+        Saves a threat model with all of its diagrams, components and threats. The threat model item is written last,
+        so that a threat model only exists once everything in it does (see single_table_migration.migrate).
+        """
+        self.save_diagrams(threat_model.diagrams)
+        self.save_components([c for d in threat_model.diagrams for c in d.components])
+        self.save_threats([t for d in threat_model.diagrams for c in d.components for t in c.threats])
+        self.save(threat_model)
+
+    def save_diagram(self, diagram: Diagram) -> None:
+        self.save_diagrams([diagram])
+
+    def save_diagrams(self, diagrams: list[Diagram]) -> None:
+        self._write(put=[item for diagram in diagrams for item in self._diagram_items(diagram)])
+
+    def save_component(self, component: Component) -> None:
+        """
+        NOTE: this method does not save the threats relationship! you must save each individually
+        """
+        self.save_components([component])
+
+    def save_components(self, components: list[Component]) -> None:
+        self._write(put=[item for component in components for item in self._component_items(component)])
+
+    def save_threat(self, threat: Threat) -> None:
+        self.save_threats([threat])
+
+    def _put_threat_item(self, item: dict) -> Optional[Threat]:
+        """ :return: {Optional[Threat]} the threat we replaced, if any, which tells us which counters to take back """
+        try:
+            replaced = self.table.put_item(Item=item, ReturnValues="ALL_OLD").get("Attributes")
+        except ClientError as e:
+            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+        return Threat(**self._attributes_of(replaced)) if replaced else None
+
+    def save_threats(self, threats: list[Threat]) -> None:
+        # the last of duplicate threats wins
+        threats = list({threat.id: threat for threat in threats}.values())
+        if len(threats) == 0:
+            return
+
+        items = [self._threat_items(threat) for threat in threats]
+        # references first, so that every threat we write can be located
+        self._write(put=[reference for _, reference in items])
+
+        def put_one(item: dict) -> Union[Optional[Threat], Exception]:
+            try:
+                return self._put_threat_item(item)
+            except Exception as e:
+                return e
+
+        # batched writes can't return the items they replace, so each threat gets its own PutItem
+        with ThreadPoolExecutor(max_workers=min(BATCH_WRITE_MAX_CONCURRENCY, len(items))) as executor:
+            outcomes = list(executor.map(put_one, [item for item, _ in items]))
+
+        # the counters come from the items as they were right before each (atomic) put
+        saved = [(threat, outcome) for threat, outcome in zip(threats, outcomes) if not isinstance(outcome, Exception)]
+        self._add_risk_counters(before=[replaced for _, replaced in saved if replaced is not None],
+                                after=[threat for threat, _ in saved])
+
+        errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+        if errors:
+            raise errors[0]
+
+    def delete_component(self, component_id: str) -> None:
+        pk, sk = self._locate(COMPONENT, component_id)
+
+        # we need to make sure we keep referential integrity, so we will fail deletes when there are threats associated
+        # so, first let's check if there is at least one threat, and only list them all to report the error
+        probe = self.table.query(KeyConditionExpression=Key("PK").eq(pk) & Key("SK").begins_with(sk + "T#"),
+                                 ProjectionExpression="SK", Limit=1)
+        if len(probe["Items"]) > 0:
+            threat_ids = [item["id"] for item in self._query(pk, sk + "T#", ProjectionExpression="id")]
+            raise DeleteItemException("Component has threats associated",
+                                      errors=[f"Threat {threat_id}" for threat_id in threat_ids])
+
+        self._write(delete=[{"PK": pk, "SK": sk}, {"PK": REFERENCE_PREFIXES[COMPONENT] + component_id, "SK": "REF"},
+                            # all zeros, since the component has no threats
+                            {"PK": pk, "SK": component_risk_summary_sk(component_id)}])
+        self._forget(COMPONENT, component_id)
+
+    def _delete_threat_item(self, threat_id: str, pk: str, sk: str) -> Optional[Threat]:
+        """
+        Deletes a threat and then its reference.
+
+        :return: {Optional[Threat]} the deleted threat, which tells us which counters to take back, None if it was
+        already gone
+        """
+        try:
+            deleted = self.table.delete_item(Key={"PK": pk, "SK": sk}, ReturnValues="ALL_OLD").get("Attributes")
+        except ClientError as e:
+            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+        self._write(delete=[{"PK": REFERENCE_PREFIXES[THREAT] + threat_id, "SK": "REF"}])
+        self._forget(THREAT, threat_id)
+
+        return Threat(**self._attributes_of(deleted)) if deleted else None
+
+    def delete_threat(self, threat_id: str) -> None:
+        deleted = self._delete_threat_item(threat_id, *self._locate(THREAT, threat_id))
+
+        if deleted is not None:
+            self._add_risk_counters(before=[deleted], after=[])
+
+    def delete_threats(self, threat_ids: list[str]) -> dict[str, Optional[Exception]]:
+        threat_ids = list(dict.fromkeys(threat_ids))
+        located = self._locate_many(THREAT, threat_ids)
+
+        def delete_one(threat_id: str) -> Union[Optional[Threat], Exception]:
+            try:
+                return self._delete_threat_item(threat_id, *located[threat_id])
+            except Exception as e:
+                return e
+
+        results: dict[str, Optional[Exception]] = {
+            threat_id: NotFoundException(f"Threat {threat_id} does not exist") for threat_id in threat_ids}
+        if len(located) == 0:
+            return results
+
+        # batched deletes can't return the items they delete, so each threat gets its own DeleteItem
+        with ThreadPoolExecutor(max_workers=min(BATCH_WRITE_MAX_CONCURRENCY, len(located))) as executor:
+            outcomes = dict(zip(located, executor.map(delete_one, located)))
+
+        # the counters come from the items as they were right before each (atomic) delete
+        self._add_risk_counters(before=[outcome for outcome in outcomes.values() if isinstance(outcome, Threat)],
+                                after=[])
+
+        results.update({threat_id: outcome if isinstance(outcome, Exception) else None
+                        for threat_id, outcome in outcomes.items()})
+        return results
+
+    def delete(self, threat_model_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        items = self._query(threat_model_pk(threat_model_id), ProjectionExpression="PK, SK, entity_type, id")
+        if not any(item["entity_type"] == THREAT_MODEL for item in items):
+            raise NotFoundException(f"ThreatModel {threat_model_id} not found")
+
+        # risk summaries are derived from the threats, so they go first and are not counted
+        self._write(delete=[{"PK": item["PK"], "SK": item["SK"]} for item in items
+                            if item["entity_type"] == RISK_SUMMARY])
+        items = [item for item in items if item["entity_type"] != RISK_SUMMARY]
+
+        items.sort(key=lambda item: DELETE_ORDER[item["entity_type"]])
+
+        deleted = 0
+        for i in range(0, len(items), DELETE_PROGRESS_INTERVAL):
+            chunk = items[i:i + DELETE_PROGRESS_INTERVAL]
+
+            keys = []
+            for item in chunk:
+                keys.append({"PK": item["PK"], "SK": item["SK"]})
+                # the reference of an entity goes along with it
+                if item["entity_type"] in REFERENCE_PREFIXES:
+                    keys.append({"PK": REFERENCE_PREFIXES[item["entity_type"]] + item["id"], "SK": "REF"})
+                    self._forget(item["entity_type"], item["id"])
+
+            self._write(delete=keys)
+
+            deleted += len(chunk)
+            if on_progress is not None:
+                on_progress(deleted, len(items))
+
+        return deleted
+
+    # Risk summaries
+
+    def _add_risk_counters(self, before: list[Threat], after: list[Threat]) -> None:
+        """ Adds the difference between the counters of `after` and `before` to their components and diagrams """
+        deltas = risk_counter_deltas(before, after)
+        if len(deltas) == 0:
+            return
+
+        located = self._locate_many(COMPONENT, list(deltas))
+        # component sort keys are D#<diagram>#C#<component>#
+        diagram_of = {component_id: sk[len("D#"):-len(f"#C#{component_id}#")]
+                      for component_id, (_, sk) in located.items()}
+        pk_of_diagram = {diagram_of[component_id]: pk for component_id, (pk, _) in located.items()}
+
+        add_counters(self.table,
+                     [({"PK": pk, "SK": component_risk_summary_sk(component_id)}, deltas[component_id])
+                      for component_id, (pk, _) in located.items()] +
+                     [({"PK": pk_of_diagram[diagram_id], "SK": diagram_risk_summary_sk(diagram_id)}, delta)
+                      for diagram_id, delta in roll_up(deltas, diagram_of).items()],
+                     set_attributes={"entity_type": RISK_SUMMARY})
+
+    def _get_risk_summary(self, pk: str, sk: str) -> RiskSummary:
+        try:
+            return risk_summary_from(self.table.get_item(Key={"PK": pk, "SK": sk}).get("Item"))
+        except ClientError as e:
+            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+    def get_diagram_risk_summary(self, diagram_id: str) -> RiskSummary:
+        pk, _ = self._locate(DIAGRAM, diagram_id)
+        return self._get_risk_summary(pk, diagram_risk_summary_sk(diagram_id))
+
+    def get_component_risk_summary(self, component_id: str) -> RiskSummary:
+        pk, _ = self._locate(COMPONENT, component_id)
+        return self._get_risk_summary(pk, component_risk_summary_sk(component_id))
+
+    def backfill_risk_summaries(self) -> int:
+        """
+        Recounts the risk summaries of every diagram and component from their threats, e.g. for threat models written
+        before we kept them. Threats written while it runs may be counted twice or not at all, run it again when idle.
+
+        :return: {int} the number of diagrams recounted
+        """
+        diagrams = self.list_diagrams()
+        for diagram in diagrams:
+            pk = threat_model_pk(diagram.threat_model_id)
+            diagram_counters, component_counters = risk_counters_of(self.get_diagram(diagram.id))
+
+            self._write(put=[{**diagram_counters, "PK": pk, "SK": diagram_risk_summary_sk(diagram.id),
+                              "entity_type": RISK_SUMMARY}] +
+                            [{**counters, "PK": pk, "SK": component_risk_summary_sk(component_id),
+                              "entity_type": RISK_SUMMARY} for component_id, counters in component_counters.items()])
+
+        return len(diagrams)
@@ -0,0 +1,483 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+SQLite implementation of the ThreatModelRepository, for load tests and offline runs without DynamoDB tables.
+
+One table per entity, like the multi-table DynamoDB design, with an index on the parent id of every child (the
+equivalent of the ByThreatModel, ByDiagram and ByComponent indexes). Trees are loaded with a single query joining every
+level, and batches are written with `executemany` in a single transaction. `query_plans` shows how SQLite runs each of
+the queries we send, e.g. to compare them after changing an index.
+
+Enable it with SQLITE_DATABASE_PATH, see genai_core.adapter.environment.
+"""
+
+from contextlib import contextmanager
+import os
+import sqlite3
+import threading
+from typing import Callable, Iterator, Optional, Union
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD, DiagramSummary, DiagramSummaryPage, \
+    RiskSummary, DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
+from genai_core.repository import ThreatModelRepository, DeleteItemException, NotFoundException, \
+    VersionConflictException, ThreatUpdate, THREAT_UPDATABLE_FIELDS, COMPONENT_UPDATABLE_FIELDS
+
+from .dynamodb_batch import DELETE_PROGRESS_INTERVAL
+from .pagination import encode_next_token, decode_next_token
+
+SQLITE_DATABASE_PATH = os.getenv("SQLITE_DATABASE_PATH", ":memory:")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS threat_models (
+    id TEXT PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS diagrams (
+    id TEXT PRIMARY KEY,
+    threat_model_id TEXT NOT NULL,
+    s3_prefix TEXT NOT NULL,
+    user_description TEXT NOT NULL,
+    diagram_description TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT
+);
+-- children are joined on their parent id and read in id order, like the DynamoDB indexes return them
+CREATE INDEX IF NOT EXISTS diagrams_by_threat_model ON diagrams (threat_model_id, id);
+-- partial, like the sparse ByCreatedAt index
+CREATE INDEX IF NOT EXISTS diagrams_by_created_at ON diagrams (created_at, id) WHERE created_at IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS components (
+    id TEXT PRIMARY KEY,
+    diagram_id TEXT NOT NULL,
+    component_type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS components_by_diagram ON components (diagram_id, id);
+
+CREATE TABLE IF NOT EXISTS threats (
+    id TEXT PRIMARY KEY,
+    component_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    stride_type TEXT NOT NULL,
+    description TEXT NOT NULL,
+    damage INTEGER NOT NULL,
+    reproducibility INTEGER NOT NULL,
+    exploitability INTEGER NOT NULL,
+    affected_users INTEGER NOT NULL,
+    discoverability INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS threats_by_component ON threats (component_id, id);
+"""
+
+DIAGRAM_COLUMNS = ["id", "threat_model_id", "s3_prefix", "user_description", "diagram_description", "status",
+                   "created_at"]
+COMPONENT_COLUMNS = ["id", "diagram_id", "component_type", "name", "description", "version"]
+DREAD_COLUMNS = ["damage", "reproducibility", "exploitability", "affected_users", "discoverability"]
+THREAT_COLUMNS = ["id", "component_id", "name", "stride_type", "description", *DREAD_COLUMNS, "action", "reason",
+                  "version"]
+
+
+def _select(*tables: tuple[str, list[str]]) -> str:
+    """ :return: {str} the columns of each (alias, columns), as `<alias>_<column>` so that joined names don't clash """
+    return ", ".join(f"{alias}.{column} AS {alias}_{column}" for alias, columns in tables for column in columns)
+
+
+_TREE_COLUMNS = _select(("d", DIAGRAM_COLUMNS), ("c", COMPONENT_COLUMNS), ("t", THREAT_COLUMNS))
+
+# a whole threat model, diagram or component with a single query, parents come before their children
+THREAT_MODEL_TREE_QUERY = f"""
+SELECT tm.id AS tm_id, {_TREE_COLUMNS}
+FROM threat_models tm
+LEFT JOIN diagrams d ON d.threat_model_id = tm.id
+LEFT JOIN components c ON c.diagram_id = d.id
+LEFT JOIN threats t ON t.component_id = c.id
+WHERE tm.id = ?
+ORDER BY d.id, c.id, t.id
+"""
+
+DIAGRAM_TREE_QUERY = f"""
+SELECT {_TREE_COLUMNS}
+FROM diagrams d
+LEFT JOIN components c ON c.diagram_id = d.id
+LEFT JOIN threats t ON t.component_id = c.id
+WHERE d.id = ?
+ORDER BY c.id, t.id
+"""
+
+COMPONENT_TREE_QUERY = f"""
+SELECT {_select(("c", COMPONENT_COLUMNS), ("t", THREAT_COLUMNS))}
+FROM components c
+LEFT JOIN threats t ON t.component_id = c.id
+WHERE c.id = ?
+ORDER BY t.id
+"""
+
+DIAGRAM_SUMMARIES_QUERY = f"""
+SELECT id, threat_model_id, s3_prefix, status, created_at,
+    substr(user_description, 1, {DIAGRAM_DESCRIPTION_PREVIEW_LENGTH}) AS user_description,
+    substr(diagram_description, 1, {DIAGRAM_DESCRIPTION_PREVIEW_LENGTH}) AS diagram_description
+FROM diagrams
+WHERE created_at IS NOT NULL AND (created_at, id) < (?, ?)
+ORDER BY created_at DESC, id DESC
+LIMIT ?
+"""
+
+DIAGRAM_THREATS_QUERY = f"""
+SELECT {_select(("t", THREAT_COLUMNS))}
+FROM components c
+JOIN threats t ON t.component_id = c.id
+WHERE c.diagram_id = ?
+"""
+
+# the keys of every item of a threat model, children before their parents
+THREAT_MODEL_KEYS_QUERY = """
+SELECT d.id AS diagram_id, c.id AS component_id, t.id AS threat_id
+FROM diagrams d
+LEFT JOIN components c ON c.diagram_id = d.id
+LEFT JOIN threats t ON t.component_id = c.id
+WHERE d.threat_model_id = ?
+"""
+
+QUERIES = {
+    "threat_model_tree": (THREAT_MODEL_TREE_QUERY, ("",)),
+    "diagram_tree": (DIAGRAM_TREE_QUERY, ("",)),
+    "component_tree": (COMPONENT_TREE_QUERY, ("",)),
+    "diagram_summaries": (DIAGRAM_SUMMARIES_QUERY, ("", "", 1)),
+    "diagram_threats": (DIAGRAM_THREATS_QUERY, ("",)),
+    "threat_model_keys": (THREAT_MODEL_KEYS_QUERY, ("",)),
+}
+
+
+def _values(row: sqlite3.Row, alias: str, columns: list[str]) -> dict:
+    return {column: row[f"{alias}_{column}"] for column in columns}
+
+
+def _threat_from(values: dict) -> Threat:
+    return Threat(**{column: value for column, value in values.items() if column not in DREAD_COLUMNS},
+                  dread_scores=DREAD(**{column: values[column] for column in DREAD_COLUMNS}))
+
+
+def _threat_row(threat: Threat) -> tuple:
+    values = {**threat.model_dump(exclude={"dread_scores"}), **threat.dread_scores.model_dump()}
+    return tuple(values[column] for column in THREAT_COLUMNS)
+
+
+def _columns_of(changes: dict) -> dict:
+    """ :return: {dict} the changes of `update_threat` or `update_component` by column """
+    columns = {name: value for name, value in changes.items() if name != "dread_scores"}
+    if "dread_scores" in changes:
+        dread_scores = changes["dread_scores"]
+        columns.update((dread_scores if isinstance(dread_scores, DREAD) else DREAD(**dread_scores)).model_dump())
+    return columns
+
+
+class SQLiteThreatModelRepository(ThreatModelRepository):
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.connection.row_factory = sqlite3.Row
+        # a connection runs one statement at a time, transactions hold this lock until they commit
+        self._lock = threading.RLock()
+
+        with self._transaction() as connection:
+            connection.executescript(SCHEMA)
+
+    @classmethod
+    def from_path(cls, path: str = SQLITE_DATABASE_PATH) -> "SQLiteThreatModelRepository":
+        """ :param path: {str} the database file, the default `:memory:` database lives as long as the repository """
+        return SQLiteThreatModelRepository(sqlite3.connect(path, check_same_thread=False))
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """ Commits when the block completes, rolls back if it raises """
+        with self._lock, self.connection:
+            yield self.connection
+
+    def _query(self, sql: str, parameters=()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def query_plans(self) -> dict[str, list[str]]:
+        """ :return: {dict[str, list[str]]} the EXPLAIN QUERY PLAN of each of our queries, by name (see QUERIES) """
+        return {name: [row["detail"] for row in self._query("EXPLAIN QUERY PLAN " + sql, parameters)]
+                for name, (sql, parameters) in QUERIES.items()}
+
+    # Tree loads
+
+    @staticmethod
+    def _assemble(rows: list[sqlite3.Row]) -> tuple[list[Diagram], list[Component]]:
+        """ Builds the diagrams and components of the rows of a tree query, in a single pass """
+        diagrams: dict[str, Diagram] = {}
+        components: dict[str, Component] = {}
+
+        for row in rows:
+            keys = row.keys()
+            if "d_id" in keys and row["d_id"] is not None and row["d_id"] not in diagrams:
+                diagrams[row["d_id"]] = Diagram(**_values(row, "d", DIAGRAM_COLUMNS))
+
+            if row["c_id"] is not None and row["c_id"] not in components:
+                component = Component(**_values(row, "c", COMPONENT_COLUMNS))
+                components[component.id] = component
+                if component.diagram_id in diagrams:
+                    diagrams[component.diagram_id].components.append(component)
+
+            if row["t_id"] is not None:
+                threat = _threat_from(_values(row, "t", THREAT_COLUMNS))
+                components[threat.component_id].threats.append(threat)
+
+        return list(diagrams.values()), list(components.values())
+
+    def get(self, threat_model_id: str) -> ThreatModel:
+        rows = self._query(THREAT_MODEL_TREE_QUERY, (threat_model_id,))
+        if len(rows) == 0:
+            raise NotFoundException(f"ThreatModel {threat_model_id} not found")
+
+        diagrams, _ = self._assemble(rows)
+        return ThreatModel(id=threat_model_id, diagrams=diagrams)
+
+    def get_diagram(self, diagram_id: str) -> Diagram:
+        diagrams, _ = self._assemble(self._query(DIAGRAM_TREE_QUERY, (diagram_id,)))
+        if len(diagrams) == 0:
+            raise NotFoundException(f"Diagram {diagram_id} does not exist")
+
+        return diagrams[0]
+
+    def get_component(self, component_id: str) -> Component:
+        _, components = self._assemble(self._query(COMPONENT_TREE_QUERY, (component_id,)))
+        if len(components) == 0:
+            raise NotFoundException(f"Component {component_id} does not exist")
+
+        return components[0]
+
+    def get_threat(self, threat_id: str) -> Threat:
+        rows = self._query(f"SELECT {', '.join(THREAT_COLUMNS)} FROM threats WHERE id = ?", (threat_id,))
+        if len(rows) == 0:
+            raise NotFoundException(f"Threat {threat_id} does not exist")
+
+        return _threat_from(dict(rows[0]))
+
+    def list_diagrams(self) -> list[Diagram]:
+        """
+        NOTE: this method does not populate components relationship
+        """
+        return [Diagram(**dict(row)) for row in self._query(f"SELECT {', '.join(DIAGRAM_COLUMNS)} FROM diagrams")]
+
+    def list_diagram_summaries(self, limit: int, next_token: Optional[str] = None) -> DiagramSummaryPage:
+        # the cursor is the sort key of the last diagram of the previous page, which sorts after any created_at
+        last_key = decode_next_token(next_token) or {"created_at": "\uffff", "id": ""}
+        if not isinstance(last_key.get("created_at"), str) or not isinstance(last_key.get("id"), str):
+            raise ValueError("Invalid nextToken")
+
+        # one more row tells us whether there is a next page
+        rows = self._query(DIAGRAM_SUMMARIES_QUERY, (last_key["created_at"], last_key["id"], limit + 1))
+
+        items = [DiagramSummary(**dict(row)) for row in rows[:limit]]
+        next_key = {"created_at": items[-1].created_at, "id": items[-1].id} if len(rows) > limit else None
+
+        return DiagramSummaryPage(items=items, next_token=encode_next_token(next_key))
+
+    # Writes
+
+    def save(self, threat_model: ThreatModel) -> None:
+        with self._transaction() as connection:
+            connection.execute("INSERT OR REPLACE INTO threat_models (id) VALUES (?)", (threat_model.id,))
+
+    def save_diagram(self, diagram: Diagram) -> None:
+        self.save_diagrams([diagram])
+
+    def save_diagrams(self, diagrams: list[Diagram]) -> None:
+        with self._transaction() as connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO diagrams ({', '.join(DIAGRAM_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(DIAGRAM_COLUMNS))})",
+                [tuple(getattr(diagram, column) for column in DIAGRAM_COLUMNS) for diagram in diagrams])
+
+    def save_component(self, component: Component) -> None:
+        """
+        NOTE: this method does not save the threats relationship! you must save each individually
+        """
+        self.save_components([component])
+
+    def save_components(self, components: list[Component]) -> None:
+        with self._transaction() as connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO components ({', '.join(COMPONENT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COMPONENT_COLUMNS))})",
+                [tuple(getattr(component, column) for column in COMPONENT_COLUMNS) for component in components])
+
+    def save_threat(self, threat: Threat) -> None:
+        self.save_threats([threat])
+
+    def save_threats(self, threats: list[Threat]) -> None:
+        with self._transaction() as connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO threats ({', '.join(THREAT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(THREAT_COLUMNS))})",
+                [_threat_row(threat) for threat in threats])
+
+    def _update(self, connection: sqlite3.Connection, table: str, entity_name: str, columns: list[str], item_id: str,
+                changes: dict, expected_version: Optional[int]) -> dict:
+        """
+        Updates the given columns and increments the version of the item, inside the caller's transaction.
+
+        :return: {dict} the item after the update
+        """
+        assignments = [f"{column} = ?" for column in changes] + ["version = version + 1"]
+        condition, parameters = "id = ?", [*changes.values(), item_id]
+        if expected_version is not None:
+            condition, parameters = condition + " AND version = ?", parameters + [expected_version]
+
+        updated = connection.execute(f"UPDATE {table} SET {', '.join(assignments)} WHERE {condition}",
+                                     parameters).rowcount
+
+        row = connection.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            raise NotFoundException(f"{entity_name} {item_id} does not exist")
+        if updated == 0:
+            raise VersionConflictException(f"{entity_name} {item_id} is at version {row['version']}, "
+                                           f"expected {expected_version}", current_version=row["version"])
+
+        return dict(row)
+
+    def update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int] = None) -> Threat:
+        unknown_fields = set(changes) - THREAT_UPDATABLE_FIELDS
+        if unknown_fields:
+            raise ValueError(f"Threat fields {sorted(unknown_fields)} can't be updated")
+
+        with self._transaction() as connection:
+            # invalid changes fail to build the threat, which rolls the update back
+            return _threat_from(self._update(connection, "threats", "Threat", THREAT_COLUMNS, threat_id,
+                                             _columns_of(changes), expected_version))
+
+    def update_component(self, component_id: str, changes: dict, expected_version: Optional[int] = None) -> Component:
+        unknown_fields = set(changes) - COMPONENT_UPDATABLE_FIELDS
+        if unknown_fields:
+            raise ValueError(f"Component fields {sorted(unknown_fields)} can't be updated")
+
+        with self._transaction() as connection:
+            return Component(**self._update(connection, "components", "Component", COMPONENT_COLUMNS, component_id,
+                                            changes, expected_version))
+
+    def _threats_at(self, connection: sqlite3.Connection, threat_ids: list[str]) -> dict[str, dict]:
+        """ :return: {dict[str, dict]} the columns of the threats that exist among `threat_ids`, by id """
+        if len(threat_ids) == 0:
+            return {}
+
+        rows = connection.execute(f"SELECT {', '.join(THREAT_COLUMNS)} FROM threats "
+                                  f"WHERE id IN ({', '.join('?' * len(threat_ids))})", threat_ids).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+
+    def update_threats(self, updates: list[ThreatUpdate]) -> dict[str, Union[Threat, Exception]]:
+        threat_ids = [update.threat_id for update in updates]
+        if len(set(threat_ids)) != len(threat_ids):
+            raise ValueError("A threat can only be updated once per request")
+
+        results: dict[str, Union[Threat, Exception]] = {}
+        with self._transaction() as connection:
+            threats = self._threats_at(connection, threat_ids)
+
+            to_write = []
+            for update in updates:
+                values = threats.get(update.threat_id)
+                unknown_fields = set(update.changes) - THREAT_UPDATABLE_FIELDS
+                current_version = values["version"] if values is not None else None
+
+                if unknown_fields:
+                    results[update.threat_id] = ValueError(f"Threat fields {sorted(unknown_fields)} can't be updated")
+                elif values is None:
+                    results[update.threat_id] = NotFoundException(f"Threat {update.threat_id} does not exist")
+                elif update.expected_version is not None and update.expected_version != current_version:
+                    results[update.threat_id] = VersionConflictException(
+                        f"Threat {update.threat_id} is at version {current_version}, expected {update.expected_version}",
+                        current_version=current_version)
+                else:
+                    try:
+                        threat = _threat_from({**values, **_columns_of(update.changes), "version": current_version + 1})
+                        results[update.threat_id] = threat
+                        to_write.append(threat)
+                    except (TypeError, ValueError) as e:
+                        results[update.threat_id] = ValueError(f"Invalid changes to Threat {update.threat_id}: {e}")
+
+            connection.executemany(
+                f"UPDATE threats SET {', '.join(f'{column} = ?' for column in THREAT_COLUMNS[1:])} WHERE id = ?",
+                [(*_threat_row(threat)[1:], threat.id) for threat in to_write])
+
+        return {threat_id: results[threat_id] for threat_id in threat_ids}
+
+    # Deletes
+
+    def delete(self, threat_model_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        with self._lock:
+            if len(self._query("SELECT id FROM threat_models WHERE id = ?", (threat_model_id,))) == 0:
+                raise NotFoundException(f"ThreatModel {threat_model_id} not found")
+
+            rows = self._query(THREAT_MODEL_KEYS_QUERY, (threat_model_id,))
+            levels = [("threats", {row["threat_id"] for row in rows} - {None}),
+                      ("components", {row["component_id"] for row in rows} - {None}),
+                      ("diagrams", {row["diagram_id"] for row in rows}),
+                      ("threat_models", {threat_model_id})]
+            total = sum(len(ids) for _, ids in levels)
+
+            # children go before their parents and each chunk is its own transaction, like the DynamoDB deletes
+            deleted = 0
+            for table, ids in levels:
+                ids = sorted(ids)
+                for i in range(0, len(ids), DELETE_PROGRESS_INTERVAL):
+                    chunk = ids[i:i + DELETE_PROGRESS_INTERVAL]
+                    with self._transaction() as connection:
+                        connection.executemany(f"DELETE FROM {table} WHERE id = ?", [(item_id,) for item_id in chunk])
+
+                    deleted += len(chunk)
+                    if on_progress is not None:
+                        on_progress(deleted, total)
+
+            return deleted
+
+    def delete_component(self, component_id: str) -> None:
+        with self._transaction() as connection:
+            # we keep referential integrity, so we fail deletes when there are threats associated
+            threat_ids = [row["id"] for row in connection.execute(
+                "SELECT id FROM threats WHERE component_id = ? ORDER BY id", (component_id,))]
+            if len(threat_ids) > 0:
+                raise DeleteItemException("Component has threats associated",
+                                          errors=[f"Threat {threat_id}" for threat_id in threat_ids])
+
+            if connection.execute("DELETE FROM components WHERE id = ?", (component_id,)).rowcount == 0:
+                raise NotFoundException(f"Component {component_id} does not exist")
+
+    def delete_threat(self, threat_id: str) -> None:
+        with self._transaction() as connection:
+            if connection.execute("DELETE FROM threats WHERE id = ?", (threat_id,)).rowcount == 0:
+                raise NotFoundException(f"Threat {threat_id} does not exist")
+
+    def delete_threats(self, threat_ids: list[str]) -> dict[str, Optional[Exception]]:
+        threat_ids = list(dict.fromkeys(threat_ids))
+
+        with self._transaction() as connection:
+            existing = self._threats_at(connection, threat_ids)
+            connection.executemany("DELETE FROM threats WHERE id = ?", [(threat_id,) for threat_id in existing])
+
+        return {threat_id: None if threat_id in existing else NotFoundException(f"Threat {threat_id} does not exist")
+                for threat_id in threat_ids}
+
+    # Risk summaries
+
+    def get_diagram_risk_summary(self, diagram_id: str) -> RiskSummary:
+        """ Counted from the threats, which only needs the components_by_diagram and threats_by_component indexes """
+        with self._lock:
+            if len(self._query("SELECT id FROM diagrams WHERE id = ?", (diagram_id,))) == 0:
+                raise NotFoundException(f"Diagram {diagram_id} does not exist")
+
+            rows = self._query(DIAGRAM_THREATS_QUERY, (diagram_id,))
+
+        return RiskSummary.of([_threat_from(_values(row, "t", THREAT_COLUMNS)) for row in rows])
+
+    def get_component_risk_summary(self, component_id: str) -> RiskSummary:
+        return RiskSummary.of(self.get_component(component_id).threats)
@@ -0,0 +1,373 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Materialized threat model documents.
+
+Loading a threat model takes a query per level of the tree (or a paginated query of its partition with the single-table
+design). The stream consumer in backend/api/streams/materialize_documents keeps a denormalized JSON document of every
+threat model up to date instead, rebuilt whenever any of its items change, so that readers get the whole tree with a
+single GetItem.
+
+Documents are versioned with the time of the latest stream record that triggered their rebuild (its
+ApproximateCreationDateTime, rounded down to the second by DynamoDB Streams), and a rebuild only replaces a document of
+the same or an older version, so concurrent or retried rebuilds never go back in time. Rebuilds read the tables after
+the batching window of the stream consumer, which is usually plenty for their (eventually consistent) indexes to have
+caught up with the writes of the batch.
+
+Documents lag behind writes by that batching window plus the rebuild itself, so DocumentThreatModelRepository only
+serves a document of a later second than the last write it made to the threat model, and goes to the tables otherwise.
+Writes made by other execution environments (e.g. the generate threats workflow) can still take that long to show up,
+which is why documents are off unless REPOSITORY_DOCUMENTS_ENABLED is set (see genai_core.adapter.environment).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+from time import time, time_ns
+from typing import Callable, Optional, TYPE_CHECKING, Union
+
+import boto3
+from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError
+from pynamodb.exceptions import DoesNotExist
+
+from genai_core.metrics import cache_metrics
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DiagramSummaryPage, RiskSummary
+from genai_core.repository import ThreatModelRepository, NotFoundException, ThreatUpdate
+
+from .caching_threat_model_repository import EntityCache
+from .dynamo_db_data_model import ThreatModelDataModel, DiagramDataModel, ComponentDataModel, ThreatDataModel
+from .dynamodb_threat_model_repository import DYNAMODB_MAX_CONCURRENCY
+from .single_table_threat_model_repository import threat_model_pk
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table as DynamoDBTable
+else:
+    DynamoDBTable = object
+
+logger = Logger()
+
+AWS_REGION = os.getenv("AWS_REGION",
+                       "us-east-1")  # we assume the runtime will have this defined, if not, please define yourself
+
+# DynamoDB items can't exceed 400KB, larger threat models are not materialized and are read from the tables instead
+DOCUMENT_MAX_BYTES = 350_000
+# deleted threat models leave a tombstone behind, so that an older rebuild can't bring their document back
+TOMBSTONE_TTL_SECONDS = 24 * 60 * 60
+# threat models whose last write DocumentThreatModelRepository remembers, along with the parents of their entities
+DOCUMENT_WRITES_MAX_SIZE = int(os.getenv("DOCUMENT_WRITES_MAX_SIZE", "4096"))
+
+NANOSECONDS = 1_000_000_000
+
+THREAT_MODEL, DIAGRAM, COMPONENT, THREAT = "threatModel", "diagram", "component", "threat"
+_PARENT_TYPES = {DIAGRAM: THREAT_MODEL, COMPONENT: DIAGRAM, THREAT: COMPONENT}
+
+
+def record_version(record: dict) -> int:
+    """ :return: {int} the version of a document that includes the write of a DynamoDB Streams record """
+    return int(record["dynamodb"]["ApproximateCreationDateTime"] * NANOSECONDS)
+
+
+class ThreatModelDocumentStore:
+    """ One item per threat model: its id, the version of the document and the document itself """
+
+    def __init__(self, table: DynamoDBTable):
+        self.table = table
+
+    @classmethod
+    def from_table_name(cls, table_name: str) -> "ThreatModelDocumentStore":
+        session = boto3.session.Session(region_name=AWS_REGION)
+        return ThreatModelDocumentStore(session.resource("dynamodb").Table(table_name))
+
+    def get(self, threat_model_id: str, min_version: int = 0) -> Optional[ThreatModel]:
+        """
+        :param min_version: [OPTIONAL] {int} older documents are not usable
+        :return: {Optional[ThreatModel]} the materialized threat model, None if there is no (usable) document
+        """
+        item = self.table.get_item(Key={"id": threat_model_id}).get("Item")
+        if item is None or "document" not in item or item["version"] < min_version:
+            return None
+
+        return ThreatModel.model_validate_json(item["document"])
+
+    def _put_if_newer(self, item: dict) -> bool:
+        try:
+            # records of the same second share a version, and the rebuild of a later one must replace the document
+            self.table.put_item(Item=item, ConditionExpression="attribute_not_exists(id) OR version <= :version",
+                                ExpressionAttributeValues={":version": item["version"]})
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise Exception(f"DynamoDB ClientError {e.response['Error']['Message']}")
+
+    def put(self, threat_model: ThreatModel, version: int) -> bool:
+        """
+        :param version: {int} the version of the latest write `threat_model` includes, see `record_version`
+        :return: {bool} False when a newer document was stored in the meantime
+        """
+        document = threat_model.model_dump_json()
+
+        if len(document.encode("utf-8")) > DOCUMENT_MAX_BYTES:
+            logger.warning(f"Threat model {threat_model.id} is too large to be materialized ({len(document)} chars)")
+            # an item without a document sends readers back to the tables
+            return self._put_if_newer({"id": threat_model.id, "version": version})
+
+        return self._put_if_newer({"id": threat_model.id, "version": version, "document": document})
+
+    def remove(self, threat_model_id: str, version: int) -> bool:
+        """ Replaces the document of a deleted threat model with a tombstone """
+        return self._put_if_newer({"id": threat_model_id, "version": version,
+                                   "expires_at": int(time() + TOMBSTONE_TTL_SECONDS)})
+
+
+class DocumentThreatModelRepository(ThreatModelRepository):
+    """
+    Serves `get` from the materialized documents when there is one that includes the last write this repository made
+    to the threat model, everything else goes to `repository`.
+
+    Writes by id (e.g. `update_threat`) only tell us their threat model once we know the parents of the entity, which
+    we learn from the threat models we load and the entities we write. A write to an entity we know nothing about counts
+    as a write to every threat model.
+    """
+
+    def __init__(self, repository: ThreatModelRepository, store: ThreatModelDocumentStore,
+                 max_size: int = DOCUMENT_WRITES_MAX_SIZE):
+        self.repository = repository
+        self.store = store
+        # threat model id -> when we last started to write it
+        self._last_writes = EntityCache(max_size, ttl_seconds=None)
+        self._last_unknown_write = 0
+        # (entity type, id) -> id of the parent, entities never move between parents so these never expire
+        self._parents = EntityCache(max_size * 4, ttl_seconds=None)
+        self._lock = threading.Lock()
+
+    def _learn(self, threat_model: ThreatModel) -> None:
+        for diagram in threat_model.diagrams:
+            self._parents.set(f"{DIAGRAM}#{diagram.id}", threat_model.id)
+            for component in diagram.components:
+                self._parents.set(f"{COMPONENT}#{component.id}", diagram.id)
+                for threat in component.threats:
+                    self._parents.set(f"{THREAT}#{threat.id}", component.id)
+
+    def _written(self, started: int, entity_type: str, entity_id: str, parent_id: Optional[str] = None) -> None:
+        """ Remembers that a write of an entity started at `started` (time_ns), for the threat model it belongs to """
+        while entity_type != THREAT_MODEL:
+            if parent_id is not None:
+                self._parents.set(f"{entity_type}#{entity_id}", parent_id)
+            else:
+                parent_id = self._parents.get(f"{entity_type}#{entity_id}")
+                if parent_id is None:
+                    with self._lock:
+                        self._last_unknown_write = max(self._last_unknown_write, started)
+                    return
+
+            entity_type, entity_id, parent_id = _PARENT_TYPES[entity_type], parent_id, None
+
+        with self._lock:
+            self._last_writes.set(entity_id, max(self._last_writes.get(entity_id) or 0, started))
+
+    def _min_version(self, threat_model_id: str) -> int:
+        with self._lock:
+            last_write = max(self._last_writes.get(threat_model_id) or 0, self._last_unknown_write)
+
+        if not last_write:
+            return 0
+
+        # stream records are rounded down to the second, so a document of the same second as our write may or may not
+        # include it. Only documents of a later second certainly do, we go to the tables until then
+        return last_write // NANOSECONDS * NANOSECONDS + 1
+
+    def get(self, threat_model_id: str) -> ThreatModel:
+        threat_model = self.store.get(threat_model_id, min_version=self._min_version(threat_model_id))
+        cache_metrics("threatModelDocument", hit=threat_model is not None)
+
+        if threat_model is None:
+            threat_model = self.repository.get(threat_model_id)
+
+        self._learn(threat_model)
+        return threat_model
+
+    def get_diagram(self, diagram_id: str) -> Diagram:
+        return self.repository.get_diagram(diagram_id)
+
+    def get_component(self, component_id: str) -> Component:
+        return self.repository.get_component(component_id)
+
+    def get_threat(self, threat_id: str) -> Threat:
+        return self.repository.get_threat(threat_id)
+
+    def list_diagrams(self) -> list[Diagram]:
+        return self.repository.list_diagrams()
+
+    def list_diagram_summaries(self, limit: int, next_token: Optional[str] = None) -> DiagramSummaryPage:
+        return self.repository.list_diagram_summaries(limit, next_token)
+
+    def get_diagram_risk_summary(self, diagram_id: str) -> RiskSummary:
+        return self.repository.get_diagram_risk_summary(diagram_id)
+
+    def get_component_risk_summary(self, component_id: str) -> RiskSummary:
+        return self.repository.get_component_risk_summary(component_id)
+
+    def save(self, threat_model: ThreatModel) -> None:
+        self._written(time_ns(), THREAT_MODEL, threat_model.id)
+        self.repository.save(threat_model)
+
+    def save_diagram(self, diagram: Diagram) -> None:
+        self.save_diagrams([diagram])
+
+    def save_diagrams(self, diagrams: list[Diagram]) -> None:
+        started = time_ns()
+        for diagram in diagrams:
+            self._written(started, DIAGRAM, diagram.id, diagram.threat_model_id)
+        self.repository.save_diagrams(diagrams)
+
+    def save_component(self, component: Component) -> None:
+        self.save_components([component])
+
+    def save_components(self, components: list[Component]) -> None:
+        started = time_ns()
+        for component in components:
+            self._written(started, COMPONENT, component.id, component.diagram_id)
+        self.repository.save_components(components)
+
+    def save_threat(self, threat: Threat) -> None:
+        self.save_threats([threat])
+
+    def save_threats(self, threats: list[Threat]) -> None:
+        started = time_ns()
+        for threat in threats:
+            self._written(started, THREAT, threat.id, threat.component_id)
+        self.repository.save_threats(threats)
+
+    def update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int] = None) -> Threat:
+        # updates are conditional, those that fail write nothing
+        started = time_ns()
+        threat = self.repository.update_threat(threat_id, changes, expected_version)
+        self._written(started, THREAT, threat.id, threat.component_id)
+        return threat
+
+    def update_threats(self, updates: list[ThreatUpdate]) -> dict[str, Union[Threat, Exception]]:
+        started = time_ns()
+        results = self.repository.update_threats(updates)
+        for result in results.values():
+            if isinstance(result, Threat):
+                self._written(started, THREAT, result.id, result.component_id)
+        return results
+
+    def update_component(self, component_id: str, changes: dict, expected_version: Optional[int] = None) -> Component:
+        started = time_ns()
+        component = self.repository.update_component(component_id, changes, expected_version)
+        self._written(started, COMPONENT, component.id, component.diagram_id)
+        return component
+
+    def delete(self, threat_model_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        self._written(time_ns(), THREAT_MODEL, threat_model_id)
+        return self.repository.delete(threat_model_id, on_progress)
+
+    def delete_component(self, component_id: str) -> None:
+        self._written(time_ns(), COMPONENT, component_id)
+        self.repository.delete_component(component_id)
+
+    def delete_threat(self, threat_id: str) -> None:
+        self._written(time_ns(), THREAT, threat_id)
+        self.repository.delete_threat(threat_id)
+
+    def delete_threats(self, threat_ids: list[str]) -> dict[str, Optional[Exception]]:
+        started = time_ns()
+        for threat_id in threat_ids:
+            self._written(started, THREAT, threat_id)
+        return self.repository.delete_threats(threat_ids)
+
+
+def _attribute(record: dict, name: str) -> Optional[str]:
+    """ :return: {Optional[str]} a string attribute of the keys, or of the new or old image of a stream record """
+    for image in ["Keys", "NewImage", "OldImage"]:
+        value = record["dynamodb"].get(image, {}).get(name)
+        if value is not None:
+            return value["S"]
+    return None
+
+
+class ThreatModelLocator:
+    """
+    Finds the threat model a DynamoDB Streams record belongs to. Records of the single-table design carry it in their
+    partition key, while components and threats only know their parent, so we look parents up (once, since entities
+    never move between parents).
+    """
+
+    def __init__(self):
+        self._threat_model_of_diagram: dict[str, Optional[str]] = {}
+        self._diagram_of_component: dict[str, Optional[str]] = {}
+
+    def _diagram_threat_model_id(self, diagram_id: Optional[str]) -> Optional[str]:
+        if diagram_id is not None and diagram_id not in self._threat_model_of_diagram:
+            try:
+                diagram = DiagramDataModel.get(diagram_id, attributes_to_get=["id", "threat_model_id"])
+                self._threat_model_of_diagram[diagram_id] = diagram.threat_model_id
+            except DoesNotExist:
+                # deleted along with its threat model, which has its own record
+                return None
+
+        return self._threat_model_of_diagram.get(diagram_id)
+
+    def _component_threat_model_id(self, component_id: Optional[str]) -> Optional[str]:
+        if component_id is not None and component_id not in self._diagram_of_component:
+            try:
+                component = ComponentDataModel.get(component_id, attributes_to_get=["id", "diagram_id"])
+                self._diagram_of_component[component_id] = component.diagram_id
+            except DoesNotExist:
+                return None
+
+        return self._diagram_threat_model_id(self._diagram_of_component.get(component_id))
+
+    def threat_model_id_of(self, record: dict) -> Optional[str]:
+        pk = _attribute(record, "PK")
+        if pk is not None:
+            # reference items (REF#...) are written along with the entity they point to
+            return pk[len(threat_model_pk("")):] if pk.startswith(threat_model_pk("")) else None
+
+        table_name = record["eventSourceARN"].split(":table/")[1].split("/")[0]
+        if table_name == ThreatModelDataModel.Meta.table_name:
+            return _attribute(record, "id")
+        if table_name == DiagramDataModel.Meta.table_name:
+            return _attribute(record, "threat_model_id")
+        if table_name == ComponentDataModel.Meta.table_name:
+            return self._diagram_threat_model_id(_attribute(record, "diagram_id"))
+        if table_name == ThreatDataModel.Meta.table_name:
+            return self._component_threat_model_id(_attribute(record, "component_id"))
+
+        return None
+
+
+def rebuild_documents(versions: dict[str, int],
+                      repository: ThreatModelRepository,
+                      store: ThreatModelDocumentStore,
+                      max_workers: int = DYNAMODB_MAX_CONCURRENCY) -> dict[str, Optional[str]]:
+    """
+    Reads each threat model from `repository` (the tables, never the documents) and stores its document.
+
+    :param versions: {dict[str, int]} by threat model id, the version of its latest record, see `record_version`
+    :return: {dict[str, Optional[str]]} for every threat model, None if it was rebuilt or the error that prevented it
+    """
+
+    def rebuild(threat_model_id: str) -> Optional[str]:
+        version = versions[threat_model_id]
+        try:
+            try:
+                store.put(repository.get(threat_model_id), version)
+            except NotFoundException:
+                store.remove(threat_model_id, version)
+            return None
+        except Exception as e:
+            logger.exception(f"Failed to rebuild the document of threat model {threat_model_id}")
+            return str(e)
+
+    threat_model_ids = list(versions)
+    if len(threat_model_ids) == 0:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(threat_model_ids))) as executor:
+        return dict(zip(threat_model_ids, executor.map(rebuild, threat_model_ids)))
@@ -2,8 +2,10 @@
 # SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 import os
+import threading
 from typing import Optional, TYPE_CHECKING
 
 import boto3
@@ -25,6 +27,36 @@ class ConverseModelIds(Enum):
     CLAUDE_V3_SONNET_MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
     CLAUDE_V3_5_SONNET_MODEL_ID = "anthropic.claude-3-5-sonnet-20240620-v1:0"
     CLAUDE_V3_HAIKU_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+    CLAUDE_V3_5_SONNET_V2_MODEL_ID = "anthropic.claude-3-5-sonnet-20241022-v2:0"
+    CLAUDE_V3_7_SONNET_MODEL_ID = "anthropic.claude-3-7-sonnet-20250219-v1:0"
+
+
+# Bedrock rejects requests with cache checkpoints for models that don't support prompt caching. NOTE: none of the models
+# our stack lets users pick (see graphql.model) and grants (see the Bedrock policies in backend/api) support it yet, so
+# no checkpoints are sent until one of these is allowed and granted
+PROMPT_CACHING_MODEL_IDS = {
+    ConverseModelIds.CLAUDE_V3_5_SONNET_V2_MODEL_ID,
+    ConverseModelIds.CLAUDE_V3_7_SONNET_MODEL_ID,
+}
+PROMPT_CACHING_ENABLED = os.getenv("BEDROCK_PROMPT_CACHING", "true").lower() == "true"
+
+
+def cache_point(model_id: ConverseModelIds) -> list[dict]:
+    """
+    Content blocks to place right after a stable prompt prefix (system prompt, few shot examples, image and description),
+    so that subsequent calls sharing the prefix read it from Bedrock's prompt cache instead of paying for it again.
+
+    :return: {list[dict]} a single cache checkpoint, or no blocks at all if the model doesn't support prompt caching
+    """
+    if not PROMPT_CACHING_ENABLED or model_id not in PROMPT_CACHING_MODEL_IDS:
+        return []
+
+    return [{"cachePoint": {"type": "default"}}]
+
+
+class MaxTokensExceededException(Exception):
+    """ Raised when the model stops generating because it hit `maxTokens`, i.e. the tool input is incomplete """
+    pass
 
 
 class EMBEDDING_MODEL_IDS(Enum):
@@ -41,8 +73,13 @@ def get_s3_client(region: Optional[str] = None):
     return session.client("s3")
 
 
-def get_bedrock_client(assumed_role: Optional[str] = None,
-                       region: Optional[str] = None) -> "BedrockRuntimeClient":
+def _create_bedrock_client(assumed_role: Optional[str] = None,
+                          region: Optional[str] = None) -> tuple["BedrockRuntimeClient", Optional[datetime]]:
+    """
+    Builds a new bedrock-runtime client, assuming `assumed_role` if provided.
+
+    :return: the client and the expiration of its assumed role credentials (None when using the default credentials)
+    """
     if region is None:
         target_region = os.environ.get("AWS_REGION", os.environ.get("AWS_DEFAULT_REGION"))
     else:
@@ -50,6 +87,7 @@ def get_bedrock_client(assumed_role: Optional[str] = None,
 
     session_kwargs = {"region_name": target_region}
     client_kwargs = {**session_kwargs}
+    expiration = None
 
     retry_config = Config(
         region_name=target_region,
@@ -74,6 +112,7 @@ def get_bedrock_client(assumed_role: Optional[str] = None,
         client_kwargs["aws_access_key_id"] = response["Credentials"]["AccessKeyId"]
         client_kwargs["aws_secret_access_key"] = response["Credentials"]["SecretAccessKey"]
         client_kwargs["aws_session_token"] = response["Credentials"]["SessionToken"]
+        expiration = response["Credentials"].get("Expiration")
 
     bedrock_client = session.client(
         service_name="bedrock-runtime",
@@ -81,7 +120,80 @@ def get_bedrock_client(assumed_role: Optional[str] = None,
         **client_kwargs
     )
 
-    return bedrock_client
+    return bedrock_client, expiration
+
+
+class BedrockClientPool:
+    """
+    Process-wide pool of bedrock-runtime clients keyed by (assumed_role, region, model_id).
+
+    Lambda keeps module level state between warm invocations, so pooling clients here saves us an STS round trip and
+    the client construction on every LLM call. Clients built from assumed role credentials are rebuilt proactively
+    when their credentials are within `refresh_window` of expiring, so we rarely depend on `RefreshCredentials`
+    catching an `ExpiredTokenException`.
+    """
+
+    def __init__(self, refresh_window: timedelta = timedelta(minutes=5)):
+        self._refresh_window = refresh_window
+        self._clients: dict[tuple, tuple["BedrockRuntimeClient", Optional[datetime]]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def _is_expiring(self, expiration: Optional[datetime]) -> bool:
+        if expiration is None:
+            return False
+
+        return expiration - datetime.now(timezone.utc) <= self._refresh_window
+
+    def get(self, assumed_role: Optional[str] = None, region: Optional[str] = None, model_id: Optional[str] = None,
+            force_refresh: bool = False) -> "BedrockRuntimeClient":
+        key = (assumed_role, region, model_id)
+
+        with self._lock:
+            pooled = self._clients.get(key)
+
+            if pooled is not None and not force_refresh and not self._is_expiring(pooled[1]):
+                self.hits += 1
+                return pooled[0]
+
+            if pooled is None:
+                self.misses += 1
+            else:
+                logger.info(f"Refreshing bedrock client for role {assumed_role} in region {region}")
+                self.refreshes += 1
+
+            self._clients[key] = _create_bedrock_client(assumed_role=assumed_role, region=region)
+            return self._clients[key][0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "refreshes": self.refreshes, "size": len(self._clients)}
+
+
+bedrock_client_pool = BedrockClientPool()
+
+
+def get_bedrock_client(assumed_role: Optional[str] = None,
+                       region: Optional[str] = None,
+                       model_id: Optional[str] = None,
+                       force_refresh: bool = False) -> "BedrockRuntimeClient":
+    """
+    Returns a pooled bedrock-runtime client, see `BedrockClientPool`.
+
+    :param assumed_role: [OPTIONAL] {str} the ARN of the role to assume before calling Bedrock
+    :param region: [OPTIONAL] {str} the region of the client, defaults to the runtime region
+    :param model_id: [OPTIONAL] {str} the model id the client will be used for, clients are pooled per model id
+    :param force_refresh: [OPTIONAL] {bool} rebuilds the client and its credentials even if the pooled one is valid
+    :return: {BedrockRuntimeClient}
+    """
+    return bedrock_client_pool.get(assumed_role=assumed_role, region=region, model_id=model_id,
+                                   force_refresh=force_refresh)
 
 
 class RefreshCredentials:
@@ -110,7 +222,8 @@ class RefreshCredentials:
                     if any(exc_desc in str(ex) for exc_desc in descriptor._exception_descriptions):
                         logger.warning(
                             f"Credentials expired when calling {descriptor._decorated_fn.__name__}. Refreshing credentials. Attempt: {i + 1}")
-                        self._bedrock_client = get_bedrock_client(assumed_role=self._assumed_role, region=self._region)
+                        get_bedrock_client(assumed_role=self._assumed_role, region=self._region,
+                                           model_id=self._model_id, force_refresh=True)
                         continue
                     raise
             raise Exception(
@@ -125,15 +238,24 @@ class BedrockClient:
 
     We wrap the client because we are using AssumeRole credentials which expire after 15 minutes.
 
-    This wrapper will refresh the credentials if the calls raise an exception that matches `exception_description` and
-    will retry up to `retries` times.
+    The underlying client comes from the process-wide `bedrock_client_pool`, which refreshes credentials before they
+    expire. As a safety net, this wrapper will also refresh the credentials if the calls raise an exception that
+    matches `exception_description` and will retry up to `retries` times.
     """
 
-    def __init__(self, assumed_role: Optional[str] = None, region: Optional[str] = None):
+    def __init__(self, assumed_role: Optional[str] = None, region: Optional[str] = None,
+                 model_id: Optional[str] = None):
         self._assumed_role = assumed_role
         self._region = region
+        self._model_id = model_id
+
+        # warm up the pool so that credential errors surface on construction
+        get_bedrock_client(assumed_role=assumed_role, region=region, model_id=model_id)
 
-        self._bedrock_client = get_bedrock_client(assumed_role=assumed_role, region=region)
+    @property
+    def _bedrock_client(self) -> "BedrockRuntimeClient":
+        # we always go through the pool so that long-lived wrappers pick up proactively refreshed clients
+        return get_bedrock_client(assumed_role=self._assumed_role, region=self._region, model_id=self._model_id)
 
     @RefreshCredentials(exception_descriptions=["ExpiredTokenException"], retries=1)
     def invoke_model(self, *args, **kwargs):
@@ -143,6 +265,10 @@ class BedrockClient:
     def converse(self, *args, **kwargs):
         return self._bedrock_client.converse(*args, **kwargs)
 
+    @RefreshCredentials(exception_descriptions=["ExpiredTokenException"], retries=1)
+    def converse_stream(self, *args, **kwargs):
+        return self._bedrock_client.converse_stream(*args, **kwargs)
+
     # Delegate all remaining methods to the underlying client
     def __getattr__(self, item):
         return getattr(self._bedrock_client, item)
@@ -0,0 +1,237 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Content-addressed cache for converse responses.
+
+All our prompts run with `temperature: 0`, so the same (modelId, system, messages, toolConfig, inferenceConfig) request
+is effectively repeatable. We key responses by a hash of the request where binary blobs (i.e. images) are replaced by
+their own digest, so keys stay small regardless of the diagram size.
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+from time import time
+from typing import Any, Optional, TYPE_CHECKING
+
+import boto3
+from aws_lambda_powertools import Logger
+
+from genai_core.metrics import cache_metrics
+
+if TYPE_CHECKING:
+    from mypy_boto3_bedrock_runtime.type_defs import ConverseResponseTypeDef
+else:
+    ConverseResponseTypeDef = object
+
+logger = Logger()
+
+CONVERSE_CACHE_TABLE_NAME = os.getenv("CONVERSE_CACHE_TABLE_NAME")
+CONVERSE_CACHE_BACKEND = os.getenv("CONVERSE_CACHE_BACKEND", "dynamodb" if CONVERSE_CACHE_TABLE_NAME else "memory")
+CONVERSE_CACHE_TTL_SECONDS = int(os.getenv("CONVERSE_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+CONVERSE_CACHE_BYPASS = os.getenv("CONVERSE_CACHE_BYPASS", "false").lower() == "true"
+CONVERSE_CACHE_DIRECTORY = os.getenv("CONVERSE_CACHE_DIRECTORY", "/tmp/converse_cache")
+
+# only these request parameters influence the response of the model
+CACHE_KEY_PARAMETERS = ["modelId", "system", "messages", "toolConfig", "inferenceConfig"]
+
+# other stop reasons (max_tokens, guardrails, content filtering...) are not responses we want to replay
+CACHEABLE_STOP_REASONS = {"end_turn", "tool_use"}
+
+
+def _hash_binary_blobs(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return {"sha256": hashlib.sha256(value).hexdigest()}
+    if isinstance(value, dict):
+        return {k: _hash_binary_blobs(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_hash_binary_blobs(v) for v in value]
+    return value
+
+
+def converse_cache_key(request: dict) -> str:
+    """
+    :param request: {dict} the keyword arguments of a converse call
+    :return: {str} a sha256 hex digest identifying the request
+    """
+    relevant = {k: request.get(k) for k in CACHE_KEY_PARAMETERS}
+    canonical = json.dumps(_hash_binary_blobs(relevant), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(request: dict) -> bool:
+    """ Only deterministic (temperature 0) requests can be cached """
+    return request.get("inferenceConfig", {}).get("temperature") == 0
+
+
+class ConverseCacheBackend(ABC):
+    """ Backends store serialized (json) responses with a time to live """
+
+    def __init__(self, ttl_seconds: int = CONVERSE_CACHE_TTL_SECONDS):
+        self._ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None: ...
+
+
+class InMemoryLRUBackend(ConverseCacheBackend):
+    """ Lives as long as the Lambda execution environment, i.e. it survives warm invocations """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: int = CONVERSE_CACHE_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self._max_size = max_size
+        self._items: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at <= time():
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._items[key] = (time() + self._ttl_seconds, value)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+
+class FileSystemBackend(ConverseCacheBackend):
+    """ Stores one file per key, by default in Lambda's ephemeral storage (/tmp) """
+
+    def __init__(self, directory: str = CONVERSE_CACHE_DIRECTORY, ttl_seconds: int = CONVERSE_CACHE_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self._directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                item = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if item["expires_at"] <= time():
+            os.remove(path)
+            return None
+
+        return item["value"]
+
+    def set(self, key: str, value: str) -> None:
+        # write to a temporary file first so that concurrent readers never see partial entries
+        tmp_path = self._path(key) + f".{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"expires_at": time() + self._ttl_seconds, "value": value}, f)
+        os.replace(tmp_path, self._path(key))
+
+
+class DynamoDBBackend(ConverseCacheBackend):
+    """
+    Shared across all Lambda execution environments. The table should have TTL enabled on the `expires_at` attribute,
+    but since DynamoDB deletes expired items lazily we also check the expiration on reads.
+    """
+
+    def __init__(self, table_name: str = CONVERSE_CACHE_TABLE_NAME, ttl_seconds: int = CONVERSE_CACHE_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        region = os.getenv("AWS_REGION", "us-east-1")
+        self._table = boto3.session.Session(region_name=region).resource("dynamodb").Table(table_name)
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._table.get_item(Key={"key": key}).get("Item")
+
+        if item is None or int(item["expires_at"]) <= time():
+            return None
+
+        return item["value"]
+
+    def set(self, key: str, value: str) -> None:
+        self._table.put_item(Item={"key": key, "value": value, "expires_at": int(time() + self._ttl_seconds)})
+
+
+_default_backend: Optional[ConverseCacheBackend] = None
+
+
+def get_default_backend() -> Optional[ConverseCacheBackend]:
+    """ Lazily creates the backend configured through `CONVERSE_CACHE_BACKEND` (memory, filesystem, dynamodb or none) """
+    global _default_backend
+
+    if _default_backend is None:
+        if CONVERSE_CACHE_BACKEND == "memory":
+            _default_backend = InMemoryLRUBackend()
+        elif CONVERSE_CACHE_BACKEND == "filesystem":
+            _default_backend = FileSystemBackend()
+        elif CONVERSE_CACHE_BACKEND == "dynamodb":
+            _default_backend = DynamoDBBackend()
+
+    return _default_backend
+
+
+class CachedConverseClient:
+    """
+    Wraps a bedrock client (or `BedrockClient`) and serves deterministic converse calls from a cache.
+
+    Pass `bypass_cache=True` to `converse` (or set the CONVERSE_CACHE_BYPASS env var) to always invoke the model, the
+    fresh response still refreshes the cache.
+    """
+
+    def __init__(self, bedrock_client, backend: Optional[ConverseCacheBackend] = None,
+                 bypass: bool = CONVERSE_CACHE_BYPASS):
+        self._bedrock_client = bedrock_client
+        self._backend = backend if backend is not None else get_default_backend()
+        self._bypass = bypass
+
+    def converse(self, bypass_cache: bool = False, **kwargs) -> ConverseResponseTypeDef:
+        if self._backend is None or not is_cacheable(kwargs):
+            return self._bedrock_client.converse(**kwargs)
+
+        key = converse_cache_key(kwargs)
+
+        if not (bypass_cache or self._bypass):
+            try:
+                cached = self._backend.get(key)
+            except Exception as e:
+                logger.warning(f"Failed to read from converse cache: {e}")
+                cached = None
+
+            cache_metrics("converse", hit=cached is not None)
+            if cached is not None:
+                # we flag cached responses so that we don't account for their tokens in `llm_metrics`
+                return {**json.loads(cached), "cacheHit": True}
+
+        response = self._bedrock_client.converse(**kwargs)
+
+        if response.get("stopReason") not in CACHEABLE_STOP_REASONS:
+            return response
+
+        try:
+            self._backend.set(key, json.dumps({k: v for k, v in response.items() if k != "ResponseMetadata"}))
+        except Exception as e:
+            logger.warning(f"Failed to write to converse cache: {e}")
+
+        return response
+
+    # Delegate all remaining methods to the underlying client
+    def __getattr__(self, item):
+        return getattr(self._bedrock_client, item)
@@ -0,0 +1,81 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Runs many blocking Bedrock calls concurrently inside a single process.
+
+Bedrock calls are network bound, so a thread pool is enough to overlap them. We bound the number of in-flight requests
+to stay below our Bedrock quotas, since the pooled clients already retry with adaptive backoff on throttling.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+from typing import Any, Callable, Iterable, Optional, TYPE_CHECKING
+
+from aws_lambda_powertools import Logger
+
+from genai_core.clients import BedrockClient
+
+if TYPE_CHECKING:
+    from mypy_boto3_bedrock_runtime.type_defs import ConverseResponseTypeDef
+else:
+    ConverseResponseTypeDef = object
+
+logger = Logger()
+
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("BEDROCK_MAX_IN_FLIGHT", "4"))
+
+
+class ConverseExecutor:
+    """
+    Executes converse requests (or any callable) concurrently with at most `max_in_flight` requests at a time.
+
+    Results are always returned in submission order. When `return_exceptions` is False the first failing request (in
+    submission order) raises its exception, otherwise exceptions are returned in place of the failed results, similarly
+    to `asyncio.gather`.
+    """
+
+    def __init__(self, bedrock_client: Optional[BedrockClient] = None, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self._bedrock_client = bedrock_client
+        self._max_in_flight = max_in_flight
+
+    def map(self, fn: Callable[..., Any], args_list: Iterable[tuple], return_exceptions: bool = False) -> list:
+        args_list = list(args_list)
+
+        if len(args_list) == 0:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self._max_in_flight, len(args_list))) as executor:
+            futures = [executor.submit(fn, *args) for args in args_list]
+
+            results = []
+            for i, future in enumerate(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.warning(f"Request {i} of {len(futures)} failed: {e}")
+                    if not return_exceptions:
+                        for pending in futures[i + 1:]:
+                            pending.cancel()
+                        raise
+                    results.append(e)
+
+        return results
+
+    def converse_all(self, requests: Iterable[dict],
+                     return_exceptions: bool = False) -> list[ConverseResponseTypeDef | Exception]:
+        """
+        :param requests: {Iterable[dict]} the keyword arguments of each converse call
+        :param return_exceptions: [OPTIONAL] {bool} whether to return exceptions instead of raising them
+        :return: {list} the converse responses in the same order as `requests`
+        """
+        if self._bedrock_client is None:
+            raise ValueError("A bedrock client is required to run converse requests")
+
+        return self.map(lambda request: self._bedrock_client.converse(**request),
+                        [(request,) for request in requests],
+                        return_exceptions=return_exceptions)
@@ -3,13 +3,15 @@
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
 import os
-from typing import TYPE_CHECKING
+from typing import Iterator, TYPE_CHECKING
 
 from aws_lambda_powertools import Logger
 
-from genai_core.clients import get_bedrock_client, ConverseModelIds
+from genai_core.clients import get_bedrock_client, ConverseModelIds, cache_point
+from genai_core.converse_cache import CachedConverseClient
 from genai_core.metrics import llm_metrics
-from genai_core.model import DFD
+from genai_core.model import DFD, DFDComponent
+from genai_core.streaming import stream_tool_use_items
 
 if TYPE_CHECKING:
     from mypy_boto3_bedrock_runtime.type_defs import ConverseResponseTypeDef
@@ -35,19 +37,7 @@ DFD_AS_TOOL = [{
 }]
 
 
-@llm_metrics
-def extract_dfd(image: bytes, diagram_description: str,
-                model_id: ConverseModelIds = ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID) -> ConverseResponseTypeDef:
-    """
-
-    :param image: {bytes} the image containing the architectural diagram from which to extract a DFD
-    :param diagram_description: {str} the description of the architectural diagram including the dfd components
-    :param model_id: [OPTIONAL] {CONVERSE_MODEL_IDS} the model id of the converse-type foundation model to be invoked
-    :return: {ConverseResponseTypeDef} the response from the converse API call
-    """
-
-    bedrock_client = get_bedrock_client(assumed_role=BEDROCK_XACCT_ROLE, region=BEDROCK_CRIS_REGION)
-
+def _build_extract_dfd_request(image: bytes, diagram_description: str, model_id: ConverseModelIds) -> dict:
     # TODO: incorporate few shot examples:
 
     system_prompt = (
@@ -62,10 +52,11 @@ def extract_dfd(image: bytes, diagram_description: str,
         "content": [
             {"image": {"format": "png", "source": {"bytes": image}}},
             {"text": diagram_description},
+            *cache_point(model_id),
         ]
     }
 
-    response = bedrock_client.converse(
+    return dict(
         modelId=model_id.value,
         system=[{"text": system_prompt}],
         # TODO: PEAPO6WPA3ZY-14 - extract inferenceConfig to somewhere that makes more sense...
@@ -87,9 +78,43 @@ def extract_dfd(image: bytes, diagram_description: str,
         }
     )
 
+
+@llm_metrics
+def extract_dfd(image: bytes, diagram_description: str,
+                model_id: ConverseModelIds = ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID) -> ConverseResponseTypeDef:
+    """
+
+    :param image: {bytes} the image containing the architectural diagram from which to extract a DFD
+    :param diagram_description: {str} the description of the architectural diagram including the dfd components
+    :param model_id: [OPTIONAL] {CONVERSE_MODEL_IDS} the model id of the converse-type foundation model to be invoked
+    :return: {ConverseResponseTypeDef} the response from the converse API call
+    """
+
+    bedrock_client = CachedConverseClient(get_bedrock_client(assumed_role=BEDROCK_XACCT_ROLE,
+                                                             region=BEDROCK_CRIS_REGION,
+                                                             model_id=model_id.value))
+
+    response = bedrock_client.converse(**_build_extract_dfd_request(image, diagram_description, model_id))
+
     return response
 
 
+def stream_dfd_components(image: bytes, diagram_description: str,
+                          model_id: str = None) -> Iterator[DFDComponent]:
+    """
+    Same as `get_dfd_from_diagram_and_description`, but yields each component as soon as the model has finished
+    generating it.
+    """
+    model_id = ConverseModelIds(model_id or ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID)
+
+    bedrock_client = get_bedrock_client(assumed_role=BEDROCK_XACCT_ROLE, region=BEDROCK_CRIS_REGION,
+                                        model_id=model_id.value)
+
+    for item in stream_tool_use_items(bedrock_client, "stream_dfd_components",
+                                      **_build_extract_dfd_request(image, diagram_description, model_id)):
+        yield DFDComponent.model_validate(item)
+
+
 def get_dfd_from_diagram_and_description(image: bytes, diagram_description: str,
                                          model_id: str) -> DFD:
     model_id = model_id or ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID
@@ -7,7 +7,8 @@ from typing import TYPE_CHECKING
 
 from aws_lambda_powertools import Logger
 
-from genai_core.clients import get_bedrock_client, ConverseModelIds, get_s3_client
+from genai_core.clients import get_bedrock_client, ConverseModelIds, get_s3_client, cache_point
+from genai_core.converse_cache import CachedConverseClient
 from genai_core.metrics import llm_metrics
 from genai_core.example_retriever import ExampleRetriever
 
@@ -54,18 +55,25 @@ If available, use the user description <user_description> to enrich your results
 . \n\n You will be provided with examples below that you should follow to format your response. ")"""
 
 DIAGRAM_DESCRIBER_OPERATION_NAME = 'diagram_describer'
+# the number of few shot examples, we pick the ones whose diagram is the most similar to the one we describe
+DIAGRAM_DESCRIBER_EXAMPLES_TOP_K = int(os.getenv("DIAGRAM_DESCRIBER_EXAMPLES_TOP_K", "3"))
 
 
 @llm_metrics
 def describe_diagram(image: bytes, model_id: ConverseModelIds = ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID,
                      user_description: str = "") -> ConverseResponseTypeDef:
     if BEDROCK_XACCT_ROLE:
-        bedrock_client = get_bedrock_client(assumed_role=BEDROCK_XACCT_ROLE, region=BEDROCK_CRIS_REGION)
+        bedrock_client = get_bedrock_client(assumed_role=BEDROCK_XACCT_ROLE, region=BEDROCK_CRIS_REGION,
+                                            model_id=model_id.value)
     else:
-        bedrock_client = get_bedrock_client()
+        bedrock_client = get_bedrock_client(model_id=model_id.value)
+
+    bedrock_client = CachedConverseClient(bedrock_client)
 
     example_retriever = ExampleRetriever(get_s3_client())
-    examples = example_retriever.get_operation_examples(operation_name=DIAGRAM_DESCRIBER_OPERATION_NAME)
+    examples = example_retriever.get_operation_examples(operation_name=DIAGRAM_DESCRIBER_OPERATION_NAME,
+                                                        similar_to=image,
+                                                        top_k=DIAGRAM_DESCRIBER_EXAMPLES_TOP_K)
 
     # These are the few shot examples we will use
     example_messages = [[
@@ -96,16 +104,21 @@ def describe_diagram(image: bytes, model_id: ConverseModelIds = ConverseModelIds
     if len(example_messages) == 0:
         raise Exception("Expected at least one example!")
 
+    # The examples depend on the diagram (they are the most similar ones), and the system prompt on the user
+    # description, so the only prefix shared by many calls is the system prompt without a user description. A cache
+    # checkpoint anywhere else would pay the cache write premium on most calls without being read.
     if user_description == "":
         system_prompt = DIAGRAM_DESCRIBER_PROMPT.replace("<user_description>{user_description}</user_description>", "")
+        system = [{"text": system_prompt}, *cache_point(model_id)]
     else:
         system_prompt = DIAGRAM_DESCRIBER_PROMPT.format(user_description=user_description)
+        system = [{"text": system_prompt}]
 
     logger.info({"prompt": system_prompt})
 
     response = bedrock_client.converse(
         modelId=model_id.value,
-        system=[{"text": system_prompt}],
+        system=system,
         # TODO: PEAPO6WPA3ZY-14 - extract inferenceConfig to somewhere that makes more sense...
         inferenceConfig={
             "maxTokens": 4000,
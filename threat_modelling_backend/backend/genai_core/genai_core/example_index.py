@@ -0,0 +1,154 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Vector index of the few-shot example images, used to pick the examples most similar to the diagram at hand.
+
+Each example image is embedded once with Titan Multimodal Embeddings. The index is a `vectors.npy` array of L2
+normalized float32 rows plus a `manifest.json` with the key and ETag of the image behind each row. We keep it in S3 so
+that every execution environment shares it, and a copy in Lambda's ephemeral storage which we memory-map.
+"""
+
+import base64
+import json
+import os
+from typing import Callable, Optional
+
+from aws_lambda_powertools import Logger
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import ClientError
+import numpy as np
+
+from genai_core.clients import EMBEDDING_MODEL_IDS, get_bedrock_client
+
+logger = Logger()
+
+# same as the converse calls, we embed cross account in PDX when a role is configured
+BEDROCK_XACCT_ROLE = os.getenv("BEDROCK_XACCT_ROLE")
+BEDROCK_CRIS_REGION = "us-west-2" if BEDROCK_XACCT_ROLE else None
+
+# Titan Multimodal Embeddings supports 256, 384 and 1024 dimensions
+EMBEDDING_DIMENSIONS = int(os.getenv("EXAMPLES_EMBEDDING_DIMENSIONS", "384"))
+
+EXAMPLE_INDEX_FOLDER = "genai_core_example_index"
+EXAMPLE_INDEX_DIRECTORY = os.getenv("EXAMPLE_INDEX_DIRECTORY", "/tmp/example_index")
+
+VECTORS_FILE_NAME = "vectors.npy"
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+def embed_image(image: bytes,
+                model_id: EMBEDDING_MODEL_IDS = EMBEDDING_MODEL_IDS.TITAN_EMBED_IMAGE_V1_MODEL_ID) -> np.ndarray:
+    """
+    :param image: {bytes} a PNG or JPEG image
+    :return: {np.ndarray} the L2 normalized embedding of `image`
+    """
+    bedrock_client = get_bedrock_client(assumed_role=BEDROCK_XACCT_ROLE, region=BEDROCK_CRIS_REGION,
+                                        model_id=model_id.value)
+
+    response = bedrock_client.invoke_model(
+        modelId=model_id.value,
+        body=json.dumps({
+            "inputImage": base64.b64encode(image).decode("utf-8"),
+            "embeddingConfig": {"outputEmbeddingLength": EMBEDDING_DIMENSIONS},
+        }),
+        accept="application/json",
+        contentType="application/json",
+    )
+
+    return _normalize(np.array(json.loads(response["body"].read())["embedding"], dtype=np.float32))
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class ExampleIndex:
+    """
+    Maps example image keys to their embeddings.
+
+    Rows are only ever (re)computed for images that are new or whose ETag changed, see `update`.
+    """
+
+    def __init__(self, keys: list[str], etags: list[str], vectors: Optional[np.ndarray] = None):
+        self.keys = keys
+        self.etags = etags
+        self.vectors = vectors if vectors is not None else np.zeros((0, EMBEDDING_DIMENSIONS), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def update(self, etags: dict[str, str], embed: Callable[[str], np.ndarray]) -> tuple["ExampleIndex", bool]:
+        """
+        :param etags: {dict[str, str]} the ETag of every example image that should be part of the index
+        :param embed: {Callable[[str], np.ndarray]} returns the normalized embedding of the image stored under a key
+        :return: {tuple[ExampleIndex, bool]} the up-to-date index and whether it differs from this one
+        """
+        rows = {key: i for i, (key, etag) in enumerate(zip(self.keys, self.etags)) if etags.get(key) == etag}
+
+        if len(rows) == len(self.keys) == len(etags):
+            return self, False
+
+        keys = list(etags.keys())
+        vectors = np.empty((len(keys), EMBEDDING_DIMENSIONS), dtype=np.float32)
+        for i, key in enumerate(keys):
+            if key in rows:
+                vectors[i] = self.vectors[rows[key]]
+            else:
+                logger.info(f"Embedding example {key}")
+                vectors[i] = embed(key)
+
+        return ExampleIndex(keys, [etags[key] for key in keys], vectors), True
+
+    def nearest(self, query: np.ndarray, k: int) -> list[str]:
+        """ :return: {list[str]} the keys of the (at most) `k` examples with the highest cosine similarity """
+        if len(self) <= k:
+            return list(self.keys)
+
+        scores = self.vectors @ query
+        top_k = np.argpartition(-scores, k - 1)[:k]
+        return [self.keys[i] for i in top_k[np.argsort(-scores[top_k])]]
+
+    @classmethod
+    def load(cls, s3_client, bucket_name: str, operation_name: str,
+             directory: Optional[str] = None) -> "ExampleIndex":
+        """ Loads the index from ephemeral storage, downloading it from S3 first if needed """
+        local_directory = os.path.join(directory or EXAMPLE_INDEX_DIRECTORY, operation_name)
+        vectors_path = os.path.join(local_directory, VECTORS_FILE_NAME)
+        manifest_path = os.path.join(local_directory, MANIFEST_FILE_NAME)
+
+        if not os.path.exists(manifest_path):
+            os.makedirs(local_directory, exist_ok=True)
+            try:
+                for file_name, path in [(VECTORS_FILE_NAME, vectors_path), (MANIFEST_FILE_NAME, manifest_path)]:
+                    s3_client.download_file(bucket_name, f"{EXAMPLE_INDEX_FOLDER}/{operation_name}/{file_name}", path)
+            except ClientError as e:
+                logger.info(f"No example index found for {operation_name}: {e}")
+                return cls([], [])
+
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        return cls(manifest["keys"], manifest["etags"], np.load(vectors_path, mmap_mode="r"))
+
+    def save(self, s3_client, bucket_name: str, operation_name: str, directory: Optional[str] = None):
+        local_directory = os.path.join(directory or EXAMPLE_INDEX_DIRECTORY, operation_name)
+        os.makedirs(local_directory, exist_ok=True)
+
+        # the manifest is written last, so that we never load it together with vectors of an older index
+        for file_name, write in [
+            (VECTORS_FILE_NAME, lambda f: np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))),
+            (MANIFEST_FILE_NAME, lambda f: f.write(json.dumps({"keys": self.keys, "etags": self.etags}).encode())),
+        ]:
+            path = os.path.join(local_directory, file_name)
+            with open(path + ".tmp", "wb") as f:
+                write(f)
+            os.replace(path + ".tmp", path)
+
+            try:
+                s3_client.upload_file(path, bucket_name, f"{EXAMPLE_INDEX_FOLDER}/{operation_name}/{file_name}")
+            except (ClientError, S3UploadFailedError) as e:
+                # the local copy is still usable, other environments will just embed the examples themselves
+                logger.warning(f"Failed to upload example index for {operation_name}: {e}")
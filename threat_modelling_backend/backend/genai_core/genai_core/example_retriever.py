@@ -2,13 +2,25 @@
 # SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
+from time import time
+from typing import Callable, Optional
 
 from aws_lambda_powertools.logging import Logger
+import numpy as np
 from pydantic import BaseModel
 
+from genai_core.example_index import ExampleIndex, embed_image
+from genai_core.image_pipeline import get_normalized_image
+from genai_core.metrics import cache_metrics
+
 DATA_BUCKET_NAME = os.environ["DATA_BUCKET_NAME"]
 EXAMPLES_FOLDER = "genai_core_examples"
+# how long we trust the cached examples of an operation before listing the folder again to revalidate them
+EXAMPLES_CACHE_TTL_SECONDS = int(os.getenv("EXAMPLES_CACHE_TTL_SECONDS", "300"))
+EXAMPLES_MAX_WORKERS = int(os.getenv("EXAMPLES_MAX_WORKERS", "8"))
 logger = Logger()
 
 
@@ -17,65 +29,180 @@ class Example(BaseModel):
     diagram_description: str
 
 
+class ExamplesCache:
+    """
+    Keeps the examples of each operation for the lifetime of the Lambda execution environment.
+
+    The listing of an operation folder is trusted for `ttl_seconds`, after that we list the folder again and only
+    download the objects whose ETag has changed since we last read them.
+    """
+
+    def __init__(self, ttl_seconds: int = EXAMPLES_CACHE_TTL_SECONDS):
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # (bucket, folder) -> (expires_at, {key: etag})
+        self._listings: dict[tuple[str, str], tuple[float, dict[str, str]]] = {}
+        # (bucket, key) -> (etag, content)
+        self._objects: dict[tuple[str, str], tuple[str, object]] = {}
+
+    def get_listing(self, bucket: str, folder: str) -> Optional[dict[str, str]]:
+        with self._lock:
+            cached = self._listings.get((bucket, folder))
+
+        if cached is None or cached[0] <= time():
+            return None
+
+        return cached[1]
+
+    def set_listing(self, bucket: str, folder: str, etags: dict[str, str]):
+        with self._lock:
+            self._listings[(bucket, folder)] = (time() + self._ttl_seconds, etags)
+
+    def get_object(self, bucket: str, key: str, etag: str, load: Callable[[], object]) -> object:
+        """ Returns the cached content of `key` if its ETag is still `etag`, otherwise loads (and caches) it again """
+        with self._lock:
+            cached = self._objects.get((bucket, key))
+
+        hit = cached is not None and cached[0] == etag
+        cache_metrics("example", hit=hit)
+        if hit:
+            return cached[1]
+
+        content = load()
+        with self._lock:
+            self._objects[(bucket, key)] = (etag, content)
+
+        return content
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
+            self._objects.clear()
+
+
+examples_cache = ExamplesCache()
+
+
 class ExampleRetriever:
-    def __init__(self, s3_client):
+    def __init__(self, s3_client, cache: ExamplesCache = examples_cache,
+                 embed: Callable[[bytes], np.ndarray] = embed_image):
         self.s3_client = s3_client
+        self.cache = cache
+        self.embed = embed
 
-    def _list_examples_in_s3_folder(self, s3_folder: str) -> list:
+    def _list_examples_in_s3_folder(self, s3_folder: str, bucket_name: str = DATA_BUCKET_NAME) -> Optional[list]:
+        """ :return: the objects of `s3_folder`, or None when we failed to list them """
         try:
-            objects_in_folder = self.s3_client.list_objects_v2(Prefix=s3_folder, Bucket=DATA_BUCKET_NAME)
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+            objects_in_folder = [obj
+                                 for page in paginator.paginate(Prefix=s3_folder, Bucket=bucket_name)
+                                 for obj in page.get("Contents", [])]
         except Exception as e:
             logger.error({'retriever': e})
-        else:
-            # If list of examples is too large, S3 will truncate the response.
-            #  This is very unlikely to happen as we don't expect to have many examples.
-            if objects_in_folder['IsTruncated']:
-                logger.warning('Response is truncated')
-            if "Contents" in objects_in_folder:
-                return objects_in_folder["Contents"]
+            return None
 
+        if len(objects_in_folder) == 0:
             logger.warning("NO EXAMPLES FOUND!")
-            return []
+
+        return objects_in_folder
 
     def _read_s3_object(self, prefix: str, bucket_name: str = DATA_BUCKET_NAME):
         logger.info(f"Reading object {bucket_name}/{prefix}")
         s3_object = self.s3_client.get_object(Bucket=bucket_name, Key=prefix)
         return s3_object["Body"].read()
 
-    def get_operation_examples(self, operation_name: str, bucket: str = DATA_BUCKET_NAME) -> list[Example]:
-        examples = []
+    def _load_example(self, image_key: str, description_key: str, etags: dict[str, str], bucket: str) -> dict:
+        image = self.cache.get_object(
+            bucket, image_key, etags[image_key],
+            lambda: get_normalized_image(self.s3_client, bucket_name=bucket, key=image_key))
+        description = self.cache.get_object(
+            bucket, description_key, etags[description_key],
+            lambda: self._read_s3_object(description_key, bucket).decode("utf-8"))
+
+        return Example(image_bytes=image, diagram_description=description).model_dump()
+
+    def _list_example_etags(self, folder: str, bucket: str) -> dict[str, str]:
+        etags = self.cache.get_listing(bucket, folder)
+
+        if etags is None:
+            objects_in_folder = self._list_examples_in_s3_folder(folder, bucket)
+            if objects_in_folder is None:
+                # we don't cache a failed listing, so that the next call tries again
+                return {}
+
+            etags = {obj["Key"]: obj["ETag"] for obj in objects_in_folder}
+            self.cache.set_listing(bucket, folder, etags)
+
+        return etags
+
+    def _select_similar_examples(self, operation_name: str, example_pairs: list[tuple[str, str]],
+                                 etags: dict[str, str], bucket: str, image: bytes, top_k: int) -> list[tuple[str, str]]:
+        try:
+            return self._select_nearest_examples(operation_name, example_pairs, etags, bucket, image, top_k)
+        except Exception as e:
+            # similar examples are better, but any example is better than failing the whole call
+            logger.warning({'retriever': f'Failed to select similar examples, using the first {top_k}: {e}'})
+            return example_pairs[:top_k]
+
+    def _select_nearest_examples(self, operation_name: str, example_pairs: list[tuple[str, str]],
+                                 etags: dict[str, str], bucket: str, image: bytes, top_k: int) -> list[tuple[str, str]]:
+        image_etags = {image_key: etags[image_key] for image_key, _ in example_pairs}
+
+        index = ExampleIndex.load(self.s3_client, bucket, operation_name)
+        index, changed = index.update(image_etags, lambda key: self.embed(self.cache.get_object(
+            bucket, key, image_etags[key], lambda: get_normalized_image(self.s3_client, bucket_name=bucket, key=key))))
+
+        if changed:
+            index.save(self.s3_client, bucket, operation_name)
+
+        nearest = set(index.nearest(self.embed(image), top_k))
+        logger.info({'retriever_similar_examples': list(nearest)})
+
+        return [pair for pair in example_pairs if pair[0] in nearest]
+
+    def get_operation_examples(self, operation_name: str, bucket: str = DATA_BUCKET_NAME,
+                               similar_to: Optional[bytes] = None, top_k: Optional[int] = None) -> list[Example]:
+        """
+        :param operation_name: {str} the folder of the examples, under `EXAMPLES_FOLDER`
+        :param similar_to: [OPTIONAL] {bytes} an image, when given along with `top_k` we only return the `top_k`
+        examples whose image is the most similar to it
+        :param top_k: [OPTIONAL] {int} the maximum number of examples to return, by default we return all of them
+        """
+        folder = EXAMPLES_FOLDER + "/" + operation_name
+
         # List available examples on operation folder
-        examples_in_s3_path = self._list_examples_in_s3_folder(EXAMPLES_FOLDER + "/" + operation_name)
+        etags = self._list_example_etags(folder, bucket)
 
-        if len(examples_in_s3_path) == 0:
+        if len(etags) == 0:
             logger.error({'retriever': f'No examples found for {operation_name}'})
-            return examples
+            return []
 
-        example_keys = [obj["Key"] for obj in examples_in_s3_path]
-        logger.info({'retriever_examples': example_keys})
+        logger.info({'retriever_examples': list(etags.keys())})
 
-        used_examples = []
-        for example_key in example_keys:
-            file_type = example_key.split('.')[-1]
-            if file_type != 'png' or example_key in used_examples:
+        example_pairs = []
+        for example_key in etags.keys():
+            if example_key.split('.')[-1] != 'png':
                 continue
 
             description_file_name = example_key + '.description'
-            if description_file_name not in example_keys:
+            if description_file_name not in etags:
                 logger.error(
                     {'retriever': f'Found example image but not image description found for {example_key}'})
                 continue
-            image = self._read_s3_object(example_key, bucket)
-            description = self._read_s3_object(
-                description_file_name, bucket)
-            description = description.decode("utf-8")
 
-            new_example = Example(
-                image_bytes=image,
-                diagram_description=description
-            )
+            example_pairs.append((example_key, description_file_name))
 
-            examples.append(new_example.model_dump())
-            used_examples.append(description_file_name)
+        if len(example_pairs) == 0:
+            return []
 
-        return examples
+        # we only need embeddings when there are more examples than we want
+        if top_k is not None and len(example_pairs) > top_k:
+            if similar_to is None:
+                example_pairs = example_pairs[:top_k]
+            else:
+                example_pairs = self._select_similar_examples(operation_name, example_pairs, etags, bucket,
+                                                              similar_to, top_k)
+
+        # S3 reads are network bound, so we overlap them; results keep the listing order
+        with ThreadPoolExecutor(max_workers=min(EXAMPLES_MAX_WORKERS, len(example_pairs))) as executor:
+            return list(executor.map(lambda pair: self._load_example(pair[0], pair[1], etags, bucket), example_pairs))
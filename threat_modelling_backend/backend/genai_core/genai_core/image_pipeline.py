@@ -0,0 +1,109 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Normalizes diagram images before we send them to the LLM.
+
+Claude downscales any image whose long edge exceeds 1568 pixels (or that exceeds ~1.15 megapixels), so uploading larger
+images only costs us payload size and S3 transfer. We downscale, flatten transparency and recompress each diagram once
+and store the normalized variant next to the other data in S3, keyed by the ETag of the uploaded object.
+"""
+
+import io
+import os
+
+from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from genai_core.metrics import cache_metrics
+
+logger = Logger()
+
+MAX_IMAGE_EDGE = int(os.getenv("MAX_IMAGE_EDGE", "1568"))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", "1150000"))
+
+NORMALIZED_IMAGES_FOLDER = "normalized"
+# bump it whenever `normalize_image` changes, so that we don't serve variants produced by an older pipeline
+NORMALIZATION_VERSION = "v1"
+
+
+def _target_size(width: int, height: int) -> tuple[int, int]:
+    scale = min(1.0, MAX_IMAGE_EDGE / max(width, height), (MAX_IMAGE_PIXELS / (width * height)) ** 0.5)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def normalize_image(image: bytes) -> bytes:
+    """
+    :param image: {bytes} an image in any format supported by Pillow
+    :return: {bytes} an RGB PNG that fits the model's effective resolution, or `image` itself if it isn't an image
+    """
+    try:
+        source = Image.open(io.BytesIO(image))
+    except UnidentifiedImageError:
+        # we let the model reject it, as it did before we normalized images
+        logger.warning("Unable to identify the image format, skipping normalization")
+        return image
+
+    with source:
+        normalized = ImageOps.exif_transpose(source)
+
+        if normalized.mode in ("RGBA", "LA", "P"):
+            # transparent backgrounds become black otherwise, which makes most diagrams unreadable
+            rgba = normalized.convert("RGBA")
+            normalized = Image.new("RGB", rgba.size, (255, 255, 255))
+            normalized.paste(rgba, mask=rgba.getchannel("A"))
+        elif normalized.mode != "RGB":
+            normalized = normalized.convert("RGB")
+
+        target_size = _target_size(*normalized.size)
+        if target_size != normalized.size:
+            normalized = normalized.resize(target_size, Image.Resampling.LANCZOS)
+
+        output = io.BytesIO()
+        normalized.save(output, format="PNG", optimize=True)
+
+    logger.info({"image_normalization": {"source_bytes": len(image), "normalized_bytes": output.tell(),
+                                         "size": target_size}})
+
+    return output.getvalue()
+
+
+def normalized_image_key(etag: str) -> str:
+    etag = etag.strip('"')
+    return f"{NORMALIZED_IMAGES_FOLDER}/{NORMALIZATION_VERSION}/{etag}.png"
+
+
+def get_normalized_image(s3_client, bucket_name: str, key: str) -> bytes:
+    """
+    Returns the normalized variant of the image stored in `bucket_name/key`, normalizing and storing it on first use.
+
+    :param s3_client: the client used to read (and write) both the uploaded image and its normalized variant
+    :param bucket_name: {str} the bucket holding the uploaded image, normalized variants are stored in the same bucket
+    :param key: {str} the key of the uploaded image
+    :return: {bytes} the normalized PNG
+    """
+    etag = s3_client.head_object(Bucket=bucket_name, Key=key)["ETag"]
+    normalized_key = normalized_image_key(etag)
+
+    try:
+        image = s3_client.get_object(Bucket=bucket_name, Key=normalized_key)["Body"].read()
+        cache_metrics("normalizedImage", hit=True)
+        return image
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("NoSuchKey", "404", "AccessDenied"):
+            raise
+
+    cache_metrics("normalizedImage", hit=False)
+
+    logger.info(f"Normalizing image {bucket_name}/{key}")
+    image = normalize_image(s3_client.get_object(Bucket=bucket_name, Key=key, IfMatch=etag)["Body"].read())
+
+    try:
+        s3_client.put_object(Bucket=bucket_name, Key=normalized_key, Body=image, ContentType="image/png")
+    except ClientError as e:
+        # we can still use the normalized image, the next caller will just normalize it again
+        logger.warning(f"Failed to store normalized image {normalized_key}: {e}")
+
+    return image
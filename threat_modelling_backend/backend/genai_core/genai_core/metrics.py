@@ -10,6 +10,25 @@ from aws_lambda_powertools.metrics import MetricUnit
 metrics = Metrics()
 
 
+def add_usage_metrics(method_name: str, model_id, usage: dict, latency_ms: int):
+    metrics.add_dimension(name="Method", value=method_name)
+
+    if model_id:
+        metrics.add_dimension(name="ModelId", value=model_id)
+
+    metrics.add_metric(name="inputTokens", unit=MetricUnit.NoUnit, value=usage["inputTokens"])
+    metrics.add_metric(name="outputTokens", unit=MetricUnit.NoUnit, value=usage["outputTokens"])
+    metrics.add_metric(name="totalTokens", unit=MetricUnit.NoUnit, value=usage["totalTokens"])
+
+    # only present when the request has prompt cache checkpoints
+    if "cacheReadInputTokens" in usage:
+        metrics.add_metric(name="cacheReadInputTokens", unit=MetricUnit.NoUnit, value=usage["cacheReadInputTokens"])
+    if "cacheWriteInputTokens" in usage:
+        metrics.add_metric(name="cacheWriteInputTokens", unit=MetricUnit.NoUnit, value=usage["cacheWriteInputTokens"])
+
+    metrics.add_metric(name="latencyMs", unit=MetricUnit.Milliseconds, value=latency_ms)
+
+
 def llm_metrics(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
@@ -17,19 +36,24 @@ def llm_metrics(func):
 
         response = func(*args, **kwargs)
 
-        usage = response["usage"]
-        latency_ms = response["metrics"]["latencyMs"]
+        if response.get("cacheHit"):
+            # served from the converse cache, no tokens were spent
+            return response
 
-        metrics.add_dimension(name="Method", value=func.__name__)
-
-        if model_id:
-            metrics.add_dimension(name="ModelId", value=model_id)
-
-        metrics.add_metric(name="inputTokens", unit=MetricUnit.NoUnit, value=usage["inputTokens"])
-        metrics.add_metric(name="outputTokens", unit=MetricUnit.NoUnit, value=usage["outputTokens"])
-        metrics.add_metric(name="totalTokens", unit=MetricUnit.NoUnit, value=usage["totalTokens"])
-        metrics.add_metric(name="latencyMs", unit=MetricUnit.Milliseconds, value=latency_ms)
+        add_usage_metrics(func.__name__, model_id, response["usage"], response["metrics"]["latencyMs"])
 
         return response
 
     return wrapper
+
+
+def cache_metrics(cache_name: str, hit: bool):
+    """ Emits one hit or miss for `cache_name`, the hit rate is hits / (hits + misses) """
+    metrics.add_metric(name=f"{cache_name}CacheHits" if hit else f"{cache_name}CacheMisses", unit=MetricUnit.Count,
+                       value=1)
+
+
+def write_metrics(operation: str, item_count: int, latency_ms: float):
+    """ Emits the number of items written by `operation` and how long it took """
+    metrics.add_metric(name=f"{operation}Items", unit=MetricUnit.Count, value=item_count)
+    metrics.add_metric(name=f"{operation}LatencyMs", unit=MetricUnit.Milliseconds, value=latency_ms)
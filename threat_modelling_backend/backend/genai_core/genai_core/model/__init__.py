@@ -70,11 +70,45 @@ class Threats(BaseModel, ParseBedrockResponseMixin):
         return "\n".join([f"- {str(t)}" for t in self.threats])
 
 
+class StrideThreats(BaseModel):
+    """
+    Represents the identified Threats of a single STRIDE type
+    """
+    stride_type: StrideType = Field(..., description="The STRIDE type of all threats in this group", alias="threatType")
+    threats: list[DFDThreat]
+
+    class Config:
+        populate_by_name = True
+        use_enum_values = True
+
+
+class ThreatsByStrideType(BaseModel, ParseBedrockResponseMixin):
+    """
+    Represents a list of identified Threats in the context of a Threat Model, grouped by STRIDE type
+    """
+    stride_threats: list[StrideThreats] = Field(..., alias="strideThreats")
+
+    class Config:
+        populate_by_name = True
+
+    def split(self) -> dict[str, Threats]:
+        """ Splits the groups back into one `Threats` per STRIDE type """
+        threats_by_stride_type: dict[str, Threats] = {}
+
+        for group in self.stride_threats:
+            threats = threats_by_stride_type.setdefault(group.stride_type, Threats(threats=[]))
+            threats.threats.extend(t.model_copy(update={"stride_type": group.stride_type}) for t in group.threats)
+
+        return threats_by_stride_type
+
+
 class Threat(DFDThreat):
     id: str = Field(default_factory=lambda: str(uuid4()))
     component_id: str = Field(...)
     action: str = "Mitigate"
     reason: str = Field("")
+    # incremented by every partial update, see ThreatModelRepository.update_threat
+    version: int = Field(0)
 
 
 DFDComponentType = Literal["Process", "DataStore", "Actor", "TrustBoundary", "DataFlow", "ExternalEntity"]
@@ -107,6 +141,8 @@ class DFD(BaseModel, ParseBedrockResponseMixin):
 class Component(DFDComponent):
     diagram_id: str = Field(...)
     threats: list[Threat] = Field(default_factory=list)
+    # incremented by every partial update, see ThreatModelRepository.update_component
+    version: int = Field(0)
 
     def __str__(self):
         return super().__str__() + f"Threats: {self.threats}"
@@ -127,6 +163,38 @@ class Diagram(BaseModel):
 
     status: Literal["NA", "GENERATING_THREATS", "THREATS_GENERATED"] = Field("NA")
 
+    # ISO 8601 UTC timestamp, diagrams created before we tracked it have none until backfilled
+    created_at: Optional[str] = Field(None, alias="createdAt")
+
+
+# only the first characters of the description are shown when listing diagrams
+DIAGRAM_DESCRIPTION_PREVIEW_LENGTH = 200
+
+
+class DiagramSummary(BaseModel):
+    """
+    What we list of a diagram, the `user_description` and `diagram_description` are cut to their first
+    DIAGRAM_DESCRIPTION_PREVIEW_LENGTH characters
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str
+    threat_model_id: str
+
+    s3_prefix: str = Field(..., alias="s3Prefix")
+    user_description: str = Field("", alias="userDescription")
+    diagram_description: str = Field("", alias="diagramDescription")
+    status: Literal["NA", "GENERATING_THREATS", "THREATS_GENERATED"] = Field("NA")
+    created_at: Optional[str] = Field(None, alias="createdAt")
+
+
+class DiagramSummaryPage(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    items: list[DiagramSummary]
+    # opaque cursor of the next page, None on the last page
+    next_token: Optional[str] = Field(None, alias="nextToken")
+
 
 class ThreatModel(BaseModel):
     """
@@ -139,3 +207,95 @@ class ThreatModel(BaseModel):
     """
     id: SkipJsonSchema[str] = Field()
     diagrams: list[Diagram] = Field([])
+
+
+# the DREAD histogram of the report, a bin holds the threats whose summed scores are in (previous bound, upper bound]
+DREAD_SCORE_BINS = [(10, "1-10"), (20, "10-20"), (30, "20-30"), (40, "30-40"), (50, "40-50")]
+
+
+def dread_score_bin(dread_scores: DREAD) -> str:
+    total = (dread_scores.damage + dread_scores.reproducibility + dread_scores.exploitability +
+             dread_scores.affected_users + dread_scores.discoverability)
+    return next(label for upper_bound, label in DREAD_SCORE_BINS if total <= upper_bound)
+
+
+def risk_counters(threat: Threat) -> dict[str, int]:
+    """
+    What a threat adds to the risk summaries of its component and diagram. To us, being "evaluated" means there is a
+    reason for the action, same as in the report.
+    """
+    evaluated = "evaluated" if threat.reason else "not_evaluated"
+    return {
+        "threats": 1,
+        f"stride#{threat.stride_type}": 1,
+        f"action#{threat.action}#{evaluated}": 1,
+        f"dread#{dread_score_bin(threat.dread_scores)}": 1,
+    }
+
+
+class ThreatTypeCount(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    threat_type: str = Field(..., alias="threatType")
+    count: int
+
+
+class ActionCount(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    action: str
+    evaluated: int = 0
+    not_evaluated: int = Field(0, alias="notEvaluated")
+
+
+class DreadScoreBinCount(BaseModel):
+    bin: str
+    count: int
+
+
+class RiskSummary(BaseModel):
+    """
+    Threat counts of a component or diagram, the same figures the report pivots out of the whole threat model. Built
+    from the counters the repositories maintain on every threat write, see `risk_counters`.
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    threats: int = 0
+    evaluated: int = 0
+    not_evaluated: int = Field(0, alias="notEvaluated")
+    by_threat_type: list[ThreatTypeCount] = Field([], alias="byThreatType")
+    by_action: list[ActionCount] = Field([], alias="byAction")
+    dread_score_histogram: list[DreadScoreBinCount] = Field([], alias="dreadScoreHistogram")
+
+    @classmethod
+    def from_counters(cls, counters: dict[str, int]) -> "RiskSummary":
+        by_threat_type, by_action = {}, {}
+        for name, count in counters.items():
+            if name.startswith("stride#") and count:
+                by_threat_type[name[len("stride#"):]] = count
+            elif name.startswith("action#") and count:
+                action, evaluated = name[len("action#"):].rsplit("#", 1)
+                setattr(by_action.setdefault(action, ActionCount(action=action)), evaluated, count)
+
+        evaluated = sum(a.evaluated for a in by_action.values())
+        not_evaluated = sum(a.not_evaluated for a in by_action.values())
+
+        return RiskSummary(
+            threats=counters.get("threats", 0),
+            evaluated=evaluated,
+            not_evaluated=not_evaluated,
+            by_threat_type=[ThreatTypeCount(threat_type=t, count=c) for t, c in sorted(by_threat_type.items())],
+            by_action=[by_action[a] for a in sorted(by_action)],
+            # every bin, so that histograms always have the same x axis
+            dread_score_histogram=[DreadScoreBinCount(bin=label, count=counters.get(f"dread#{label}", 0))
+                                   for _, label in DREAD_SCORE_BINS],
+        )
+
+    @classmethod
+    def of(cls, threats: list[Threat]) -> "RiskSummary":
+        counters: dict[str, int] = {}
+        for threat in threats:
+            for name, count in risk_counters(threat).items():
+                counters[name] = counters.get(name, 0) + count
+
+        return cls.from_counters(counters)
@@ -2,4 +2,7 @@
 # SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
-from .threat_model_repository import ThreatModelRepository, DeleteItemException, NotFoundException
+from .threat_model_repository import ThreatModelRepository, DeleteItemException, NotFoundException, \
+    VersionConflictException, ThreatUpdate, THREAT_UPDATABLE_FIELDS, COMPONENT_UPDATABLE_FIELDS, \
+    check_threat_changes
+from .async_threat_model_repository import AsyncThreatModelRepository
@@ -0,0 +1,86 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+from abc import ABC, abstractmethod
+from typing import Callable, Optional, Union
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DiagramSummaryPage, RiskSummary
+
+from .threat_model_repository import ThreatUpdate
+
+
+class AsyncThreatModelRepository(ABC):
+    """
+    Asynchronous counterpart of ThreatModelRepository, for callers running on an event loop. Every method behaves (and
+    raises) like the ThreatModelRepository method of the same name.
+    """
+
+    @abstractmethod
+    async def get(self, threat_model_id: str) -> ThreatModel: ...
+
+    @abstractmethod
+    async def get_diagram(self, diagram_id: str) -> Diagram: ...
+
+    @abstractmethod
+    async def get_component(self, component_id: str) -> Component: ...
+
+    @abstractmethod
+    async def get_threat(self, threat_id: str) -> Threat: ...
+
+    @abstractmethod
+    async def save(self, threat_model: ThreatModel) -> None: ...
+
+    @abstractmethod
+    async def save_diagram(self, diagram: Diagram) -> None: ...
+
+    @abstractmethod
+    async def save_diagrams(self, diagrams: list[Diagram]) -> None: ...
+
+    @abstractmethod
+    async def save_component(self, component: Component) -> None: ...
+
+    @abstractmethod
+    async def save_components(self, components: list[Component]) -> None: ...
+
+    @abstractmethod
+    async def save_threat(self, threat: Threat) -> None: ...
+
+    @abstractmethod
+    async def save_threats(self, threats: list[Threat]) -> None: ...
+
+    @abstractmethod
+    async def update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int] = None) -> Threat: ...
+
+    @abstractmethod
+    async def update_component(self, component_id: str, changes: dict,
+                               expected_version: Optional[int] = None) -> Component: ...
+
+    @abstractmethod
+    async def update_threats(self, updates: list[ThreatUpdate]) -> dict[str, Union[Threat, Exception]]: ...
+
+    @abstractmethod
+    async def delete(self, threat_model_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """ :param on_progress: [OPTIONAL] a regular function, it may be called from another thread """
+        ...
+
+    @abstractmethod
+    async def delete_component(self, component_id: str) -> None: ...
+
+    @abstractmethod
+    async def delete_threat(self, threat_id: str) -> None: ...
+
+    @abstractmethod
+    async def delete_threats(self, threat_ids: list[str]) -> dict[str, Optional[Exception]]: ...
+
+    @abstractmethod
+    async def list_diagrams(self) -> list[Diagram]: ...
+
+    @abstractmethod
+    async def list_diagram_summaries(self, limit: int, next_token: Optional[str] = None) -> DiagramSummaryPage: ...
+
+    @abstractmethod
+    async def get_diagram_risk_summary(self, diagram_id: str) -> RiskSummary: ...
+
+    @abstractmethod
+    async def get_component_risk_summary(self, component_id: str) -> RiskSummary: ...
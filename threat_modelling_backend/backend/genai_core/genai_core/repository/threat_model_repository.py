@@ -3,7 +3,12 @@
 # Licensed under the Amazon Software License  http://aws.amazon.com/asl/
 
 from abc import ABC, abstractmethod
-from genai_core.model import ThreatModel, Diagram, Component, Threat
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+from pydantic import TypeAdapter
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DiagramSummaryPage, RiskSummary
 
 
 class DeleteItemException(Exception):
@@ -17,6 +22,41 @@ class NotFoundException(Exception):
     pass
 
 
+class VersionConflictException(Exception):
+    """ Raised when an update expected another version of the item, i.e. someone else updated it in the meantime """
+
+    def __init__(self, message: str, current_version: int):
+        super().__init__(message)
+
+        self.current_version = current_version
+
+
+# the fields that `update_threat` and `update_component` accept
+THREAT_UPDATABLE_FIELDS = {"name", "description", "stride_type", "dread_scores", "action", "reason"}
+COMPONENT_UPDATABLE_FIELDS = {"name", "description", "component_type"}
+
+
+def check_threat_changes(threat_id: str, changes: dict) -> None:
+    """ Raises ValueError unless `changes` only holds THREAT_UPDATABLE_FIELDS with values a `Threat` accepts """
+    unknown_fields = set(changes) - THREAT_UPDATABLE_FIELDS
+    if unknown_fields:
+        raise ValueError(f"Threat fields {sorted(unknown_fields)} can't be updated")
+
+    for name, value in changes.items():
+        try:
+            TypeAdapter(Threat.model_fields[name].annotation).validate_python(value)
+        except ValueError as e:
+            raise ValueError(f"Invalid changes to Threat {threat_id}: {e}")
+
+
+@dataclass
+class ThreatUpdate:
+    """ The changes to a single threat in `ThreatModelRepository.update_threats` """
+    threat_id: str
+    changes: dict
+    expected_version: Optional[int] = None
+
+
 class ThreatModelRepository(ABC):
     @abstractmethod
     def get(self, threat_model_id: str) -> ThreatModel: ...
@@ -53,10 +93,45 @@ class ThreatModelRepository(ABC):
     @abstractmethod
     def save_threats(self, threats: list[Threat]) -> None: ...
 
-    # @abstractmethod
-    # def delete(self, threat_model_id: str) -> None:
-    #     """ we recommend implementing soft-deletes """
-    #     pass
+    @abstractmethod
+    def update_threat(self, threat_id: str, changes: dict, expected_version: Optional[int] = None) -> Threat:
+        """
+        Updates only the given fields (see THREAT_UPDATABLE_FIELDS) in place, and increments the version of the threat.
+
+        :param expected_version: {Optional[int]} fail with VersionConflictException unless this is the current version
+        :return: {Threat} the threat after the update
+        """
+        ...
+
+    @abstractmethod
+    def update_component(self, component_id: str, changes: dict, expected_version: Optional[int] = None) -> Component:
+        """
+        Same as `update_threat`, see COMPONENT_UPDATABLE_FIELDS.
+
+        :return: {Component} the component after the update, without its threats
+        """
+        ...
+
+    @abstractmethod
+    def update_threats(self, updates: list[ThreatUpdate]) -> dict[str, Union[Threat, Exception]]:
+        """
+        Same as `update_threat` for many threats at once. Each threat is updated on its own, conditionally on its
+        expected version, so an update never overwrites a concurrent one, and succeeds or fails independently.
+
+        :return: {dict[str, Union[Threat, Exception]]} for every threat id, the threat after the update or why it failed
+        """
+        ...
+
+    @abstractmethod
+    def delete(self, threat_model_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Hard deletes a threat model along with all of its diagrams, components and threats. Children are deleted before
+        their parents, and the threat model itself last, so a delete that fails halfway can simply be retried.
+
+        :param on_progress: [OPTIONAL] called with the number of items deleted so far and the total number of items
+        :return: {int} the number of items deleted
+        """
+        ...
 
     @abstractmethod
     def delete_component(self, component_id: str) -> None: ...
@@ -64,5 +139,34 @@ class ThreatModelRepository(ABC):
     @abstractmethod
     def delete_threat(self, threat_id: str) -> None: ...
 
+    @abstractmethod
+    def delete_threats(self, threat_ids: list[str]) -> dict[str, Optional[Exception]]:
+        """
+        Deletes many threats with batched writes.
+
+        :return: {dict[str, Optional[Exception]]} for every threat id, None if it was deleted or why it wasn't
+        """
+        ...
+
     @abstractmethod
     def list_diagrams(self) -> list[Diagram]: ...
+
+    @abstractmethod
+    def list_diagram_summaries(self, limit: int, next_token: Optional[str] = None) -> DiagramSummaryPage:
+        """ Lists diagrams newest first, one page at a time """
+        ...
+
+    @abstractmethod
+    def get_diagram_risk_summary(self, diagram_id: str) -> RiskSummary:
+        """
+        Counts the threats of a diagram by STRIDE type, action, evaluated or not and DREAD score. Summaries are kept up
+        to date by every threat write, so reading one doesn't read the threats.
+
+        :return: {RiskSummary} the summary, an empty one for diagrams without threats
+        """
+        ...
+
+    @abstractmethod
+    def get_component_risk_summary(self, component_id: str) -> RiskSummary:
+        """ Same as `get_diagram_risk_summary` for the threats of a component """
+        ...
@@ -0,0 +1,118 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Streaming support for tool-use converse calls.
+
+Our tools return a single object holding a list of items, e.g. `{"components": [...]}` or `{"threats": [...]}`. With
+`converse_stream` the tool input arrives as partial JSON strings, so we parse it incrementally and yield each item as
+soon as its object closes, instead of waiting for the whole (up to 4000 tokens) response.
+
+NOTE: streamed calls go straight to `converse_stream`, they are neither served from nor stored in the converse cache
+(see genai_core.converse_cache), so STREAM_PARTIAL_RESULTS trades that cache for the earlier partial results.
+"""
+
+import json
+from typing import Iterator, TYPE_CHECKING
+
+from aws_lambda_powertools import Logger
+
+from genai_core.clients import MaxTokensExceededException
+from genai_core.metrics import add_usage_metrics
+
+if TYPE_CHECKING:
+    from mypy_boto3_bedrock_runtime.client import BedrockRuntimeClient
+else:
+    BedrockRuntimeClient = object
+
+logger = Logger()
+
+
+class IncrementalJsonArrayParser:
+    """
+    Incrementally parses a JSON object and returns every object that is a direct element of an array held by the root
+    object, as soon as it is complete.
+
+    Example: feeding `{"threats": [{"name": "a"}, {"na` returns `[{"name": "a"}]`, and the second threat is returned once
+    its closing brace is fed.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+
+    def feed(self, chunk: str) -> list[dict]:
+        self._buffer += chunk
+        items = []
+
+        while self._position < len(self._buffer):
+            char = self._buffer[self._position]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if char == "{" and self._stack == ["{", "["]:
+                    self._item_start = self._position
+                self._stack.append(char)
+            elif char in "}]":
+                self._stack.pop()
+                if char == "}" and self._stack == ["{", "["] and self._item_start is not None:
+                    items.append(json.loads(self._buffer[self._item_start:self._position + 1]))
+                    self._item_start = None
+
+            self._position += 1
+
+        # we no longer need what we have already parsed, unless we are in the middle of an item
+        keep_from = self._item_start if self._item_start is not None else self._position
+        self._buffer = self._buffer[keep_from:]
+        self._position -= keep_from
+        if self._item_start is not None:
+            self._item_start = 0
+
+        return items
+
+
+def stream_tool_use_items(bedrock_client: BedrockRuntimeClient, method_name: str, **request) -> Iterator[dict]:
+    """
+    Invokes `converse_stream` with `request` and yields each item of the tool-use input as soon as it is complete.
+
+    :param bedrock_client: {BedrockRuntimeClient} the client used to call converse_stream
+    :param method_name: {str} the name used as the `Method` dimension of the usage metrics
+    :param request: the keyword arguments of the converse_stream call (they are the same as converse)
+    :raises MaxTokensExceededException: once the stream ends, when the model stopped at `maxTokens`. The items yielded
+    until then are only part of the result
+    """
+    response = bedrock_client.converse_stream(**request)
+
+    parser = IncrementalJsonArrayParser()
+    stop_reason = None
+
+    for event in response["stream"]:
+        if "contentBlockDelta" in event:
+            delta = event["contentBlockDelta"]["delta"]
+            if "toolUse" in delta:
+                yield from parser.feed(delta["toolUse"]["input"])
+        elif "metadata" in event:
+            metadata = event["metadata"]
+            add_usage_metrics(method_name, request.get("modelId"), metadata["usage"],
+                              metadata["metrics"]["latencyMs"])
+        elif "messageStop" in event:
+            stop_reason = event["messageStop"].get("stopReason")
+            logger.info({"stop_reason": stop_reason})
+
+    # raised after the metadata event, so that the usage of the truncated call is still recorded
+    if stop_reason == "max_tokens":
+        raise MaxTokensExceededException(
+            f"{method_name} exceeded {request.get('inferenceConfig', {}).get('maxTokens')} tokens")
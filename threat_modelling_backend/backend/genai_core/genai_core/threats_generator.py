@@ -10,11 +10,18 @@ The idea here is to try and automate what msn did here: https://web.archive.org/
 """
 
 import os
-from typing import TYPE_CHECKING
+from typing import Iterator, TYPE_CHECKING
 
-from genai_core.clients import BedrockClient, ConverseModelIds
+from aws_lambda_powertools import Logger
+
+from genai_core.clients import BedrockClient, ConverseModelIds, MaxTokensExceededException, cache_point
+from genai_core.converse_executor import ConverseExecutor
+from genai_core.converse_cache import CachedConverseClient
 from genai_core.metrics import llm_metrics
-from genai_core.model import DFDComponent, StrideType, Threats
+from genai_core.model import (
+    DFDComponent, DFDThreat, StrideType, StrideThreats, Threats, ThreatsByStrideType
+)
+from genai_core.streaming import stream_tool_use_items
 
 if TYPE_CHECKING:
     from mypy_boto3_bedrock_runtime.type_defs import ConverseResponseTypeDef
@@ -26,6 +33,10 @@ else:
 BEDROCK_XACCT_ROLE = os.getenv("BEDROCK_XACCT_ROLE")
 BEDROCK_CRIS_REGION = "us-west-2" if BEDROCK_XACCT_ROLE else None  # we use a client in PDX region for CRIS, otherwise we don't about region
 
+logger = Logger()
+
+MAX_OUTPUT_TOKENS = 4000
+
 THREATS_SCHEMA = Threats.model_json_schema()
 
 THREATS_AS_TOOL = [{
@@ -38,28 +49,99 @@ THREATS_AS_TOOL = [{
     }
 }]
 
+THREATS_BY_STRIDE_TYPE_SCHEMA = ThreatsByStrideType.model_json_schema()
 
-@llm_metrics
-def get_threats_single_turn(bedrock_client, model_id, system_prompt, messages) -> ConverseResponseTypeDef:
-    response = bedrock_client.converse(
+THREATS_BY_STRIDE_TYPE_AS_TOOL = [{
+    "toolSpec": {
+        "name": THREATS_BY_STRIDE_TYPE_SCHEMA["title"],
+        "description": THREATS_BY_STRIDE_TYPE_SCHEMA["description"],
+        "inputSchema": {
+            "json": THREATS_BY_STRIDE_TYPE_SCHEMA
+        }
+    }
+}]
+
+
+def _raise_if_truncated(response: ConverseResponseTypeDef, what: str) -> None:
+    """ The tool input of a response that stopped at `maxTokens` is incomplete, and usually not even valid JSON """
+    if response.get("stopReason") == "max_tokens":
+        raise MaxTokensExceededException(f"{what} exceeded {MAX_OUTPUT_TOKENS} tokens")
+
+
+def _build_threats_request(model_id: ConverseModelIds, system_prompt: str, messages: list,
+                           tools: list = THREATS_AS_TOOL) -> dict:
+    return dict(
         modelId=model_id.value,
         system=[{"text": system_prompt}],
         # TODO: PEAPO6WPA3ZY-14 - extract inferenceConfig to somewhere that makes more sense...
         inferenceConfig={
-            "maxTokens": 4000,
+            "maxTokens": MAX_OUTPUT_TOKENS,
             "temperature": 0,
             "stopSequences": ["\n\nHuman:"]
         },
         messages=messages,
         toolConfig={
-            "tools": THREATS_AS_TOOL,
+            "tools": tools,
             "toolChoice": {
                 "tool": {
-                    "name": THREATS_SCHEMA["title"],
+                    "name": tools[0]["toolSpec"]["name"],
                 }
             }
         }
     )
+
+
+def _stride_types_text(stride_types: list[StrideType]) -> str:
+    names = [stride_type.value for stride_type in stride_types]
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + " and " + names[-1]
+
+
+def _build_system_prompt() -> str:
+    # The system prompt doesn't depend on the STRIDE types or the component, so that it is part of the cached prefix
+    return (
+        "You are a Security Specialist, constructing a Threat Model for an application. "
+        "The user will request threats of one or more STRIDE types for a specific component of the application. "
+        "You should provide an exhaustive list of threats of the requested types that may affect this component. "
+        "Please err on the side of caution, the user will have a chance to mark threats as false positive."
+        "\n"
+        "You will be given the image of the diagram, and the overall description of the architecture as a Data "
+        "Flow Diagram to help in your assessment, but remember to focus on the specific component the user has "
+        "presented you."
+    )
+
+
+def _build_image_and_description_content(image: bytes, diagram_description: str,
+                                         model_id: ConverseModelIds) -> list[dict]:
+    """ The content shared by all the threats requests of a diagram, followed by a prompt cache checkpoint """
+    return [
+        {"image": {"format": "png", "source": {"bytes": image}}},
+        {"text": diagram_description},
+        *cache_point(model_id),
+    ]
+
+
+def _build_user_message(image: bytes, diagram_description: str, dataflow_component: DFDComponent,
+                        stride_types: list[StrideType], model_id: ConverseModelIds) -> dict:
+    grouping_instructions = (
+        "\nGroup the threats by their STRIDE type, including every requested type even if you can't find threats "
+        "for it.\n"
+    ) if len(stride_types) > 1 else ""
+
+    return {
+        "role": "user",
+        "content": _build_image_and_description_content(image, diagram_description, model_id) + [
+            {"text": f"""Please give me an exhaustive list of {_stride_types_text(stride_types)} threats that may affect this component:
+
+{str(dataflow_component)}
+{grouping_instructions}"""},
+        ]
+    }
+
+
+@llm_metrics
+def get_threats_single_turn(bedrock_client, model_id, system_prompt, messages,
+                            tools: list = THREATS_AS_TOOL) -> ConverseResponseTypeDef:
+    response = bedrock_client.converse(**_build_threats_request(model_id, system_prompt, messages, tools))
     return response
 
 
@@ -77,31 +159,11 @@ def generate_threats(image: bytes, diagram_description: str, dataflow_component:
     :param model_id:
     :return:
     """
-    bedrock_client = BedrockClient(assumed_role=BEDROCK_XACCT_ROLE, region=BEDROCK_CRIS_REGION)
+    bedrock_client = CachedConverseClient(
+        BedrockClient(assumed_role=BEDROCK_XACCT_ROLE, region=BEDROCK_CRIS_REGION, model_id=model_id.value))
 
-    system_prompt = (
-        "You are a Security Specialist, constructing a Threat Model for an application. "
-        "The user will request STRIDE threats for a specific component of the application. "
-        f"You should provide an exhaustive list of {stride_type.value} threats that may affect this component. "
-        "Please err on the side of caution, the user will have a chance to mark threats as false positive."
-        "\n"
-        "You will be given the image of the diagram, and the overall description of the architecture as a Data "
-        "Flow Diagram to help in your assessment, but remember to focus on the specific component the user has "
-        "presented you."
-    )
-
-    user_message = {
-        "role": "user",
-        "content": [
-            {"image": {"format": "png", "source": {"bytes": image}}},
-            {"text": diagram_description + f"""
-            
-Please give me an exhaustive list of {stride_type.value} threats that may affect this component:
-
-{str(dataflow_component)}
-"""},
-        ]
-    }
+    system_prompt = _build_system_prompt()
+    user_message = _build_user_message(image, diagram_description, dataflow_component, [stride_type], model_id)
 
     response = get_threats_single_turn(bedrock_client, model_id, system_prompt, [user_message])
 
@@ -127,6 +189,110 @@ Would you like more threats?
     return threats
 
 
+def generate_threats_by_stride_type(image: bytes, diagram_description: str, dataflow_component: DFDComponent,
+                                    stride_types: list[StrideType],
+                                    iterations: int = 1,
+                                    model_id: ConverseModelIds = ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID
+                                    ) -> dict[str, Threats]:
+    """
+    Same as `generate_threats`, but asks for all `stride_types` in a single tool call. This way the image and the
+    diagram description are sent once per component instead of once per (component, STRIDE type).
+
+    :param stride_types: {list[StrideType]} the STRIDE types we want threats for
+    :param iterations: {int} The number of consecutive turns we will invoke the model to ask for additional threats
+    :raises MaxTokensExceededException: when the threats of all `stride_types` did not fit in `MAX_OUTPUT_TOKENS`, see
+    `generate_threats_by_stride_type_with_fallback`
+    :return: {dict[str, Threats]} the threats of each requested STRIDE type, keyed by the STRIDE type value
+    """
+    bedrock_client = CachedConverseClient(
+        BedrockClient(assumed_role=BEDROCK_XACCT_ROLE, region=BEDROCK_CRIS_REGION, model_id=model_id.value))
+
+    system_prompt = _build_system_prompt()
+    user_message = _build_user_message(image, diagram_description, dataflow_component, stride_types, model_id)
+
+    response = get_threats_single_turn(bedrock_client, model_id, system_prompt, [user_message],
+                                       tools=THREATS_BY_STRIDE_TYPE_AS_TOOL)
+    _raise_if_truncated(response, f"Threats of {len(stride_types)} STRIDE types")
+    threats = ThreatsByStrideType.model_validate_bedrock_response(response)
+
+    for _ in range(iterations - 1):
+        messages = [
+            user_message,
+            {"role": "assistant", "content": [{"text": f"""
+These are some potential {_stride_types_text(stride_types)} threats:
+
+{str(Threats(threats=[t for group in threats.stride_threats for t in group.threats]))}
+
+Would you like more threats?
+"""}]},
+            {"role": "user", "content": [{"text": "Yes, please provide additional threats. Don't repeat threats you've given me before."}]},
+        ]
+
+        response = get_threats_single_turn(bedrock_client, model_id, system_prompt, messages,
+                                           tools=THREATS_BY_STRIDE_TYPE_AS_TOOL)
+        _raise_if_truncated(response, f"Threats of {len(stride_types)} STRIDE types")
+        new_threats = ThreatsByStrideType.model_validate_bedrock_response(response)
+        threats = ThreatsByStrideType(stride_threats=threats.stride_threats + new_threats.stride_threats)
+
+    threats_by_stride_type = threats.split()
+
+    # we only return the requested types, and always return all of them
+    return {
+        stride_type.value: threats_by_stride_type.get(stride_type.value, Threats(threats=[]))
+        for stride_type in stride_types
+    }
+
+
+def generate_threats_by_stride_type_with_fallback(
+        image: bytes, diagram_description: str, dataflow_component: DFDComponent, stride_types: list[StrideType],
+        iterations: int = 1, model_id: ConverseModelIds = ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID
+) -> dict[str, Threats]:
+    """
+    `generate_threats_by_stride_type`, splitting `stride_types` in halves whenever their threats exceed
+    `MAX_OUTPUT_TOKENS`, down to a single STRIDE type per call.
+
+    :raises MaxTokensExceededException: when the threats of a single STRIDE type do not fit in `MAX_OUTPUT_TOKENS`
+    """
+    try:
+        return generate_threats_by_stride_type(image, diagram_description, dataflow_component, stride_types,
+                                               iterations, model_id)
+    except MaxTokensExceededException as e:
+        if len(stride_types) == 1:
+            raise
+
+        logger.warning(f"Splitting {len(stride_types)} STRIDE types of component {dataflow_component.id}: {e}")
+
+        # the halves don't depend on each other, so we ask for both at once
+        half = len(stride_types) // 2
+        halves = ConverseExecutor(max_in_flight=2).map(generate_threats_by_stride_type_with_fallback, [
+            (image, diagram_description, dataflow_component, stride_types[:half], iterations, model_id),
+            (image, diagram_description, dataflow_component, stride_types[half:], iterations, model_id),
+        ])
+        return {**halves[0], **halves[1]}
+
+
+def stream_threats_for_component(image: bytes,
+                                 diagram_description: str,
+                                 dataflow_component: DFDComponent,
+                                 stride_type: str,
+                                 model_id: str) -> Iterator[DFDThreat]:
+    """
+    Single turn version of `get_threats_for_component` that yields each threat as soon as the model has finished
+    generating it.
+    """
+    model_id = ConverseModelIds(model_id or ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID.value)
+    stride_type = StrideType(stride_type)
+
+    bedrock_client = BedrockClient(assumed_role=BEDROCK_XACCT_ROLE, region=BEDROCK_CRIS_REGION, model_id=model_id.value)
+
+    request = _build_threats_request(model_id, _build_system_prompt(), [
+        _build_user_message(image, diagram_description, dataflow_component, [stride_type], model_id)
+    ])
+
+    for item in stream_tool_use_items(bedrock_client, "stream_threats_for_component", **request):
+        yield DFDThreat.model_validate(item)
+
+
 def get_threats_for_component(image: bytes,
                               diagram_description: str,
                               dataflow_component: DFDComponent,
@@ -138,3 +304,43 @@ def get_threats_for_component(image: bytes,
                                ConverseModelIds(model_id))
 
     return threats
+
+
+def stream_threats_by_stride_type_for_component(image: bytes,
+                                                diagram_description: str,
+                                                dataflow_component: DFDComponent,
+                                                stride_types: list[str],
+                                                model_id: str) -> Iterator[StrideThreats]:
+    """
+    Single turn version of `get_threats_by_stride_type_for_component` that yields the threats of each STRIDE type as
+    soon as the model has finished generating them.
+
+    :raises MaxTokensExceededException: when the threats of all `stride_types` did not fit in `MAX_OUTPUT_TOKENS`, the
+    groups yielded until then are incomplete
+    """
+    model_id = ConverseModelIds(model_id or ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID.value)
+    stride_types = [StrideType(stride_type) for stride_type in stride_types]
+
+    bedrock_client = BedrockClient(assumed_role=BEDROCK_XACCT_ROLE, region=BEDROCK_CRIS_REGION, model_id=model_id.value)
+
+    request = _build_threats_request(model_id, _build_system_prompt(), [
+        _build_user_message(image, diagram_description, dataflow_component, stride_types, model_id)
+    ], tools=THREATS_BY_STRIDE_TYPE_AS_TOOL)
+
+    for item in stream_tool_use_items(bedrock_client, "stream_threats_by_stride_type_for_component", **request):
+        group = StrideThreats.model_validate(item)
+        yield group.model_copy(update={
+            "threats": [t.model_copy(update={"stride_type": group.stride_type}) for t in group.threats]
+        })
+
+
+def get_threats_by_stride_type_for_component(image: bytes,
+                                             diagram_description: str,
+                                             dataflow_component: DFDComponent,
+                                             stride_types: list[str],
+                                             model_id: str,
+                                             iterations: int = 1) -> dict[str, Threats]:
+    model_id = model_id or ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID.value
+    return generate_threats_by_stride_type_with_fallback(image, diagram_description, dataflow_component,
+                                                         [StrideType(stride_type) for stride_type in stride_types],
+                                                         iterations, ConverseModelIds(model_id))
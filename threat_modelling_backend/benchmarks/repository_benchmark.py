@@ -0,0 +1,150 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+Compares the multi-table and single-table threat model repositories.
+
+For each repository we save a synthetic threat model and then load it back with `get` and `get_diagram`, reporting the
+number of DynamoDB requests and the latency of each operation. By default everything runs against moto, which is good
+for request counts but not for latencies; pass --real to use the tables configured in the environment instead.
+
+    PYTHONPATH=backend/genai_core python benchmarks/repository_benchmark.py --components 20 --threats 10
+"""
+
+import argparse
+from collections import Counter
+from contextlib import contextmanager
+import os
+import statistics
+import time
+from unittest.mock import patch
+import uuid
+
+import boto3
+from botocore.client import BaseClient
+
+SINGLE_TABLE_NAME = "ThreatModelItems"
+
+
+@contextmanager
+def count_requests():
+    """ Counts the DynamoDB requests made, by boto3 and pynamodb alike, while the context is active """
+    counter = Counter()
+    make_api_call = BaseClient._make_api_call
+
+    def counting_make_api_call(client, operation_name, api_params):
+        counter[operation_name] += 1
+        return make_api_call(client, operation_name, api_params)
+
+    with patch.object(BaseClient, "_make_api_call", counting_make_api_call):
+        yield counter
+
+
+def create_tables(dynamodb):
+    def table(name, key_schema, attributes, indexes=()):
+        dynamodb.create_table(TableName=name, KeySchema=key_schema, BillingMode="PAY_PER_REQUEST",
+                              AttributeDefinitions=[{"AttributeName": a, "AttributeType": "S"} for a in attributes],
+                              **({"GlobalSecondaryIndexes": [{
+                                  "IndexName": index_name,
+                                  "KeySchema": [{"AttributeName": hash_key, "KeyType": "HASH"},
+                                                {"AttributeName": "id", "KeyType": "RANGE"}],
+                                  "Projection": {"ProjectionType": "ALL"},
+                              } for index_name, hash_key in indexes]} if indexes else {}))
+
+    hash_id = [{"AttributeName": "id", "KeyType": "HASH"}]
+    table("ThreatModels", hash_id, ["id"])
+    table("Diagrams", hash_id, ["id", "threat_model_id"], [("ByThreatModel", "threat_model_id")])
+    table("Components", hash_id, ["id", "diagram_id"], [("ByDiagram", "diagram_id")])
+    table("Threats", hash_id, ["id", "component_id"], [("ByComponent", "component_id")])
+    table(SINGLE_TABLE_NAME, [{"AttributeName": "PK", "KeyType": "HASH"}, {"AttributeName": "SK", "KeyType": "RANGE"}],
+          ["PK", "SK", "id", "diagrams_index_pk"], [("Diagrams", "diagrams_index_pk")])
+
+
+def synthetic_threat_model(components: int, threats: int):
+    from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD
+
+    threat_model_id = diagram_id = str(uuid.uuid4())
+
+    def component(component_id):
+        return Component(id=component_id, diagram_id=diagram_id, name="component", description="description " * 20,
+                         component_type="Process", threats=[
+                Threat(component_id=component_id, name="threat", description="description " * 50,
+                       stride_type="Tampering", action="Not Applicable", reason="reason " * 20,
+                       dread_scores=DREAD(damage=1, reproducibility=2, exploitability=3, affected_users=4,
+                                          discoverability=5))
+                for _ in range(threats)])
+
+    return ThreatModel(id=threat_model_id, diagrams=[Diagram(
+        id=diagram_id, threat_model_id=threat_model_id, s3_prefix="diagram.png",
+        diagram_description="description " * 100,
+        components=[component(str(uuid.uuid4())) for _ in range(components)])])
+
+
+def measure(operation, repetitions: int) -> tuple[float, float]:
+    """ :return: {tuple[float, float]} the average number of requests and the median latency in ms """
+    latencies, requests = [], 0
+    for _ in range(repetitions):
+        with count_requests() as counter:
+            start = time.perf_counter()
+            operation()
+            latencies.append((time.perf_counter() - start) * 1000)
+        requests += sum(counter.values())
+
+    return requests / repetitions, statistics.median(latencies)
+
+
+def run(components: int, threats: int, repetitions: int):
+    from genai_core.adapter import DynamoDBThreatModelRepository, SingleTableThreatModelRepository
+
+    repositories = {
+        "multi-table": DynamoDBThreatModelRepository.from_table_names(
+            threat_models_table_name=os.getenv("THREAT_MODELS_TABLE_NAME", "ThreatModels"),
+            diagrams_table_name=os.getenv("DIAGRAMS_TABLE_NAME", "Diagrams"),
+            components_table_name=os.getenv("COMPONENTS_TABLE_NAME", "Components"),
+            threats_table_name=os.getenv("THREATS_TABLE_NAME", "Threats"),
+        ),
+        "single-table": SingleTableThreatModelRepository.from_table_name(
+            os.getenv("THREAT_MODEL_ITEMS_TABLE_NAME", SINGLE_TABLE_NAME)),
+    }
+
+    threat_model = synthetic_threat_model(components, threats)
+    diagram = threat_model.diagrams[0]
+
+    print(f"{components} components, {threats} threats per component, {repetitions} repetitions")
+    print(f"{'repository':<14}{'operation':<14}{'requests':>10}{'p50 ms':>10}")
+
+    for name, repository in repositories.items():
+        save = lambda: (repository.save(threat_model), repository.save_diagrams(threat_model.diagrams),
+                        repository.save_components(diagram.components),
+                        repository.save_threats([t for c in diagram.components for t in c.threats]))
+
+        for operation_name, operation in [("save", save),
+                                          ("get", lambda: repository.get(threat_model.id)),
+                                          ("get_diagram", lambda: repository.get_diagram(diagram.id))]:
+            requests, latency = measure(operation, repetitions)
+            print(f"{name:<14}{operation_name:<14}{requests:>10.1f}{latency:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--components", type=int, default=20)
+    parser.add_argument("--threats", type=int, default=10, help="threats per component")
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--real", action="store_true", help="use the tables configured in the environment")
+    args = parser.parse_args()
+
+    if args.real:
+        run(args.components, args.threats, args.repetitions)
+        return
+
+    from moto import mock_aws
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        create_tables(boto3.resource("dynamodb", region_name="us-east-1"))
+        run(args.components, args.threats, args.repetitions)
+
+
+if __name__ == "__main__":
+    main()
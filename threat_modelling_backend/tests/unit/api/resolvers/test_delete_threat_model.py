@@ -0,0 +1,99 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import boto3
+from moto import mock_aws
+import pytest
+from unittest.mock import patch, Mock
+
+from genai_core.image_pipeline import normalized_image_key
+from genai_core.repository import NotFoundException
+
+
+@pytest.fixture(autouse=True)
+def mock_environment(monkeypatch, bucket_name):
+    monkeypatch.setenv("DATA_BUCKET_NAME", bucket_name)
+
+
+@pytest.fixture(scope="function")
+def s3(aws_credentials):
+    with mock_aws():
+        yield boto3.client("s3", region_name="us-east-1")
+
+
+@pytest.fixture
+def bucket_name():
+    # same as test_generate_report, the services read it once when they are imported
+    return "test_bucket_name"
+
+
+@pytest.fixture
+def bucket(s3, bucket_name):
+    s3.create_bucket(Bucket=bucket_name)
+
+
+@pytest.fixture
+def threat_model_objects(s3, bucket, bucket_name, threat_model):
+    diagram = threat_model.diagrams[0]
+    etag = s3.put_object(Bucket=bucket_name, Key=diagram.s3_prefix, Body=b"an image")["ETag"]
+
+    keys = [
+        normalized_image_key(etag),
+        f"db/threats/{diagram.id}-{diagram.components[0].id}-Spoofing-DataStore.jsonl",
+        f"db/threats/{diagram.id}-{diagram.components[0].id}-Tampering-DataStore.jsonl",
+        f"reports/{threat_model.id}/2024-01-01_00-00-{threat_model.id}.xlsx",
+    ]
+    for key in keys:
+        s3.put_object(Bucket=bucket_name, Key=key, Body=b"")
+
+    return [diagram.s3_prefix] + keys
+
+
+def test_delete_threat_model_deletes_its_items_and_objects(s3, bucket_name, threat_model, threat_model_objects):
+    from backend.api.resolvers.main.services.delete_threat_model_svc import delete_threat_model
+
+    # given, objects of another threat model
+    other_keys = ["db/threats/another-diagram-Spoofing-DataStore.jsonl", "reports/another/2024-01-01_00-00-another.xlsx"]
+    for key in other_keys:
+        s3.put_object(Bucket=bucket_name, Key=key, Body=b"")
+
+    repository = Mock()
+    repository.get.return_value = threat_model
+    repository.delete.return_value = 4
+
+    # when
+    deletion = delete_threat_model(repository, threat_model.id)
+
+    # then
+    repository.delete.assert_called_once()
+    assert deletion.items_deleted == 4
+    assert deletion.objects_deleted == len(threat_model_objects)
+    assert deletion.errors == []
+    assert sorted(o["Key"] for o in s3.list_objects_v2(Bucket=bucket_name)["Contents"]) == sorted(other_keys)
+
+
+def test_delete_threat_model_does_not_delete_objects_when_items_cannot_be_deleted(s3, bucket_name, threat_model,
+                                                                                 threat_model_objects):
+    from backend.api.resolvers.main.services.delete_threat_model_svc import delete_threat_model
+
+    repository = Mock()
+    repository.get.return_value = threat_model
+    repository.delete.side_effect = Exception("DynamoDB BatchWriteItem error")
+
+    with pytest.raises(Exception):
+        delete_threat_model(repository, threat_model.id)
+
+    assert s3.list_objects_v2(Bucket=bucket_name)["KeyCount"] == len(threat_model_objects)
+
+
+@patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
+def test_delete_threat_model_resolver(repository: Mock, threat_model, threat_model_objects):
+    from backend.api.resolvers.main.routers.sync_resolvers import delete_threat_model
+
+    repository.get = Mock(side_effect=[threat_model, NotFoundException(f"ThreatModel {threat_model.id} not found")])
+    repository.delete = Mock(return_value=4)
+
+    assert delete_threat_model(threat_model.id)["success"] is True
+    assert delete_threat_model(threat_model.id) == {"success": False,
+                                                    "message": f"ThreatModel {threat_model.id} not found"}
@@ -45,7 +45,7 @@ def test_generate_report(repository: Mock, bucket, s3, bucket_name, threat_model
     presigned_url = report["presignedUrl"]
 
     # then we expect a presigned url to have been generated
-    assert re.match(fr"https://s3.amazonaws.com/{bucket_name}/reports/\d{{4}}-\d{{2}}-\d{{2}}_\d{{2}}-\d{{2}}-{threat_model.id}.xlsx\?AWSAccessKeyId", presigned_url)
+    assert re.match(fr"https://s3.amazonaws.com/{bucket_name}/reports/{threat_model.id}/\d{{4}}-\d{{2}}-\d{{2}}_\d{{2}}-\d{{2}}-{threat_model.id}.xlsx\?AWSAccessKeyId", presigned_url)
 
     # let's also assert that the expiration is the expected one
     expires_in = 3600  # number of seconds from now to expire the link
@@ -36,7 +36,7 @@ def dfd(faker):
 
 
 @patch("backend.api.resolvers.main.index.get_diagram_description")
-@patch("backend.api.resolvers.main.index.read_s3_object")
+@patch("backend.api.resolvers.main.index.read_diagram_image")
 @patch("backend.api.resolvers.main.index.repository")
 def test_create_diagram_description_resolver(repo: Mock, read_s3_obj: Mock, get_diagram_description: Mock, diagram_id,
                                              s3_prefix, diagram_description, mock_notify):
@@ -56,14 +56,17 @@ def test_create_diagram_description_resolver(repo: Mock, read_s3_obj: Mock, get_
     # relay_status.assert_called_with(diagram_id, DiagramDescriptionMutation.query,
     #                                 variables={"id": diagram_id, "diagramDescription": diagram_description})
 
-    # and we also expect to have persisted the result
-    repo.save_diagram.assert_called_with(
+    # and we also expect to have persisted the result, stamped with its creation time
+    repo.save_diagram.assert_called_once()
+    saved_diagram = repo.save_diagram.call_args.args[0]
+    assert saved_diagram.created_at is not None
+    assert saved_diagram.model_copy(update={"created_at": None}) == \
         Diagram(id=diagram_id, threat_model_id=diagram_id, s3_prefix=s3_prefix,
-                diagram_description=diagram_description))
+                diagram_description=diagram_description)
 
 
 @patch("backend.api.resolvers.main.index.get_dfd_from_diagram_and_description")
-@patch("backend.api.resolvers.main.index.read_s3_object")
+@patch("backend.api.resolvers.main.index.read_diagram_image")
 @patch("backend.api.resolvers.main.index.repository")
 def test_extract_components_resolver(repo: Mock, read_s3_obj: Mock, get_dfd_from_diagram_and_description: Mock,
                                      diagram_id, s3_prefix, diagram_description, dfd, mock_notify):
@@ -91,3 +94,28 @@ def test_extract_components_resolver(repo: Mock, read_s3_obj: Mock, get_dfd_from
     repo.save_components.assert_called_with([Component(
         id=c.id, diagram_id=diagram_id, name=c.name, description=c.description, component_type=c.component_type
     ) for c in dfd.components])
+
+
+@patch("backend.api.resolvers.main.index.STREAM_PARTIAL_RESULTS", True)
+@patch("backend.api.resolvers.main.index.relay_partial_result")
+@patch("backend.api.resolvers.main.index.stream_dfd_components")
+@patch("backend.api.resolvers.main.index.read_diagram_image")
+@patch("backend.api.resolvers.main.index.repository")
+def test_extract_components_resolver_relays_only_the_new_components(repo: Mock, read_s3_obj: Mock,
+                                                                    stream_dfd_components: Mock,
+                                                                    relay_partial_result: Mock, diagram_id, s3_prefix,
+                                                                    diagram_description, dfd, faker, mock_notify):
+    from backend.api.resolvers.main.index import extract_components
+    from graphql.model import PartialComponentsMutation
+
+    components = dfd.components + [dfd.components[0].model_copy(update={"id": faker.uuid4()})]
+    read_s3_obj.return_value = b"some binary data"
+    stream_dfd_components.return_value = iter(components)
+
+    # when
+    extract_components({"id": diagram_id, "s3Prefix": s3_prefix, "diagramDescription": diagram_description})
+
+    # then, one component per partial result, on their own mutation
+    assert [call.args[0] for call in relay_partial_result.call_args_list] == [PartialComponentsMutation] * 2
+    assert [[c.id for c in call.args[1].components] for call in relay_partial_result.call_args_list] == \
+        [[c.id] for c in components]
@@ -7,8 +7,8 @@ from random import choice
 from typing import Optional
 from unittest.mock import patch, Mock
 
-from genai_core.repository import DeleteItemException
-from genai_core.model import Diagram, Component, Threat
+from genai_core.repository import DeleteItemException, NotFoundException, VersionConflictException, ThreatUpdate
+from genai_core.model import Diagram, Component, Threat, DiagramSummary, DiagramSummaryPage, RiskSummary
 
 
 @pytest.fixture
@@ -40,6 +40,7 @@ def test_get_diagram_resolver(repo: Mock, diagram_id, s3_prefix, threat_model):
         "s3Prefix": s3_prefix,
         "diagramDescription": diagram.diagram_description,
         "status": "NA",
+        "createdAt": None,
         "components": [{
             "id": c.id, "diagram_id": diagram_id, "name": c.name, "description": c.description,
             "componentType": c.component_type,
@@ -53,12 +54,40 @@ def test_get_diagram_resolver(repo: Mock, diagram_id, s3_prefix, threat_model):
                     "exploitability": t.dread_scores.exploitability,
                     "affectedUsers": t.dread_scores.affected_users,
                     "discoverability": t.dread_scores.discoverability,
-                }
-            } for t in c.threats]
+                },
+                "version": 0,
+            } for t in c.threats],
+            "version": 0,
         } for c in diagram.components]
     }
 
 
+@patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
+def test_get_risk_summary_resolver(repo: Mock, threat_model):
+    from backend.api.resolvers.main.routers.sync_resolvers import get_risk_summary
+
+    # given
+    diagram = threat_model.diagrams[0]
+    component = diagram.components[0]
+    repo.get_diagram_risk_summary = Mock(return_value=RiskSummary.of(
+        [t for c in diagram.components for t in c.threats]))
+    repo.get_component_risk_summary = Mock(return_value=RiskSummary.of(component.threats))
+
+    # when
+    diagram_summary = get_risk_summary(diagram.id)
+    component_summary = get_risk_summary(diagram.id, componentId=component.id)
+
+    # then
+    repo.get_diagram_risk_summary.assert_called_once_with(diagram.id)
+    repo.get_component_risk_summary.assert_called_once_with(component.id)
+    assert diagram_summary["threats"] == len(component.threats)
+    assert component_summary["byThreatType"] == [{"threatType": "Spoofing", "count": 1}]
+    assert [b["bin"] for b in component_summary["dreadScoreHistogram"]] == ["1-10", "10-20", "20-30", "30-40",
+                                                                            "40-50"]
+    assert set(component_summary) == {"threats", "evaluated", "notEvaluated", "byThreatType", "byAction",
+                                      "dreadScoreHistogram"}
+
+
 @patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
 def test_delete_component_resolver(repo: Mock, faker):
     from backend.api.resolvers.main.routers.sync_resolvers import delete_component
@@ -118,19 +147,38 @@ def test_list_diagrams_resolver(repo: Mock, diagram_id, s3_prefix, diagram_descr
     a_status = choice(["NA", "THREATS_GENERATED", "GENERATING_THREATS"])
 
     # given
-    diagrams = [
-        Diagram(id=diagram_id, threat_model_id=diagram_id, s3_prefix=s3_prefix, diagram_description=diagram_description,
-                user_description=user_description, status=a_status),
-    ]
-    repo.list_diagrams = Mock(return_value=diagrams)
+    page = DiagramSummaryPage(items=[
+        DiagramSummary(id=diagram_id, threat_model_id=diagram_id, s3_prefix=s3_prefix,
+                       diagram_description=diagram_description, user_description=user_description, status=a_status,
+                       created_at="2024-01-01T00:00:00+00:00"),
+    ], next_token="a-token")
+    repo.list_diagram_summaries = Mock(return_value=page)
 
     # when
-    result = list_diagrams()
+    result = list_diagrams(limit=10, nextToken="previous-token")
 
     # then
-    assert result == [
-        {"components": [], "diagramDescription": diagram_description, "id": diagram_id, "threat_model_id": diagram_id,
-         "userDescription": user_description, "s3Prefix": s3_prefix, "status": a_status}]
+    repo.list_diagram_summaries.assert_called_once_with(limit=10, next_token="previous-token")
+    assert result == {
+        "items": [{"diagramDescription": diagram_description, "id": diagram_id, "threat_model_id": diagram_id,
+                   "userDescription": user_description, "s3Prefix": s3_prefix, "status": a_status,
+                   "createdAt": "2024-01-01T00:00:00+00:00"}],
+        "nextToken": "a-token",
+    }
+
+
+@patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
+def test_list_diagrams_resolver_bounds_the_page_size(repo: Mock):
+    from backend.api.resolvers.main.routers.sync_resolvers import list_diagrams, LIST_DIAGRAMS_DEFAULT_LIMIT, \
+        LIST_DIAGRAMS_MAX_LIMIT
+
+    repo.list_diagram_summaries = Mock(return_value=DiagramSummaryPage(items=[]))
+
+    list_diagrams()
+    list_diagrams(limit=10_000)
+
+    assert [c.kwargs["limit"] for c in repo.list_diagram_summaries.call_args_list] == [LIST_DIAGRAMS_DEFAULT_LIMIT,
+                                                                                       LIST_DIAGRAMS_MAX_LIMIT]
 
 
 @patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
@@ -145,25 +193,24 @@ def test_update_component_resolver(repo: Mock, threat_model, faker, component_ty
     a_new_description = faker.text()
     a_new_component_type = component_type_different_from(component.component_type)
 
-    repo.get_component = Mock(return_value=component)
-    repo.save_component = Mock()
+    repo.update_component = Mock(side_effect=lambda component_id, changes, expected_version: component.model_copy(
+        update={**changes, "threats": [], "version": component.version + 1}))
 
     # when
     updated_component = update_component(
         {"id": threat_model.id, "diagramId": diagram.id, "componentId": component.id,
-         "name": a_new_name, "description": a_new_description, "componentType": a_new_component_type})
-
-    # then
-    component_dict = component.model_dump(by_alias=True)
-    differences = {k: (component_dict[k], updated_component[k]) for k in component_dict if
-                   component_dict[k] != updated_component[k]}
+         "name": a_new_name, "description": a_new_description, "componentType": a_new_component_type,
+         "expectedVersion": component.version})
 
-    assert len(differences) == 3
-    assert differences["name"] == (component.name, a_new_name)
-    assert differences["description"] == (component.description, a_new_description)
-    assert differences["componentType"] == (component.component_type, a_new_component_type)
+    # then, we only send the fields we got in a single update
+    repo.update_component.assert_called_once_with(
+        component.id, {"name": a_new_name, "description": a_new_description, "component_type": a_new_component_type},
+        expected_version=component.version)
 
-    repo.save_component.assert_called_with(Component(**updated_component))
+    assert updated_component["name"] == a_new_name
+    assert updated_component["description"] == a_new_description
+    assert updated_component["componentType"] == a_new_component_type
+    assert updated_component["version"] == component.version + 1
 
 
 @patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
@@ -181,8 +228,8 @@ def test_update_threat_resolver(repo: Mock, threat_model, faker):
     a_new_action = choice([a for a in ["Mitigate", "Avoid", "Transfer"] if a != threat.action])
     a_reason = faker.text()
 
-    repo.get_threat = Mock(return_value=threat)
-    repo.save_threat = Mock()
+    repo.update_threat = Mock(side_effect=lambda threat_id, changes, expected_version: threat.model_copy(
+        update={**changes, "version": threat.version + 1}))
 
     # when
     updated_threat = update_threat(
@@ -190,7 +237,11 @@ def test_update_threat_resolver(repo: Mock, threat_model, faker):
          "name": a_new_name, "description": a_new_description, "threatType": a_new_threat_type, "action": a_new_action,
          "reason": a_reason})
 
-    # then
+    # then, we only send the fields we got in a single update
+    repo.update_threat.assert_called_once_with(
+        threat.id, {"name": a_new_name, "description": a_new_description, "stride_type": a_new_threat_type,
+                    "action": a_new_action, "reason": a_reason}, expected_version=None)
+
     threat_dict = threat.model_dump(by_alias=True)
     differences = {k: (threat_dict[k], updated_threat[k]) for k in threat_dict if threat_dict[k] != updated_threat[k]}
 
@@ -200,7 +251,90 @@ def test_update_threat_resolver(repo: Mock, threat_model, faker):
     assert differences["action"] == (threat.action, a_new_action)
     assert differences["reason"] == (threat.reason, a_reason)
 
-    repo.save_threat.assert_called_with(Threat(**updated_threat))
+
+@patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
+def test_update_threat_resolver_validates_dread_scores(repo: Mock, threat_model):
+    from backend.api.resolvers.main.routers.sync_resolvers import update_threat
+
+    # given
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    repo.update_threat = Mock(return_value=threat)
+
+    # when
+    update_threat({"id": threat_model.id, "diagramId": threat_model.id, "componentId": threat.component_id,
+                   "threatId": threat.id, "dreadScores": {"damage": 2, "reproducibility": 3, "exploitability": 4,
+                                                          "affectedUsers": 5, "discoverability": 6}})
+
+    # then, the scores are sent with the field names of our model
+    repo.update_threat.assert_called_once_with(
+        threat.id, {"dread_scores": {"damage": 2, "reproducibility": 3, "exploitability": 4, "affected_users": 5,
+                                     "discoverability": 6}}, expected_version=None)
+
+
+@patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
+def test_update_threats_resolver_reports_each_threat(repo: Mock, threat_model, faker):
+    from backend.api.resolvers.main.routers.sync_resolvers import update_threats
+
+    # given
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    conflicting_threat, missing_threat = [threat.model_copy(update={"id": faker.uuid4()}) for _ in range(2)]
+    updated_threat = threat.model_copy(update={"action": "Mitigate", "version": 1})
+    repo.update_threats = Mock(return_value={
+        threat.id: updated_threat,
+        conflicting_threat.id: VersionConflictException("conflict", current_version=2),
+        missing_threat.id: NotFoundException("not found"),
+    })
+
+    def an_input(threat_id, **changes):
+        return {"id": threat_model.id, "diagramId": threat_model.id, "componentId": threat.component_id,
+                "threatId": threat_id, **changes}
+
+    # when
+    results = update_threats([an_input(threat.id, action="Mitigate"),
+                              an_input(conflicting_threat.id, reason="a reason", expectedVersion=1),
+                              an_input(missing_threat.id, threatType="Spoofing")])
+
+    # then, a single call to the repository
+    repo.update_threats.assert_called_once_with([
+        ThreatUpdate(threat.id, {"action": "Mitigate"}),
+        ThreatUpdate(conflicting_threat.id, {"reason": "a reason"}, expected_version=1),
+        ThreatUpdate(missing_threat.id, {"stride_type": "Spoofing"}),
+    ])
+
+    assert results == [
+        {"threatId": threat.id, "success": True, "message": None, "threat": updated_threat.model_dump(by_alias=True)},
+        {"threatId": conflicting_threat.id, "success": False, "message": "conflict", "threat": None},
+        {"threatId": missing_threat.id, "success": False, "message": "not found", "threat": None},
+    ]
+
+
+@patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
+def test_delete_threats_resolver_reports_each_threat(repo: Mock, faker):
+    from backend.api.resolvers.main.routers.sync_resolvers import delete_threats
+
+    # given
+    a_threat_id, a_missing_threat_id = faker.uuid4(), faker.uuid4()
+    repo.delete_threats = Mock(return_value={a_threat_id: None, a_missing_threat_id: NotFoundException("not found")})
+
+    # when
+    results = delete_threats([a_threat_id, a_missing_threat_id])
+
+    # then
+    repo.delete_threats.assert_called_once_with([a_threat_id, a_missing_threat_id])
+    assert results == [
+        {"threatId": a_threat_id, "success": True, "message": f"Threat {a_threat_id} deleted successfully"},
+        {"threatId": a_missing_threat_id, "success": False, "message": "not found"},
+    ]
+
+
+@patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
+def test_bulk_threat_resolvers_limit_the_number_of_threats(repo: Mock):
+    from backend.api.resolvers.main.routers.sync_resolvers import delete_threats, BULK_THREATS_MAX_ITEMS
+
+    with pytest.raises(ValueError):
+        delete_threats([str(i) for i in range(BULK_THREATS_MAX_ITEMS + 1)])
+
+    repo.delete_threats.assert_not_called()
 
 
 @patch("backend.api.resolvers.main.routers.sync_resolvers.repository")
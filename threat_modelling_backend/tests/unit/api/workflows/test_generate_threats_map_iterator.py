@@ -98,7 +98,7 @@ def threats(faker):
 @patch("genai_core.model.uuid4")
 @patch("backend.api.workflows.generate_threats.index.write_threatmodel_as_jsonline_to_s3")
 @patch("backend.api.workflows.generate_threats.index.get_threats_for_component")
-@patch("backend.api.workflows.generate_threats.index.read_s3_object")
+@patch("backend.api.workflows.generate_threats.index.read_diagram_image")
 @patch("backend.api.workflows.generate_threats.index.repository")
 def test_generate_threats(repo: Mock, read_s3_obj: Mock, get_threats_for_component: Mock,
                           write_threatmodel_as_jsonline_to_s3: Mock, uuid4: Mock, diagram_id, s3_prefix,
@@ -126,3 +126,107 @@ def test_generate_threats(repo: Mock, read_s3_obj: Mock, get_threats_for_compone
         for threat in threats.threats
     ]
     repo.save_threats.assert_called_with(persisted_threats)
+
+
+@patch("genai_core.model.uuid4")
+@patch("backend.api.workflows.generate_threats.index.write_threatmodel_as_jsonline_to_s3")
+@patch("backend.api.workflows.generate_threats.index.get_threats_by_stride_type_for_component")
+@patch("backend.api.workflows.generate_threats.index.read_diagram_image")
+@patch("backend.api.workflows.generate_threats.index.repository")
+def test_generate_threats_for_multiple_stride_types(repo: Mock, read_s3_obj: Mock,
+                                                    get_threats_by_stride_type_for_component: Mock,
+                                                    write_threatmodel_as_jsonline_to_s3: Mock, uuid4: Mock, diagram_id,
+                                                    s3_prefix, diagram_description, component_payload, component_id,
+                                                    threats):
+    from backend.api.workflows.generate_threats.index import generate_threats
+
+    uuid4.return_value = UUID("00000000-0000-0000-0000-000000000000")
+    read_s3_obj.return_value = b"some binary data"
+    get_threats_by_stride_type_for_component.return_value = {"Spoofing": threats, "Tampering": Threats(threats=[])}
+
+    # when
+    generate_threats({"id": diagram_id, "s3Prefix": s3_prefix, "diagramDescription": diagram_description,
+                      "component": component_payload, "threatTypes": ["Spoofing", "Tampering"]})
+
+    # then, we generated all types with a single call
+    get_threats_by_stride_type_for_component.assert_called_once()
+    assert get_threats_by_stride_type_for_component.call_args.kwargs["stride_types"] == ["Spoofing", "Tampering"]
+
+    # and we still write one record per STRIDE type
+    written_prefixes = [c.args[1] for c in write_threatmodel_as_jsonline_to_s3.call_args_list]
+    assert [p.split("-")[-2] for p in written_prefixes] == ["Spoofing", "Tampering"]
+
+    repo.save_threats.assert_called_with([
+        Threat(component_id=component_id, **threat.model_dump())
+        for threat in threats.threats
+    ])
+
+
+@patch("backend.api.workflows.generate_threats.index.STREAM_PARTIAL_RESULTS", True)
+@patch("backend.api.workflows.generate_threats.index.relay_partial_result")
+@patch("backend.api.workflows.generate_threats.index.write_threatmodel_as_jsonline_to_s3")
+@patch("backend.api.workflows.generate_threats.index.stream_threats_by_stride_type_for_component")
+@patch("backend.api.workflows.generate_threats.index.get_threats_by_stride_type_for_component")
+@patch("backend.api.workflows.generate_threats.index.read_diagram_image")
+@patch("backend.api.workflows.generate_threats.index.repository")
+def test_generate_threats_starts_over_when_the_stream_is_truncated(repo: Mock, read_s3_obj: Mock,
+                                                                   get_threats_by_stride_type_for_component: Mock,
+                                                                   stream_threats_by_stride_type_for_component: Mock,
+                                                                   write_threatmodel_as_jsonline_to_s3: Mock,
+                                                                   relay_partial_result: Mock, diagram_id, s3_prefix,
+                                                                   diagram_description, component_payload,
+                                                                   component_id, threats):
+    from backend.api.workflows.generate_threats.index import generate_threats
+    from genai_core.clients import MaxTokensExceededException
+    from genai_core.model import StrideThreats
+
+    def truncated_stream(**kwargs):
+        yield StrideThreats(stride_type="Spoofing", threats=threats.threats[:1])
+        raise MaxTokensExceededException("truncated")
+
+    read_s3_obj.return_value = b"some binary data"
+    stream_threats_by_stride_type_for_component.side_effect = truncated_stream
+    get_threats_by_stride_type_for_component.return_value = {"Spoofing": threats, "Tampering": Threats(threats=[])}
+
+    # when
+    generate_threats({"id": diagram_id, "s3Prefix": s3_prefix, "diagramDescription": diagram_description,
+                      "component": component_payload, "threatTypes": ["Spoofing", "Tampering"]})
+
+    # then, we saved the complete threats instead of the truncated ones
+    relay_partial_result.assert_called_once()
+    repo.save_threats.assert_called_once()
+    assert [t.name for t in repo.save_threats.call_args.args[0]] == [t.name for t in threats.threats]
+
+
+@patch("backend.api.workflows.generate_threats.index.STREAM_PARTIAL_RESULTS", True)
+@patch("backend.api.workflows.generate_threats.index.relay_partial_result")
+@patch("backend.api.workflows.generate_threats.index.write_threatmodel_as_jsonline_to_s3")
+@patch("backend.api.workflows.generate_threats.index.stream_threats_by_stride_type_for_component")
+@patch("backend.api.workflows.generate_threats.index.read_diagram_image")
+@patch("backend.api.workflows.generate_threats.index.repository")
+def test_generate_threats_relays_only_the_new_threats(repo: Mock, read_s3_obj: Mock,
+                                                      stream_threats_by_stride_type_for_component: Mock,
+                                                      write_threatmodel_as_jsonline_to_s3: Mock,
+                                                      relay_partial_result: Mock, diagram_id, s3_prefix,
+                                                      diagram_description, component_payload, threats):
+    from backend.api.workflows.generate_threats.index import generate_threats
+    from genai_core.model import StrideThreats
+    from graphql.model import PartialThreatsMutation
+
+    spoofing, tampering = threats.threats[0], threats.threats[0].model_copy(update={"stride_type": "Tampering"})
+    read_s3_obj.return_value = b"some binary data"
+    stream_threats_by_stride_type_for_component.return_value = iter([
+        StrideThreats(stride_type="Spoofing", threats=[spoofing]),
+        StrideThreats(stride_type="Tampering", threats=[]),
+        StrideThreats(stride_type="Tampering", threats=[tampering]),
+    ])
+
+    # when
+    generate_threats({"id": diagram_id, "s3Prefix": s3_prefix, "diagramDescription": diagram_description,
+                      "component": component_payload, "threatTypes": ["Spoofing", "Tampering"]})
+
+    # then, each partial result only has the threats generated since the previous one, with the ids we save
+    relayed = [call.args[1].components[0].threats for call in relay_partial_result.call_args_list]
+    assert all(call.args[0] == PartialThreatsMutation for call in relay_partial_result.call_args_list)
+    assert [len(threats) for threats in relayed] == [1, 1]
+    assert [t.id for ts in relayed for t in ts] == [t.id for t in repo.save_threats.call_args.args[0]]
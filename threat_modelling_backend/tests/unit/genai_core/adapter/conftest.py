@@ -6,6 +6,19 @@ import boto3
 from moto import mock_aws
 import pytest
 
+from genai_core.metrics import metrics
+
+# same as the CDK Database construct
+DIAGRAM_SUMMARY_ATTRIBUTES = ["threat_model_id", "s3_prefix", "user_description_preview", "diagram_description_preview",
+                              "status"]
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    """ The repositories emit write metrics, Powertools flushes them past 100 values and needs a namespace to do so """
+    yield
+    metrics.clear_metrics()
+
 
 @pytest.fixture(scope="function")
 def dynamodb(aws_credentials):
@@ -36,7 +49,9 @@ def tables(dynamodb, table_names):
                           KeySchema=[{'AttributeName': "id", 'KeyType': 'HASH'}],
                           BillingMode="PAY_PER_REQUEST",
                           AttributeDefinitions=[{'AttributeName': "id", 'AttributeType': 'S'},
-                                                {'AttributeName': "threat_model_id", 'AttributeType': 'S'}],
+                                                {'AttributeName': "threat_model_id", 'AttributeType': 'S'},
+                                                {'AttributeName': "summary_pk", 'AttributeType': 'S'},
+                                                {'AttributeName': "created_at", 'AttributeType': 'S'}],
                           GlobalSecondaryIndexes=[{
                               'IndexName': 'ByThreatModel',
                               'KeySchema': [
@@ -46,6 +61,16 @@ def tables(dynamodb, table_names):
                               'Projection': {
                                   'ProjectionType': 'ALL'
                               }
+                          }, {
+                              'IndexName': 'ByCreatedAt',
+                              'KeySchema': [
+                                  {'AttributeName': "summary_pk", 'KeyType': 'HASH'},
+                                  {'AttributeName': "created_at", 'KeyType': 'RANGE'}
+                              ],
+                              'Projection': {
+                                  'ProjectionType': 'INCLUDE',
+                                  'NonKeyAttributes': DIAGRAM_SUMMARY_ATTRIBUTES,
+                              }
                           }])
 
     dynamodb.create_table(TableName=components_table_name,
@@ -81,3 +106,53 @@ def tables(dynamodb, table_names):
                           }])
 
     return (dynamodb.Table(table_name) for table_name in table_names)
+
+
+@pytest.fixture(scope="function")
+def single_table(dynamodb):
+    return dynamodb.create_table(TableName="ThreatModelItems",
+                                 KeySchema=[{'AttributeName': "PK", 'KeyType': 'HASH'},
+                                            {'AttributeName': "SK", 'KeyType': 'RANGE'}],
+                                 BillingMode="PAY_PER_REQUEST",
+                                 AttributeDefinitions=[{'AttributeName': "PK", 'AttributeType': 'S'},
+                                                       {'AttributeName': "SK", 'AttributeType': 'S'},
+                                                       {'AttributeName': "id", 'AttributeType': 'S'},
+                                                       {'AttributeName': "diagrams_index_pk", 'AttributeType': 'S'},
+                                                       {'AttributeName': "summary_pk", 'AttributeType': 'S'},
+                                                       {'AttributeName': "created_at", 'AttributeType': 'S'}],
+                                 GlobalSecondaryIndexes=[{
+                                     'IndexName': 'Diagrams',
+                                     'KeySchema': [
+                                         {'AttributeName': "diagrams_index_pk", 'KeyType': 'HASH'},
+                                         {'AttributeName': "id", 'KeyType': 'RANGE'}
+                                     ],
+                                     'Projection': {
+                                         'ProjectionType': 'ALL'
+                                     }
+                                 }, {
+                                     'IndexName': 'DiagramsByCreatedAt',
+                                     'KeySchema': [
+                                         {'AttributeName': "summary_pk", 'KeyType': 'HASH'},
+                                         {'AttributeName': "created_at", 'KeyType': 'RANGE'}
+                                     ],
+                                     'Projection': {
+                                         'ProjectionType': 'INCLUDE',
+                                         'NonKeyAttributes': ["id", "entity_type", *DIAGRAM_SUMMARY_ATTRIBUTES],
+                                     }
+                                 }])
+
+
+@pytest.fixture(scope="function")
+def documents_table(dynamodb):
+    return dynamodb.create_table(TableName="ThreatModelDocuments",
+                                 KeySchema=[{'AttributeName': "id", 'KeyType': 'HASH'}],
+                                 BillingMode="PAY_PER_REQUEST",
+                                 AttributeDefinitions=[{'AttributeName': "id", 'AttributeType': 'S'}])
+
+
+@pytest.fixture(scope="function")
+def risk_summaries_table(dynamodb):
+    return dynamodb.create_table(TableName="RiskSummaries",
+                                 KeySchema=[{'AttributeName': "id", 'KeyType': 'HASH'}],
+                                 BillingMode="PAY_PER_REQUEST",
+                                 AttributeDefinitions=[{'AttributeName': "id", 'AttributeType': 'S'}])
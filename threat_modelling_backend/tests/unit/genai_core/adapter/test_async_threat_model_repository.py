@@ -0,0 +1,114 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import asyncio
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from genai_core.model import ThreatModel, Threat, DREAD
+from genai_core.repository import ThreatModelRepository, NotFoundException
+
+# subject under test
+from genai_core.adapter import AsyncDynamoDBThreatModelRepository, SyncThreatModelRepository
+from genai_core.adapter import environment
+
+
+def a_threat(faker, component_id):
+    return Threat(id=faker.uuid4(), component_id=component_id, name=faker.word(), description=faker.text(),
+                  stride_type="Spoofing", dread_scores=DREAD(damage=1, reproducibility=1, exploitability=1,
+                                                             affected_users=1, discoverability=1))
+
+
+def test_repo_gathers_calls_without_blocking_the_event_loop(tables, table_names, faker):
+    # given
+    repo = AsyncDynamoDBThreatModelRepository.from_table_names(*table_names)
+    threats = [a_threat(faker, "c") for _ in range(10)]
+
+    async def round_trip():
+        await repo.save_threats(threats)
+        return await asyncio.gather(*(repo.get_threat(threat.id) for threat in threats))
+
+    # when
+    loaded = asyncio.run(round_trip())
+
+    # then
+    assert loaded == threats
+    repo.close()
+
+
+def test_repo_bounds_the_calls_in_flight():
+    # given
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_get_threat(threat_id):
+        with lock:
+            in_flight.append(threat_id)
+            peak.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.remove(threat_id)
+
+    repository = Mock(spec=ThreatModelRepository)
+    repository.get_threat.side_effect = slow_get_threat
+    repo = AsyncDynamoDBThreatModelRepository(repository, max_in_flight=3)
+
+    async def gather():
+        await asyncio.gather(*(repo.get_threat(str(i)) for i in range(12)))
+
+    # when
+    asyncio.run(gather())
+
+    # then
+    assert repository.get_threat.call_count == 12
+    assert max(peak) == 3
+    repo.close()
+
+
+def test_repo_raises_what_the_repository_raises(faker):
+    # given
+    repository = Mock(spec=ThreatModelRepository)
+    repository.get.side_effect = NotFoundException("Threat model not found")
+    repo = AsyncDynamoDBThreatModelRepository(repository)
+
+    # then
+    with pytest.raises(NotFoundException):
+        asyncio.run(repo.get(faker.uuid4()))
+    repo.close()
+
+
+def test_repo_needs_at_least_one_call_in_flight():
+    with pytest.raises(ValueError, match="at least 1"):
+        AsyncDynamoDBThreatModelRepository(Mock(spec=ThreatModelRepository), max_in_flight=0)
+
+
+def test_sync_repo_can_be_called_from_another_event_loop(faker):
+    # given
+    threat_model = ThreatModel(id=faker.uuid4())
+    repository = Mock(spec=ThreatModelRepository)
+    repository.get.return_value = threat_model
+    repo = SyncThreatModelRepository(AsyncDynamoDBThreatModelRepository(repository))
+
+    async def a_coroutine():
+        return repo.get(threat_model.id)
+
+    # then
+    assert asyncio.run(a_coroutine()) == threat_model
+    repo.close()
+
+
+def test_async_repository_from_environment_shares_the_repository(monkeypatch, tmp_path):
+    # given
+    monkeypatch.setenv("SQLITE_DATABASE_PATH", str(tmp_path / "threat_models.db"))
+
+    # when
+    repo = environment.async_repository_from_environment()
+
+    # then
+    assert repo.repository is environment.repository_from_environment()
+    assert environment.async_repository_from_environment() is repo
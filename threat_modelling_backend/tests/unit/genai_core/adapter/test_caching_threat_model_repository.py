@@ -0,0 +1,223 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import pytest
+from unittest.mock import Mock
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD
+from genai_core.repository import ThreatModelRepository, NotFoundException, ThreatUpdate
+
+# subject under test
+from genai_core.adapter import CachingThreatModelRepository
+
+
+@pytest.fixture
+def threat_model(faker):
+    threat_model_id = diagram_id = faker.uuid4()
+
+    def component(component_id):
+        return Component(id=component_id, diagram_id=diagram_id, name=faker.word(), description=faker.text(),
+                         component_type="DataStore", threats=[
+                Threat(id=faker.uuid4(), component_id=component_id, name=faker.word(), description=faker.text(),
+                       stride_type="Spoofing", action="Not Applicable", reason=faker.text(),
+                       dread_scores=DREAD(damage=1, reproducibility=1, exploitability=1, affected_users=1,
+                                          discoverability=1))
+                for _ in range(2)])
+
+    return ThreatModel(id=threat_model_id, diagrams=[Diagram(
+        id=diagram_id,
+        threat_model_id=threat_model_id,
+        s3_prefix=faker.word() + ".png",
+        diagram_description=faker.text(),
+        components=[component(faker.uuid4()) for _ in range(2)],
+    )])
+
+
+@pytest.fixture
+def inner(threat_model):
+    inner = Mock(spec=ThreatModelRepository)
+    inner.get.return_value = threat_model
+    inner.get_diagram.return_value = threat_model.diagrams[0]
+    inner.get_component.side_effect = lambda component_id: next(
+        c for c in threat_model.diagrams[0].components if c.id == component_id)
+    inner.get_threat.side_effect = lambda threat_id: next(
+        t for c in threat_model.diagrams[0].components for t in c.threats if t.id == threat_id)
+    return inner
+
+
+@pytest.fixture
+def repo(inner):
+    return CachingThreatModelRepository(inner, max_size=16, ttl_seconds=60)
+
+
+def test_reads_are_cached(repo, inner, threat_model):
+    diagram = threat_model.diagrams[0]
+
+    # when
+    first = repo.get_diagram(diagram.id)
+    second = repo.get_diagram(diagram.id)
+
+    # then
+    assert first == second == diagram
+    inner.get_diagram.assert_called_once_with(diagram.id)
+    assert repo.stats()["diagram"] == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_threat_models_are_always_loaded_but_cache_their_entities(repo, inner, threat_model):
+    component = threat_model.diagrams[0].components[0]
+
+    # when
+    repo.get(threat_model.id)
+    loaded = repo.get(threat_model.id)
+
+    # then, threats written by the workflow are visible as soon as they are written
+    assert loaded == threat_model
+    assert inner.get.call_count == 2
+
+    # and
+    assert repo.get_diagram(threat_model.diagrams[0].id) == threat_model.diagrams[0]
+    assert repo.get_component(component.id) == component
+    assert repo.get_threat(component.threats[0].id) == component.threats[0]
+    inner.get_diagram.assert_not_called()
+    inner.get_component.assert_not_called()
+    inner.get_threat.assert_not_called()
+
+
+def test_callers_cannot_mutate_cached_entities(repo, threat_model):
+    diagram = threat_model.diagrams[0].model_copy(deep=True)
+
+    repo.get(threat_model.id).diagrams[0].components.clear()
+    repo.get_diagram(diagram.id).components.clear()
+
+    assert repo.get_diagram(diagram.id) == diagram
+
+
+def test_saving_a_threat_invalidates_its_ancestors_only(repo, inner, threat_model):
+    # given
+    repo.get(threat_model.id)
+    component, other_component = threat_model.diagrams[0].components
+    threat, other_threat = component.threats
+
+    # when
+    repo.save_threat(threat.model_copy(update={"action": "Mitigate"}))
+
+    # then
+    inner.save_threats.assert_called_once()
+
+    # reloading an entity caches its descendants again, so we go bottom up
+    repo.get_threat(threat.id)
+    repo.get_component(component.id)
+    repo.get_diagram(threat_model.diagrams[0].id)
+    repo.get(threat_model.id)
+    assert inner.get.call_count == 2
+    assert inner.get_diagram.call_count == 1
+    assert inner.get_component.call_count == 1
+    assert inner.get_threat.call_count == 1
+
+    # siblings are still cached
+    repo.get_component(other_component.id)
+    repo.get_threat(other_threat.id)
+    assert inner.get_component.call_count == 1
+    assert inner.get_threat.call_count == 1
+
+
+def test_updating_a_threat_invalidates_it_and_its_ancestors(repo, inner, threat_model):
+    # given
+    repo.get(threat_model.id)
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    inner.update_threat.return_value = threat.model_copy(update={"action": "Mitigate", "version": 1})
+
+    # when
+    repo.update_threat(threat.id, {"action": "Mitigate"}, expected_version=0)
+
+    # then
+    inner.update_threat.assert_called_once_with(threat.id, {"action": "Mitigate"}, 0)
+    repo.get_threat(threat.id)
+    repo.get(threat_model.id)
+    assert inner.get_threat.call_count == 1
+    assert inner.get.call_count == 2
+
+
+def test_bulk_updates_only_invalidate_the_threats_that_were_updated(repo, inner, threat_model):
+    # given
+    repo.get(threat_model.id)
+    component, other_component = threat_model.diagrams[0].components
+    threat, other_threat = component.threats[0], other_component.threats[0]
+    inner.update_threats.return_value = {threat.id: threat, other_threat.id: NotFoundException("not found")}
+
+    # when
+    repo.update_threats([ThreatUpdate(threat.id, {"action": "Mitigate"}),
+                         ThreatUpdate(other_threat.id, {"action": "Mitigate"})])
+
+    # then
+    repo.get_threat(other_threat.id)
+    repo.get_component(other_component.id)
+    repo.get_threat(threat.id)
+    assert inner.get_threat.call_count == 1
+    inner.get_component.assert_not_called()
+
+
+def test_deleting_an_unknown_component_invalidates_every_ancestor(repo, inner, faker, threat_model):
+    # given
+    repo.get(threat_model.id)
+    component = threat_model.diagrams[0].components[0]
+
+    # when, a component we never loaded
+    repo.delete_component(faker.uuid4())
+
+    # then
+    repo.get_component(component.id)
+    repo.get_diagram(threat_model.diagrams[0].id)
+    repo.get(threat_model.id)
+    assert inner.get.call_count == 2
+    assert inner.get_diagram.call_count == 1
+    inner.get_component.assert_not_called()
+
+
+def test_deleting_a_threat_model_invalidates_everything(repo, inner, threat_model):
+    repo.get(threat_model.id)
+
+    repo.delete(threat_model.id)
+
+    inner.delete.assert_called_once_with(threat_model.id, None)
+    assert all(stats["size"] == 0 for stats in repo.stats().values())
+
+
+def test_failed_writes_do_not_invalidate(repo, inner, threat_model):
+    repo.get(threat_model.id)
+    inner.delete_threat.side_effect = NotFoundException("not found")
+
+    with pytest.raises(NotFoundException):
+        repo.delete_threat(threat_model.diagrams[0].components[0].threats[0].id)
+
+    repo.get_diagram(threat_model.diagrams[0].id)
+    inner.get_diagram.assert_not_called()
+
+
+def test_entries_expire(inner, threat_model):
+    repo = CachingThreatModelRepository(inner, ttl_seconds=0)
+
+    repo.get_diagram(threat_model.diagrams[0].id)
+    repo.get_diagram(threat_model.diagrams[0].id)
+
+    assert inner.get_diagram.call_count == 2
+
+
+def test_least_recently_used_entries_are_evicted(inner, threat_model):
+    repo = CachingThreatModelRepository(inner, max_size=1)
+    component, other_component = threat_model.diagrams[0].components
+
+    repo.get_component(component.id)
+    repo.get_component(other_component.id)
+    repo.get_component(component.id)
+
+    assert inner.get_component.call_count == 3
+    assert repo.stats()["component"]["size"] == 1
+
+
+def test_list_diagrams_is_not_cached(repo, inner):
+    repo.list_diagrams()
+    repo.list_diagrams()
+
+    assert inner.list_diagrams.call_count == 2
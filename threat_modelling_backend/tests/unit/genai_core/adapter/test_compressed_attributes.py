@@ -0,0 +1,162 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import os
+
+import pytest
+from boto3.dynamodb.types import Binary
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD, DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
+from genai_core.repository import ThreatUpdate
+
+# subject under test
+from genai_core.adapter import SingleTableThreatModelRepository, DynamoDBThreatModelRepository
+from genai_core.adapter.dynamo_db_data_model import compress_text, decompress_text, COMPRESSION_THRESHOLD_BYTES, \
+    UNCOMPRESSED, ZLIB
+
+
+@pytest.fixture
+def threat_model(faker):
+    threat_model_id = diagram_id = component_id = faker.uuid4()
+
+    return ThreatModel(id=threat_model_id, diagrams=[Diagram(
+        id=diagram_id,
+        threat_model_id=threat_model_id,
+        s3_prefix=faker.word() + ".png",
+        user_description="a user description " * 50,
+        diagram_description="an exhaustive description " * 500,
+        created_at="2024-01-01T00:00:00+00:00",
+        components=[Component(id=component_id, diagram_id=diagram_id, name=faker.word(), description=faker.text(),
+                              component_type="DataStore", threats=[
+                # ids in the order we read threats back
+                Threat(id=f"{i}-{faker.uuid4()}", component_id=component_id, name=faker.word(),
+                       description=description, stride_type="Spoofing", action="Mitigate", reason="",
+                       dread_scores=DREAD(damage=1, reproducibility=1, exploitability=1, affected_users=1,
+                                          discoverability=1))
+                for i, description in enumerate(["short", "a long description " * 100])])],
+    )])
+
+
+@pytest.fixture(params=["multi_table", "single_table"])
+def repo(request, dynamodb, table_names):
+    if request.param == "single_table":
+        return SingleTableThreatModelRepository(request.getfixturevalue("single_table"))
+
+    request.getfixturevalue("tables")
+    return DynamoDBThreatModelRepository.from_table_names(*table_names)
+
+
+def save_tree(repo, threat_model: ThreatModel) -> None:
+    repo.save(threat_model)
+    repo.save_diagrams(threat_model.diagrams)
+    repo.save_components([c for d in threat_model.diagrams for c in d.components])
+    repo.save_threats([t for d in threat_model.diagrams for c in d.components for t in c.threats])
+
+
+def raw_items(repo) -> list[dict]:
+    """ Every diagram and threat item as stored """
+    if isinstance(repo, SingleTableThreatModelRepository):
+        return [item for item in repo.table.scan()["Items"] if item.get("entity_type") in ("Diagram", "Threat")]
+
+    return repo.diagrams.scan()["Items"] + repo.threats.scan()["Items"]
+
+
+def test_compress_text_only_compresses_past_the_threshold(faker):
+    short, long = "a" * (COMPRESSION_THRESHOLD_BYTES - 1), "a" * COMPRESSION_THRESHOLD_BYTES
+    # random bytes hardly compress
+    incompressible = os.urandom(COMPRESSION_THRESHOLD_BYTES).decode("latin-1")
+
+    assert compress_text(short) == UNCOMPRESSED + short.encode()
+    assert compress_text(long)[:1] == ZLIB
+    assert len(compress_text(long)) < len(long)
+    # never more than the format byte over the text itself
+    assert len(compress_text(incompressible)) <= len(incompressible.encode()) + 1
+
+    for value in [short, long, incompressible, "", "ünïcödé " * 100]:
+        assert decompress_text(compress_text(value)) == value
+        assert decompress_text(Binary(compress_text(value))) == value
+
+
+def test_decompress_text_reads_strings_as_they_are():
+    assert decompress_text("written before we compressed") == "written before we compressed"
+
+    with pytest.raises(ValueError, match="Unknown text encoding"):
+        decompress_text(b"\x07garbage")
+
+
+def test_repo_stores_descriptions_compressed(repo, threat_model):
+    # when
+    save_tree(repo, threat_model)
+
+    # then, descriptions are binary, and the long ones are smaller than the text
+    diagram = threat_model.diagrams[0]
+    for item in raw_items(repo):
+        for name in ["user_description", "diagram_description", "description"]:
+            if name in item:
+                assert isinstance(item[name], Binary)
+        if item.get("diagram_description") is not None:
+            assert len(item["diagram_description"].value) < len(diagram.diagram_description)
+
+    assert repo.get(threat_model.id) == threat_model
+    assert repo.get_threat(diagram.components[0].threats[1].id) == diagram.components[0].threats[1]
+
+
+def test_repo_compresses_updated_descriptions(repo, threat_model):
+    # given
+    save_tree(repo, threat_model)
+    threats = threat_model.diagrams[0].components[0].threats
+
+    # when
+    updated = repo.update_threat(threats[0].id, {"description": "now a long description " * 100})
+    repo.update_threats([ThreatUpdate(threat_id=threats[1].id, changes={"description": "and another one " * 100})])
+
+    # then
+    assert updated.description == "now a long description " * 100
+    assert repo.get_threat(threats[0].id).description == "now a long description " * 100
+    assert repo.get_threat(threats[1].id).description == "and another one " * 100
+    assert all(isinstance(item["description"], Binary) for item in raw_items(repo) if "description" in item)
+
+
+def test_repo_lists_previews_of_descriptions(repo, threat_model):
+    # given
+    save_tree(repo, threat_model)
+    diagram = threat_model.diagrams[0]
+
+    # when
+    summary = repo.list_diagram_summaries(limit=10).items[0]
+
+    # then
+    assert summary.user_description == diagram.user_description[:DIAGRAM_DESCRIPTION_PREVIEW_LENGTH]
+    assert summary.diagram_description == diagram.diagram_description[:DIAGRAM_DESCRIPTION_PREVIEW_LENGTH]
+
+
+def test_repo_backfills_compressed_attributes(repo, threat_model):
+    # given, items written before we compressed descriptions
+    save_tree(repo, threat_model)
+    diagram = threat_model.diagrams[0]
+    threats = {t.id: t for t in diagram.components[0].threats}
+
+    table = repo.table if isinstance(repo, SingleTableThreatModelRepository) else None
+    for item in raw_items(repo):
+        legacy = {**item, **({"user_description": diagram.user_description,
+                              "diagram_description": diagram.diagram_description}
+                             if "diagram_description" in item else {"description": threats[item["id"]].description})}
+        legacy.pop("user_description_preview", None)
+        (table or (repo.diagrams if "diagram_description" in item else repo.threats)).put_item(Item=legacy)
+
+    # and they still read as they are
+    assert repo.get(threat_model.id) == threat_model
+
+    # when
+    rewritten = repo.backfill_compressed_attributes()
+
+    # then
+    assert rewritten == 1 + len(threats)
+    assert repo.backfill_compressed_attributes() == 0
+    assert all(not isinstance(value, str) for item in raw_items(repo)
+               for name, value in item.items() if name in ["user_description", "diagram_description", "description"])
+
+    assert repo.get(threat_model.id) == threat_model
+    assert repo.list_diagram_summaries(limit=10).items[0].user_description == \
+           diagram.user_description[:DIAGRAM_DESCRIPTION_PREVIEW_LENGTH]
@@ -0,0 +1,75 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import pytest
+from unittest.mock import patch
+
+from pynamodb.exceptions import PutError
+
+from genai_core.adapter.dynamo_db_data_model import ComponentDataModel
+from genai_core.adapter.dynamodb_batch import batch_write
+
+
+def a_component(i, name="a name") -> ComponentDataModel:
+    return ComponentDataModel(id=f"c{i:03}", diagram_id="d", component_type="Process", name=name, description="")
+
+
+def test_batch_write_puts_and_deletes_items_in_chunks(tables):
+    # given
+    components = [a_component(i) for i in range(60)]
+
+    # when
+    with patch.object(ComponentDataModel._get_connection(), "batch_write_item",
+                      wraps=ComponentDataModel._get_connection().batch_write_item) as batch_write_item:
+        batch_write(ComponentDataModel, put=components, max_concurrency=4)
+
+    # then
+    assert batch_write_item.call_count == 3
+    assert ComponentDataModel.count() == 60
+
+    # and when
+    batch_write(ComponentDataModel, delete=components[:30])
+
+    # then
+    assert ComponentDataModel.count() == 30
+
+
+def test_batch_write_keeps_the_last_request_of_a_key(tables):
+    # when
+    batch_write(ComponentDataModel, put=[a_component(1, "first"), a_component(1, "second")])
+
+    # then
+    assert ComponentDataModel.get("c001").name == "second"
+
+
+@patch("genai_core.adapter.dynamodb_batch.sleep")
+def test_batch_write_retries_unprocessed_items(sleep, tables):
+    # given, the first request leaves the first item unprocessed
+    connection = ComponentDataModel._get_connection()
+    batch_write_item = connection.batch_write_item
+
+    def throttled_batch_write_item(put_items, delete_items):
+        batch_write_item(put_items=put_items[1:], delete_items=delete_items)
+        return {"UnprocessedItems": {"Components": [{"PutRequest": {"Item": put_items[0]}}]}}
+
+    calls = [throttled_batch_write_item, batch_write_item]
+
+    with patch.object(connection, "batch_write_item", side_effect=lambda **kwargs: calls.pop(0)(**kwargs)):
+        # when
+        batch_write(ComponentDataModel, put=[a_component(i) for i in range(3)])
+
+    # then
+    sleep.assert_called_once()
+    assert ComponentDataModel.count() == 3
+
+
+@patch("genai_core.adapter.dynamodb_batch.sleep")
+def test_batch_write_raises_when_items_stay_unprocessed(sleep, tables):
+    connection = ComponentDataModel._get_connection()
+
+    with patch.object(connection, "batch_write_item", side_effect=lambda put_items, delete_items: {
+        "UnprocessedItems": {"Components": [{"PutRequest": {"Item": item}} for item in put_items]}
+    }):
+        with pytest.raises(PutError, match="max retries exceeded"):
+            batch_write(ComponentDataModel, put=[a_component(1)])
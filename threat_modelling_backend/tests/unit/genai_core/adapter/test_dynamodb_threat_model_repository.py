@@ -11,11 +11,12 @@ from random import choice
 from mypy_boto3_dynamodb.service_resource import Table
 
 from genai_core.repository import DeleteItemException
-from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD, DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
 
 # subject under test
 from genai_core.adapter import DynamoDBThreatModelRepository
-from genai_core.repository import NotFoundException
+from genai_core.adapter.backfill import backfill
+from genai_core.repository import NotFoundException, VersionConflictException, ThreatUpdate
 
 
 @pytest.fixture
@@ -303,3 +304,243 @@ def test_repo_can_update_component(populated_tables, repo, threat_model, faker):
     persisted_updated_component = repo.get_component(updated_component.id)
 
     assert persisted_updated_component == updated_component
+
+
+def test_repo_updates_a_threat_in_place(populated_tables, repo, threat_model):
+    # given, items written before we tracked versions are at version 0
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    a_dread_score = DREAD(damage=5, reproducibility=4, exploitability=3, affected_users=2, discoverability=1)
+
+    # when
+    updated_threat = repo.update_threat(threat.id, {"action": "Mitigate", "dread_scores": a_dread_score.model_dump()},
+                                        expected_version=0)
+
+    # then
+    assert updated_threat == threat.model_copy(update={"action": "Mitigate", "dread_scores": a_dread_score,
+                                                       "version": 1})
+    assert repo.get_threat(threat.id) == updated_threat
+
+
+def test_repo_updates_a_component_in_place(populated_tables, repo, threat_model, faker):
+    component = threat_model.diagrams[0].components[0]
+    a_name = faker.word()
+
+    updated_component = repo.update_component(component.id, {"name": a_name})
+    updated_component = repo.update_component(component.id, {"description": "updated"}, expected_version=1)
+
+    assert updated_component == component.model_copy(update={"name": a_name, "description": "updated",
+                                                             "threats": [], "version": 2})
+    assert repo.get_component(component.id).threats == component.threats
+
+
+def test_repo_update_raises_on_version_conflicts(populated_tables, repo, threat_model):
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    repo.update_threat(threat.id, {"action": "Mitigate"})
+
+    with pytest.raises(VersionConflictException) as e:
+        repo.update_threat(threat.id, {"action": "Transfer"}, expected_version=0)
+
+    assert e.value.current_version == 1
+    assert repo.get_threat(threat.id).action == "Mitigate"
+
+
+def test_repo_update_raises_when_items_do_not_exist(tables, repo, faker):
+    with pytest.raises(NotFoundException):
+        repo.update_threat(faker.uuid4(), {"action": "Mitigate"})
+
+    with pytest.raises(NotFoundException):
+        repo.update_component(faker.uuid4(), {"name": faker.word()})
+
+
+def test_repo_update_rejects_fields_that_cannot_be_updated(populated_tables, repo, threat_model):
+    with pytest.raises(ValueError):
+        repo.update_threat(threat_model.diagrams[0].components[0].threats[0].id, {"component_id": "elsewhere"})
+
+
+def test_repo_updates_threats_in_bulk(populated_tables, repo, threat_model, faker):
+    # given, the threat we populated (without a version) and two new ones
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    conflicting_threat, invalid_threat = [threat.model_copy(update={"id": faker.uuid4()}) for _ in range(2)]
+    repo.save_threats([conflicting_threat, invalid_threat])
+    a_missing_threat_id = faker.uuid4()
+
+    # when
+    results = repo.update_threats([
+        ThreatUpdate(threat.id, {"action": "Mitigate", "reason": "a reason"}, expected_version=0),
+        ThreatUpdate(conflicting_threat.id, {"action": "Mitigate"}, expected_version=3),
+        ThreatUpdate(invalid_threat.id, {"component_id": "elsewhere"}),
+        ThreatUpdate(a_missing_threat_id, {"action": "Mitigate"}),
+    ])
+
+    # then, each update succeeds or fails on its own
+    assert results[threat.id] == threat.model_copy(update={"action": "Mitigate", "reason": "a reason", "version": 1})
+    assert isinstance(results[conflicting_threat.id], VersionConflictException)
+    assert isinstance(results[invalid_threat.id], ValueError)
+    assert isinstance(results[a_missing_threat_id], NotFoundException)
+
+    assert repo.get_threat(threat.id) == results[threat.id]
+    assert repo.get_threat(conflicting_threat.id) == conflicting_threat
+
+
+def test_repo_bulk_updates_do_not_overwrite_concurrent_updates(populated_tables, repo, threat_model):
+    # given, another request updates the threat while the bulk update is in flight
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    update = repo._update
+
+    def update_concurrently(*args):
+        repo._update = update
+        repo.update_threat(threat.id, {"action": "Transfer"})
+        return update(*args)
+
+    repo._update = update_concurrently
+
+    # when
+    results = repo.update_threats([ThreatUpdate(threat.id, {"action": "Mitigate"}, expected_version=0)])
+
+    # then
+    assert isinstance(results[threat.id], VersionConflictException)
+    assert results[threat.id].current_version == 1
+    assert repo.get_threat(threat.id).action == "Transfer"
+
+
+def test_repo_bulk_updates_do_not_write_invalid_changes(populated_tables, repo, threat_model):
+    threat = threat_model.diagrams[0].components[0].threats[0]
+
+    results = repo.update_threats([ThreatUpdate(threat.id, {"stride_type": "Phishing"})])
+
+    assert isinstance(results[threat.id], ValueError)
+    assert repo.get_threat(threat.id) == threat
+
+
+def test_repo_update_threats_rejects_duplicate_threats(populated_tables, repo, threat_model):
+    threat = threat_model.diagrams[0].components[0].threats[0]
+
+    with pytest.raises(ValueError):
+        repo.update_threats([ThreatUpdate(threat.id, {"action": "Mitigate"}),
+                             ThreatUpdate(threat.id, {"action": "Transfer"})])
+
+
+def test_repo_deletes_threats_in_bulk(populated_tables, repo, threat_model, faker):
+    # given
+    threats = [t for c in threat_model.diagrams[0].components for t in c.threats]
+    a_missing_threat_id = faker.uuid4()
+
+    # when
+    results = repo.delete_threats([t.id for t in threats] + [a_missing_threat_id])
+
+    # then
+    assert all(results[t.id] is None for t in threats)
+    assert isinstance(results[a_missing_threat_id], NotFoundException)
+    with pytest.raises(NotFoundException):
+        repo.get_threat(threats[-1].id)
+
+
+def test_repo_deletes_a_threat_model_and_everything_in_it(populated_tables, repo, threat_model, faker):
+    # given
+    another_threat_model = ThreatModel(id=faker.uuid4())
+    repo.save(another_threat_model)
+    progress = []
+
+    # when
+    deleted = repo.delete(threat_model.id, on_progress=lambda deleted, total: progress.append((deleted, total)))
+
+    # then, children go first and the threat model last
+    assert deleted == 4
+    assert progress == [(1, 4), (2, 4), (3, 4), (4, 4)]
+    assert all(table.scan()["Count"] == 0 for table in populated_tables[1:])
+    assert populated_tables[0].scan()["Items"] == [{"id": another_threat_model.id}]
+
+    with pytest.raises(NotFoundException):
+        repo.delete(threat_model.id)
+
+
+def test_repo_can_get_threat_model_with_many_components(tables, repo, faker, threat_model_id, s3_prefix):
+    # given, ids are sorted because the indexes return items ordered by their range key
+    threat_model = ThreatModel(id=threat_model_id, diagrams=[Diagram(
+        id=f"d{d}", threat_model_id=threat_model_id, s3_prefix=s3_prefix, diagram_description=faker.text(),
+        components=[Component(
+            id=f"d{d}-c{c:02}", diagram_id=f"d{d}", name=faker.word(), description=faker.text(),
+            component_type="Process",
+            threats=[Threat(id=f"d{d}-c{c:02}-t{t}", component_id=f"d{d}-c{c:02}", name=faker.word(),
+                            description=faker.text(), stride_type="Tampering", action="Not Applicable",
+                            reason=faker.text(),
+                            dread_scores=DREAD(damage=1, reproducibility=2, exploitability=3, affected_users=4,
+                                               discoverability=5))
+                     for t in range(2)])
+            for c in range(12)])
+        for d in range(2)])
+
+    repo.save(threat_model)
+    repo.save_diagrams(threat_model.diagrams)
+    repo.save_components([c for d in threat_model.diagrams for c in d.components])
+    repo.save_threats([t for d in threat_model.diagrams for c in d.components for t in c.threats])
+
+    # when
+    retrieved_threat_model = repo.get(threat_model.id)
+
+    # then
+    assert retrieved_threat_model == threat_model
+
+
+def test_repo_delete_raises_when_items_do_not_exist(tables, repo, faker):
+    # given
+    an_id = faker.word()
+
+    # then
+    with pytest.raises(NotFoundException, match=f"Component {an_id} does not exist"):
+        repo.delete_component(an_id)
+
+    with pytest.raises(NotFoundException, match=f"Threat {an_id} does not exist"):
+        repo.delete_threat(an_id)
+
+
+def test_repo_lists_diagram_summaries_newest_first_one_page_at_a_time(tables, repo, faker):
+    # given, diagrams created a day apart, one of them before we tracked creation times
+    diagrams = [Diagram(id=faker.uuid4(), threat_model_id=faker.uuid4(), s3_prefix=faker.word() + ".png",
+                        diagram_description="a" * 1000, created_at=f"2024-01-0{day}T00:00:00+00:00")
+                for day in range(1, 6)]
+    for diagram in diagrams:
+        repo.save(ThreatModel(id=diagram.threat_model_id))
+    repo.save_diagrams(diagrams + [Diagram(threat_model_id=diagrams[0].threat_model_id, s3_prefix="legacy.png",
+                                           diagram_description="legacy")])
+
+    # when
+    first_page = repo.list_diagram_summaries(limit=3)
+    second_page = repo.list_diagram_summaries(limit=3, next_token=first_page.next_token)
+
+    # then
+    assert [d.id for d in first_page.items + second_page.items] == [d.id for d in reversed(diagrams)]
+    assert first_page.next_token is not None
+    assert second_page.next_token is None
+    assert first_page.items[0].s3_prefix == diagrams[-1].s3_prefix
+    assert first_page.items[0].created_at == diagrams[-1].created_at
+    assert first_page.items[0].diagram_description == "a" * DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
+
+
+def test_repo_rejects_invalid_next_tokens(tables, repo):
+    with pytest.raises(ValueError, match="Invalid nextToken"):
+        repo.list_diagram_summaries(limit=3, next_token="not a token")
+
+
+def test_repo_backfills_diagram_summaries(populated_tables, repo, threat_model):
+    # given, diagrams saved before we tracked creation times
+    assert repo.list_diagram_summaries(limit=10).items == []
+
+    # when
+    updated = repo.backfill_diagram_summaries()
+
+    # then
+    assert updated == len(threat_model.diagrams)
+    assert [d.id for d in repo.list_diagram_summaries(limit=10).items] == [d.id for d in threat_model.diagrams]
+    assert repo.backfill_diagram_summaries() == 0
+
+
+def test_backfill_runs_every_backfill_of_the_repository(populated_tables, repo, threat_model):
+    # when
+    results = backfill(repo)
+
+    # then
+    assert results["backfill_diagram_summaries"] == len(threat_model.diagrams)
+    assert set(results) == {"backfill_diagram_summaries", "backfill_compressed_attributes", "backfill_risk_summaries"}
+    assert [d.id for d in repo.list_diagram_summaries(limit=10).items] == [d.id for d in threat_model.diagrams]
+    assert backfill(repo)["backfill_diagram_summaries"] == 0
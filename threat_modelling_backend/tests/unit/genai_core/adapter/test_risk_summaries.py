@@ -0,0 +1,164 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import pytest
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD, RiskSummary, ThreatTypeCount, \
+    ActionCount, DreadScoreBinCount
+from genai_core.repository import ThreatUpdate
+
+# subject under test
+from genai_core.adapter import SingleTableThreatModelRepository, DynamoDBThreatModelRepository
+
+
+@pytest.fixture
+def threat_model(faker):
+    threat_model_id = diagram_id = faker.uuid4()
+
+    def threat(component_id, stride_type, action, reason, score):
+        return Threat(id=faker.uuid4(), component_id=component_id, name=faker.word(), description=faker.text(),
+                      stride_type=stride_type, action=action, reason=reason,
+                      dread_scores=DREAD(damage=score, reproducibility=score, exploitability=score,
+                                         affected_users=score, discoverability=score))
+
+    def component(component_id):
+        return Component(id=component_id, diagram_id=diagram_id, name=faker.word(), description=faker.text(),
+                         component_type="DataStore", threats=[
+                threat(component_id, "Spoofing", "Mitigate", "", 1),
+                threat(component_id, "Tampering", "Mitigate", faker.text(), 3),
+                threat(component_id, "Tampering", "Avoid", faker.text(), 9),
+            ])
+
+    return ThreatModel(id=threat_model_id, diagrams=[Diagram(
+        id=diagram_id,
+        threat_model_id=threat_model_id,
+        s3_prefix=faker.word() + ".png",
+        diagram_description=faker.text(),
+        components=[component(faker.uuid4()) for _ in range(2)],
+    )])
+
+
+def save_tree(repo, threat_model: ThreatModel) -> None:
+    repo.save(threat_model)
+    repo.save_diagrams(threat_model.diagrams)
+    repo.save_components([c for d in threat_model.diagrams for c in d.components])
+    repo.save_threats([t for d in threat_model.diagrams for c in d.components for t in c.threats])
+
+
+@pytest.fixture(params=["multi_table", "single_table"])
+def repo(request, dynamodb, table_names):
+    if request.param == "single_table":
+        return SingleTableThreatModelRepository(request.getfixturevalue("single_table"))
+
+    request.getfixturevalue("tables")
+    return DynamoDBThreatModelRepository.from_table_names(
+        *table_names, risk_summaries_table_name=request.getfixturevalue("risk_summaries_table").name)
+
+
+@pytest.fixture
+def populated_repo(repo, threat_model):
+    save_tree(repo, threat_model)
+    return repo
+
+
+def assert_summaries_match_threats(repo, diagram_id: str) -> None:
+    diagram = repo.get_diagram(diagram_id)
+
+    assert repo.get_diagram_risk_summary(diagram_id) == RiskSummary.of(
+        [t for c in diagram.components for t in c.threats])
+    for component in diagram.components:
+        assert repo.get_component_risk_summary(component.id) == RiskSummary.of(component.threats)
+
+
+def test_risk_summary_counts_threats():
+    threats = [Threat(component_id="c", name="n", description="d", stride_type=stride_type, action=action,
+                      reason=reason, dread_scores=DREAD(damage=score, reproducibility=score, exploitability=score,
+                                                        affected_users=score, discoverability=score))
+               for stride_type, action, reason, score in [("Spoofing", "Mitigate", "", 1),
+                                                          ("Spoofing", "Mitigate", "because", 3),
+                                                          ("Tampering", "Avoid", "because", 10)]]
+
+    assert RiskSummary.of(threats) == RiskSummary(
+        threats=3, evaluated=2, not_evaluated=1,
+        by_threat_type=[ThreatTypeCount(threat_type="Spoofing", count=2),
+                        ThreatTypeCount(threat_type="Tampering", count=1)],
+        by_action=[ActionCount(action="Avoid", evaluated=1),
+                   ActionCount(action="Mitigate", evaluated=1, not_evaluated=1)],
+        dread_score_histogram=[DreadScoreBinCount(bin="1-10", count=1), DreadScoreBinCount(bin="10-20", count=1),
+                               DreadScoreBinCount(bin="20-30", count=0), DreadScoreBinCount(bin="30-40", count=0),
+                               DreadScoreBinCount(bin="40-50", count=1)])
+
+
+def test_saving_threats_counts_them(populated_repo, threat_model):
+    summary = populated_repo.get_diagram_risk_summary(threat_model.diagrams[0].id)
+
+    assert summary.threats == 6
+    assert summary.evaluated == 4
+    assert_summaries_match_threats(populated_repo, threat_model.diagrams[0].id)
+
+
+def test_saving_a_threat_again_replaces_its_counts(populated_repo, threat_model):
+    threat = threat_model.diagrams[0].components[0].threats[0]
+
+    populated_repo.save_threat(threat.model_copy(update={"stride_type": "Repudiation", "reason": "because"}))
+    populated_repo.save_threats([threat.model_copy(update={"action": "Transfer"})])
+
+    assert populated_repo.get_diagram_risk_summary(threat_model.diagrams[0].id).threats == 6
+    assert_summaries_match_threats(populated_repo, threat_model.diagrams[0].id)
+
+
+def test_updates_move_counts(populated_repo, threat_model):
+    threat, another_threat, _ = threat_model.diagrams[0].components[0].threats
+
+    populated_repo.update_threat(threat.id, {"action": "Avoid", "reason": "because"})
+    populated_repo.update_threats([ThreatUpdate(another_threat.id, {"stride_type": "Spoofing",
+                                                                    "dread_scores": {"damage": 10,
+                                                                                     "reproducibility": 10,
+                                                                                     "exploitability": 10,
+                                                                                     "affected_users": 10,
+                                                                                     "discoverability": 10}})])
+    # changes that don't touch the counters
+    populated_repo.update_threat(threat.id, {"name": "renamed"})
+
+    assert_summaries_match_threats(populated_repo, threat_model.diagrams[0].id)
+
+
+def test_deletes_take_counts_back(populated_repo, threat_model):
+    component, another_component = threat_model.diagrams[0].components
+
+    populated_repo.delete_threat(component.threats[0].id)
+    populated_repo.delete_threats([t.id for t in another_component.threats])
+
+    assert populated_repo.get_diagram_risk_summary(threat_model.diagrams[0].id).threats == 2
+    assert populated_repo.get_component_risk_summary(another_component.id) == RiskSummary.of([])
+    assert_summaries_match_threats(populated_repo, threat_model.diagrams[0].id)
+
+
+def test_backfill_recounts_summaries(populated_repo, threat_model):
+    # given, counters that drifted, e.g. a write that failed after the threats were written
+    populated_repo._add_risk_counters(before=[], after=threat_model.diagrams[0].components[0].threats)
+    assert populated_repo.get_diagram_risk_summary(threat_model.diagrams[0].id).threats == 9
+
+    # when
+    recounted = populated_repo.backfill_risk_summaries()
+
+    # then
+    assert recounted == 1
+    assert_summaries_match_threats(populated_repo, threat_model.diagrams[0].id)
+
+
+def test_saving_and_deleting_threats_in_bulk_keeps_counts_exact(populated_repo, threat_model):
+    component, another_component = threat_model.diagrams[0].components
+    threat, another_threat, _ = component.threats
+
+    populated_repo.save_threats([
+        threat.model_copy(update={"action": "Transfer", "reason": "because"}),
+        another_threat.model_copy(update={"stride_type": "Repudiation"}),
+        # the last of the same threat wins
+        another_threat.model_copy(update={"stride_type": "ElevationOfPrivileges"}),
+    ])
+    populated_repo.delete_threats([another_component.threats[0].id, another_component.threats[0].id, "missing"])
+
+    assert populated_repo.get_diagram_risk_summary(threat_model.diagrams[0].id).threats == 5
+    assert_summaries_match_threats(populated_repo, threat_model.diagrams[0].id)
@@ -0,0 +1,346 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import pytest
+from unittest.mock import Mock
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD, DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
+from genai_core.repository import DeleteItemException, NotFoundException, VersionConflictException, ThreatUpdate
+
+# subject under test
+from genai_core.adapter import SingleTableThreatModelRepository, DynamoDBThreatModelRepository
+from genai_core.adapter.single_table_migration import migrate, scan_threat_model_ids
+
+
+@pytest.fixture
+def threat_model(faker):
+    threat_model_id = diagram_id = faker.uuid4()
+
+    def component(component_id):
+        return Component(id=component_id, diagram_id=diagram_id, name=faker.word(), description=faker.text(),
+                         component_type="DataStore", threats=[
+                Threat(id=faker.uuid4(), component_id=component_id, name=faker.word(), description=faker.text(),
+                       stride_type="Spoofing", action="Not Applicable", reason=faker.text(),
+                       dread_scores=DREAD(damage=1, reproducibility=2, exploitability=3, affected_users=4,
+                                          discoverability=5))
+                for _ in range(3)])
+
+    return ThreatModel(id=threat_model_id, diagrams=[Diagram(
+        id=diagram_id,
+        threat_model_id=threat_model_id,
+        s3_prefix=faker.word() + ".png",
+        diagram_description=faker.text(),
+        components=sorted([component(faker.uuid4()) for _ in range(3)], key=lambda c: c.id),
+    )])
+
+
+@pytest.fixture
+def repo(single_table):
+    return SingleTableThreatModelRepository(single_table)
+
+
+@pytest.fixture
+def populated_repo(repo, threat_model):
+    repo.save_tree(threat_model)
+    return repo
+
+
+def sorted_threats(threat_model: ThreatModel) -> ThreatModel:
+    """ threats are returned ordered by id, the order they are stored in """
+    for component in threat_model.diagrams[0].components:
+        component.threats.sort(key=lambda t: t.id)
+    return threat_model
+
+
+def test_repo_can_get_threat_model(populated_repo, threat_model, single_table):
+    # given
+    single_table.meta.client = Mock(wraps=single_table.meta.client)
+
+    # when
+    retrieved_threat_model = SingleTableThreatModelRepository(single_table).get(threat_model.id)
+
+    # then, a single query loads the whole tree
+    assert retrieved_threat_model == sorted_threats(threat_model)
+    assert [c[0] for c in single_table.meta.client.method_calls] == ["query"]
+
+
+def test_repo_can_get_diagram(populated_repo, threat_model):
+    assert populated_repo.get_diagram(threat_model.diagrams[0].id) == sorted_threats(threat_model).diagrams[0]
+
+
+def test_repo_can_get_component(single_table, populated_repo, threat_model):
+    component = sorted_threats(threat_model).diagrams[0].components[1]
+
+    # a fresh repository has to read the reference of the component first
+    assert SingleTableThreatModelRepository(single_table).get_component(component.id) == component
+
+
+def test_repo_can_get_threat(populated_repo, threat_model):
+    threat = threat_model.diagrams[0].components[0].threats[0]
+
+    assert populated_repo.get_threat(threat.id) == threat
+
+
+def test_repo_raises_when_not_found(faker, repo):
+    a_nonexistent_id = faker.word()
+
+    with pytest.raises(NotFoundException, match=f"ThreatModel {a_nonexistent_id} not found"):
+        repo.get(a_nonexistent_id)
+
+    with pytest.raises(NotFoundException, match=f"Diagram {a_nonexistent_id} does not exist"):
+        repo.get_diagram(a_nonexistent_id)
+
+    with pytest.raises(NotFoundException):
+        repo.get_threat(a_nonexistent_id)
+
+
+def test_repo_can_list_diagrams(populated_repo, threat_model):
+    retrieved_diagrams = populated_repo.list_diagrams()
+
+    assert [d.id for d in retrieved_diagrams] == [d.id for d in threat_model.diagrams]
+    assert all(len(d.components) == 0 for d in retrieved_diagrams)
+
+
+def test_repo_can_save_a_threat_model_level_by_level(repo, threat_model):
+    # when
+    repo.save(threat_model)
+    repo.save_diagrams(threat_model.diagrams)
+    repo.save_components([c for d in threat_model.diagrams for c in d.components])
+    repo.save_threats([t for d in threat_model.diagrams for c in d.components for t in c.threats])
+
+    # then
+    assert repo.get(threat_model.id) == sorted_threats(threat_model)
+
+
+def test_repo_can_update_a_threat(populated_repo, threat_model):
+    threat = threat_model.diagrams[0].components[0].threats[0]
+
+    populated_repo.save_threat(threat.model_copy(update={"action": "Mitigate"}))
+
+    assert populated_repo.get_threat(threat.id).action == "Mitigate"
+
+
+def test_repo_updates_a_threat_with_a_single_request(populated_repo, threat_model, single_table):
+    # given
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    single_table.meta.client = Mock(wraps=single_table.meta.client)
+
+    # when
+    updated_threat = populated_repo.update_threat(threat.id, {"action": "Mitigate"}, expected_version=0)
+
+    # then
+    assert updated_threat == threat.model_copy(update={"action": "Mitigate", "version": 1})
+    # and the risk summaries of its component and diagram are updated with one request each
+    assert [c[0] for c in single_table.meta.client.method_calls] == ["update_item"] * 3
+    assert populated_repo.get_threat(threat.id) == updated_threat
+
+
+def test_repo_updates_a_component_in_place(populated_repo, threat_model):
+    component = threat_model.diagrams[0].components[0]
+
+    updated_component = populated_repo.update_component(component.id, {"name": "renamed"})
+
+    assert updated_component == component.model_copy(update={"name": "renamed", "threats": [], "version": 1})
+    assert populated_repo.get_component(component.id).name == "renamed"
+
+
+def test_repo_update_raises_on_version_conflicts_and_missing_items(faker, populated_repo, threat_model):
+    component = threat_model.diagrams[0].components[0]
+    populated_repo.update_component(component.id, {"name": "renamed"})
+
+    with pytest.raises(VersionConflictException) as e:
+        populated_repo.update_component(component.id, {"name": "again"}, expected_version=0)
+    assert e.value.current_version == 1
+
+    with pytest.raises(NotFoundException):
+        populated_repo.update_threat(faker.uuid4(), {"action": "Mitigate"})
+
+    with pytest.raises(ValueError):
+        populated_repo.update_component(component.id, {"diagram_id": "elsewhere"})
+
+
+def test_repo_updates_threats_in_bulk_with_batched_requests(single_table, populated_repo, threat_model, faker):
+    # given, a fresh repository has to read the references of the threats too
+    repo = SingleTableThreatModelRepository(single_table)
+    threat, conflicting_threat = threat_model.diagrams[0].components[0].threats[:2]
+    a_missing_threat_id = faker.uuid4()
+    single_table.meta.client = Mock(wraps=single_table.meta.client)
+
+    # when
+    results = repo.update_threats([
+        ThreatUpdate(threat.id, {"action": "Mitigate"}),
+        ThreatUpdate(conflicting_threat.id, {"action": "Mitigate"}, expected_version=1),
+        ThreatUpdate(a_missing_threat_id, {"action": "Mitigate"}),
+    ])
+
+    # then, references are read with a single BatchGetItem, and each threat that exists is updated with a conditional
+    # UpdateItem (a failed one reads the threat again), then the risk summaries of their component (located with another
+    # BatchGetItem) and diagram are updated
+    calls = [c[0] for c in single_table.meta.client.method_calls]
+    assert calls[0] == "batch_get_item"
+    assert sorted(calls[1:-3]) == ["get_item", "update_item", "update_item"]
+    assert calls[-3:] == ["batch_get_item", "update_item", "update_item"]
+    assert results[threat.id] == threat.model_copy(update={"action": "Mitigate", "version": 1})
+    assert isinstance(results[conflicting_threat.id], VersionConflictException)
+    assert isinstance(results[a_missing_threat_id], NotFoundException)
+    assert repo.get_threat(threat.id) == results[threat.id]
+
+
+def test_repo_deletes_threats_in_bulk(populated_repo, threat_model, faker):
+    component = threat_model.diagrams[0].components[0]
+    a_missing_threat_id = faker.uuid4()
+
+    results = populated_repo.delete_threats([t.id for t in component.threats] + [a_missing_threat_id])
+
+    assert all(results[t.id] is None for t in component.threats)
+    assert isinstance(results[a_missing_threat_id], NotFoundException)
+    assert populated_repo.get_component(component.id).threats == []
+
+
+def test_repo_does_not_delete_a_component_with_threats(populated_repo, threat_model):
+    component = threat_model.diagrams[0].components[0]
+
+    with pytest.raises(DeleteItemException) as e:
+        populated_repo.delete_component(component.id)
+
+    assert sorted(e.value.errors) == sorted(f"Threat {t.id}" for t in component.threats)
+
+
+def test_repo_can_delete_threats_and_components(populated_repo, threat_model):
+    component = threat_model.diagrams[0].components[0]
+
+    # when
+    for threat in component.threats:
+        populated_repo.delete_threat(threat.id)
+    populated_repo.delete_component(component.id)
+
+    # then
+    with pytest.raises(NotFoundException):
+        populated_repo.get_component(component.id)
+    with pytest.raises(NotFoundException):
+        populated_repo.get_threat(component.threats[0].id)
+    assert component.id not in [c.id for c in populated_repo.get(threat_model.id).diagrams[0].components]
+
+
+def test_repo_deletes_a_threat_model_and_everything_in_it(single_table, populated_repo, threat_model, faker):
+    # given
+    another_threat_model = ThreatModel(id=faker.uuid4())
+    populated_repo.save(another_threat_model)
+    progress = []
+
+    # when
+    deleted = populated_repo.delete(threat_model.id, on_progress=lambda deleted, total: progress.append(total))
+
+    # then, references are deleted too, even those of a fresh repository
+    assert deleted == 1 + 1 + 3 + 9
+    assert progress == [deleted]
+    assert [item["PK"] for item in single_table.scan()["Items"]] == [f"TM#{another_threat_model.id}"]
+
+    with pytest.raises(NotFoundException):
+        populated_repo.get_threat(threat_model.diagrams[0].components[0].threats[0].id)
+    with pytest.raises(NotFoundException):
+        SingleTableThreatModelRepository(single_table).delete(threat_model.id)
+
+
+def test_repo_raises_when_deleting_a_nonexistent_component(faker, repo):
+    with pytest.raises(NotFoundException):
+        repo.delete_component(faker.word())
+
+
+def test_migration_copies_threat_models_from_the_multi_table_design(tables, table_names, repo, threat_model):
+    # given
+    source = DynamoDBThreatModelRepository.from_table_names(*table_names)
+    source.save(threat_model)
+    source.save_diagrams(threat_model.diagrams)
+    source.save_components(threat_model.diagrams[0].components)
+    source.save_threats([t for c in threat_model.diagrams[0].components for t in c.threats])
+
+    # when
+    results = migrate(source, repo, scan_threat_model_ids(source))
+
+    # then, diagrams without a creation time get stamped so that they can be listed
+    migrated_threat_model = repo.get(threat_model.id)
+    assert results == {threat_model.id: None}
+    assert migrated_threat_model.diagrams[0].created_at is not None
+    assert migrated_threat_model.model_copy(update={"diagrams": [
+        d.model_copy(update={"created_at": None}) for d in migrated_threat_model.diagrams
+    ]}) == sorted_threats(threat_model)
+
+
+def test_migration_does_not_overwrite_threat_models_already_migrated(tables, table_names, repo, threat_model):
+    # given, a threat model edited in the single table after a first run
+    source = DynamoDBThreatModelRepository.from_table_names(*table_names)
+    source.save(threat_model)
+    source.save_diagrams(threat_model.diagrams)
+    source.save_components(threat_model.diagrams[0].components)
+    source.save_threats([t for c in threat_model.diagrams[0].components for t in c.threats])
+    migrate(source, repo, [threat_model.id])
+
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    repo.update_threat(threat.id, {"name": "edited"})
+
+    # when
+    results = migrate(source, repo, [threat_model.id])
+
+    # then
+    assert results == {threat_model.id: None}
+    assert repo.get_threat(threat.id).name == "edited"
+
+
+def test_migration_completes_threat_models_partially_copied(tables, table_names, repo, threat_model):
+    # given, a first run interrupted before the threats are copied
+    source = DynamoDBThreatModelRepository.from_table_names(*table_names)
+    source.save(threat_model)
+    source.save_diagrams(threat_model.diagrams)
+    source.save_components(threat_model.diagrams[0].components)
+    source.save_threats([t for c in threat_model.diagrams[0].components for t in c.threats])
+
+    save_threats = repo.save_threats
+    repo.save_threats = Mock(side_effect=Exception("interrupted"))
+    assert migrate(source, repo, [threat_model.id]) == {threat_model.id: "interrupted"}
+    repo.save_threats = save_threats
+
+    # when
+    results = migrate(source, repo, [threat_model.id])
+
+    # then
+    assert results == {threat_model.id: None}
+    assert [len(c.threats) for c in repo.get(threat_model.id).diagrams[0].components] == [3, 3, 3]
+
+
+def test_migration_reports_failures(faker, tables, table_names, repo):
+    source = DynamoDBThreatModelRepository.from_table_names(*table_names)
+    a_nonexistent_id = faker.word()
+
+    results = migrate(source, repo, [a_nonexistent_id])
+
+    assert results == {a_nonexistent_id: f"ThreatModel {a_nonexistent_id} not found"}
+
+
+def test_repo_lists_diagram_summaries_newest_first_one_page_at_a_time(repo, faker):
+    # given, diagrams created a day apart, one of them before we tracked creation times
+    diagrams = [Diagram(id=faker.uuid4(), threat_model_id=faker.uuid4(), s3_prefix=faker.word() + ".png",
+                        diagram_description="a" * 1000, created_at=f"2024-01-0{day}T00:00:00+00:00")
+                for day in range(1, 6)]
+    for diagram in diagrams:
+        repo.save(ThreatModel(id=diagram.threat_model_id))
+    repo.save_diagrams(diagrams + [Diagram(threat_model_id=diagrams[0].threat_model_id, s3_prefix="legacy.png",
+                                           diagram_description="legacy")])
+
+    # when
+    first_page = repo.list_diagram_summaries(limit=3)
+    second_page = repo.list_diagram_summaries(limit=3, next_token=first_page.next_token)
+
+    # then
+    assert [d.id for d in first_page.items + second_page.items] == [d.id for d in reversed(diagrams)]
+    assert first_page.next_token is not None
+    assert second_page.next_token is None
+    assert first_page.items[0].s3_prefix == diagrams[-1].s3_prefix
+    assert first_page.items[0].created_at == diagrams[-1].created_at
+    assert first_page.items[0].diagram_description == "a" * DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
+
+
+def test_repo_rejects_invalid_next_tokens(repo):
+    with pytest.raises(ValueError, match="Invalid nextToken"):
+        repo.list_diagram_summaries(limit=3, next_token="not a token")
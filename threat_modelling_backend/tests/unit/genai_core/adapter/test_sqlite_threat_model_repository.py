@@ -0,0 +1,106 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import sqlite3
+
+import pytest
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD
+
+# subject under test
+from genai_core.adapter import SQLiteThreatModelRepository
+from genai_core.adapter import environment
+
+
+@pytest.fixture
+def threat_model(faker):
+    threat_model_id = diagram_id = faker.uuid4()
+
+    return ThreatModel(id=threat_model_id, diagrams=[Diagram(
+        id=diagram_id, threat_model_id=threat_model_id, s3_prefix="diagram.png", diagram_description=faker.text(),
+        components=[Component(id=f"c{c:03}", diagram_id=diagram_id, name=faker.word(), component_type="Process",
+                              threats=[Threat(id=f"c{c:03}-t{t:02}", component_id=f"c{c:03}", name=faker.word(),
+                                              description=faker.text(), stride_type="Spoofing",
+                                              dread_scores=DREAD(damage=1, reproducibility=1, exploitability=1,
+                                                                 affected_users=1, discoverability=1))
+                                       for t in range(10)])
+                    for c in range(100)],
+    )])
+
+
+def test_repo_loads_a_tree_with_a_single_query(threat_model):
+    # given
+    repo = SQLiteThreatModelRepository.from_path(":memory:")
+    repo.save(threat_model)
+    repo.save_diagrams(threat_model.diagrams)
+    repo.save_components(threat_model.diagrams[0].components)
+    repo.save_threats([t for c in threat_model.diagrams[0].components for t in c.threats])
+
+    statements = []
+    repo.connection.set_trace_callback(statements.append)
+
+    # when
+    loaded = repo.get(threat_model.id)
+
+    # then
+    assert loaded == threat_model
+    assert len(statements) == 1
+
+
+class CountingConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def executemany(self, sql, parameters):
+        parameters = list(parameters)
+        self.batches.append(len(parameters))
+        return super().executemany(sql, parameters)
+
+
+def test_repo_writes_batches_with_a_single_statement(threat_model):
+    # given
+    repo = SQLiteThreatModelRepository(sqlite3.connect(":memory:", factory=CountingConnection))
+    threats = [t for c in threat_model.diagrams[0].components for t in c.threats]
+
+    # when
+    repo.save_threats(threats)
+
+    # then
+    assert repo.connection.batches == [len(threats)]
+    assert repo.get_threat(threats[-1].id) == threats[-1]
+
+
+def test_repo_queries_children_through_their_parent_indexes():
+    # given
+    repo = SQLiteThreatModelRepository.from_path(":memory:")
+
+    # when
+    plans = repo.query_plans()
+
+    # then
+    tree = " | ".join(plans["threat_model_tree"])
+    assert "diagrams_by_threat_model" in tree
+    assert "components_by_diagram" in tree
+    assert "threats_by_component" in tree
+    assert any("diagrams_by_created_at" in detail for detail in plans["diagram_summaries"])
+    assert all("SCAN" not in detail for details in plans.values() for detail in details)
+
+
+def test_repo_keeps_threat_models_in_its_database_file(tmp_path, threat_model):
+    # given
+    path = str(tmp_path / "threat_models.db")
+    SQLiteThreatModelRepository.from_path(path).save(threat_model)
+
+    # then
+    assert SQLiteThreatModelRepository.from_path(path).get(threat_model.id) == ThreatModel(id=threat_model.id)
+
+
+def test_repository_from_environment_prefers_sqlite(monkeypatch, tmp_path):
+    # given
+    monkeypatch.setenv("SQLITE_DATABASE_PATH", str(tmp_path / "threat_models.db"))
+    monkeypatch.setenv("THREAT_MODELS_TABLE_NAME", "ThreatModels")
+
+    # then
+    assert isinstance(environment.repository_from_environment(), SQLiteThreatModelRepository)
@@ -0,0 +1,250 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import pytest
+from time import time_ns
+from unittest.mock import Mock
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD
+from genai_core.repository import ThreatModelRepository, NotFoundException
+from genai_core.adapter import DynamoDBThreatModelRepository
+
+# subject under test
+from genai_core.adapter import DocumentThreatModelRepository, ThreatModelDocumentStore
+from genai_core.adapter.threat_model_documents import ThreatModelLocator, rebuild_documents, record_version
+import genai_core.adapter.threat_model_documents as threat_model_documents
+
+
+@pytest.fixture
+def threat_model(faker):
+    threat_model_id = faker.uuid4()
+    diagram_id = faker.uuid4()
+    component_id = faker.uuid4()
+
+    return ThreatModel(id=threat_model_id, diagrams=[Diagram(
+        id=diagram_id,
+        threat_model_id=threat_model_id,
+        s3_prefix=faker.word() + ".png",
+        diagram_description=faker.text(),
+        components=[
+            Component(id=component_id, diagram_id=diagram_id, name=faker.word(), description=faker.text(),
+                      component_type="DataStore", threats=[
+                    Threat(id=faker.uuid4(), component_id=component_id, name=faker.word(), description=faker.text(),
+                           stride_type="Spoofing", action="Not Applicable", reason=faker.text(),
+                           dread_scores=DREAD(damage=1, reproducibility=1, exploitability=1, affected_users=1,
+                                              discoverability=1))
+                ]),
+        ]
+    )])
+
+
+@pytest.fixture
+def store(documents_table):
+    return ThreatModelDocumentStore(documents_table)
+
+
+@pytest.fixture
+def repo(tables, table_names):
+    return DynamoDBThreatModelRepository.from_table_names(*table_names)
+
+
+def _save_tree(repo, threat_model: ThreatModel) -> None:
+    repo.save(threat_model)
+    repo.save_diagrams(threat_model.diagrams)
+    for diagram in threat_model.diagrams:
+        repo.save_components(diagram.components)
+        for component in diagram.components:
+            repo.save_threats(component.threats)
+
+
+def _record(table_name: str, keys: dict, old_image: dict = None) -> dict:
+    record = {"eventSourceARN": f"arn:aws:dynamodb:us-east-1:123456789012:table/{table_name}/stream/2024-01-01T00:00",
+              "dynamodb": {"Keys": {name: {"S": value} for name, value in keys.items()}, "SequenceNumber": "1",
+                           "ApproximateCreationDateTime": 1704067200.0}}
+    if old_image is not None:
+        record["dynamodb"]["OldImage"] = {name: {"S": value} for name, value in old_image.items()}
+    return record
+
+
+def test_store_returns_the_document_of_a_threat_model(store, threat_model):
+    assert store.get(threat_model.id) is None
+
+    assert store.put(threat_model, version=1)
+
+    assert store.get(threat_model.id) == threat_model
+
+
+def test_store_does_not_replace_a_newer_document(store, threat_model):
+    # given
+    store.put(threat_model, version=2)
+    stale = threat_model.model_copy(update={"diagrams": []})
+
+    # when
+    stored = store.put(stale, version=1)
+
+    # then
+    assert not stored
+    assert store.get(threat_model.id) == threat_model
+
+
+def test_store_replaces_a_document_of_the_same_version(store, threat_model):
+    # records of the same second share a version
+    store.put(threat_model.model_copy(update={"diagrams": []}), version=1)
+
+    assert store.put(threat_model, version=1)
+
+    assert store.get(threat_model.id) == threat_model
+
+
+def test_store_does_not_return_documents_older_than_asked_for(store, threat_model):
+    store.put(threat_model, version=1)
+
+    assert store.get(threat_model.id, min_version=2) is None
+    assert store.get(threat_model.id, min_version=1) == threat_model
+
+
+def test_store_removes_documents_with_a_tombstone(store, documents_table, threat_model):
+    # given
+    store.put(threat_model, version=1)
+
+    # when
+    store.remove(threat_model.id, version=2)
+
+    # then
+    assert store.get(threat_model.id) is None
+    assert "expires_at" in documents_table.get_item(Key={"id": threat_model.id})["Item"]
+    # a rebuild that read the threat model before it was deleted can't bring it back
+    assert not store.put(threat_model, version=1)
+
+
+def test_store_does_not_materialize_large_threat_models(store, threat_model, monkeypatch):
+    monkeypatch.setattr(threat_model_documents, "DOCUMENT_MAX_BYTES", 10)
+
+    assert store.put(threat_model, version=1)
+
+    assert store.get(threat_model.id) is None
+
+
+def test_document_repository_reads_documents_first(store, threat_model):
+    # given
+    inner = Mock(spec=ThreatModelRepository)
+    inner.get.side_effect = NotFoundException("not found")
+    store.put(threat_model, version=1)
+
+    # when
+    retrieved_threat_model = DocumentThreatModelRepository(inner, store).get(threat_model.id)
+
+    # then
+    assert retrieved_threat_model == threat_model
+    inner.get.assert_not_called()
+
+
+def test_document_repository_falls_back_to_the_tables(store, threat_model):
+    inner = Mock(spec=ThreatModelRepository)
+    inner.get.return_value = threat_model
+
+    assert DocumentThreatModelRepository(inner, store).get(threat_model.id) == threat_model
+    inner.get.assert_called_once_with(threat_model.id)
+
+
+def test_document_repository_does_not_serve_documents_older_than_its_writes(store, threat_model):
+    # given, a document rebuilt a second before we update one of its threats
+    inner = Mock(spec=ThreatModelRepository)
+    inner.get.return_value = threat_model
+    repo = DocumentThreatModelRepository(inner, store)
+    repo.get(threat_model.id)
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    stale_version = time_ns() - 1_000_000_000
+    store.put(threat_model, version=stale_version)
+
+    # when
+    repo.delete_threat(threat.id)
+
+    # then, the document doesn't include the delete yet
+    repo.get(threat_model.id)
+    assert inner.get.call_count == 2
+
+    # until it is rebuilt from the record of the delete
+    store.put(threat_model, version=time_ns() + 1_000_000_000)
+    repo.get(threat_model.id)
+    assert inner.get.call_count == 2
+
+
+def test_document_repository_does_not_serve_documents_of_the_same_second_as_its_writes(store, threat_model):
+    # given, a document rebuilt from a record of the same second as our write, which may predate it
+    inner = Mock(spec=ThreatModelRepository)
+    inner.get.return_value = threat_model
+    repo = DocumentThreatModelRepository(inner, store)
+    repo.get(threat_model.id)
+    threat = threat_model.diagrams[0].components[0].threats[0]
+    same_second_version = time_ns() // 1_000_000_000 * 1_000_000_000
+
+    # when
+    repo.delete_threat(threat.id)
+    store.put(threat_model, version=same_second_version)
+
+    # then
+    repo.get(threat_model.id)
+    assert inner.get.call_count == 2
+
+
+def test_document_repository_does_not_serve_any_document_after_writing_an_unknown_entity(store, threat_model, faker):
+    inner = Mock(spec=ThreatModelRepository)
+    inner.get.return_value = threat_model
+    repo = DocumentThreatModelRepository(inner, store)
+    store.put(threat_model, version=time_ns() - 1_000_000_000)
+
+    repo.delete_threat(faker.uuid4())
+    repo.get(threat_model.id)
+
+    inner.get.assert_called_once_with(threat_model.id)
+
+
+def test_record_version():
+    record = _record("ThreatModelItems", {"PK": "TM#1", "SK": "TM#"})
+
+    assert record_version(record) == 1704067200 * 1_000_000_000
+
+
+def test_locator_finds_the_threat_model_of_records_of_every_table(repo, table_names, threat_model):
+    # given
+    _save_tree(repo, threat_model)
+    threat_models_table_name, diagrams_table_name, components_table_name, threats_table_name = table_names
+    diagram = threat_model.diagrams[0]
+    component = diagram.components[0]
+    threat = component.threats[0]
+    locator = ThreatModelLocator()
+
+    # then
+    assert locator.threat_model_id_of(_record(threat_models_table_name, {"id": threat_model.id})) == threat_model.id
+    assert locator.threat_model_id_of(
+        _record(diagrams_table_name, {"id": diagram.id}, {"threat_model_id": threat_model.id})) == threat_model.id
+    assert locator.threat_model_id_of(
+        _record(components_table_name, {"id": component.id}, {"diagram_id": diagram.id})) == threat_model.id
+    assert locator.threat_model_id_of(
+        _record(threats_table_name, {"id": threat.id}, {"component_id": component.id})) == threat_model.id
+
+
+def test_locator_finds_the_threat_model_of_single_table_records(faker):
+    locator = ThreatModelLocator()
+    threat_model_id = faker.uuid4()
+
+    assert locator.threat_model_id_of(
+        _record("ThreatModelItems", {"PK": f"TM#{threat_model_id}", "SK": "DIAGRAM#1"})) == threat_model_id
+    assert locator.threat_model_id_of(_record("ThreatModelItems", {"PK": "REF#1", "SK": "REF"})) is None
+
+
+def test_rebuild_documents(repo, store, threat_model, faker):
+    # given
+    _save_tree(repo, threat_model)
+    deleted_threat_model_id = faker.uuid4()
+    store.put(threat_model.model_copy(update={"id": deleted_threat_model_id}), version=1)
+
+    # when
+    errors = rebuild_documents({threat_model.id: 2, deleted_threat_model_id: 2}, repo, store)
+
+    # then
+    assert errors == {threat_model.id: None, deleted_threat_model_id: None}
+    assert store.get(threat_model.id) == threat_model
+    assert store.get(deleted_threat_model_id) is None
@@ -0,0 +1,224 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+"""
+What every ThreatModelRepository must do, whatever stores the threat models. Each test runs against every
+implementation.
+"""
+
+import pytest
+
+from genai_core.model import ThreatModel, Diagram, Component, Threat, DREAD, RiskSummary, \
+    DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
+from genai_core.repository import NotFoundException, DeleteItemException, VersionConflictException, ThreatUpdate
+
+# subject under test
+from genai_core.adapter import DynamoDBThreatModelRepository, SingleTableThreatModelRepository, \
+    SQLiteThreatModelRepository, AsyncDynamoDBThreatModelRepository, SyncThreatModelRepository
+
+
+@pytest.fixture(params=["multi_table", "single_table", "sqlite", "async"])
+def repo(request, table_names):
+    if request.param == "async":
+        request.getfixturevalue("tables")
+        repo = SyncThreatModelRepository(AsyncDynamoDBThreatModelRepository.from_table_names(*table_names))
+        yield repo
+        repo.close()
+    elif request.param == "sqlite":
+        yield SQLiteThreatModelRepository.from_path(":memory:")
+    elif request.param == "single_table":
+        yield SingleTableThreatModelRepository(request.getfixturevalue("single_table"))
+    else:
+        request.getfixturevalue("tables")
+        yield DynamoDBThreatModelRepository.from_table_names(*table_names)
+
+
+@pytest.fixture
+def threat_model(faker):
+    threat_model_id = faker.uuid4()
+    diagram_id = faker.uuid4()
+
+    def threat(component_id, i):
+        return Threat(id=f"{component_id}-t{i}", component_id=component_id, name=faker.word(), description=faker.text(),
+                      stride_type="Tampering", action="Mitigate", reason="",
+                      dread_scores=DREAD(damage=1, reproducibility=2, exploitability=3, affected_users=4,
+                                         discoverability=5))
+
+    # ids in the order the repositories read them back
+    return ThreatModel(id=threat_model_id, diagrams=[Diagram(
+        id=diagram_id,
+        threat_model_id=threat_model_id,
+        s3_prefix=faker.word() + ".png",
+        diagram_description=faker.text(),
+        components=[Component(id=f"c{c}", diagram_id=diagram_id, name=faker.word(), description=faker.text(),
+                              component_type="DataStore", threats=[threat(f"c{c}", t) for t in range(3)])
+                    for c in range(3)],
+    )])
+
+
+@pytest.fixture
+def populated_repo(repo, threat_model):
+    repo.save(threat_model)
+    repo.save_diagrams(threat_model.diagrams)
+    repo.save_components([c for d in threat_model.diagrams for c in d.components])
+    repo.save_threats([t for d in threat_model.diagrams for c in d.components for t in c.threats])
+    return repo
+
+
+def test_repo_gets_what_it_saved(populated_repo, threat_model):
+    diagram = threat_model.diagrams[0]
+    component = diagram.components[1]
+
+    assert populated_repo.get(threat_model.id) == threat_model
+    assert populated_repo.get_diagram(diagram.id) == diagram
+    assert populated_repo.get_component(component.id) == component
+    assert populated_repo.get_threat(component.threats[2].id) == component.threats[2]
+    assert populated_repo.list_diagrams() == [diagram.model_copy(update={"components": []})]
+
+
+def test_repo_saves_entities_one_at_a_time(repo, threat_model):
+    diagram = threat_model.diagrams[0]
+
+    repo.save(threat_model)
+    repo.save_diagram(diagram)
+    for component in diagram.components:
+        repo.save_component(component)
+        for threat in component.threats:
+            repo.save_threat(threat)
+
+    assert repo.get(threat_model.id) == threat_model
+
+
+def test_repo_overwrites_what_it_saves_again(populated_repo, threat_model):
+    threat = threat_model.diagrams[0].components[0].threats[0].model_copy(update={"name": "renamed"})
+
+    populated_repo.save_threats([threat])
+
+    assert populated_repo.get_threat(threat.id) == threat
+
+
+def test_repo_raises_when_not_found(repo, faker):
+    an_id = faker.uuid4()
+
+    with pytest.raises(NotFoundException):
+        repo.get(an_id)
+    with pytest.raises(NotFoundException):
+        repo.get_diagram(an_id)
+    with pytest.raises(NotFoundException):
+        repo.get_component(an_id)
+    with pytest.raises(NotFoundException):
+        repo.get_threat(an_id)
+
+
+def test_repo_updates_in_place_and_checks_versions(populated_repo, threat_model):
+    component = threat_model.diagrams[0].components[0]
+    threat = component.threats[0]
+
+    updated = populated_repo.update_threat(threat.id, {"reason": "accepted",
+                                                       "dread_scores": {"damage": 9, "reproducibility": 9,
+                                                                        "exploitability": 9, "affected_users": 9,
+                                                                        "discoverability": 9}},
+                                           expected_version=0)
+    assert updated == threat.model_copy(update={"reason": "accepted", "version": 1, "dread_scores": DREAD(
+        damage=9, reproducibility=9, exploitability=9, affected_users=9, discoverability=9)})
+    assert populated_repo.get_threat(threat.id) == updated
+
+    with pytest.raises(VersionConflictException) as e:
+        populated_repo.update_threat(threat.id, {"reason": "again"}, expected_version=0)
+    assert e.value.current_version == 1
+
+    assert populated_repo.update_component(component.id, {"name": "renamed"}) == \
+           component.model_copy(update={"name": "renamed", "version": 1, "threats": []})
+
+    with pytest.raises(NotFoundException):
+        populated_repo.update_threat("missing", {"reason": "none"})
+    with pytest.raises(ValueError, match="can't be updated"):
+        populated_repo.update_threat(threat.id, {"component_id": "elsewhere"})
+
+
+def test_repo_updates_threats_in_bulk(populated_repo, threat_model):
+    threats = threat_model.diagrams[0].components[0].threats
+
+    results = populated_repo.update_threats([
+        ThreatUpdate(threat_id=threats[0].id, changes={"name": "first"}),
+        ThreatUpdate(threat_id=threats[1].id, changes={"name": "second"}, expected_version=3),
+        ThreatUpdate(threat_id="missing", changes={"name": "none"}),
+    ])
+
+    assert list(results) == [threats[0].id, threats[1].id, "missing"]
+    assert results[threats[0].id] == threats[0].model_copy(update={"name": "first", "version": 1})
+    assert isinstance(results[threats[1].id], VersionConflictException)
+    assert isinstance(results["missing"], NotFoundException)
+    assert populated_repo.get_threat(threats[0].id).name == "first"
+    assert populated_repo.get_threat(threats[1].id) == threats[1]
+
+    with pytest.raises(ValueError, match="only be updated once"):
+        populated_repo.update_threats([ThreatUpdate(threat_id=threats[0].id, changes={}),
+                                       ThreatUpdate(threat_id=threats[0].id, changes={})])
+
+
+def test_repo_deletes_threats_and_empty_components(populated_repo, threat_model):
+    component = threat_model.diagrams[0].components[0]
+
+    with pytest.raises(DeleteItemException) as e:
+        populated_repo.delete_component(component.id)
+    assert e.value.errors == [f"Threat {threat.id}" for threat in component.threats]
+
+    populated_repo.delete_threat(component.threats[0].id)
+    results = populated_repo.delete_threats([threat.id for threat in component.threats[1:]] + ["missing"])
+    populated_repo.delete_component(component.id)
+
+    assert [error is None for error in results.values()] == [True, True, False]
+    with pytest.raises(NotFoundException):
+        populated_repo.get_component(component.id)
+    with pytest.raises(NotFoundException):
+        populated_repo.delete_threat(component.threats[0].id)
+    with pytest.raises(NotFoundException):
+        populated_repo.delete_component(component.id)
+
+
+def test_repo_deletes_a_threat_model_and_everything_in_it(populated_repo, threat_model):
+    progress = []
+
+    deleted = populated_repo.delete(threat_model.id, on_progress=lambda done, total: progress.append((done, total)))
+
+    # the threat model, its diagram, 3 components and 9 threats
+    assert deleted == 14
+    assert progress[-1] == (14, 14)
+    with pytest.raises(NotFoundException):
+        populated_repo.get(threat_model.id)
+    with pytest.raises(NotFoundException):
+        populated_repo.get_threat(threat_model.diagrams[0].components[0].threats[0].id)
+    with pytest.raises(NotFoundException):
+        populated_repo.delete(threat_model.id)
+
+
+def test_repo_lists_diagram_summaries_newest_first_one_page_at_a_time(repo, faker):
+    diagrams = [Diagram(id=faker.uuid4(), threat_model_id=faker.uuid4(), s3_prefix=faker.word() + ".png",
+                        diagram_description="a" * 1000, created_at=f"2024-01-0{day}T00:00:00+00:00")
+                for day in range(1, 6)]
+    for diagram in diagrams:
+        repo.save(ThreatModel(id=diagram.threat_model_id))
+    repo.save_diagrams(diagrams + [Diagram(threat_model_id=diagrams[0].threat_model_id, s3_prefix="legacy.png",
+                                           diagram_description="legacy")])
+
+    first_page = repo.list_diagram_summaries(limit=3)
+    second_page = repo.list_diagram_summaries(limit=3, next_token=first_page.next_token)
+
+    assert [d.id for d in first_page.items + second_page.items] == [d.id for d in reversed(diagrams)]
+    assert first_page.next_token is not None
+    assert second_page.next_token is None
+    assert first_page.items[0].diagram_description == "a" * DIAGRAM_DESCRIPTION_PREVIEW_LENGTH
+
+    with pytest.raises(ValueError, match="Invalid nextToken"):
+        repo.list_diagram_summaries(limit=3, next_token="not a token")
+
+
+def test_repo_summarizes_risks(populated_repo, threat_model):
+    diagram = threat_model.diagrams[0]
+
+    assert populated_repo.get_diagram_risk_summary(diagram.id) == RiskSummary.of(
+        [t for c in diagram.components for t in c.threats])
+    assert populated_repo.get_component_risk_summary(diagram.components[0].id) == RiskSummary.of(
+        diagram.components[0].threats)
@@ -0,0 +1,86 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import patch, Mock
+
+from genai_core.clients import BedrockClientPool, BedrockClient, bedrock_client_pool
+
+
+@pytest.fixture
+def a_role(faker):
+    return f"arn:aws:iam::123456789012:role/{faker.word()}"
+
+
+@pytest.fixture(autouse=True)
+def clear_pool():
+    bedrock_client_pool.clear()
+    yield
+    bedrock_client_pool.clear()
+
+
+@pytest.fixture
+def create_bedrock_client():
+    with patch("genai_core.clients._create_bedrock_client") as _create_bedrock_client:
+        _create_bedrock_client.side_effect = lambda **kwargs: (Mock(), datetime.now(timezone.utc) + timedelta(hours=1))
+        yield _create_bedrock_client
+
+
+def test_pool_reuses_clients_for_the_same_key(create_bedrock_client, a_role):
+    pool = BedrockClientPool()
+
+    # when
+    first = pool.get(assumed_role=a_role, region="us-west-2", model_id="a-model")
+    second = pool.get(assumed_role=a_role, region="us-west-2", model_id="a-model")
+
+    # then
+    assert first is second
+    assert create_bedrock_client.call_count == 1
+    assert pool.stats() == {"hits": 1, "misses": 1, "refreshes": 0, "size": 1}
+
+
+def test_pool_creates_one_client_per_key(create_bedrock_client, a_role):
+    pool = BedrockClientPool()
+
+    # when
+    first = pool.get(assumed_role=a_role, region="us-west-2", model_id="a-model")
+    second = pool.get(assumed_role=a_role, region="us-west-2", model_id="another-model")
+
+    # then
+    assert first is not second
+    assert pool.stats()["misses"] == 2
+
+
+def test_pool_refreshes_clients_before_credentials_expire(create_bedrock_client, a_role):
+    pool = BedrockClientPool(refresh_window=timedelta(minutes=5))
+    create_bedrock_client.side_effect = [
+        (Mock(), datetime.now(timezone.utc) + timedelta(minutes=4)),
+        (Mock(), datetime.now(timezone.utc) + timedelta(hours=1)),
+    ]
+
+    # when
+    first = pool.get(assumed_role=a_role)
+    second = pool.get(assumed_role=a_role)
+
+    # then, since the first credentials were about to expire, we expect a new client
+    assert first is not second
+    assert pool.stats()["refreshes"] == 1
+
+
+def test_bedrock_client_refreshes_credentials_when_token_expires(create_bedrock_client, a_role):
+    expired_client, fresh_client = Mock(), Mock()
+    expired_client.converse.side_effect = Exception("An error occurred (ExpiredTokenException)")
+    create_bedrock_client.side_effect = [
+        (expired_client, datetime.now(timezone.utc) + timedelta(hours=1)),
+        (fresh_client, datetime.now(timezone.utc) + timedelta(hours=1)),
+    ]
+
+    # when
+    response = BedrockClient(assumed_role=a_role).converse(modelId="a-model")
+
+    # then
+    assert response == fresh_client.converse.return_value
+    assert bedrock_client_pool.stats()["refreshes"] == 1
@@ -0,0 +1,133 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import boto3
+from moto import mock_aws
+import pytest
+from unittest.mock import patch, Mock
+
+from genai_core.converse_cache import (
+    CachedConverseClient, InMemoryLRUBackend, FileSystemBackend, DynamoDBBackend, converse_cache_key
+)
+
+
+@pytest.fixture
+def a_request():
+    return {
+        "modelId": "anthropic.claude-3-5-sonnet-20240620-v1:0",
+        "system": [{"text": "You are a security specialist"}],
+        "inferenceConfig": {"maxTokens": 4000, "temperature": 0},
+        "messages": [{"role": "user", "content": [{"image": {"format": "png", "source": {"bytes": b"image"}}}]}],
+    }
+
+
+@pytest.fixture
+def a_response():
+    return {"output": {"message": {"role": "assistant", "content": [{"text": "a description"}]}},
+            "stopReason": "end_turn", "usage": {"inputTokens": 1, "outputTokens": 1, "totalTokens": 2}, "metrics": {"latencyMs": 1}}
+
+
+@pytest.fixture
+def bedrock_client(a_response):
+    client = Mock()
+    client.converse.return_value = a_response
+    return client
+
+
+@pytest.fixture
+def dynamodb_table_name(aws_credentials):
+    with mock_aws():
+        table_name = "ConverseCache"
+        boto3.resource("dynamodb", region_name="us-east-1").create_table(
+            TableName=table_name,
+            KeySchema=[{"AttributeName": "key", "KeyType": "HASH"}],
+            BillingMode="PAY_PER_REQUEST",
+            AttributeDefinitions=[{"AttributeName": "key", "AttributeType": "S"}])
+        yield table_name
+
+
+def test_cache_key_hashes_image_bytes(a_request):
+    key = converse_cache_key(a_request)
+
+    a_request["messages"][0]["content"][0]["image"]["source"]["bytes"] = b"another image"
+
+    assert key != converse_cache_key(a_request)
+    assert len(key) == 64
+
+
+@pytest.mark.parametrize("backend_factory", [
+    lambda tmp_path, _: InMemoryLRUBackend(),
+    lambda tmp_path, _: FileSystemBackend(directory=str(tmp_path)),
+    lambda _, table_name: DynamoDBBackend(table_name=table_name),
+])
+@patch("genai_core.converse_cache.cache_metrics")
+def test_cached_client_serves_repeated_requests_from_cache(cache_metrics: Mock, backend_factory, tmp_path,
+                                                           dynamodb_table_name, bedrock_client, a_request, a_response):
+    client = CachedConverseClient(bedrock_client, backend=backend_factory(tmp_path, dynamodb_table_name))
+
+    # when
+    first = client.converse(**a_request)
+    second = client.converse(**a_request)
+
+    # then, we only invoked the model once
+    assert bedrock_client.converse.call_count == 1
+    assert first == a_response
+    assert second == {**a_response, "cacheHit": True}
+    assert [c.kwargs["hit"] for c in cache_metrics.call_args_list] == [False, True]
+
+
+@patch("genai_core.converse_cache.cache_metrics")
+def test_cached_client_can_bypass_cache(cache_metrics: Mock, bedrock_client, a_request):
+    client = CachedConverseClient(bedrock_client, backend=InMemoryLRUBackend())
+
+    # when
+    client.converse(**a_request)
+    client.converse(bypass_cache=True, **a_request)
+
+    # then
+    assert bedrock_client.converse.call_count == 2
+
+
+@patch("genai_core.converse_cache.cache_metrics")
+def test_cached_client_does_not_cache_non_deterministic_requests(cache_metrics: Mock, bedrock_client, a_request):
+    client = CachedConverseClient(bedrock_client, backend=InMemoryLRUBackend())
+    a_request["inferenceConfig"]["temperature"] = 0.5
+
+    # when
+    client.converse(**a_request)
+    client.converse(**a_request)
+
+    # then
+    assert bedrock_client.converse.call_count == 2
+
+
+@pytest.mark.parametrize("stop_reason", ["max_tokens", "guardrail_intervened", "content_filtered"])
+@patch("genai_core.converse_cache.cache_metrics")
+def test_cached_client_does_not_cache_incomplete_responses(cache_metrics: Mock, stop_reason, bedrock_client, a_request,
+                                                           a_response):
+    client = CachedConverseClient(bedrock_client, backend=InMemoryLRUBackend())
+    bedrock_client.converse.return_value = {**a_response, "stopReason": stop_reason}
+
+    # when
+    client.converse(**a_request)
+    client.converse(**a_request)
+
+    # then
+    assert bedrock_client.converse.call_count == 2
+
+
+def test_in_memory_backend_evicts_expired_and_least_recently_used_items():
+    backend = InMemoryLRUBackend(max_size=2, ttl_seconds=60)
+    backend.set("a", "1")
+    backend.set("b", "2")
+    backend.get("a")
+    backend.set("c", "3")
+
+    assert backend.get("b") is None
+    assert backend.get("a") == "1"
+
+    expired = InMemoryLRUBackend(ttl_seconds=0)
+    expired.set("a", "1")
+
+    assert expired.get("a") is None
@@ -0,0 +1,78 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import threading
+from time import sleep
+
+import pytest
+from unittest.mock import Mock
+
+from genai_core.converse_executor import ConverseExecutor
+
+
+def test_executor_returns_results_in_submission_order():
+    executor = ConverseExecutor(max_in_flight=4)
+
+    def slow_echo(value, delay):
+        sleep(delay)
+        return value
+
+    # when, the first requests are the slowest ones
+    results = executor.map(slow_echo, [(i, 0.05 * (5 - i)) for i in range(5)])
+
+    # then
+    assert results == [0, 1, 2, 3, 4]
+
+
+def test_executor_limits_requests_in_flight():
+    max_in_flight = 2
+    executor = ConverseExecutor(max_in_flight=max_in_flight)
+
+    lock = threading.Lock()
+    in_flight, peak = [0], [0]
+
+    def track(_):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+
+    # when
+    executor.map(track, [(i,) for i in range(10)])
+
+    # then
+    assert peak[0] <= max_in_flight
+
+
+def test_executor_propagates_per_request_errors():
+    executor = ConverseExecutor(max_in_flight=2)
+
+    def maybe_fail(i):
+        if i == 1:
+            raise ValueError("boom")
+        return i
+
+    # when we ask for exceptions, they are returned in place of results
+    results = executor.map(maybe_fail, [(i,) for i in range(3)], return_exceptions=True)
+
+    assert results[0] == 0 and results[2] == 2
+    assert isinstance(results[1], ValueError)
+
+    # otherwise, the error is raised
+    with pytest.raises(ValueError, match="boom"):
+        executor.map(maybe_fail, [(i,) for i in range(3)])
+
+
+def test_executor_can_run_converse_requests():
+    bedrock_client = Mock()
+    bedrock_client.converse.side_effect = lambda **kwargs: {"modelId": kwargs["modelId"]}
+    executor = ConverseExecutor(bedrock_client=bedrock_client)
+
+    # when
+    responses = executor.converse_all([{"modelId": "a"}, {"modelId": "b"}])
+
+    # then
+    assert responses == [{"modelId": "a"}, {"modelId": "b"}]
@@ -84,3 +84,27 @@ def test_describe_diagram_can_use_example_retriever(get_bedrock_client: Mock, Ex
     assert kwargs["modelId"] == model_id.value
     assert len(kwargs["messages"]) == 3  # a pair or user+assistant for the example + the final user message
     assert kwargs["messages"][1]["content"][0]["text"] == some_examples[0]["diagram_description"]
+
+
+@patch("genai_core.diagram_describer.ExampleRetriever")
+@patch("genai_core.diagram_describer.get_bedrock_client")
+def test_describe_diagram_only_caches_the_shared_system_prompt(get_bedrock_client: Mock, ExampleRetriever: Mock):
+    from genai_core.diagram_describer import describe_diagram
+
+    # given
+    bedrock_client = Mock()
+    get_bedrock_client.return_value = bedrock_client
+    ExampleRetriever.return_value.get_operation_examples.return_value = [
+        {"image_bytes": b"data", "diagram_description": "some_description"}]
+    model_id = ConverseModelIds.CLAUDE_V3_5_SONNET_V2_MODEL_ID
+
+    # when
+    describe_diagram(image=b"data", model_id=model_id)
+    describe_diagram(image=b"data", model_id=model_id, user_description="a user description")
+
+    # then
+    without_description, with_description = [c.kwargs for c in bedrock_client.converse.call_args_list]
+    assert without_description["system"][-1] == {"cachePoint": {"type": "default"}}
+    assert all("cachePoint" not in block for block in with_description["system"])
+    assert all("cachePoint" not in block for request in (without_description, with_description)
+               for message in request["messages"] for block in message["content"])
@@ -0,0 +1,132 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import boto3
+from moto import mock_aws
+import numpy as np
+import pytest
+from unittest.mock import Mock
+
+
+@pytest.fixture(autouse=True)
+def mock_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATA_BUCKET_NAME", "test_bucket_name")
+    monkeypatch.setattr("genai_core.example_index.EXAMPLE_INDEX_DIRECTORY", str(tmp_path))
+
+
+@pytest.fixture(autouse=True)
+def clear_examples_cache():
+    from genai_core.example_retriever import examples_cache
+
+    examples_cache.clear()
+
+
+@pytest.fixture(scope="function")
+def s3(aws_credentials):
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="test_bucket_name")
+        yield s3
+
+
+def a_vector(*values) -> np.ndarray:
+    from genai_core.example_index import EMBEDDING_DIMENSIONS
+
+    vector = np.zeros(EMBEDDING_DIMENSIONS, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector / np.linalg.norm(vector)
+
+
+def test_index_only_embeds_new_or_changed_images():
+    from genai_core.example_index import ExampleIndex
+
+    # given
+    embed = Mock(side_effect=lambda key: a_vector(1, len(key)))
+    index, changed = ExampleIndex([], []).update({"a.png": "1", "bb.png": "1"}, embed)
+    assert changed and embed.call_count == 2
+
+    # when
+    embed.reset_mock()
+    unchanged_index, changed = index.update({"a.png": "1", "bb.png": "1"}, embed)
+
+    # then
+    assert not changed and unchanged_index is index
+    embed.assert_not_called()
+
+    # and when an image changes, we only embed that one
+    index, changed = index.update({"a.png": "1", "bb.png": "2", "ccc.png": "1"}, embed)
+    assert changed
+    assert [c.args[0] for c in embed.call_args_list] == ["bb.png", "ccc.png"]
+    assert index.keys == ["a.png", "bb.png", "ccc.png"]
+
+
+def test_index_returns_the_nearest_examples():
+    from genai_core.example_index import ExampleIndex
+
+    index = ExampleIndex(["x.png", "y.png", "xy.png"], ["1", "1", "1"],
+                         np.stack([a_vector(1, 0), a_vector(0, 1), a_vector(1, 1)]))
+
+    assert index.nearest(a_vector(1, 0.1), k=2) == ["x.png", "xy.png"]
+    assert index.nearest(a_vector(0, 1), k=1) == ["y.png"]
+
+
+def test_index_is_shared_through_s3(s3, tmp_path):
+    from genai_core.example_index import ExampleIndex
+
+    # given
+    index = ExampleIndex(["x.png"], ["1"], np.stack([a_vector(1, 0)]))
+
+    # when
+    index.save(s3, "test_bucket_name", "diagram_describer")
+
+    # then, another execution environment (with a different ephemeral storage) loads a memory-mapped copy
+    loaded = ExampleIndex.load(s3, "test_bucket_name", "diagram_describer", directory=str(tmp_path / "other"))
+    assert loaded.keys == ["x.png"] and loaded.etags == ["1"]
+    assert isinstance(loaded.vectors, np.memmap)
+    np.testing.assert_array_equal(loaded.vectors, index.vectors)
+
+
+def test_example_retriever_returns_the_top_k_similar_examples(s3):
+    from genai_core.example_retriever import ExampleRetriever
+
+    # given
+    for name in ["x", "y", "xy"]:
+        s3.put_object(Bucket="test_bucket_name", Key=f"genai_core_examples/op/{name}.png", Body=name.encode())
+        s3.put_object(Bucket="test_bucket_name", Key=f"genai_core_examples/op/{name}.png.description",
+                      Body=f"{name} description".encode())
+
+    vectors = {b"x": a_vector(1, 0), b"y": a_vector(0, 1), b"xy": a_vector(1, 1), b"query": a_vector(0.1, 1)}
+    embed = Mock(side_effect=lambda image: vectors[image])
+
+    # when
+    results = ExampleRetriever(s3_client=s3, embed=embed).get_operation_examples(
+        operation_name="op", similar_to=b"query", top_k=2)
+
+    # then, we keep the listing order
+    assert [r["diagram_description"] for r in results] == ["xy description", "y description"]
+
+    # and only the query is embedded on subsequent calls
+    embed.reset_mock()
+    ExampleRetriever(s3_client=s3, embed=embed).get_operation_examples(operation_name="op", similar_to=b"query",
+                                                                       top_k=2)
+    assert embed.call_args_list[0].args == (b"query",) and embed.call_count == 1
+
+
+def test_example_retriever_falls_back_to_the_first_examples_when_embedding_fails(s3):
+    from genai_core.example_retriever import ExampleRetriever
+
+    # given
+    for name in ["x", "y", "z"]:
+        s3.put_object(Bucket="test_bucket_name", Key=f"genai_core_examples/op/{name}.png", Body=name.encode())
+        s3.put_object(Bucket="test_bucket_name", Key=f"genai_core_examples/op/{name}.png.description",
+                      Body=f"{name} description".encode())
+
+    embed = Mock(side_effect=Exception("ThrottlingException"))
+
+    # when
+    results = ExampleRetriever(s3_client=s3, embed=embed).get_operation_examples(
+        operation_name="op", similar_to=b"query", top_k=2)
+
+    # then
+    assert [r["diagram_description"] for r in results] == ["x description", "y description"]
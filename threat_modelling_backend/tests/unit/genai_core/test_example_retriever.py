@@ -5,6 +5,7 @@
 import boto3
 from moto import mock_aws
 import pytest
+from unittest.mock import Mock
 
 
 @pytest.fixture(autouse=True)
@@ -12,6 +13,13 @@ def mock_environment(monkeypatch, bucket_name):
     monkeypatch.setenv("DATA_BUCKET_NAME", bucket_name)
 
 
+@pytest.fixture(autouse=True)
+def clear_examples_cache():
+    from genai_core.example_retriever import examples_cache
+
+    examples_cache.clear()
+
+
 @pytest.fixture(scope="function")
 def s3(aws_credentials):
     with mock_aws():
@@ -120,3 +128,74 @@ def test_example_retriever_when_there_are_multiple_examples(s3, populated_bucket
         {"image_bytes": b"data", "diagram_description": "description"},
         {"image_bytes": b"another_data", "diagram_description": "another_description"}
     ]
+
+
+def test_example_retriever_serves_examples_from_cache(s3, populated_bucket, operation_name):
+    from genai_core.example_retriever import ExampleRetriever
+
+    # given, a first call has loaded the examples
+    ExampleRetriever(s3_client=s3).get_operation_examples(operation_name=operation_name)
+
+    s3_client = Mock(wraps=s3)
+    examples_retriever = ExampleRetriever(s3_client=s3_client)
+
+    # when
+    results = examples_retriever.get_operation_examples(operation_name=operation_name)
+
+    # then, a new retriever doesn't need any request to S3
+    assert results == [{"image_bytes": b"data", "diagram_description": "description"}]
+    assert s3_client.method_calls == []
+
+
+def test_example_retriever_only_downloads_changed_examples(s3, populated_bucket, bucket_name, example_files,
+                                                           operation_name):
+    from genai_core.example_retriever import ExampleRetriever, ExamplesCache
+
+    # given, a cache that revalidates examples on every call
+    cache = ExamplesCache(ttl_seconds=0)
+    ExampleRetriever(s3_client=s3, cache=cache).get_operation_examples(operation_name=operation_name)
+
+    _, description = example_files
+    s3.put_object(Bucket=bucket_name, Key=f"genai_core_examples/{operation_name}/{description}", Body=b"changed")
+
+    s3_client = Mock(wraps=s3)
+
+    # when
+    results = ExampleRetriever(s3_client=s3_client, cache=cache).get_operation_examples(operation_name=operation_name)
+
+    # then, we listed the folder and only downloaded the changed description
+    assert results == [{"image_bytes": b"data", "diagram_description": "changed"}]
+    assert [c[0] for c in s3_client.method_calls] == ["get_paginator", "get_object"]
+
+
+def test_example_retriever_reads_all_pages(s3, populated_bucket, bucket_name, example_files, operation_name):
+    from genai_core.example_retriever import ExampleRetriever
+
+    # given, an image and its description in different pages
+    pages = [{"Contents": [obj]} for obj in s3.list_objects_v2(Bucket=bucket_name)["Contents"]]
+
+    s3_client = Mock(wraps=s3)
+    s3_client.get_paginator.return_value.paginate.return_value = pages
+
+    # when
+    results = ExampleRetriever(s3_client=s3_client).get_operation_examples(operation_name=operation_name)
+
+    # then
+    assert results == [{"image_bytes": b"data", "diagram_description": "description"}]
+
+
+def test_example_retriever_does_not_cache_a_failed_listing(s3, populated_bucket, operation_name):
+    from genai_core.example_retriever import ExampleRetriever
+
+    # given, a transient S3 error
+    s3_client = Mock(wraps=s3)
+    s3_client.get_paginator.side_effect = [Exception("Throttling"), s3.get_paginator("list_objects_v2")]
+    examples_retriever = ExampleRetriever(s3_client=s3_client)
+
+    # when
+    first_results = examples_retriever.get_operation_examples(operation_name=operation_name)
+    second_results = examples_retriever.get_operation_examples(operation_name=operation_name)
+
+    # then
+    assert first_results == []
+    assert second_results == [{"image_bytes": b"data", "diagram_description": "description"}]
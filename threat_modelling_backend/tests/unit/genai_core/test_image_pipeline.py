@@ -0,0 +1,74 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import io
+
+import boto3
+from moto import mock_aws
+from PIL import Image
+import pytest
+from unittest.mock import patch
+
+
+@pytest.fixture(scope="function")
+def s3(aws_credentials):
+    with mock_aws():
+        yield boto3.client("s3", region_name="us-east-1")
+
+
+@pytest.fixture
+def bucket_name(s3):
+    s3.create_bucket(Bucket="test_bucket_name")
+    return "test_bucket_name"
+
+
+def an_image(size, mode="RGB", image_format="PNG") -> bytes:
+    output = io.BytesIO()
+    Image.new(mode, size).save(output, format=image_format)
+    return output.getvalue()
+
+
+def test_normalize_image_downscales_large_images():
+    from genai_core.image_pipeline import normalize_image
+
+    # when
+    normalized = Image.open(io.BytesIO(normalize_image(an_image((4000, 1000), image_format="JPEG"))))
+
+    # then, the long edge fits the model's resolution and the aspect ratio is preserved
+    assert normalized.format == "PNG"
+    assert normalized.size == (1568, 392)
+
+
+def test_normalize_image_flattens_transparency_and_keeps_small_images():
+    from genai_core.image_pipeline import normalize_image
+
+    # when
+    normalized = Image.open(io.BytesIO(normalize_image(an_image((100, 50), mode="RGBA"))))
+
+    # then, a fully transparent image becomes white instead of black
+    assert normalized.size == (100, 50)
+    assert normalized.mode == "RGB"
+    assert normalized.getpixel((0, 0)) == (255, 255, 255)
+
+
+def test_get_normalized_image_stores_the_normalized_variant(s3, bucket_name):
+    from genai_core.image_pipeline import get_normalized_image, normalize_image
+
+    # given
+    s3.put_object(Bucket=bucket_name, Key="diagram.png", Body=an_image((3000, 3000)))
+
+    # when
+    image = get_normalized_image(s3, bucket_name, "diagram.png")
+
+    # then, the next caller reads the stored variant instead of normalizing again
+    with patch("genai_core.image_pipeline.normalize_image", wraps=normalize_image) as normalize:
+        assert get_normalized_image(s3, bucket_name, "diagram.png") == image
+        normalize.assert_not_called()
+
+    keys = [obj["Key"] for obj in s3.list_objects_v2(Bucket=bucket_name)["Contents"]]
+    assert len([key for key in keys if key.startswith("normalized/")]) == 1
+
+    # and replacing the upload changes its ETag, so we normalize it again
+    s3.put_object(Bucket=bucket_name, Key="diagram.png", Body=an_image((200, 100)))
+    assert Image.open(io.BytesIO(get_normalized_image(s3, bucket_name, "diagram.png"))).size == (200, 100)
@@ -0,0 +1,89 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import json
+
+import pytest
+from unittest.mock import patch, Mock
+
+from genai_core.clients import MaxTokensExceededException
+from genai_core.model import DFDComponent
+from genai_core.streaming import IncrementalJsonArrayParser, stream_tool_use_items
+
+
+@pytest.fixture
+def components():
+    return [
+        {"componentType": "Process", "name": "API {gateway}", "description": "Routes \"requests\" [to] lambdas"},
+        {"componentType": "DataStore", "name": "Table", "description": "Stores items\\n"},
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+def test_parser_yields_each_item_as_soon_as_it_closes(components, chunk_size):
+    document = json.dumps({"components": components})
+    parser = IncrementalJsonArrayParser()
+
+    # when
+    items_per_chunk = [parser.feed(document[i:i + chunk_size]) for i in range(0, len(document), chunk_size)]
+
+    # then
+    assert [item for items in items_per_chunk for item in items] == components
+
+    # and the first item is available before the whole document has been fed
+    first_chunk_with_items = next(i for i, items in enumerate(items_per_chunk) if items)
+    assert first_chunk_with_items * chunk_size < len(document) - len(json.dumps(components[-1]))
+
+
+def test_parser_ignores_nested_objects():
+    parser = IncrementalJsonArrayParser()
+
+    items = parser.feed('{"threats": [{"name": "a", "dreadScores": {"damage": 1}}]}')
+
+    assert items == [{"name": "a", "dreadScores": {"damage": 1}}]
+
+
+@patch("genai_core.streaming.add_usage_metrics")
+def test_stream_tool_use_items(add_usage_metrics: Mock, components):
+    document = json.dumps({"components": components})
+    bedrock_client = Mock()
+    bedrock_client.converse_stream.return_value = {"stream": [
+        {"messageStart": {"role": "assistant"}},
+        {"contentBlockStart": {"start": {"toolUse": {"toolUseId": "1", "name": "DFD"}}, "contentBlockIndex": 0}},
+        *[{"contentBlockDelta": {"delta": {"toolUse": {"input": document[i:i + 10]}}, "contentBlockIndex": 0}}
+          for i in range(0, len(document), 10)],
+        {"contentBlockStop": {"contentBlockIndex": 0}},
+        {"messageStop": {"stopReason": "tool_use"}},
+        {"metadata": {"usage": {"inputTokens": 1, "outputTokens": 1, "totalTokens": 2}, "metrics": {"latencyMs": 1}}},
+    ]}
+
+    # when
+    results = [DFDComponent.model_validate(item) for item in
+               stream_tool_use_items(bedrock_client, "a_method", modelId="a-model")]
+
+    # then
+    assert [c.name for c in results] == [c["name"] for c in components]
+    add_usage_metrics.assert_called_once()
+
+
+@patch("genai_core.streaming.add_usage_metrics")
+def test_stream_tool_use_items_raises_when_truncated(add_usage_metrics: Mock, components):
+    document = json.dumps({"components": components})
+    bedrock_client = Mock()
+    bedrock_client.converse_stream.return_value = {"stream": [
+        {"contentBlockDelta": {"delta": {"toolUse": {"input": document[:-20]}}, "contentBlockIndex": 0}},
+        {"messageStop": {"stopReason": "max_tokens"}},
+        {"metadata": {"usage": {"inputTokens": 1, "outputTokens": 1, "totalTokens": 2}, "metrics": {"latencyMs": 1}}},
+    ]}
+    results = []
+
+    # when
+    with pytest.raises(MaxTokensExceededException):
+        for item in stream_tool_use_items(bedrock_client, "a_method", modelId="a-model",
+                                          inferenceConfig={"maxTokens": 10}):
+            results.append(item)
+
+    # then the complete items were yielded, and the usage recorded
+    assert results == components[:1]
+    add_usage_metrics.assert_called_once()
@@ -0,0 +1,134 @@
+# Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: LicenseRef-.amazon.com.-AmznSL-1.0
+# Licensed under the Amazon Software License  http://aws.amazon.com/asl/
+
+import pytest
+from unittest.mock import patch, Mock
+
+from genai_core.model import DFDComponent, StrideType
+
+
+@pytest.fixture
+def component(faker):
+    return DFDComponent(name=faker.word(), description=faker.text(), component_type="DataStore")
+
+
+@pytest.fixture
+def a_threat():
+    def _a_threat(name, stride_type):
+        return {"name": name, "threatType": stride_type, "description": "a description",
+                "dreadScores": {"damage": 1, "reproducibility": 1, "exploitability": 1, "affectedUsers": 1,
+                                "discoverability": 1}}
+
+    return _a_threat
+
+
+@pytest.fixture
+def tool_use_response():
+    def _tool_use_response(tool_input):
+        return {"output": {"message": {"role": "assistant", "content": [{"toolUse": {"input": tool_input}}]}},
+                "usage": {"inputTokens": 1, "outputTokens": 1, "totalTokens": 2}, "metrics": {"latencyMs": 1}}
+
+    return _tool_use_response
+
+
+@patch("genai_core.metrics.add_usage_metrics")
+@patch("genai_core.threats_generator.CachedConverseClient")
+@patch("genai_core.threats_generator.BedrockClient")
+def test_generate_threats_by_stride_type_uses_a_single_call(BedrockClient: Mock, CachedConverseClient: Mock,
+                                                            add_usage_metrics: Mock, component, a_threat,
+                                                            tool_use_response):
+    from genai_core.threats_generator import generate_threats_by_stride_type
+
+    # given
+    bedrock_client = CachedConverseClient.return_value
+    bedrock_client.converse.return_value = tool_use_response({"strideThreats": [
+        {"threatType": "Spoofing", "threats": [a_threat("spoof", "Spoofing")]},
+        # the model may misclassify a threat within a group, we trust the group
+        {"threatType": "Tampering", "threats": [a_threat("tamper", "Spoofing")]},
+    ]})
+
+    # when
+    threats_by_stride_type = generate_threats_by_stride_type(
+        b"image", "a description", component,
+        [StrideType.SPOOFING, StrideType.TAMPERING, StrideType.REPUDIATION])
+
+    # then
+    assert bedrock_client.converse.call_count == 1
+    assert list(threats_by_stride_type.keys()) == ["Spoofing", "Tampering", "Repudiation"]
+    assert [t.name for t in threats_by_stride_type["Spoofing"].threats] == ["spoof"]
+    assert [t.stride_type for t in threats_by_stride_type["Tampering"].threats] == ["Tampering"]
+    assert threats_by_stride_type["Repudiation"].threats == []
+
+    kwargs = bedrock_client.converse.call_args.kwargs
+    assert kwargs["toolConfig"]["toolChoice"]["tool"]["name"] == "ThreatsByStrideType"
+    assert "Spoofing, Tampering and Repudiation threats" in kwargs["messages"][0]["content"][-1]["text"]
+
+
+@patch("genai_core.metrics.add_usage_metrics")
+@patch("genai_core.threats_generator.CachedConverseClient")
+@patch("genai_core.threats_generator.BedrockClient")
+def test_get_threats_by_stride_type_splits_stride_types_exceeding_max_tokens(BedrockClient: Mock,
+                                                                            CachedConverseClient: Mock,
+                                                                            add_usage_metrics: Mock, component,
+                                                                            a_threat, tool_use_response):
+    from genai_core.threats_generator import get_threats_by_stride_type_for_component, MaxTokensExceededException
+
+    # given
+    def converse(**kwargs):
+        text = kwargs["messages"][0]["content"][-1]["text"]
+        stride_type = next((t.value for t in StrideType if f"list of {t.value} threats" in text), None)
+        if stride_type in (None, "Repudiation"):
+            # the threats of more than one type, or of Repudiation, do not fit in the output tokens
+            return {**tool_use_response({"strideThreats": []}), "stopReason": "max_tokens"}
+        return tool_use_response({"strideThreats": [{"threatType": stride_type,
+                                                     "threats": [a_threat(stride_type.lower(), stride_type)]}]})
+
+    CachedConverseClient.return_value.converse.side_effect = converse
+
+    # when
+    threats = get_threats_by_stride_type_for_component(b"image", "a description", component,
+                                                       ["Spoofing", "Tampering"], None)
+
+    # then
+    assert {stride_type: [t.name for t in t.threats] for stride_type, t in threats.items()} == {
+        "Spoofing": ["spoofing"], "Tampering": ["tampering"]}
+
+    # and the threats of a single type that do not fit are an error, [S, T, R] is split in [S], [T] and [R]
+    with pytest.raises(MaxTokensExceededException):
+        get_threats_by_stride_type_for_component(b"image", "a description", component,
+                                                 ["Spoofing", "Tampering", "Repudiation"], None)
+
+
+@patch("genai_core.metrics.add_usage_metrics")
+@patch("genai_core.threats_generator.CachedConverseClient")
+@patch("genai_core.threats_generator.BedrockClient")
+def test_threats_requests_share_a_cached_prefix(BedrockClient: Mock, CachedConverseClient: Mock,
+                                                add_usage_metrics: Mock, component, tool_use_response):
+    from genai_core.clients import ConverseModelIds
+    from genai_core.threats_generator import generate_threats
+
+    # given
+    bedrock_client = CachedConverseClient.return_value
+    bedrock_client.converse.return_value = tool_use_response({"threats": []})
+
+    # when
+    for stride_type in [StrideType.SPOOFING, StrideType.TAMPERING]:
+        generate_threats(b"image", "a description", component, stride_type, iterations=1,
+                         model_id=ConverseModelIds.CLAUDE_V3_5_SONNET_V2_MODEL_ID)
+
+    # then, everything up to the cache checkpoint is the same for both STRIDE types
+    spoofing, tampering = [c.kwargs for c in bedrock_client.converse.call_args_list]
+    assert spoofing["system"] == tampering["system"]
+
+    spoofing_content, tampering_content = spoofing["messages"][0]["content"], tampering["messages"][0]["content"]
+    assert spoofing_content[2] == {"cachePoint": {"type": "default"}}
+    assert spoofing_content[:3] == tampering_content[:3]
+    assert spoofing_content[3] != tampering_content[3]
+
+
+def test_cache_point_is_only_added_for_supported_models():
+    from genai_core.clients import cache_point, ConverseModelIds
+
+    assert cache_point(ConverseModelIds.CLAUDE_V3_5_SONNET_V2_MODEL_ID) == [{"cachePoint": {"type": "default"}}]
+    assert cache_point(ConverseModelIds.CLAUDE_V3_5_SONNET_MODEL_ID) == []
@@ -178,6 +178,13 @@ export type DiagramSummary = {
   status: DiagramStatus,
   diagramDescription?: string | null,
   userDescription?: string | null,
+  createdAt?: string | null,
+};
+
+export type DiagramSummaryPage = {
+  __typename: "DiagramSummaryPage",
+  items:  Array<DiagramSummary >,
+  nextToken?: string | null,
 };
 
 export type GeneratedThreatsSubQuerySubscriptionVariables = {
@@ -375,6 +382,46 @@ export type ComponentsMutation = {
   } | null,
 };
 
+export type PartialComponentsMutationVariables = {
+  id: string,
+  components?: Array< ComponentInput | null > | null,
+};
+
+export type PartialComponentsMutation = {
+  partialComponents?:  {
+    __typename: "Diagram",
+    id?: string | null,
+    s3Prefix?: string | null,
+    userDescription?: string | null,
+    diagramDescription?: string | null,
+    components?:  Array< {
+      __typename: "Component",
+      id: string,
+      name: string,
+      componentType: ComponentType,
+      description: string,
+      threats?:  Array< {
+        __typename: "Threat",
+        id: string,
+        name: string,
+        description: string,
+        threatType: ThreatType,
+        dreadScores:  {
+          __typename: "DREADScore",
+          damage: number,
+          reproducibility: number,
+          exploitability: number,
+          affectedUsers: number,
+          discoverability: number,
+        },
+        action: ThreatAction,
+        reason?: string | null,
+      } | null > | null,
+    } | null > | null,
+    status?: DiagramStatus | null,
+  } | null,
+};
+
 export type GenerateThreatsMutationVariables = {
   generateThreatsInput: GenerateThreatsInput,
 };
@@ -454,6 +501,46 @@ export type ThreatsMutation = {
   } | null,
 };
 
+export type PartialThreatsMutationVariables = {
+  id: string,
+  components?: Array< ComponentInput | null > | null,
+};
+
+export type PartialThreatsMutation = {
+  partialThreats?:  {
+    __typename: "Diagram",
+    id?: string | null,
+    s3Prefix?: string | null,
+    userDescription?: string | null,
+    diagramDescription?: string | null,
+    components?:  Array< {
+      __typename: "Component",
+      id: string,
+      name: string,
+      componentType: ComponentType,
+      description: string,
+      threats?:  Array< {
+        __typename: "Threat",
+        id: string,
+        name: string,
+        description: string,
+        threatType: ThreatType,
+        dreadScores:  {
+          __typename: "DREADScore",
+          damage: number,
+          reproducibility: number,
+          exploitability: number,
+          affectedUsers: number,
+          discoverability: number,
+        },
+        action: ThreatAction,
+        reason?: string | null,
+      } | null > | null,
+    } | null > | null,
+    status?: DiagramStatus | null,
+  } | null,
+};
+
 export type CreateComponentMutationVariables = {
   createComponentInput?: CreateComponentInput | null,
 };
@@ -587,17 +674,24 @@ export type GenerateReportMutation = {
 };
 
 export type ListDiagramsQueryVariables = {
+  limit?: number | null,
+  nextToken?: string | null,
 };
 
 export type ListDiagramsQuery = {
-  listDiagrams?:  Array< {
-    __typename: "DiagramSummary",
-    id: string,
-    s3Prefix: string,
-    status: DiagramStatus,
-    diagramDescription?: string | null,
-    userDescription?: string | null,
-  } | null > | null,
+  listDiagrams?:  {
+    __typename: "DiagramSummaryPage",
+    items:  Array< {
+      __typename: "DiagramSummary",
+      id: string,
+      s3Prefix: string,
+      status: DiagramStatus,
+      diagramDescription?: string | null,
+      userDescription?: string | null,
+      createdAt?: string | null,
+    } >,
+    nextToken?: string | null,
+  } | null,
 };
 
 export type GetDiagramQueryVariables = {
@@ -717,6 +811,45 @@ export type ExtractedComponentsSubscription = {
   } | null,
 };
 
+export type ExtractedPartialComponentsSubscriptionVariables = {
+  id?: string | null,
+};
+
+export type ExtractedPartialComponentsSubscription = {
+  extractedPartialComponents?:  {
+    __typename: "Diagram",
+    id?: string | null,
+    s3Prefix?: string | null,
+    userDescription?: string | null,
+    diagramDescription?: string | null,
+    components?:  Array< {
+      __typename: "Component",
+      id: string,
+      name: string,
+      componentType: ComponentType,
+      description: string,
+      threats?:  Array< {
+        __typename: "Threat",
+        id: string,
+        name: string,
+        description: string,
+        threatType: ThreatType,
+        dreadScores:  {
+          __typename: "DREADScore",
+          damage: number,
+          reproducibility: number,
+          exploitability: number,
+          affectedUsers: number,
+          discoverability: number,
+        },
+        action: ThreatAction,
+        reason?: string | null,
+      } | null > | null,
+    } | null > | null,
+    status?: DiagramStatus | null,
+  } | null,
+};
+
 export type GeneratedThreatsSubscriptionVariables = {
   id?: string | null,
 };
@@ -756,6 +889,45 @@ export type GeneratedThreatsSubscription = {
   } | null,
 };
 
+export type GeneratedPartialThreatsSubscriptionVariables = {
+  id?: string | null,
+};
+
+export type GeneratedPartialThreatsSubscription = {
+  generatedPartialThreats?:  {
+    __typename: "Diagram",
+    id?: string | null,
+    s3Prefix?: string | null,
+    userDescription?: string | null,
+    diagramDescription?: string | null,
+    components?:  Array< {
+      __typename: "Component",
+      id: string,
+      name: string,
+      componentType: ComponentType,
+      description: string,
+      threats?:  Array< {
+        __typename: "Threat",
+        id: string,
+        name: string,
+        description: string,
+        threatType: ThreatType,
+        dreadScores:  {
+          __typename: "DREADScore",
+          damage: number,
+          reproducibility: number,
+          exploitability: number,
+          affectedUsers: number,
+          discoverability: number,
+        },
+        action: ThreatAction,
+        reason?: string | null,
+      } | null > | null,
+    } | null > | null,
+    status?: DiagramStatus | null,
+  } | null,
+};
+
 export type GeneratedAllThreatsSubscriptionVariables = {
   id?: string | null,
 };
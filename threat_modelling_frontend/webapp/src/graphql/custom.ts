@@ -63,3 +63,58 @@ export const generatedThreatsSubQuery = /* GraphQL */ `
   APITypes.GeneratedThreatsSubscriptionVariables,
   GeneratedThreatsSubscription
 >;
+
+export type GeneratedPartialThreatsSubscription = {
+  generatedPartialThreats?: {
+    __typename: "Diagram";
+    id?: string | null;
+    s3Prefix?: string | null;
+    userDescription?: string | null;
+    diagramDescription?: string | null;
+    components?: Array<{
+      __typename: "Component";
+      id: string;
+      name: string;
+      componentType: APITypes.ComponentType;
+      description: string;
+      threats?: Threat[] | null;
+    } | null> | null;
+  } | null;
+};
+
+export const generatedPartialThreatsSubQuery = /* GraphQL */ `
+  subscription GeneratedPartialThreatsSubQuery($id: ID) {
+    generatedPartialThreats(id: $id) {
+      id
+      s3Prefix
+      userDescription
+      diagramDescription
+      components {
+        id
+        name
+        componentType
+        description
+        threats {
+          id
+          name
+          description
+          threatType
+          dreadScores {
+            damage
+            reproducibility
+            exploitability
+            affectedUsers
+            discoverability
+          }
+          action
+          __typename
+        }
+        __typename
+      }
+      __typename
+    }
+  }
+` as GeneratedSubscription<
+  APITypes.GeneratedPartialThreatsSubscriptionVariables,
+  GeneratedPartialThreatsSubscription
+>;
@@ -159,6 +159,44 @@ export const components = /* GraphQL */ `mutation Components($id: ID!, $componen
   APITypes.ComponentsMutationVariables,
   APITypes.ComponentsMutation
 >;
+export const partialComponents = /* GraphQL */ `mutation PartialComponents($id: ID!, $components: [ComponentInput]) {
+  partialComponents(id: $id, components: $components) {
+    id
+    s3Prefix
+    userDescription
+    diagramDescription
+    components {
+      id
+      name
+      componentType
+      description
+      threats {
+        id
+        name
+        description
+        threatType
+        dreadScores {
+          damage
+          reproducibility
+          exploitability
+          affectedUsers
+          discoverability
+          __typename
+        }
+        action
+        reason
+        __typename
+      }
+      __typename
+    }
+    status
+    __typename
+  }
+}
+` as GeneratedMutation<
+  APITypes.PartialComponentsMutationVariables,
+  APITypes.PartialComponentsMutation
+>;
 export const generateThreats = /* GraphQL */ `mutation GenerateThreats($generateThreatsInput: GenerateThreatsInput!) {
   generateThreats(generateThreatsInput: $generateThreatsInput) {
     id
@@ -235,6 +273,44 @@ export const threats = /* GraphQL */ `mutation Threats($id: ID!, $components: [C
   APITypes.ThreatsMutationVariables,
   APITypes.ThreatsMutation
 >;
+export const partialThreats = /* GraphQL */ `mutation PartialThreats($id: ID!, $components: [ComponentInput]) {
+  partialThreats(id: $id, components: $components) {
+    id
+    s3Prefix
+    userDescription
+    diagramDescription
+    components {
+      id
+      name
+      componentType
+      description
+      threats {
+        id
+        name
+        description
+        threatType
+        dreadScores {
+          damage
+          reproducibility
+          exploitability
+          affectedUsers
+          discoverability
+          __typename
+        }
+        action
+        reason
+        __typename
+      }
+      __typename
+    }
+    status
+    __typename
+  }
+}
+` as GeneratedMutation<
+  APITypes.PartialThreatsMutationVariables,
+  APITypes.PartialThreatsMutation
+>;
 export const createComponent = /* GraphQL */ `mutation CreateComponent($createComponentInput: CreateComponentInput) {
   createComponent(createComponentInput: $createComponentInput) {
     id
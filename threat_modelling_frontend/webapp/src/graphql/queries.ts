@@ -8,13 +8,18 @@ type GeneratedQuery<InputType, OutputType> = string & {
   __generatedQueryOutput: OutputType;
 };
 
-export const listDiagrams = /* GraphQL */ `query ListDiagrams {
-  listDiagrams {
-    id
-    s3Prefix
-    status
-    diagramDescription
-    userDescription
+export const listDiagrams = /* GraphQL */ `query ListDiagrams($limit: Int, $nextToken: String) {
+  listDiagrams(limit: $limit, nextToken: $nextToken) {
+    items {
+      id
+      s3Prefix
+      status
+      diagramDescription
+      userDescription
+      createdAt
+      __typename
+    }
+    nextToken
     __typename
   }
 }
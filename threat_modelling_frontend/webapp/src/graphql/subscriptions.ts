@@ -84,6 +84,44 @@ export const extractedComponents = /* GraphQL */ `subscription ExtractedComponen
   APITypes.ExtractedComponentsSubscriptionVariables,
   APITypes.ExtractedComponentsSubscription
 >;
+export const extractedPartialComponents = /* GraphQL */ `subscription ExtractedPartialComponents($id: ID) {
+  extractedPartialComponents(id: $id) {
+    id
+    s3Prefix
+    userDescription
+    diagramDescription
+    components {
+      id
+      name
+      componentType
+      description
+      threats {
+        id
+        name
+        description
+        threatType
+        dreadScores {
+          damage
+          reproducibility
+          exploitability
+          affectedUsers
+          discoverability
+          __typename
+        }
+        action
+        reason
+        __typename
+      }
+      __typename
+    }
+    status
+    __typename
+  }
+}
+` as GeneratedSubscription<
+  APITypes.ExtractedPartialComponentsSubscriptionVariables,
+  APITypes.ExtractedPartialComponentsSubscription
+>;
 export const generatedThreats = /* GraphQL */ `subscription GeneratedThreats($id: ID) {
   generatedThreats(id: $id) {
     id
@@ -122,6 +160,44 @@ export const generatedThreats = /* GraphQL */ `subscription GeneratedThreats($id
   APITypes.GeneratedThreatsSubscriptionVariables,
   APITypes.GeneratedThreatsSubscription
 >;
+export const generatedPartialThreats = /* GraphQL */ `subscription GeneratedPartialThreats($id: ID) {
+  generatedPartialThreats(id: $id) {
+    id
+    s3Prefix
+    userDescription
+    diagramDescription
+    components {
+      id
+      name
+      componentType
+      description
+      threats {
+        id
+        name
+        description
+        threatType
+        dreadScores {
+          damage
+          reproducibility
+          exploitability
+          affectedUsers
+          discoverability
+          __typename
+        }
+        action
+        reason
+        __typename
+      }
+      __typename
+    }
+    status
+    __typename
+  }
+}
+` as GeneratedSubscription<
+  APITypes.GeneratedPartialThreatsSubscriptionVariables,
+  APITypes.GeneratedPartialThreatsSubscription
+>;
 export const generatedAllThreats = /* GraphQL */ `subscription GeneratedAllThreats($id: ID) {
   generatedAllThreats(id: $id) {
     id
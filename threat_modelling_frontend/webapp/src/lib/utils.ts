@@ -49,6 +49,22 @@ export function removeKeys<T>(data: T, keysToRemove: string[]): T {
   return data;
 }
 
+/**
+ * Replaces the items that have the same id as one of the updates, and appends the others.
+ * @param items The current items.
+ * @param updates The items to replace or append.
+ * @returns A new array with the updates applied.
+ */
+export function upsertById<T extends { id: string }>(items: T[], updates: T[]): T[] {
+  const updatesById = new Map(updates.map((update) => [update.id, update]));
+  const ids = new Set(items.map((item) => item.id));
+
+  return [
+    ...items.map((item) => updatesById.get(item.id) ?? item),
+    ...updates.filter((update) => !ids.has(update.id)),
+  ];
+}
+
 /**
  * Retrieves a presigned URL for an S3 object.
  *
@@ -4,31 +4,44 @@
 
 import { generateClient } from "aws-amplify/api";
 import { listDiagrams } from "@/graphql/queries";
-import { ListDiagramsQuery } from "@/API";
+import { DiagramSummary, ListDiagramsQuery } from "@/API";
 import { defer, LoaderFunction } from "react-router-dom";
 
-export const listDiagramsLoader: LoaderFunction = () => {
+export const DIAGRAMS_PAGE_SIZE = 50;
+
+export interface DiagramsPage {
+  items: DiagramSummary[];
+  nextToken?: string | null;
+}
+
+// a single page, newest first, the list page asks for the next one when the user wants more
+export const fetchDiagramsPage = async (
+  nextToken?: string | null,
+): Promise<DiagramsPage> => {
   const client = generateClient();
 
-  const fetchDiagrams = async () => {
-    try {
-      const result = await client.graphql<ListDiagramsQuery>({
-        query: listDiagrams,
-      });
-
-      if ("data" in result && result.data?.listDiagrams) {
-        console.log(result.data.listDiagrams);
-        return result.data.listDiagrams;
-      } else {
-        throw new Error("Failed to load diagrams");
-      }
-    } catch (error) {
-      console.error("Error loading diagrams:", error);
-      throw error;
+  try {
+    const result = await client.graphql<ListDiagramsQuery>({
+      query: listDiagrams,
+      variables: { limit: DIAGRAMS_PAGE_SIZE, nextToken },
+    });
+
+    if (!("data" in result) || !result.data?.listDiagrams) {
+      throw new Error("Failed to load diagrams");
     }
-  };
 
+    return {
+      items: result.data.listDiagrams.items,
+      nextToken: result.data.listDiagrams.nextToken,
+    };
+  } catch (error) {
+    console.error("Error loading diagrams:", error);
+    throw error;
+  }
+};
+
+export const listDiagramsLoader: LoaderFunction = () => {
   return defer({
-    diagrams: fetchDiagrams(),
+    firstPage: fetchDiagramsPage(),
   });
 };
@@ -9,13 +9,13 @@ import {generateClient} from "aws-amplify/api";
 import * as mutations from "@/graphql/mutations";
 import * as subscriptions from "@/graphql/subscriptions";
 import * as queries from "@/graphql/queries";
-import {generatedThreatsSubQuery} from "@/graphql/custom";
-import {ComponentInput, ComponentType, CreateComponentInput, Diagram, ThreatAction, ThreatType,} from "@/API";
+import {generatedPartialThreatsSubQuery, generatedThreatsSubQuery} from "@/graphql/custom";
+import {ComponentInput, ComponentType, CreateComponentInput, Diagram, Threat, ThreatAction, ThreatType,} from "@/API";
 
 import {nanoid} from "nanoid";
 import {Badge} from "@/components/ui/badge";
 import {Subscription} from "rxjs";
-import {getPresignedUrl, removeKeys} from "@/lib/utils";
+import {getPresignedUrl, removeKeys, upsertById} from "@/lib/utils";
 import {Label} from "@/components/ui/label";
 import {Textarea} from "@/components/ui/textarea";
 import FileUpload from "@/components/file-upload";
@@ -306,6 +306,32 @@ const Flow: React.FC = () => {
     console.log("Subscribing to extractedComponents");
     setIsLoadingComponents(true);
 
+    // ids of the components shown while the extraction is still streaming
+    const partialComponentIds = new Set<string>();
+
+    const extractPartialComponentsSub: Subscription = clientRef.current
+      .graphql({
+        query: subscriptions.extractedPartialComponents,
+        variables: { id: id },
+      })
+      .subscribe({
+        next: (data) => {
+          console.log("Received partial components:", data);
+          const components = removeKeys(
+            data?.data?.extractedPartialComponents?.components || [],
+            ["__typename"],
+          ).filter(Boolean) as ComponentInput[];
+
+          components.forEach((component) => partialComponentIds.add(component.id));
+          setDiagramComponents((prevComponents) =>
+            upsertById(prevComponents || [], components),
+          );
+        },
+        error: (error) => {
+          console.error(error);
+        },
+      });
+
     const extractComponentsSub: Subscription = clientRef.current
       .graphql({
         query: subscriptions.extractedComponents,
@@ -318,14 +344,21 @@ const Flow: React.FC = () => {
             const components = removeKeys(
               data?.data?.extractedComponents?.components,
               ["__typename"],
+            ) as ComponentInput[];
+            const ids = new Set(components.map((component) => component.id));
+
+            // the final result carries all the components, partial ones included
+            setDiagramComponents((prevComponents) =>
+              upsertById(
+                (prevComponents || []).filter(
+                  (component) =>
+                    !partialComponentIds.has(component.id) ||
+                    ids.has(component.id),
+                ),
+                components,
+              ),
             );
-
-            setDiagramComponents((prevComponents) => {
-              return [
-                ...(prevComponents || []),
-                ...(components as ComponentInput[]),
-              ];
-            });
+            extractPartialComponentsSub.unsubscribe();
             extractComponentsSub.unsubscribe();
             setIsLoadingComponents(false);
           } else {
@@ -361,6 +394,51 @@ const Flow: React.FC = () => {
     console.log("Subscribing to generatedThreats");
     setIsLoadingThreats(true);
 
+    // ids of the threats shown while they are still streaming, until a final result confirms them
+    const unconfirmedThreatIds = new Set<string>();
+
+    const threatsOf = (
+      components?: Array<{ id: string; threats?: Threat[] | null } | null> | null,
+    ): ThreatWithComponentId[] => {
+      const threatsWithComponentId: ThreatWithComponentId[] = [];
+
+      components?.forEach((component) => {
+        component?.threats?.forEach((threat) => {
+          const threatWithComponentId: ThreatWithComponentId = {
+            ...threat,
+            componentId: component.id,
+          };
+          threatsWithComponentId.push(threatWithComponentId);
+        });
+      });
+
+      return threatsWithComponentId;
+    };
+
+    const generatedPartialThreatsSub = clientRef.current
+      .graphql({
+        query: generatedPartialThreatsSubQuery,
+        variables: { id: id },
+      })
+      .subscribe({
+        next: (response) => {
+          console.log("Received partial threats:", response);
+          const threatsWithComponentId = threatsOf(
+            response.data.generatedPartialThreats?.components,
+          );
+
+          threatsWithComponentId.forEach((threat) =>
+            unconfirmedThreatIds.add(threat.id),
+          );
+          setComponentThreats((threats) =>
+            upsertById(threats, threatsWithComponentId),
+          );
+        },
+        error: (error) => {
+          console.error(error);
+        },
+      });
+
     const generatedThreatsSub = clientRef.current
       .graphql({
         query: generatedThreatsSubQuery,
@@ -369,24 +447,16 @@ const Flow: React.FC = () => {
       .subscribe({
         next: (response) => {
           console.log("Received threats:", response);
-          const components = response.data.generatedThreats.components;
-          const threatsWithComponentId: ThreatWithComponentId[] = [];
-
-          if (components?.length) {
-            components.forEach((component) => {
-              component?.threats?.forEach((threat) => {
-                const threatWithComponentId: ThreatWithComponentId = {
-                  ...threat,
-                  componentId: component.id,
-                };
-                threatsWithComponentId.push(threatWithComponentId);
-              });
-            });
-          }
+          const threatsWithComponentId = threatsOf(
+            response.data.generatedThreats?.components,
+          );
 
-          setComponentThreats((threats) => {
-            return [...threats, ...threatsWithComponentId];
-          });
+          threatsWithComponentId.forEach((threat) =>
+            unconfirmedThreatIds.delete(threat.id),
+          );
+          setComponentThreats((threats) =>
+            upsertById(threats, threatsWithComponentId),
+          );
         },
         error: (error) => {
           console.error(error);
@@ -405,6 +475,11 @@ const Flow: React.FC = () => {
             response,
           );
 
+          // partial threats can be regenerated (e.g. after a truncated response), drop the ones never confirmed
+          setComponentThreats((threats) =>
+            threats.filter((threat) => !unconfirmedThreatIds.has(threat.id)),
+          );
+          generatedPartialThreatsSub.unsubscribe();
           generatedThreatsSub.unsubscribe();
           allThreatsGeneratedSub.unsubscribe();
           setIsLoadingThreats(false);
@@ -18,6 +18,7 @@ import { Loader2, SearchIcon } from "lucide-react";
 import { useState, Suspense } from "react";
 import { useLoaderData, Await, Link, useNavigate } from "react-router-dom";
 import { DiagramSummary, DiagramStatus } from "@/API";
+import { DiagramsPage, fetchDiagramsPage } from "@/loaders/list-diagrams-loader";
 
 import {
   Pagination,
@@ -37,13 +38,39 @@ interface Sort {
 
 const List: React.FC = () => {
   const navigate = useNavigate();
-  const loaderData = useLoaderData() as { diagrams: DiagramSummary[] };
+  const loaderData = useLoaderData() as { firstPage: Promise<DiagramsPage> };
 
   const [search, setSearch] = useState("");
-  const [sort, setSort] = useState<Sort>({ key: "id", order: "asc" });
+  // by default we keep the server order (newest first), so that loading more diagrams appends them
+  const [sort, setSort] = useState<Sort | null>(null);
   const [page, setPage] = useState(1);
   const [pageSize] = useState(10);
 
+  // the pages loaded after the first one, and the token of the next page (undefined until we load a second page)
+  const [morePages, setMorePages] = useState<DiagramSummary[]>([]);
+  const [moreToken, setMoreToken] = useState<string | null | undefined>(
+    undefined,
+  );
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const loadedDiagrams = (firstPage: DiagramsPage) => [
+    ...firstPage.items,
+    ...morePages,
+  ];
+  const nextTokenOf = (firstPage: DiagramsPage) =>
+    moreToken === undefined ? firstPage.nextToken : moreToken;
+
+  const loadMore = async (nextToken: string) => {
+    setLoadingMore(true);
+    try {
+      const nextPage = await fetchDiagramsPage(nextToken);
+      setMorePages((diagrams) => [...diagrams, ...nextPage.items]);
+      setMoreToken(nextPage.nextToken ?? null);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const filteredAndSortedDiagrams = (diagramList: DiagramSummary[]) => {
     return diagramList
       .filter((diagram) => {
@@ -58,6 +85,9 @@ const List: React.FC = () => {
         );
       })
       .sort((a, b) => {
+        if (sort === null) {
+          return 0;
+        }
         const aValue = a[sort.key];
         const bValue = b[sort.key];
         if (typeof aValue === "string" && typeof bValue === "string") {
@@ -81,10 +111,11 @@ const List: React.FC = () => {
               </Badge>
             }
           >
-            <Await resolve={loaderData.diagrams}>
-              {(resolvedDiagrams: DiagramSummary[]) => (
+            <Await resolve={loaderData.firstPage}>
+              {(firstPage: DiagramsPage) => (
                 <Badge className="bg-primary text-white">
-                  {resolvedDiagrams.length}
+                  {loadedDiagrams(firstPage).length}
+                  {nextTokenOf(firstPage) ? "+" : ""}
                 </Badge>
               )}
             </Await>
@@ -106,10 +137,13 @@ const List: React.FC = () => {
       </div>
       <Card className="shadow-xl">
         <Suspense fallback={<DataTableSkeleton />}>
-          <Await resolve={loaderData.diagrams}>
-            {(resolvedDiagrams: DiagramSummary[]) => {
-              const filteredDiagrams =
-                filteredAndSortedDiagrams(resolvedDiagrams);
+          <Await resolve={loaderData.firstPage}>
+            {(firstPage: DiagramsPage) => {
+              // search and sort apply to the diagrams loaded so far
+              const filteredDiagrams = filteredAndSortedDiagrams(
+                loadedDiagrams(firstPage),
+              );
+              const nextToken = nextTokenOf(firstPage);
               const totalPages = Math.ceil(filteredDiagrams.length / pageSize);
               const paginatedDiagrams = filteredDiagrams.slice(
                 (page - 1) * pageSize,
@@ -136,7 +170,7 @@ const List: React.FC = () => {
                               setSort({
                                 key,
                                 order:
-                                  sort.key === key
+                                  sort?.key === key
                                     ? sort.order === "asc"
                                       ? "desc"
                                       : "asc"
@@ -145,7 +179,7 @@ const List: React.FC = () => {
                             }
                           >
                             {key.charAt(0).toUpperCase() + key.slice(1)}
-                            {sort.key === key && (
+                            {sort?.key === key && (
                               <span className="ml-1">
                                 {sort.order === "asc" ? "\u2191" : "\u2193"}
                               </span>
@@ -206,6 +240,16 @@ const List: React.FC = () => {
                       Showing {(page - 1) * pageSize + 1} to{" "}
                       {Math.min(page * pageSize, filteredDiagrams.length)} of{" "}
                       {filteredDiagrams.length} diagrams
+                      {nextToken && (
+                        <Button
+                          variant="link"
+                          className="ml-2 h-auto p-0"
+                          disabled={loadingMore}
+                          onClick={() => loadMore(nextToken)}
+                        >
+                          {loadingMore ? "Loading..." : "Load more"}
+                        </Button>
+                      )}
                     </div>
                     <Pagination className="flex justify-end">
                       <PaginationContent>